@@ -19,5 +19,6 @@ setup(
         #          'ssbio/protein/structure/utils/tleap.py'],
         #          'ssbio/protein/structure/properties/msms.py'],
         long_description=open('README.rst').read(),
+        python_requires='>=3.4',
         install_requires=required
 )
@@ -1,4 +1,5 @@
 from cobra.core import Gene
+from ssbio.core.object import mark_modified
 from ssbio.core.protein import Protein
 import os.path as op
 import ssbio.utils
@@ -25,6 +26,8 @@ class GenePro(Gene):
         Gene.__init__(self, id=id, name=name, functional=functional)
 
         self.pdb_file_type = pdb_file_type
+        self._protein = None
+        self._protein_loader = None
 
         # Create directories
         self._root_dir = None
@@ -33,6 +36,10 @@ class GenePro(Gene):
 
         self.protein = Protein(ident=id, root_dir=self.gene_dir, pdb_file_type=self.pdb_file_type)
 
+    def __setattr__(self, name, value):
+        Gene.__setattr__(self, name, value)
+        mark_modified(self)
+
     @property
     def root_dir(self):
         """Directory where Gene folder is located"""
@@ -56,10 +63,43 @@ class GenePro(Gene):
 
         ssbio.utils.make_dir(self.gene_dir)
 
-        # Propagate changes to protein
-        if hasattr(self, 'protein'):
+        # Propagate changes to protein, a protein which is not loaded yet gets the new folder when it is loaded
+        if self.protein_loaded and self.__dict__.get('_protein'):
             self.protein.root_dir = self.gene_dir
 
+    @property
+    def protein(self):
+        """Protein: Protein encoded by this gene. In a project opened lazily with :func:`ssbio.io.project.load_project`
+        it is loaded from its own file the first time it is used."""
+        loader = self.__dict__.get('_protein_loader')
+        if loader is not None:
+            protein = loader()
+            if self.gene_dir and protein.root_dir != self.gene_dir:
+                protein.root_dir = self.gene_dir
+            self._protein = protein
+            self._protein_loader = None
+        return self.__dict__.get('_protein')
+
+    @protein.setter
+    def protein(self, protein):
+        self._protein = protein
+        self._protein_loader = None
+
+    @property
+    def protein_loaded(self):
+        """bool: If the protein of this gene is in memory, False if it will be loaded from its file when used"""
+        return self.__dict__.get('_protein_loader') is None
+
+    def set_protein_loader(self, loader):
+        """Replace the protein of this gene with a function which loads it the first time it is used.
+
+        Args:
+            loader (callable): Function without arguments returning the Protein
+
+        """
+        self._protein = None
+        self._protein_loader = loader
+
     @property
     def gene_dir(self):
         """Gene folder"""
@@ -86,8 +126,22 @@ class GenePro(Gene):
 
         return new_gene
 
+    def __getstate__(self):
+        # Load the protein so a pickled gene does not depend on the file it was loaded from
+        self.protein
+        return Gene.__getstate__(self)
+
+    def __setstate__(self, state):
+        # Genes pickled before the protein was loaded lazily store it as "protein"
+        if 'protein' in state:
+            state['_protein'] = state.pop('protein')
+        state.setdefault('_protein_loader', None)
+        self.__dict__.update(state)
+
     def __json_decode__(self, **attrs):
         Gene.__init__(self, id=attrs['id'])
+        self._protein = None
+        self._protein_loader = None
         for k, v in attrs.items():
             if k not in ['id']:
                 setattr(self, k, v)
@@ -1,4 +1,6 @@
+import itertools
 import logging
+import weakref
 from copy import deepcopy
 
 import pandas as pd
@@ -8,6 +10,131 @@ import ssbio.utils
 
 log = logging.getLogger(__name__)
 
+_json_schemas = {}
+
+# Versions of objects, kept outside the objects so they are not saved with them
+_versions = {}
+_version_clock = itertools.count(1)
+
+
+class JSONSchema(object):
+
+    """Fields of a class which are saved in JSON, worked out once from the class instead of for every object.
+
+    An object is saved with its instance attributes and the data attributes of its class, except properties, methods
+    (and any other callable) and private ``__`` names.
+
+    Args:
+        cls (type): Class of the objects to encode
+
+    """
+
+    def __init__(self, cls):
+        self.private_prefix = '_{}__'.format(cls.__name__)
+        self.properties = set()
+        class_fields = []
+        for a in dir(cls):
+            if self.is_private(a):
+                continue
+            value = getattr(cls, a, None)
+            if isinstance(value, property):
+                self.properties.add(a)
+            elif not callable(value):
+                class_fields.append(a)
+        self.class_fields = tuple(class_fields)
+
+    def is_private(self, name):
+        return name.startswith('__') or name.startswith(self.private_prefix)
+
+    def encode(self, obj, exclude=None):
+        """Get the fields of an object to save in JSON, sorted by name.
+
+        Args:
+            obj: Object of the class of this schema
+            exclude (list): Fields to leave out
+
+        Returns:
+            dict: Field names and values
+
+        """
+        instance_dict = obj.__dict__
+        fields = {a: getattr(obj, a) for a in self.class_fields if a not in instance_dict}
+        for a, value in instance_dict.items():
+            if a not in self.properties and not self.is_private(a) and not callable(value):
+                fields[a] = value
+        if exclude:
+            for a in exclude:
+                fields.pop(a, None)
+        return {a: fields[a] for a in sorted(fields)}
+
+
+def json_schema(cls):
+    """Get the cached :class:`JSONSchema` of a class"""
+    schema = _json_schemas.get(cls)
+    if schema is None:
+        schema = _json_schemas[cls] = JSONSchema(cls)
+    return schema
+
+
+def attribute_dict(obj, only_attributes=None, exclude_attributes=None, df_format=False, copy=True):
+    """Get a dictionary of an object's attributes, see :meth:`Object.get_dict`."""
+    # Choose attributes to return, return everything in the object if a list is not specified
+    if not only_attributes:
+        keys = set(obj.__dict__.keys())
+    else:
+        keys = set(ssbio.utils.force_list(only_attributes))
+
+    # Remove keys you don't want returned
+    if exclude_attributes:
+        keys.difference_update(ssbio.utils.force_list(exclude_attributes))
+
+    df_dict = {}
+    for k, v in obj.__dict__.items():
+        if k not in keys:
+            continue
+        if df_format:
+            # Values are turned into new strings or kept as immutable numbers, so there is nothing to copy
+            if v and not isinstance(v, (str, int, float, bool)):
+                try:
+                    df_dict[k] = ssbio.utils.force_string(v)
+                except TypeError:
+                    log.warning('{}: excluding attribute from dict, cannot transform into string'.format(k))
+            elif not v and not isinstance(v, int) and not isinstance(v, float):
+                df_dict[k] = None
+            else:
+                df_dict[k] = v
+        elif copy:
+            df_dict[k] = deepcopy(v)
+        else:
+            df_dict[k] = v
+    return df_dict
+
+
+def mark_modified(obj):
+    """Give an object a new version, see :func:`modified_version`."""
+    key = id(obj)
+    if key not in _versions:
+        weakref.finalize(obj, _versions.pop, key, None)
+    _versions[key] = next(_version_clock)
+
+
+def modified_version(obj):
+    """Get the version of an object, a number which changes whenever one of its attributes is set.
+
+    Versions are unique among objects in memory, so a replaced object never has the version of the one it replaces.
+    Objects which were never modified (ie. loaded from a file) have version 0. Changes inside attribute values, like
+    appending to a list, do not change the version.
+
+    Args:
+        obj: :class:`Object`, :class:`~ssbio.core.genepro.GenePro`, or ``None``
+
+    Returns:
+        int: Version of the object
+
+    """
+    return _versions.get(id(obj), 0)
+
+
 class Object(object):
     """Cobra core object with additional methods to update and get attributes"""
 
@@ -16,6 +143,10 @@ class Object(object):
         self.description = description
         self.notes = {}
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        mark_modified(self)
+
     def __str__(self):
         return str(self.id)
 
@@ -88,7 +219,7 @@ class Object(object):
                 else:
                     setattr(self, key, value)
 
-    def get_dict(self, only_attributes=None, exclude_attributes=None, df_format=False):
+    def get_dict(self, only_attributes=None, exclude_attributes=None, df_format=False, copy=True):
         """Get a dictionary of this object's attributes. Optional format for storage in a Pandas DataFrame.
 
         Args:
@@ -97,43 +228,16 @@ class Object(object):
             df_format (bool): If dictionary values should be formatted for a dataframe
                 (everything possible is transformed into strings, int, or float -
                 if something can't be transformed it is excluded)
+            copy (bool): If attribute values should be deep copied. Set to False to get the attributes themselves,
+                which must then not be modified. Values formatted for a dataframe are never copied, as they are
+                new strings or immutable numbers.
 
         Returns:
             dict: Dictionary of attributes
 
         """
-
-        # Choose attributes to return, return everything in the object if a list is not specified
-        if not only_attributes:
-            keys = list(self.__dict__.keys())
-        else:
-            keys = ssbio.utils.force_list(only_attributes)
-
-        # Remove keys you don't want returned
-        if exclude_attributes:
-            exclude_attributes = ssbio.utils.force_list(exclude_attributes)
-            for x in exclude_attributes:
-                if x in keys:
-                    keys.remove(x)
-
-        # Copy attributes into a new dictionary
-        df_dict = {}
-        for k, orig_v in self.__dict__.items():
-            if k in keys:
-                v = deepcopy(orig_v)
-                if df_format:
-                    if v and not isinstance(v, str) and not isinstance(v, int) and not isinstance(v, float) and not isinstance(v, bool):
-                        try:
-                            df_dict[k] = ssbio.utils.force_string(deepcopy(v))
-                        except TypeError:
-                            log.warning('{}: excluding attribute from dict, cannot transform into string'.format(k))
-                    elif not v and not isinstance(v, int) and not isinstance(v, float):
-                        df_dict[k] = None
-                    else:
-                        df_dict[k] = deepcopy(v)
-                else:
-                    df_dict[k] = deepcopy(v)
-        return df_dict
+        return attribute_dict(self, only_attributes=only_attributes, exclude_attributes=exclude_attributes,
+                              df_format=df_format, copy=copy)
 
     def save_dataframes(self, outdir, prefix='df_'):
         """Save all attributes that start with "df" into a specified directory.
@@ -162,25 +266,24 @@ class Object(object):
 
         log.debug('Saved {} dataframes at {}'.format(counter, outdir))
 
-    def save_pickle(self, outfile, protocol=2):
+    def save_pickle(self, outfile, protocol=2, compression=None):
         """Save the object as a pickle file
 
         Args:
             outfile (str): Filename
-            protocol (int): Pickle protocol to use. Default is 2 to remain compatible with Python 2
+            protocol (int): Pickle protocol to use. Default is 2 to remain compatible with Python 2, use 5 for the
+                faster format with out-of-band buffers (Python 3.8+)
+            compression (str): ``zstd``, ``lz4`` or ``gzip`` compression, only with protocol 5
 
         Returns:
             str: Path to pickle file
 
         """
-        ssbio.io.save_pickle(self, outfile, protocol)
+        return ssbio.io.save_pickle(self, outfile, protocol, compression=compression)
 
     def __json_encode__(self):
-        to_return = {}
         # Don't save properties, methods in the JSON
-        for x in [a for a in dir(self) if not a.startswith('__') and not a.startswith('_{}__'.format(type(self).__name__)) and not isinstance(getattr(type(self), a, None), property) and not callable(getattr(self,a))]:
-            to_return.update({x: getattr(self, x)})
-        return to_return
+        return json_schema(type(self)).encode(self)
 
     def save_json(self, outfile, compression=False):
         """Save the object as a JSON file using json_tricks"""
@@ -6,12 +6,12 @@ Protein
 import logging
 import requests
 import shutil
+from copy import deepcopy
 import pandas as pd
 import numpy as np
 import os.path as op
 import seaborn as sns
 from slugify import Slugify
-from collections import defaultdict
 from six.moves.urllib.error import URLError
 
 from Bio.Seq import Seq
@@ -25,11 +25,16 @@ import ssbio.utils
 import ssbio.databases.pdb
 import ssbio.protein.sequence.utils.alignment
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.letter_annotations
+import ssbio.protein.sequence.utils.mapping
+import ssbio.protein.sequence.utils.mutation_matrix
+import ssbio.protein.sequence.utils.seqstore
 import ssbio.protein.structure.properties.quality
 from ssbio.core.object import Object
 from ssbio.protein.sequence.seqprop import SeqProp
 from ssbio.databases.kegg import KEGGProp
 from ssbio.databases.uniprot import UniProtProp
+from ssbio.io import tracing
 from ssbio.protein.structure.structprop import StructProp
 from ssbio.databases.pdb import PDBProp
 from ssbio.protein.structure.homology.itasser.itasserprop import ITASSERProp
@@ -40,6 +45,20 @@ custom_slugify = Slugify(safe_chars='-_.')
 log = logging.getLogger(__name__)
 
 
+def _take_residues(seq_str, indices):
+    """Get the residues at many 0-based indices of a sequence string, as an array of single letters."""
+    return np.frombuffer(seq_str.encode(), dtype='S1')[indices].astype(str)
+
+
+def _take_letter_annotation(values, indices):
+    """Get the values of a letter annotation at many 0-based indices, without copying it per residue."""
+    if isinstance(values, str):
+        return _take_residues(values, indices)
+    if not isinstance(values, np.ndarray):
+        values = pd.Series(values).values
+    return values[indices]
+
+
 class Protein(Object):
 
     """Store information about a protein, which represents the monomeric translated unit of a gene.
@@ -108,6 +127,10 @@ class Protein(Object):
         self.structure_alignments = DictList()
         """DictList: Pairwise or multiple structure alignments - currently a placeholder"""
 
+        # Residue mappings and mutation matrices built from alignments, kept private so they are not saved in JSON files
+        self.__residue_mappings = {}
+        self.__mutation_matrices = {}
+
     @property
     def root_dir(self):
         """str: Path to where the folder named by this protein's ID will be created. Default is current working
@@ -260,6 +283,7 @@ class Protein(Object):
         """
         return DictList(x for x in self.sequences if isinstance(x, seq_type))
 
+    @tracing.traced('protein')
     def load_kegg(self, kegg_id, kegg_organism_code=None, kegg_seq_file=None, kegg_metadata_file=None,
                   set_as_representative=False, download=False, outdir=None, force_rerun=False):
         """Load a KEGG ID, sequence, and metadata files into the sequences attribute.
@@ -334,6 +358,7 @@ class Protein(Object):
 
         return self.sequences.get_by_id(kegg_id)
 
+    @tracing.traced('protein')
     def load_uniprot(self, uniprot_id, uniprot_seq_file=None, uniprot_xml_file=None, download=False, outdir=None,
                      set_as_representative=False, force_rerun=False):
         """Load a UniProt ID and associated sequence/metadata files into the sequences attribute.
@@ -439,7 +464,7 @@ class Protein(Object):
         return self.sequences.get_by_id(ident)
 
     def load_manual_sequence(self, seq, ident=None, write_fasta_file=False, outdir=None,
-                             set_as_representative=False, force_rewrite=False):
+                             set_as_representative=False, force_rewrite=False, sequence_store=None):
         """Load a manual sequence given as a string and optionally set it as the representative sequence.
         Also store it in the sequences attribute.
 
@@ -451,11 +476,16 @@ class Protein(Object):
             outdir (str): Path to output directory
             set_as_representative (bool): If this sequence should be set as the representative one
             force_rewrite (bool): If the FASTA file should be overwritten if it already exists
+            sequence_store (SequenceStore, str): Sequence store (or path to its FASTA file) to append this sequence
+                to, instead of writing its own FASTA file
 
         Returns:
             SeqProp: Sequence that was loaded into the ``sequences`` attribute
 
         """
+        if write_fasta_file and sequence_store:
+            raise ValueError('Only one of write_fasta_file or sequence_store can be set')
+
         if write_fasta_file:
             if not outdir:
                 outdir = self.sequence_dir
@@ -477,8 +507,12 @@ class Protein(Object):
                 seq.id = ident
 
         manual_sequence = SeqProp(id=ident, seq=seq)
+        if self.root_dir:
+            manual_sequence.sequence_dir = self.sequence_dir
         if write_fasta_file:
             manual_sequence.write_fasta_file(outfile=outfile, force_rerun=force_rewrite)
+        elif sequence_store:
+            manual_sequence.write_to_sequence_store(store=sequence_store, key='{}|{}'.format(self.id, ident))
         self.sequences.append(manual_sequence)
 
         if set_as_representative:
@@ -486,6 +520,7 @@ class Protein(Object):
 
         return self.sequences.get_by_id(ident)
 
+    @tracing.traced('protein')
     def set_representative_sequence(self, force_rerun=False):
         """Automatically consolidate loaded sequences (manual, UniProt, or KEGG) and set a single representative
         sequence.
@@ -556,8 +591,10 @@ class Protein(Object):
 
         return self.representative_sequence
 
+    @tracing.traced('protein')
     def pairwise_align_sequences_to_representative(self, gapopen=10, gapextend=0.5, outdir=None,
-                                                   engine='needle', parse=True, force_rerun=False):
+                                                   engine='needle', parse=True, force_rerun=False,
+                                                   reuse_identical=False):
         """Pairwise all sequences in the sequences attribute to the representative sequence. Stores the alignments
         in the ``sequence_alignments`` DictList attribute.
 
@@ -574,6 +611,9 @@ class Protein(Object):
                 annotation)
             force_rerun (bool): Only for ``engine='needle'`` - Default False, set to True if you want to rerun the
                 alignment if outfile exists.
+            reuse_identical (bool): Copy the alignment of a sequence which was already aligned to the representative
+                sequence to the other sequences identical to it, instead of aligning each of them. Many strains share
+                the same allele of a gene, so only distinct alleles are aligned.
 
         """
 
@@ -585,6 +625,19 @@ class Protein(Object):
             if not outdir:
                 raise ValueError('Output directory must be specified')
 
+        # Alignments of the distinct sequences aligned so far, by their sequence
+        alleles = {}
+        if reuse_identical:
+            for aln in self.sequence_alignments:
+                if aln.annotations.get('a_seq') != self.representative_sequence.id:
+                    continue
+                if aln.annotations.get('ssbio_type', 'seqalign') != 'seqalign' or not self.sequences.has_id(
+                        aln.annotations.get('b_seq')):
+                    continue
+                if bool(parse) != ('mutations' in aln.annotations):
+                    continue
+                alleles.setdefault(self.sequences.get_by_id(aln.annotations['b_seq']).seq_str, aln)
+
         for seq in self.sequences:
             aln_id = '{}_{}'.format(self.id, seq.id)
             outfile = '{}.needle'.format(aln_id)
@@ -601,6 +654,17 @@ class Protein(Object):
             if seq.id == self.representative_sequence.id:
                 continue
 
+            if seq.seq_str in alleles:
+                aln = deepcopy(alleles[seq.seq_str])
+                aln.id = aln_id
+                aln.annotations['b_seq'] = seq.id
+                b_record = list(aln)[1]
+                b_record.id = seq.id
+                b_record.name = seq.id
+                self.sequence_alignments.append(aln)
+                log.debug('{}: copied alignment of identical sequence'.format(seq.id))
+                continue
+
             aln = ssbio.protein.sequence.utils.alignment.pairwise_sequence_alignment(a_seq=self.representative_sequence.seq_str,
                                                                                      a_seq_id=self.id,
                                                                                      b_seq=seq.seq_str,
@@ -624,7 +688,10 @@ class Protein(Object):
                 aln.annotations['insertions'] = ssbio.protein.sequence.utils.alignment.get_insertions(aln_df)
 
             self.sequence_alignments.append(aln)
+            if reuse_identical:
+                alleles[seq.seq_str] = aln
 
+    @tracing.traced('protein')
     def pairwise_align_sequences_to_representative_parallelize(self, sc, gapopen=10, gapextend=0.5, outdir=None,
                                                       engine='needle', parse=True, force_rerun=False):
         """Pairwise all sequences in the sequences attribute to the representative sequence. Stores the alignments
@@ -692,6 +759,8 @@ class Protein(Object):
     def write_all_sequences_file(self, outname, outdir=None):
         """Write all the stored sequences as a single FASTA file. By default, sets IDs to model gene IDs.
 
+        If all sequences are held in the same sequence store, they are copied over directly without being parsed.
+
         Args:
             outname (str): Name of the output FASTA file without the extension
             outdir (str): Path to output directory for the file, default is the sequences directory
@@ -704,11 +773,19 @@ class Protein(Object):
                 raise ValueError('Output directory must be specified')
 
         outfile = op.join(outdir, outname + '.faa')
-        SeqIO.write(self.sequences, outfile, "fasta")
+
+        store = ssbio.protein.sequence.utils.seqstore.shared_sequence_store(self.sequences)
+        if store:
+            titles = {s.sequence_key: ssbio.protein.sequence.utils.seqstore.fasta_title(s) for s in self.sequences}
+            store.export(outfile=outfile, keys=[s.sequence_key for s in self.sequences], titles=titles,
+                         force_rerun=True)
+        else:
+            SeqIO.write(self.sequences, outfile, "fasta")
 
         log.info('{}: wrote all protein sequences to file'.format(outfile))
         return outfile
 
+    @tracing.traced('protein')
     def get_sequence_properties(self, representative_only=True):
         """Run Biopython ProteinAnalysis and EMBOSS pepstats to summarize basic statistics of the protein sequences.
         Results are stored in the protein's respective SeqProp objects at ``.annotations``
@@ -802,6 +879,7 @@ class Protein(Object):
 
         log.debug('Prepared I-TASSER modeling folder {}'.format(self.homology_models_dir))
 
+    @tracing.traced('protein')
     def blast_representative_sequence_to_pdb(self, seq_ident_cutoff=0, evalue=0.0001, display_link=False,
                                              outdir=None, force_rerun=False):
         """BLAST the representative protein sequence to the PDB. Saves a raw BLAST result file (XML file).
@@ -885,6 +963,7 @@ class Protein(Object):
         df = pd.DataFrame.from_records(blast_results_pre_df, columns=cols).set_index('pdb_id')
         return ssbio.utils.clean_df(df)
 
+    @tracing.traced('protein')
     def map_uniprot_to_pdb(self, seq_ident_cutoff=0.0, outdir=None, force_rerun=False):
         """Map the representative sequence's UniProt ID to PDB IDs using the PDBe "Best Structures" API.
         Will save a JSON file of the results to the protein sequences folder.
@@ -981,6 +1060,7 @@ class Protein(Object):
         df = pd.DataFrame.from_records(best_structures_pre_df, columns=cols).set_index(['pdb_id', 'pdb_chain_id'])
         return ssbio.utils.clean_df(df)
 
+    @tracing.traced('protein')
     def load_pdb(self, pdb_id, mapped_chains=None, pdb_file=None, file_type=None, is_experimental=True,
                  set_as_representative=False, representative_chain=None, force_rerun=False):
         """Load a structure ID and optional structure file into the structures attribute.
@@ -1029,6 +1109,7 @@ class Protein(Object):
 
         return self.structures.get_by_id(pdb_id)
 
+    @tracing.traced('protein')
     def load_itasser_folder(self, ident, itasser_folder, organize=False, outdir=None, organize_name=None,
                             set_as_representative=False, representative_chain='X', force_rerun=False):
         """Load the results folder from an I-TASSER run (local, not from the website) and copy relevant files over to
@@ -1152,6 +1233,7 @@ class Protein(Object):
         df = pd.DataFrame.from_records(itasser_pre_df, columns=df_cols).set_index('id')
         return ssbio.utils.clean_df(df)
 
+    @tracing.traced('protein')
     def pdb_downloader_and_metadata(self, outdir=None, pdb_file_type=None, force_rerun=False):
         """Download ALL mapped experimental structures to the protein structures directory.
 
@@ -1190,6 +1272,7 @@ class Protein(Object):
 
         return downloaded_pdb_ids
 
+    @tracing.traced('protein')
     def download_all_pdbs(self, outdir=None, pdb_file_type=None, load_metadata=False, force_rerun=False):
         """Downloads all structures from the PDB. load_metadata flag sets if metadata should be parsed and stored in
         StructProp, otherwise filepaths are just linked"""
@@ -1217,6 +1300,7 @@ class Protein(Object):
 
         return downloaded_pdb_ids
 
+    @tracing.traced('protein')
     def parse_all_stored_structures(self, outdir=None, pdb_file_type=None, force_rerun=False):
         """Runs parse_structure for any stored structure with a file available"""
         # TODO: will replace pdb_downloader_and_metadata function
@@ -1271,6 +1355,7 @@ class Protein(Object):
         df = pd.DataFrame.from_records(pdb_pre_df, columns=cols).set_index('pdb_id')
         return ssbio.utils.clean_df(df)
 
+    @tracing.traced('protein')
     def align_seqprop_to_structprop(self, seqprop, structprop, chains=None, outdir=None,
                                     engine='needle', structure_already_parsed=False, parse=True, force_rerun=False,
                                     **kwargs):
@@ -1421,6 +1506,7 @@ class Protein(Object):
                                                                    allow_unresolved=allow_unresolved)
         return chain_passes_quality_check
 
+    @tracing.traced('protein')
     def find_representative_chain(self, seqprop, structprop, chains_to_check=None,
                                   seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
                                   allow_mutants=True, allow_deletions=False,
@@ -1479,54 +1565,86 @@ class Protein(Object):
             log.debug('{}: no chains meet quality checks'.format(structprop.id))
             return None
 
-    def _map_seqprop_resnums_to_structprop_chain_index(self, resnums, seqprop=None, structprop=None, chain_id=None,
-                                                       use_representatives=False):
-        """Map a residue number in any SeqProp to the mapping index in the StructProp + chain ID. This does not provide
-        a mapping to residue number, only a mapping to the index which then can be mapped to the structure resnum!
+    def get_residue_mapping(self, seqprop=None, structprop=None, chain_id=None, use_representatives=False):
+        """Get the residue number mapping between a SeqProp and a chain of a StructProp.
+
+        The mapping is built from the parsed alignment of the sequence to the chain the first time it is requested,
+        and is cached until the alignment or the chain's residue numbers are replaced.
 
         Args:
-            resnums (int, list): Residue numbers in the sequence
             seqprop (SeqProp): SeqProp object
             structprop (StructProp): StructProp object
-            chain_id (str): Chain ID to map to index
-            use_representatives (bool): If representative sequence/structure/chain should be used in mapping
+            chain_id (str): Chain ID to map to
+            use_representatives (bool): If the representative sequence and structure should be used. If True, seqprop,
+                structprop, and chain_id do not need to be defined.
 
         Returns:
-            dict: Mapping of resnums to indices
+            ResidueMapping: Bidirectional mapping of sequence and structure residue numbers
 
         """
-        resnums = ssbio.utils.force_list(resnums)
-
         if use_representatives:
             seqprop = self.representative_sequence
             structprop = self.representative_structure
             chain_id = self.representative_chain
             full_structure_id = '{}-{}'.format(structprop.id, chain_id).replace('REP-', '')
-            aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
         else:
             if not seqprop or not structprop or not chain_id:
                 raise ValueError('Please specify sequence, structure, and chain ID')
             full_structure_id = '{}-{}'.format(structprop.id, chain_id)
-            aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
+        aln_id = '{}_{}'.format(seqprop.id, full_structure_id)
 
         access_key = '{}_chain_index'.format(aln_id)
         if access_key not in seqprop.letter_annotations:
             raise KeyError('{}: structure mapping {} not available in sequence letter annotations. Was alignment parsed? '
                            'Run ``align_seqprop_to_structprop`` with ``parse=True``.'.format(access_key, aln_id))
-        chain_index_mapping = seqprop.letter_annotations[access_key]
+        # Stored columns are used so they are not copied, and so cached mappings can be matched to them
+        chain_index = seqprop.letter_annotations.column(access_key)
+        chain_record = structprop.chains.get_by_id(chain_id).seq_record
+        structure_resnums = dict(ssbio.protein.sequence.utils.letter_annotations.annotation_columns(chain_record))[
+            'structure_resnums']
+
+        # Cached mappings are reused as long as they were built from the same annotation objects
+        if getattr(self, '_Protein__residue_mappings', None) is None:
+            # Protein objects saved before mappings were cached
+            self.__residue_mappings = {}
+        cached = self.__residue_mappings.get(aln_id)
+        if cached and cached[1] is chain_index and cached[2] is structure_resnums:
+            return cached[0]
+
+        mapping = ssbio.protein.sequence.utils.mapping.ResidueMapping(chain_index=chain_index,
+                                                                      structure_resnums=structure_resnums,
+                                                                      seq_str=seqprop.seq_str,
+                                                                      chain_seq_str=str(chain_record.seq),
+                                                                      id=aln_id)
+        self.__residue_mappings[aln_id] = (mapping, chain_index, structure_resnums)
+        return mapping
 
-        resnum_to_chain_index = {}
-        for x in resnums:
-            ix = chain_index_mapping[x - 1] - 1
+    def _map_seqprop_resnums_to_structprop_chain_index(self, resnums, seqprop=None, structprop=None, chain_id=None,
+                                                       use_representatives=False):
+        """Map a residue number in any SeqProp to the mapping index in the StructProp + chain ID. This does not provide
+        a mapping to residue number, only a mapping to the index which then can be mapped to the structure resnum!
 
-            if np.isnan(ix):
-                log.warning('{}-{}, {}: no equivalent residue found in structure sequence'.format(structprop.id,
-                                                                                                  chain_id,
-                                                                                                  x))
-            else:
-                resnum_to_chain_index[int(x)] = int(ix)
+        Args:
+            resnums (int, list): Residue numbers in the sequence
+            seqprop (SeqProp): SeqProp object
+            structprop (StructProp): StructProp object
+            chain_id (str): Chain ID to map to index
+            use_representatives (bool): If representative sequence/structure/chain should be used in mapping
+
+        Returns:
+            dict: Mapping of resnums to indices
+
+        """
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        mapping = self.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id,
+                                           use_representatives=use_representatives)
+        chain_indices, found = mapping.seq_to_chain(resnums)
 
-        return resnum_to_chain_index
+        if not found.all():
+            log.warning('{}: no equivalent residue found in structure sequence for residues {}'.format(
+                    mapping.id, resnums[~found].tolist()))
+
+        return dict(zip(resnums[found].tolist(), chain_indices[found].tolist()))
 
     def map_seqprop_resnums_to_structprop_resnums(self, resnums, seqprop=None, structprop=None, chain_id=None,
                                                   use_representatives=False):
@@ -1544,58 +1662,26 @@ class Protein(Object):
             dict: Mapping of sequence residue numbers to structure residue numbers
 
         """
-        resnums = ssbio.utils.force_list(resnums)
-
-        if use_representatives:
-            seqprop = self.representative_sequence
-            structprop = self.representative_structure
-            chain_id = self.representative_chain
-        else:
-            if not seqprop or not structprop or not chain_id:
-                raise ValueError('Please specify sequence, structure, and chain ID')
-
-        mapping_to_repchain_index = self._map_seqprop_resnums_to_structprop_chain_index(resnums=resnums,
-                                                                                        seqprop=seqprop,
-                                                                                        structprop=structprop,
-                                                                                        chain_id=chain_id,
-                                                                                        use_representatives=use_representatives)
-
-        chain = structprop.chains.get_by_id(chain_id)
-        chain_structure_resnum_mapping = chain.seq_record.letter_annotations['structure_resnums']
-
-        final_mapping = {}
-        for k, v in mapping_to_repchain_index.items():
-            k = int(k)
-            rn = chain_structure_resnum_mapping[v]
-
-            if rn == float('Inf'):
-                log.warning('{}-{}, {}: structure file does not contain coordinates for this residue'.format(structprop.id,
-                                                                                                             chain_id,
-                                                                                                             k))
-            else:
-                rn = int(rn)
-                final_mapping[k] = rn
-
-                # Additionally report if residues are the same - they could be different in the structure though
-                format_data = {'seqprop_id'       : seqprop.id,
-                               'seqprop_resid'    : seqprop[k - 1],
-                               'seqprop_resnum'   : k,
-                               'structprop_id'    : structprop.id,
-                               'structprop_chid'  : chain_id,
-                               'structprop_resid' : chain.seq_record[rn - 1],
-                               'structprop_resnum': rn}
-
-                if seqprop[k-1] != chain.seq_record[rn-1]:
-                    log.warning('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} does not match to '
-                                'structure {structprop_id}-{structprop_chid} residue '
-                                '{structprop_resid}{structprop_resnum}. NOTE: this may be due to '
-                                'structural differences'.format(**format_data))
-                else:
-                    log.debug('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} is mapped to '
-                              'structure {structprop_id}-{structprop_chid} residue '
-                              '{structprop_resid}{structprop_resnum}'.format(**format_data))
-
-        return final_mapping
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        mapping = self.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id,
+                                           use_representatives=use_representatives)
+        struct_resnums, found = mapping.seq_to_structure(resnums)
+        _, aligned = mapping.seq_to_chain(resnums)
+
+        if not aligned.all():
+            log.warning('{}: no equivalent residue found in structure sequence for residues {}'.format(
+                    mapping.id, resnums[~aligned].tolist()))
+        if (aligned & ~found).any():
+            log.warning('{}: structure file does not contain coordinates for residues {}'.format(
+                    mapping.id, resnums[aligned & ~found].tolist()))
+
+        # Additionally report if residues are the same - they could be different in the structure though
+        mismatched = resnums[found][~mapping.residues_match[resnums[found] - 1]]
+        if len(mismatched):
+            log.warning('{}: sequence residues {} do not match to structure residues. NOTE: this may be due to '
+                        'structural differences'.format(mapping.id, mismatched.tolist()))
+
+        return dict(zip(resnums[found].tolist(), struct_resnums[found].tolist()))
 
     def map_structprop_resnums_to_seqprop_resnums(self, resnums, structprop=None, chain_id=None, seqprop=None,
                                                   use_representatives=False):
@@ -1613,60 +1699,21 @@ class Protein(Object):
             dict: Mapping of structure residue numbers to sequence residue numbers
 
         """
-        pass
-        # TODO: implementation
-        # resnums = ssbio.utils.force_list(resnums)
-        #
-        # if use_representatives:
-        #     seqprop = self.representative_sequence
-        #     structprop = self.representative_structure
-        #     chain_id = self.representative_chain
-        # else:
-        #     if not seqprop or not structprop or not chain_id:
-        #         raise ValueError('Please specify sequence, structure, and chain ID')
-        #
-        # mapping_to_repchain_index = self.map_seqprop_resnums_to_structprop_chain_index(resnums=resnums,
-        #                                                                                seqprop=seqprop,
-        #                                                                                structprop=structprop,
-        #                                                                                chain_id=chain_id,
-        #                                                                                use_representatives=use_representatives)
-        #
-        # chain = structprop.chains.get_by_id(chain_id)
-        # chain_structure_resnum_mapping = chain.seq_record.letter_annotations['structure_resnums']
-        #
-        # final_mapping = {}
-        # for k, v in mapping_to_repchain_index.items():
-        #     k = int(k)
-        #     rn = chain_structure_resnum_mapping[v]
-        #
-        #     if rn == float('Inf'):
-        #         log.warning('{}-{}, {}: structure file does not contain coordinates for this residue'.format(structprop.id,
-        #                                                                                                      chain_id,
-        #                                                                                                      k))
-        #     else:
-        #         rn = int(rn)
-        #         final_mapping[k] = rn
-        #
-        #         # Additionally report if residues are the same - they could be different in the structure though
-        #         format_data = {'seqprop_id'       : seqprop.id,
-        #                        'seqprop_resid'    : seqprop[k - 1],
-        #                        'seqprop_resnum'   : k,
-        #                        'structprop_id'    : structprop.id,
-        #                        'structprop_chid'  : chain_id,
-        #                        'structprop_resid' : chain.seq_record[rn - 1],
-        #                        'structprop_resnum': rn}
-        #
-        #         if seqprop[k-1] != chain.seq_record[rn-1]:
-        #             log.warning('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} does not match to '
-        #                         'structure {structprop_id}-{structprop_chid} residue '
-        #                         '{structprop_resid}{structprop_resnum}. NOTE: this may be due to '
-        #                         'structural differences'.format(**format_data))
-        #         else:
-        #             log.debug('Sequence {seqprop_id} residue {seqprop_resid}{seqprop_resnum} is mapped to '
-        #                       'structure {structprop_id}-{structprop_chid} residue '
-        #                       '{structprop_resid}{structprop_resnum}'.format(**format_data))
-        #
-        # return final_mapping
+        resnums = np.asarray(ssbio.utils.force_list(resnums), dtype=np.int64)
+        mapping = self.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id,
+                                           use_representatives=use_representatives)
+        seq_resnums, found = mapping.structure_to_seq(resnums)
+
+        if not found.all():
+            log.warning('{}: no equivalent residue found in sequence for structure residues {}'.format(
+                    mapping.id, resnums[~found].tolist()))
+
+        mismatched = resnums[found][~mapping.residues_match[seq_resnums[found] - 1]]
+        if len(mismatched):
+            log.warning('{}: structure residues {} do not match to sequence residues. NOTE: this may be due to '
+                        'structural differences'.format(mapping.id, mismatched.tolist()))
+
+        return dict(zip(resnums[found].tolist(), seq_resnums[found].tolist()))
 
     def _representative_structure_setter(self, structprop, keep_chain, clean=True, keep_chemicals=None,
                                          out_suffix='_clean', outdir=None, force_rerun=False):
@@ -1728,6 +1775,7 @@ class Protein(Object):
         # And finally add it to the list of structures
         self.structures.append(self.representative_structure)
 
+    @tracing.traced('protein')
     def set_representative_structure(self, seq_outdir=None, struct_outdir=None, pdb_file_type=None,
                                      engine='needle', always_use_homology=False, rez_cutoff=0.0,
                                      seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
@@ -1983,7 +2031,8 @@ class Protein(Object):
         log.warning('{}: no structures meet quality checks'.format(self.id))
         return None
 
-    def get_dssp_annotations(self, representative_only=True, force_rerun=False):
+    @tracing.traced('protein')
+    def get_dssp_annotations(self, representative_only=True, force_rerun=False, engine='dssp'):
         """Run DSSP on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1992,6 +2041,7 @@ class Protein(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``dssp`` to run the DSSP executable, or ``builtin`` to assign secondary structure in process
 
         Todo:
             * Some errors arise from storing annotations for nonstandard amino acids, need to run DSSP separately for those
@@ -2000,7 +2050,8 @@ class Protein(Object):
         if representative_only:
             if self.representative_structure:
                 try:
-                    self.representative_structure.get_dssp_annotations(outdir=self.structure_dir, force_rerun=force_rerun)
+                    self.representative_structure.get_dssp_annotations(outdir=self.structure_dir, force_rerun=force_rerun,
+                                                                       engine=engine)
                 except PDBException as e:
                     log.error('{}: Biopython error, issue matching sequences with {}'.format(self.id, self.representative_structure))
                     print(e)
@@ -2015,7 +2066,7 @@ class Protein(Object):
         else:
             for s in self.structures:
                 try:
-                    s.get_dssp_annotations(outdir=self.structure_dir)
+                    s.get_dssp_annotations(outdir=self.structure_dir, engine=engine)
                 except PDBException as e:
                     log.error('{}: Biopython error, issue matching sequences with {}'.format(self.id, s.id))
                     print(e)
@@ -2026,7 +2077,8 @@ class Protein(Object):
                     log.error('{}: DSSP failed to run on {}'.format(self.id, s.id))
                     print(e)
 
-    def get_msms_annotations(self, representative_only=True, force_rerun=False):
+    @tracing.traced('protein')
+    def get_msms_annotations(self, representative_only=True, force_rerun=False, engine='msms'):
         """Run MSMS on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -2035,12 +2087,14 @@ class Protein(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``msms`` to run the MSMS executable, or ``builtin`` to calculate residue depths in process
 
         """
         if representative_only:
             if self.representative_structure:
                 try:
-                    self.representative_structure.get_msms_annotations(outdir=self.structure_dir, force_rerun=force_rerun)
+                    self.representative_structure.get_msms_annotations(outdir=self.structure_dir, force_rerun=force_rerun,
+                                                                       engine=engine)
                 except TypeError:
                     log.error('{}: MSMS SeqRecord length mismatch with {}'.format(self.id, self.representative_structure))
                 except:
@@ -2050,14 +2104,16 @@ class Protein(Object):
         else:
             for s in self.structures:
                 try:
-                    s.get_msms_annotations(outdir=self.structure_dir)
+                    s.get_msms_annotations(outdir=self.structure_dir, engine=engine)
                 except TypeError:
                     log.error('{}: MSMS SeqRecord length mismatch with {}'.format(self.id, s.id))
                 except Exception as e:
                     log.error('{}: unknown MSMS error with {}'.format(self.id, s.id))
                     print(e)
 
-    def get_freesasa_annotations(self, include_hetatms=False, representative_only=True, force_rerun=False):
+    @tracing.traced('protein')
+    def get_freesasa_annotations(self, include_hetatms=False, representative_only=True, force_rerun=False,
+                                 engine='freesasa'):
         """Run freesasa on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -2067,6 +2123,8 @@ class Protein(Object):
             include_hetatms (bool): If HETATMs should be included in calculations. Defaults to ``False``.
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``freesasa`` to run the freesasa executable, or ``builtin`` to calculate in process. See
+                :meth:`ssbio.protein.structure.structprop.StructProp.get_freesasa_annotations`.
 
         """
         if representative_only:
@@ -2074,7 +2132,8 @@ class Protein(Object):
                 try:
                     self.representative_structure.get_freesasa_annotations(outdir=self.structure_dir,
                                                                            include_hetatms=include_hetatms,
-                                                                           force_rerun=force_rerun)
+                                                                           force_rerun=force_rerun,
+                                                                           engine=engine)
                 except TypeError:
                     log.error('{}: freesasa SeqRecord length mismatch with {}'.format(self.id, self.representative_structure))
                 except:
@@ -2084,13 +2143,45 @@ class Protein(Object):
         else:
             for s in self.structures:
                 try:
-                    s.get_freesasa_annotations(outdir=self.structure_dir, include_hetatms=include_hetatms)
+                    s.get_freesasa_annotations(outdir=self.structure_dir, include_hetatms=include_hetatms,
+                                                engine=engine)
                 except TypeError:
                     log.error('{}: freesasa SeqRecord length mismatch with {}'.format(self.id, s.id))
                 except Exception as e:
                     log.error('{}: unknown freesasa error with {}'.format(self.id, s.id))
                     print(e)
 
+    @tracing.traced('protein')
+    def get_hse_annotations(self, representative_only=True):
+        """Calculate half sphere exposures and contact numbers of structures and store calculations.
+
+        Annotations are stored in the protein structure's chain sequence at:
+        ``<chain_prop>.seq_record.letter_annotations['*-biopython']``
+
+        Args:
+            representative_only (bool): If analysis should only be run on the representative structure
+
+        """
+        if representative_only:
+            if self.representative_structure:
+                try:
+                    self.representative_structure.get_hse_annotations()
+                except TypeError:
+                    log.error('{}: HSE SeqRecord length mismatch with {}'.format(self.id, self.representative_structure))
+                except Exception:
+                    log.exception('{}: unknown HSE error with {}'.format(self.id, self.representative_structure))
+            else:
+                log.warning('{}: no representative structure set, cannot calculate HSE'.format(self.id))
+        else:
+            for s in self.structures:
+                try:
+                    s.get_hse_annotations()
+                except TypeError:
+                    log.error('{}: HSE SeqRecord length mismatch with {}'.format(self.id, s.id))
+                except Exception:
+                    log.exception('{}: unknown HSE error with {}'.format(self.id, s.id))
+
+    @tracing.traced('protein')
     def find_disulfide_bridges(self, representative_only=True):
         """Run Biopython's disulfide bridge finder and store found bridges.
 
@@ -2116,6 +2207,38 @@ class Protein(Object):
                 except KeyError:
                     log.error('{}: unable to run disulfide bridge finder on {}'.format(self.id, s.id))
 
+    @tracing.traced('protein')
+    def annotate(self, which=None, representative_only=True, threads=None):
+        """Calculate several structure properties from a single parse of each structure and store calculations.
+
+        See :meth:`ssbio.protein.structure.structprop.StructProp.annotate` for the annotations available and where
+        they are stored.
+
+        Args:
+            which (list): Annotations to calculate - ``dssp``, ``msms``, ``freesasa``, ``hse`` and ``disulfide`` by
+                default
+            representative_only (bool): If analysis should only be run on the representative structure
+            threads (int): Number of calculators to run at the same time for each structure
+
+        """
+        if representative_only:
+            if self.representative_structure:
+                structures = [self.representative_structure]
+            else:
+                log.warning('{}: no representative structure set, cannot calculate annotations'.format(self.id))
+                return
+        else:
+            structures = self.structures
+
+        for s in structures:
+            try:
+                s.annotate(which=which, threads=threads)
+            except TypeError:
+                log.error('{}: annotation SeqRecord length mismatch with {}'.format(self.id, s.id))
+            except KeyError:
+                log.error('{}: unable to calculate annotations of {}'.format(self.id, s.id))
+
+    @tracing.traced('protein')
     def get_residue_annotations(self, seq_resnum, seqprop=None, structprop=None, chain_id=None,
                                 use_representatives=False):
         """Get all residue-level annotations stored in the SeqProp ``letter_annotations`` field for a given residue number.
@@ -2168,17 +2291,17 @@ class Protein(Object):
         if structprop:
             chain = structprop.chains.get_by_id(chain_id)
 
-            # Get structure properties
-            mapping_to_structure_resnum = self.map_seqprop_resnums_to_structprop_resnums(resnums=seq_resnum,
-                                                                                         seqprop=seqprop,
-                                                                                         structprop=structprop,
-                                                                                         chain_id=chain_id,
-                                                                                         use_representatives=use_representatives)
+            # Get structure properties, through the same mapping as get_residue_annotations_bulk
+            mapping = self.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id,
+                                               use_representatives=use_representatives)
+            struct_resnums, mapped = mapping.seq_to_structure(seq_resnum)
+            chain_indices, _ = mapping.seq_to_chain(seq_resnum)
 
             # Try finding the residue in the structure
-            if f.location.end.position in mapping_to_structure_resnum:
-                struct_resnum = mapping_to_structure_resnum[f.location.end.position]
-                struct_f = SeqFeature(FeatureLocation(struct_resnum-1, struct_resnum))
+            if mapped[0]:
+                struct_resnum = int(struct_resnums[0])
+                struct_ix = int(chain_indices[0])
+                struct_f = SeqFeature(FeatureLocation(struct_ix, struct_ix + 1))
 
                 struct_seq_features = struct_f.extract(chain.seq_record)
                 struct_info = ssbio.utils.clean_single_dict(indict=struct_seq_features.letter_annotations,
@@ -2198,6 +2321,153 @@ class Protein(Object):
 
         return all_info
 
+    def get_residue_annotations_bulk(self, seq_resnums, seqprop=None, structprop=None, chain_id=None,
+                                     use_representatives=False):
+        """Get all residue-level annotations stored in the SeqProp and chain ``letter_annotations`` fields for many
+        residue numbers at once.
+
+        Returns the same information as :meth:`~ssbio.core.protein.Protein.get_residue_annotations`, with one row per
+        residue number. Annotations are looked up with index arrays, so no SeqRecords are copied and mapping to the
+        structure is only done once. Structure columns are empty for residues which cannot be mapped to the structure.
+
+        Args:
+            seq_resnums (int, list): Residue numbers in the sequence
+            seqprop (SeqProp): SeqProp object
+            structprop (StructProp): StructProp object
+            chain_id (str): ID of the structure's chain to get annotation from
+            use_representatives (bool): If the representative sequence/structure/chain IDs should be used
+
+        Returns:
+            DataFrame: All available letter_annotations for the residue numbers, in the order they were given
+
+        """
+        if use_representatives:
+            if seqprop and structprop and chain_id:
+                raise ValueError('Overriding sequence, structure, and chain IDs with representatives. '
+                                 'Set use_representatives to False if custom IDs are to be used.')
+            seqprop = self.representative_sequence
+            structprop = self.representative_structure
+            chain_id = self.representative_chain
+        else:
+            if not seqprop or not structprop or not chain_id:
+                raise ValueError('Input sequence, structure, and chain to map between, or set use_representatives '
+                                 'to True.')
+
+        seq_resnums = np.asarray(ssbio.utils.force_list(seq_resnums), dtype=np.int64)
+        seq_str = seqprop.seq_str
+        if len(seq_resnums) and (seq_resnums.min() < 1 or seq_resnums.max() > len(seq_str)):
+            raise ValueError('{}: residue numbers must be between 1 and {}'.format(seqprop.id, len(seq_str)))
+        seq_ix = seq_resnums - 1
+
+        all_info = {'seq_resnum': seq_resnums,
+                    'seq_residue': _take_residues(seq_str, seq_ix)}
+        for k, v in seqprop.letter_annotations.columns():
+            if '_chain_index' in k:
+                continue
+            all_info['seq_' + k] = _take_letter_annotation(v, seq_ix)
+
+        if structprop and chain_id:
+            mapping = self.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id=chain_id,
+                                               use_representatives=use_representatives)
+            chain_record = structprop.chains.get_by_id(chain_id).seq_record
+            chain_str = str(chain_record.seq)
+
+            struct_resnums, mapped = mapping.seq_to_structure(seq_resnums)
+            if not mapped.all():
+                log.debug('{}: {} of {} residues could not be mapped to the structure'.format(mapping.id,
+                                                                                              (~mapped).sum(),
+                                                                                              len(mapped)))
+            struct_ix = mapping.seq_to_chain_index[seq_ix[mapped]]
+            rows = np.flatnonzero(mapped)
+
+            struct_info = {'struct_resnum': struct_resnums[mapped],
+                           'struct_residue': _take_residues(chain_str, struct_ix)}
+            for k, v in ssbio.protein.sequence.utils.letter_annotations.annotation_columns(chain_record):
+                if 'structure_resnums' in k:
+                    continue
+                struct_info['struct_' + k] = _take_letter_annotation(v, struct_ix)
+
+            num_mismatched = (all_info['seq_residue'][rows] != struct_info['struct_residue']).sum()
+            if num_mismatched:
+                log.warning('{}: {} sequence residues do not match structure residues in {}-{}. This may simply be due '
+                            'to differences in the structure'.format(seqprop.id, num_mismatched, structprop.id,
+                                                                     chain_id))
+
+            for k, v in struct_info.items():
+                all_info[k] = pd.Series(v, index=rows)
+
+        return pd.DataFrame(all_info, index=np.arange(len(seq_resnums)))
+
+    def get_residue_annotation_records(self, representatives_only=True):
+        """Get the SeqRecords which hold residue-level annotations for this protein, labeled for export with
+        :func:`ssbio.protein.sequence.utils.letter_annotations.residue_annotations_dataset`.
+
+        Sequences are labeled with their ID, and structure chains with ``<StructProp_ID>-<Chain_ID>``.
+
+        Args:
+            representatives_only (bool): If only the representative sequence and representative structure's chain
+                should be returned
+
+        Returns:
+            list: ``(label, SeqRecord)`` tuples
+
+        """
+        records = []
+        if representatives_only:
+            if self.representative_sequence:
+                records.append((self.representative_sequence.id, self.representative_sequence))
+            if self.representative_structure and self.representative_chain:
+                chain = self.representative_structure.chains.get_by_id(self.representative_chain)
+                if chain.seq_record:
+                    records.append(('{}-{}'.format(self.representative_structure.id, chain.id), chain.seq_record))
+            return records
+
+        for s in self.sequences:
+            records.append((s.id, s))
+        for s in self.structures:
+            for chain in s.chains:
+                if chain.seq_record:
+                    records.append(('{}-{}'.format(s.id, chain.id), chain.seq_record))
+        return records
+
+    @tracing.traced('protein')
+    def get_mutation_matrix(self, alignment_ids=None, alignment_type=None):
+        """Get a sparse matrix of the point mutations found in the sequence_alignments attribute.
+
+        The matrix is built from the ``mutations`` annotation of parsed alignments the first time it is requested, and
+        is cached until alignments are added, removed, or parsed again.
+
+        Args:
+            alignment_ids (str, list): Specified alignment ID or IDs to use
+            alignment_type (str): Specified alignment type contained in the ``annotation`` field of an alignment object,
+                ``seqalign`` or ``structalign`` are the current types.
+
+        Returns:
+            MutationMatrix: Aligned sequence × point mutation matrix, with one row per alignment
+
+        """
+        if alignment_ids:
+            alignment_ids = ssbio.utils.force_list(alignment_ids)
+            cache_key = (alignment_type, tuple(alignment_ids))
+        else:
+            cache_key = (alignment_type, None)
+
+        # Cached matrices are reused as long as they were built from the same alignments and mutation annotations
+        if getattr(self, '_Protein__mutation_matrices', None) is None:
+            # Protein objects saved before mutation matrices were cached
+            self.__mutation_matrices = {}
+        sources = [(x, x.annotations.get('mutations')) for x in self.sequence_alignments]
+        cached = self.__mutation_matrices.get(cache_key)
+        if cached and len(cached[1]) == len(sources) and all(a is c and m is n for (a, m), (c, n) in zip(sources,
+                                                                                                       cached[1])):
+            return cached[0]
+
+        matrix = ssbio.protein.sequence.utils.mutation_matrix.MutationMatrix.from_alignments(
+                alignments=self.sequence_alignments, alignment_ids=alignment_ids, alignment_type=alignment_type)
+        self.__mutation_matrices[cache_key] = (matrix, sources)
+        return matrix
+
+    @tracing.traced('protein')
     def sequence_mutation_summary(self, alignment_ids=None, alignment_type=None):
         """Summarize all mutations found in the sequence_alignments attribute.
 
@@ -2224,7 +2494,9 @@ class Protein(Object):
                 }
 
             Here, we report which genes/strains have the specific combinations (or "fingerprints") of point mutations
-            
+
+        Both dictionaries are made from :meth:`get_mutation_matrix`, which can be used directly for frequency queries.
+
         Args:
             alignment_ids (str, list): Specified alignment ID or IDs to use
             alignment_type (str): Specified alignment type contained in the ``annotation`` field of an alignment object,
@@ -2234,38 +2506,12 @@ class Protein(Object):
             dict, dict: single_counter, fingerprint_counter
 
         """
-        if alignment_ids:
-            ssbio.utils.force_list(alignment_ids)
-
         if len(self.sequence_alignments) == 0:
             log.error('{}: no sequence alignments'.format(self.id))
             return {}, {}
 
-        fingerprint_counter = defaultdict(list)
-        single_counter = defaultdict(list)
-
-        for alignment in self.sequence_alignments:
-            # Ignore alignments if a list of identifiers is provided
-            if alignment_ids:
-                if alignment.id not in alignment_ids:
-                    continue
-            # Ignore alignments if type is specified
-            if alignment_type:
-                if alignment.annotations['ssbio_type'] != alignment_type:
-                    continue
-
-            other_sequence = alignment.annotations['b_seq']
-            mutations = alignment.annotations['mutations']
-
-            if mutations:
-                # Turn this list of mutations into a tuple so it can be a dictionary key
-                mutations = tuple(tuple(x) for x in mutations)
-                fingerprint_counter[mutations].append(other_sequence)
-
-                for m in mutations:
-                    single_counter[m].append(other_sequence)
-
-        return dict(single_counter), dict(fingerprint_counter)
+        matrix = self.get_mutation_matrix(alignment_ids=alignment_ids, alignment_type=alignment_type)
+        return matrix.single_mutations(), matrix.mutation_groups()
 
     def add_features_to_nglview(self, view, seqprop=None, structprop=None, chain_id=None, use_representatives=False):
         """Add select features from the selected SeqProp object to an NGLWidget view object.
@@ -20,6 +20,7 @@ from six.moves.urllib.request import urlopen, urlretrieve
 
 import ssbio.databases.pisa as pisa
 import ssbio.utils
+from ssbio.io import tracing
 from ssbio.protein.structure.structprop import StructProp
 
 try:
@@ -166,7 +167,9 @@ def download_mmcif_header(pdb_id, outdir='', force_rerun=False):
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
         download_link = 'http://files.rcsb.org/{}/{}.{}'.format(folder, pdb_id, file_type)
-        urlretrieve(download_link, outfile)
+        with tracing.span('download_mmcif_header', 'network', url=download_link):
+            tracing.count('network_requests')
+            urlretrieve(download_link, outfile)
         log.debug('{}: saved header file'.format(outfile))
     else:
         log.debug('{}: header file already saved'.format(outfile))
@@ -401,8 +404,10 @@ def best_structures(uniprot_id, outname=None, outdir=None, seq_ident_cutoff=0.0,
     # Otherwise run the web request
     else:
         # TODO: add a checker for a cached file of uniprot -> PDBs - can be generated within gempro pipeline and stored
-        response = requests.get('https://www.ebi.ac.uk/pdbe/api/mappings/best_structures/{}'.format(uniprot_id),
-                                data={'key': 'value'})
+        with tracing.span('best_structures', 'network', uniprot_id=uniprot_id):
+            tracing.count('network_requests')
+            response = requests.get('https://www.ebi.ac.uk/pdbe/api/mappings/best_structures/{}'.format(uniprot_id),
+                                    data={'key': 'value'})
         if response.status_code == 404:
             log.debug('{}: 404 returned, probably no structures available.'.format(uniprot_id))
             raw_data = {uniprot_id: {}}
@@ -571,7 +576,7 @@ def get_resolution(pdb_id):
     if pdb_id not in _property_table().index:
         raise ValueError('PDB ID not in property table')
     else:
-        resolution = _property_table().ix[pdb_id, 'resolution']
+        resolution = _property_table().loc[pdb_id, 'resolution']
         if pd.isnull(resolution):
             log.debug('{}: no resolution available, probably not an X-ray crystal structure')
             resolution = float('inf')
@@ -593,7 +598,7 @@ def get_release_date(pdb_id):
     if pdb_id not in _property_table().index:
         raise ValueError('PDB ID not in property table')
     else:
-        release_date = _property_table().ix[pdb_id, 'releaseDate']
+        release_date = _property_table().loc[pdb_id, 'releaseDate']
         if pd.isnull(release_date):
             log.debug('{}: no release date available')
             release_date = None
@@ -824,7 +829,9 @@ def download_structure(pdb_id, file_type, outdir='', only_header=False, force_re
         else:
             download_link = 'http://files.rcsb.org/{}/{}.{}'.format(folder, pdb_id, file_type)
 
-        urlretrieve(download_link, outfile)
+        with tracing.span('download_structure', 'network', url=download_link):
+            tracing.count('network_requests')
+            urlretrieve(download_link, outfile)
 
         if gzipped:
             outfile = ssbio.utils.gunzip_file(infile=outfile,
@@ -12,6 +12,7 @@ import requests
 from collections import defaultdict
 from dateutil.parser import parse as dateparse
 import ssbio.utils
+from ssbio.io import tracing
 from BCBio import GFF
 from ssbio.protein.sequence.seqprop import SeqProp
 
@@ -456,7 +457,9 @@ def download_uniprot_file(uniprot_id, filetype, outdir='', force_rerun=False):
     outfile = op.join(outdir, my_file)
 
     if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        urlretrieve(url, outfile)
+        with tracing.span('download_uniprot_file', 'network', url=url):
+            tracing.count('network_requests')
+            urlretrieve(url, outfile)
 
     return outfile
 
@@ -1,5 +1,8 @@
+import gzip
 import logging
 import pickle
+import struct
+import sys
 
 from json_tricks import dump, load
 
@@ -31,25 +34,138 @@ def load_json(file, new_root_dir=None, decompression=False):
     return my_object
 
 
-def save_pickle(obj, outfile, protocol=2):
+_OOB_MAGIC = b'\x93SSBIOPK'
+_OOB_FORMAT = 1
+_UINT64 = struct.Struct('<Q')
+
+
+def _compressed_writer(f, compression):
+    """Wrap a binary file in a streaming compressor"""
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).stream_writer(f)
+    elif compression == 'lz4':
+        import lz4.frame
+        return lz4.frame.LZ4FrameFile(f, mode='wb')
+    elif compression == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='wb', compresslevel=6)
+    return f
+
+
+def _compressed_reader(f, compression):
+    """Wrap a binary file in a streaming decompressor"""
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(f)
+    elif compression == 'lz4':
+        import lz4.frame
+        return lz4.frame.LZ4FrameFile(f, mode='rb')
+    elif compression == 'gzip':
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    return f
+
+
+def _read_exact(f, size):
+    """Read exactly size bytes from a (possibly decompressing) file into a new writable buffer"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        if hasattr(f, 'readinto'):
+            n = f.readinto(view[pos:])
+        else:
+            chunk = f.read(size - pos)
+            n = len(chunk)
+            view[pos:pos + n] = chunk
+        if not n:
+            raise EOFError('Unexpected end of pickle file')
+        pos += n
+    return buf
+
+
+def _save_pickle_oob(obj, outfile, protocol, compression):
+    """Save an object with pickle protocol 5, writing NumPy and pandas data as out-of-band buffers.
+
+    The file holds a small header (magic bytes and the compression used), then, compressed as one stream: the number of
+    buffers, each buffer prefixed by its size, and the pickle of the object itself prefixed by its size. The buffers are
+    written straight from the memory of the arrays they belong to, without being copied into the pickle first.
+
+    """
+    buffers = []
+    data = pickle.dumps(obj, protocol=protocol, buffer_callback=buffers.append)
+
+    compression_name = (compression or '').encode('ascii')
+    with open(outfile, 'wb') as raw:
+        raw.write(_OOB_MAGIC)
+        raw.write(struct.pack('<BB', _OOB_FORMAT, len(compression_name)))
+        raw.write(compression_name)
+
+        f = _compressed_writer(raw, compression)
+        try:
+            f.write(_UINT64.pack(len(buffers)))
+            for buf in buffers:
+                view = buf.raw()
+                f.write(_UINT64.pack(view.nbytes))
+                f.write(view)
+            f.write(_UINT64.pack(len(data)))
+            f.write(data)
+        finally:
+            if f is not raw:
+                f.close()
+
+
+def _load_pickle_oob(f):
+    """Load an object saved by :func:`_save_pickle_oob`, the file is positioned after the magic bytes"""
+    file_format, name_length = struct.unpack('<BB', f.read(2))
+    if file_format != _OOB_FORMAT:
+        raise ValueError('Unsupported pickle file format {}'.format(file_format))
+    compression = f.read(name_length).decode('ascii') or None
+
+    stream = _compressed_reader(f, compression)
+    num_buffers = _UINT64.unpack(_read_exact(stream, _UINT64.size))[0]
+    buffers = []
+    for _ in range(num_buffers):
+        size = _UINT64.unpack(_read_exact(stream, _UINT64.size))[0]
+        buffers.append(_read_exact(stream, size))
+    size = _UINT64.unpack(_read_exact(stream, _UINT64.size))[0]
+    return pickle.loads(_read_exact(stream, size), buffers=buffers)
+
+
+def save_pickle(obj, outfile, protocol=2, compression=None):
     """Save the object as a pickle file
 
+    With protocol 5 (Python 3.8+), NumPy arrays and pandas data are written as out-of-band buffers next to the pickle
+    instead of being copied into it, and the file can be compressed while it is written. Such files can only be read
+    with :func:`load_pickle`.
+
     Args:
         outfile (str): Filename
         protocol (int): Pickle protocol to use. Default is 2 to remain compatible with Python 2
+        compression (str): ``zstd`` (needs the zstandard package), ``lz4`` (needs the lz4 package) or ``gzip``
+            compression, only with protocol 5
 
     Returns:
         str: Path to pickle file
 
     """
-    with open(outfile, 'wb') as f:
-        pickle.dump(obj, f, protocol=protocol)
+    if compression and compression not in ['zstd', 'lz4', 'gzip']:
+        raise ValueError('{}: compression must be zstd, lz4 or gzip'.format(compression))
+
+    if protocol >= 5:
+        if sys.version_info < (3, 8):
+            raise ValueError('Pickle protocol 5 requires Python 3.8 or later')
+        _save_pickle_oob(obj, outfile, protocol, compression)
+    else:
+        if compression:
+            raise ValueError('Compression is only supported with pickle protocol 5')
+        with open(outfile, 'wb') as f:
+            pickle.dump(obj, f, protocol=protocol)
 
     return outfile
 
 
 def load_pickle(file):
-    """Load a pickle file.
+    """Load a pickle file, saved with any protocol.
 
     Args:
         file (str): Path to pickle file
@@ -59,4 +175,7 @@ def load_pickle(file):
 
     """
     with open(file, 'rb') as f:
-       return pickle.load(f)
\ No newline at end of file
+        if f.read(len(_OOB_MAGIC)) == _OOB_MAGIC:
+            return _load_pickle_oob(f)
+        f.seek(0)
+        return pickle.load(f)
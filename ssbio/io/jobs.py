@@ -0,0 +1,490 @@
+"""
+Jobs
+====
+
+Run external programs (needle, pepstats, SCRATCH, FATCAT, DSSP, freesasa, DOCK6) in a bounded pool of workers, with a
+time limit and a memory limit for each job.
+
+Each job runs in its own process group, so a job which runs past its time limit is stopped together with anything it
+started (a wrapper script and the program it calls, for example) - first with SIGTERM and, if it is still running a
+few seconds later, with SIGKILL. Standard output and standard error are captured, optionally to log files, and the
+exit status, wall time, CPU time and peak memory of every job are recorded in a :class:`JobResult`.
+
+Jobs are submitted to a :class:`JobPool`, which returns a :class:`concurrent.futures.Future` for each one. Most
+wrappers in ssbio run their programs through a shared pool with :func:`run`, which blocks until the job is done. The
+shared pool is configured for a session with :func:`set_job_pool`, or for every session with the
+``SSBIO_MAX_JOBS``, ``SSBIO_JOB_TIMEOUT`` (seconds), ``SSBIO_JOB_MEMORY_LIMIT`` (bytes) and ``SSBIO_JOB_LOG_DIR``
+environment variables. By default it has one worker per CPU and no limits.
+
+Time limits, CPU time and peak memory are only available on POSIX systems, and memory limits only on Linux. The memory
+limit is a limit on the address space of the program, set right after it is started, so programs which reserve much
+more memory than they use (Java, for FATCAT) need a generous limit.
+
+"""
+
+import logging
+import multiprocessing
+import os
+import os.path as op
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import six
+
+from ssbio.io import tracing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+log = logging.getLogger(__name__)
+
+_POSIX = os.name == 'posix'
+_MAX_POLL_INTERVAL = 0.05
+_KILL_GRACE_PERIOD = 5
+
+
+class JobError(OSError):
+
+    """Raised by :meth:`JobResult.check` for a job which could not be started, failed or timed out"""
+
+    def __init__(self, result):
+        super(JobError, self).__init__(result.describe())
+        self.result = result
+
+
+class JobResult(object):
+
+    """Outcome of a job run by :func:`run_job`.
+
+    Attributes:
+        command (list): Program and arguments which were run
+        returncode (int): Exit status of the program, negative if it was stopped by a signal, ``None`` if it could
+            not be started
+        timed_out (bool): If the program was stopped because it ran past its time limit
+        error (str): Why the program could not be started, if it could not
+        wall_time (float): Elapsed time in seconds
+        cpu_time (float): User and system CPU time in seconds of the program and the processes it waited for,
+            ``None`` if not available
+        max_memory (int): Peak resident memory of the program in bytes, ``None`` if not available
+        stdout (str): Captured standard output
+        stderr (str): Captured standard error
+        stdout_log (str): Path to the file standard output was written to, if one was given
+        stderr_log (str): Path to the file standard error was written to, if one was given
+
+    """
+
+    def __init__(self, command, stdout_log=None, stderr_log=None):
+        self.command = command
+        self.returncode = None
+        self.timed_out = False
+        self.error = None
+        self.wall_time = 0.0
+        self.cpu_time = None
+        self.max_memory = None
+        self.stdout = ''
+        self.stderr = ''
+        self.stdout_log = stdout_log
+        self.stderr_log = stderr_log
+
+    @property
+    def program(self):
+        """str: Name of the program which was run"""
+        return op.basename(self.command[0])
+
+    @property
+    def ok(self):
+        """bool: If the program ran to completion and exited with status 0"""
+        return self.returncode == 0 and not self.timed_out
+
+    def describe(self):
+        """Get a one line summary of how the job went"""
+        if self.error:
+            return '{}: could not be started ({})'.format(self.program, self.error)
+        if self.timed_out:
+            status = 'timed out'
+        elif self.returncode < 0:
+            status = 'killed by signal {}'.format(-self.returncode)
+        else:
+            status = 'exit status {}'.format(self.returncode)
+        if self.cpu_time is None:
+            return '{}: {}, {:.2f}s'.format(self.program, status, self.wall_time)
+        return '{}: {}, {:.2f}s wall, {:.2f}s CPU'.format(self.program, status, self.wall_time, self.cpu_time)
+
+    def check(self):
+        """Raise a :class:`JobError` if the job did not run successfully, otherwise return the result"""
+        if not self.ok:
+            raise JobError(self)
+        return self
+
+    def __repr__(self):
+        return '<JobResult {}>'.format(self.describe())
+
+
+def _split_command(command):
+    if isinstance(command, six.string_types):
+        return shlex.split(command)
+    return list(command)
+
+
+def _set_memory_limit(popen, memory_limit):
+    """Limit the address space of a started program. This is done from the parent process, since functions run in the
+    child process before the program starts (``preexec_fn``) may deadlock when jobs are started from threads."""
+    try:
+        resource.prlimit(popen.pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+    except OSError:
+        # The program already exited
+        pass
+
+
+def _signal_job(popen, sig):
+    try:
+        if _POSIX:
+            os.killpg(popen.pid, sig)
+        else:
+            popen.kill()
+    except OSError:
+        pass
+
+
+def _wait(popen, timeout, result):
+    """Wait for a job to finish, stopping it if it runs past the timeout, and record its resource usage"""
+    deadline = time.time() + timeout if timeout else None
+    killed_at = None
+    interval = 0.001
+
+    while True:
+        if _POSIX:
+            pid, status, rusage = os.wait4(popen.pid, os.WNOHANG)
+            if pid:
+                if os.WIFSIGNALED(status):
+                    popen.returncode = -os.WTERMSIG(status)
+                else:
+                    popen.returncode = os.WEXITSTATUS(status)
+                result.cpu_time = rusage.ru_utime + rusage.ru_stime
+                # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+                result.max_memory = rusage.ru_maxrss if sys.platform == 'darwin' else rusage.ru_maxrss * 1024
+                break
+        elif popen.poll() is not None:
+            break
+
+        now = time.time()
+        if deadline and now > deadline and killed_at is None:
+            log.warning('{}: time limit of {}s reached, stopping job'.format(result.program, timeout))
+            result.timed_out = True
+            _signal_job(popen, signal.SIGTERM)
+            killed_at = now
+        elif killed_at and now > killed_at + _KILL_GRACE_PERIOD:
+            _signal_job(popen, signal.SIGKILL if _POSIX else signal.SIGTERM)
+            killed_at = float('inf')
+
+        time.sleep(interval)
+        interval = min(interval * 2, _MAX_POLL_INTERVAL)
+
+    # Clean up anything the program left running in its process group
+    if result.timed_out and _POSIX:
+        _signal_job(popen, signal.SIGKILL)
+
+    result.returncode = popen.returncode
+
+
+def _open_output(log_path):
+    if log_path:
+        log_dir = op.dirname(log_path)
+        if log_dir and not op.exists(log_dir):
+            try:
+                os.makedirs(log_dir)
+            except OSError:
+                # Made by another job in the meantime
+                if not op.isdir(log_dir):
+                    raise
+        return open(log_path, 'w+b')
+    return tempfile.TemporaryFile()
+
+
+def _read_output(f):
+    f.seek(0)
+    return f.read().decode('utf-8', 'replace')
+
+
+def run_job(command, cwd=None, timeout=None, memory_limit=None, stdin=None, stdout_log=None, stderr_log=None,
+            env=None):
+    """Run a program and wait for it to finish, stopping it if it runs past a time limit.
+
+    The program is not run through a shell. Use :meth:`JobPool.submit` or :func:`run` to run it in a pool of workers.
+
+    Args:
+        command (str, list): Program and its arguments, as a list or as it would be typed in the command line
+        cwd (str): Path to the working directory of the program
+        timeout (float): Time limit in seconds, no limit if ``None``
+        memory_limit (int): Address space limit of the program in bytes, no limit if ``None``
+        stdin (str): Text to send to the standard input of the program
+        stdout_log (str): Path to a file to write standard output to
+        stderr_log (str): Path to a file to write standard error to
+        env (dict): Environment variables of the program, the current environment if ``None``
+
+    Returns:
+        JobResult: Exit status, resource usage and output of the program
+
+    """
+    program_and_args = _split_command(command)
+    if not program_and_args:
+        raise ValueError('No command given')
+    if memory_limit and not hasattr(resource, 'prlimit'):
+        log.warning('{}: memory limits are only supported on Linux'.format(program_and_args[0]))
+        memory_limit = None
+
+    result = JobResult(program_and_args, stdout_log=stdout_log, stderr_log=stderr_log)
+    in_f = subprocess.PIPE if stdin is not None else open(os.devnull, 'rb')
+    out_f = _open_output(stdout_log)
+    err_f = _open_output(stderr_log)
+    try:
+        start = time.time()
+        try:
+            popen = subprocess.Popen(program_and_args, cwd=cwd, env=env,
+                                     stdin=in_f,
+                                     stdout=out_f, stderr=err_f,
+                                     start_new_session=_POSIX)
+        except OSError as e:
+            result.error = str(e)
+            log.error(result.describe())
+            return result
+        if memory_limit:
+            _set_memory_limit(popen, memory_limit)
+
+        if stdin is not None:
+            try:
+                popen.stdin.write(stdin.encode('utf-8'))
+            except (IOError, OSError):
+                # The program exited without reading its input, its exit status tells us why
+                pass
+            finally:
+                popen.stdin.close()
+
+        _wait(popen, timeout, result)
+        result.wall_time = time.time() - start
+        result.stdout = _read_output(out_f)
+        result.stderr = _read_output(err_f)
+    finally:
+        if stdin is None:
+            in_f.close()
+        out_f.close()
+        err_f.close()
+
+    log.debug(result.describe())
+    return result
+
+
+class JobPool(object):
+
+    """Bounded pool of workers running external programs, with default time and memory limits for its jobs.
+
+    Args:
+        max_workers (int): Maximum number of programs running at the same time, the number of CPUs if ``None``
+        timeout (float): Default time limit of a job in seconds, no limit if ``None``
+        memory_limit (int): Default memory limit of a job in bytes, no limit if ``None``
+        log_dir (str): Path to a folder where the standard output and error of every job are written to, as
+            ``<name>.out`` and ``<name>.err`` files
+
+    """
+
+    def __init__(self, max_workers=None, timeout=None, memory_limit=None, log_dir=None):
+        if max_workers is None:
+            max_workers = multiprocessing.cpu_count()
+        if max_workers < 1:
+            raise ValueError('{}: max_workers must be at least 1'.format(max_workers))
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.log_dir = log_dir
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._stats = {'submitted': 0, 'running': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0,
+                       'wall_time': 0.0, 'cpu_time': 0.0}
+
+    def _log_paths(self, command, name):
+        if not self.log_dir:
+            return None, None
+        with self._lock:
+            self._counter += 1
+            if not name:
+                name = '{}_{}'.format(op.basename(command[0]), self._counter)
+        return op.join(self.log_dir, name + '.out'), op.join(self.log_dir, name + '.err')
+
+    def _run(self, command, kwargs):
+        with self._lock:
+            self._stats['running'] += 1
+        try:
+            result = run_job(command, **kwargs)
+        finally:
+            with self._lock:
+                self._stats['running'] -= 1
+
+        with self._lock:
+            if result.ok:
+                self._stats['succeeded'] += 1
+            else:
+                self._stats['failed'] += 1
+            if result.timed_out:
+                self._stats['timed_out'] += 1
+            self._stats['wall_time'] += result.wall_time
+            if result.cpu_time:
+                self._stats['cpu_time'] += result.cpu_time
+        return result
+
+    def submit(self, command, cwd=None, timeout=None, memory_limit=None, stdin=None, name=None, env=None):
+        """Queue a program to be run by the pool.
+
+        Args:
+            command (str, list): Program and its arguments, as a list or as it would be typed in the command line
+            cwd (str): Path to the working directory of the program
+            timeout (float): Time limit in seconds, the pool's default if ``None``
+            memory_limit (int): Memory limit in bytes, the pool's default if ``None``
+            stdin (str): Text to send to the standard input of the program
+            name (str): Name of the log files of the job, if the pool has a log folder
+            env (dict): Environment variables of the program, the current environment if ``None``
+
+        Returns:
+            Future: Future whose result is the :class:`JobResult` of the program
+
+        """
+        program_and_args = _split_command(command)
+        if not program_and_args:
+            raise ValueError('No command given')
+        stdout_log, stderr_log = self._log_paths(program_and_args, name)
+
+        kwargs = {'cwd': cwd,
+                  'timeout': timeout if timeout is not None else self.timeout,
+                  'memory_limit': memory_limit if memory_limit is not None else self.memory_limit,
+                  'stdin': stdin,
+                  'stdout_log': stdout_log,
+                  'stderr_log': stderr_log,
+                  'env': env}
+        future = self._executor.submit(self._run, program_and_args, kwargs)
+        with self._lock:
+            self._stats['submitted'] += 1
+        return future
+
+    def run(self, command, **kwargs):
+        """Run a program in the pool and wait for it to finish. Takes the same arguments as :meth:`submit`.
+
+        Returns:
+            JobResult: Exit status, resource usage and output of the program
+
+        """
+        program = op.basename(_split_command(command)[0])
+        with tracing.span(program, 'subprocess'):
+            result = self.submit(command, **kwargs).result()
+            tracing.count('subprocesses')
+            tracing.count('subprocess_cpu_time', result.cpu_time or 0.0)
+        return result
+
+    def map(self, commands, **kwargs):
+        """Run a list of programs in the pool, with the same options for each.
+
+        Returns:
+            list: :class:`JobResult` of each program, in the order of the commands
+
+        """
+        futures = [self.submit(command, **kwargs) for command in commands]
+        results = [f.result() for f in futures]
+        tracing.count('subprocesses', len(results))
+        tracing.count('subprocess_cpu_time', sum(x.cpu_time or 0.0 for x in results))
+        return results
+
+    def stats(self):
+        """Get the number of jobs submitted, running, succeeded, failed and timed out, and their total wall and CPU
+        time in seconds.
+
+        Returns:
+            dict: Job counts and times
+
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs, and optionally wait for the queued ones to finish"""
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+
+_job_pool = None
+_job_pool_lock = threading.Lock()
+
+
+def set_job_pool(max_workers=None, timeout=None, memory_limit=None, log_dir=None):
+    """Set up the job pool shared by the program wrappers in ssbio, replacing the current one.
+
+    Args:
+        max_workers (int): Maximum number of programs running at the same time, the number of CPUs if ``None``
+        timeout (float): Default time limit of a job in seconds, no limit if ``None``
+        memory_limit (int): Default memory limit of a job in bytes, no limit if ``None``
+        log_dir (str): Path to a folder where the standard output and error of every job are written to
+
+    Returns:
+        JobPool: The new shared job pool
+
+    """
+    global _job_pool
+    with _job_pool_lock:
+        old_pool = _job_pool
+        _job_pool = JobPool(max_workers=max_workers, timeout=timeout, memory_limit=memory_limit, log_dir=log_dir)
+    if old_pool:
+        old_pool.shutdown(wait=False)
+    return _job_pool
+
+
+def get_job_pool():
+    """Get the job pool shared by the program wrappers in ssbio, set up from the environment the first time.
+
+    Returns:
+        JobPool: The shared job pool
+
+    """
+    global _job_pool
+    with _job_pool_lock:
+        if _job_pool is None:
+            max_workers = os.environ.get('SSBIO_MAX_JOBS')
+            timeout = os.environ.get('SSBIO_JOB_TIMEOUT')
+            memory_limit = os.environ.get('SSBIO_JOB_MEMORY_LIMIT')
+            _job_pool = JobPool(max_workers=int(max_workers) if max_workers else None,
+                                timeout=float(timeout) if timeout else None,
+                                memory_limit=int(memory_limit) if memory_limit else None,
+                                log_dir=os.environ.get('SSBIO_JOB_LOG_DIR'))
+        return _job_pool
+
+
+def submit(command, **kwargs):
+    """Queue a program to be run by the shared job pool. Takes the same arguments as :meth:`JobPool.submit`.
+
+    Returns:
+        Future: Future whose result is the :class:`JobResult` of the program
+
+    """
+    return get_job_pool().submit(command, **kwargs)
+
+
+def run(command, **kwargs):
+    """Run a program in the shared job pool and wait for it to finish. Takes the same arguments as
+    :meth:`JobPool.submit`.
+
+    Returns:
+        JobResult: Exit status, resource usage and output of the program
+
+    """
+    return get_job_pool().run(command, **kwargs)
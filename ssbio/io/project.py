@@ -0,0 +1,270 @@
+"""
+Project
+=======
+
+Sharded storage of GEM-PRO projects. Instead of one JSON or pickle file holding everything, the project is saved as a
+folder with the Protein of each gene in its own file, and a manifest listing them::
+
+    <project_dir>/
+        manifest.json              format, serializer, project file and the protein file of each gene
+        project.<ext>              the GEM-PRO object itself, without the proteins of its genes
+        proteins/<gene_id>.<ext>   Protein of one gene
+
+A project opened with :func:`load_project` only reads the manifest and the project file. The Protein of a gene is read
+from its file the first time it is used, so looking at a few genes of an organism-scale project does not load all of
+them.
+
+Saving is incremental. When a project is saved into the folder it was opened from, proteins which were never used
+are not serialized again, and proteins which were used are serialized and compared with the checksum in the manifest,
+so only the ones that changed are written. Proteins are serialized and written in parallel.
+
+"""
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import os.path as op
+import pickle
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import json_tricks
+
+log = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+_FORMAT = 1
+_EXTENSIONS = {'pickle': '.pckl', 'json': '.json'}
+
+
+def _dumps(obj, serializer, protocol):
+    if serializer == 'pickle':
+        return pickle.dumps(obj, protocol=protocol)
+    return json_tricks.dumps(obj, allow_nan=True).encode('utf-8')
+
+
+def _loads(data, serializer):
+    if serializer == 'pickle':
+        return pickle.loads(data)
+    return json_tricks.loads(data.decode('utf-8'))
+
+
+def _write_atomic(path, data):
+    """Write a file through a temporary file, so a save which is interrupted does not leave a truncated file"""
+    fd, tmp_path = tempfile.mkstemp(dir=op.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        shutil.move(tmp_path, path)
+    except Exception:
+        if op.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _protein_filename(gene_id, serializer, used):
+    """Name of the file of a gene's protein, made of the characters of its ID which are safe in file names"""
+    base = re.sub(r'[^\w.-]', '_', gene_id)
+    filename = op.join('proteins', base + _EXTENSIONS[serializer])
+    counter = 1
+    while filename in used:
+        filename = op.join('proteins', '{}_{}{}'.format(base, counter, _EXTENSIONS[serializer]))
+        counter += 1
+    return filename
+
+
+class ProteinFile(object):
+
+    """Loader of a gene's Protein from its file in a sharded project, called the first time the protein is used.
+
+    Args:
+        path (str): Path to the protein file
+        serializer (str): ``pickle`` or ``json``
+        sha256 (str): Checksum of the file from the manifest
+
+    """
+
+    def __init__(self, path, serializer, sha256=None):
+        self.path = path
+        self.serializer = serializer
+        self.sha256 = sha256
+
+    def __call__(self):
+        with open(self.path, 'rb') as f:
+            protein = _loads(f.read(), self.serializer)
+        log.debug('{}: loaded protein'.format(self.path))
+        return protein
+
+
+def read_manifest(project_dir):
+    """Read the manifest of a sharded project.
+
+    Args:
+        project_dir (str): Path to the project folder
+
+    Returns:
+        dict: Manifest, with the protein file and checksum of each gene under ``proteins``
+
+    """
+    manifest_path = op.join(project_dir, MANIFEST_FILE)
+    if not op.exists(manifest_path):
+        raise IOError('{}: not a sharded project folder, no {}'.format(project_dir, MANIFEST_FILE))
+    with open(manifest_path) as f:
+        manifest = json.load(f, object_pairs_hook=OrderedDict)
+    if manifest.get('format') != _FORMAT:
+        raise ValueError('{}: unsupported project format {}'.format(project_dir, manifest.get('format')))
+    return manifest
+
+
+@contextlib.contextmanager
+def _detached_proteins(genes):
+    """Temporarily remove the proteins from genes, so the project file is saved without them"""
+    saved = [(g, g.__dict__.get('_protein'), g.__dict__.get('_protein_loader')) for g in genes]
+    for g, _, _ in saved:
+        g._protein = None
+        g._protein_loader = None
+    try:
+        yield
+    finally:
+        for g, protein, loader in saved:
+            g._protein = protein
+            g._protein_loader = loader
+
+
+def save_project(project, project_dir, serializer='pickle', protocol=2, threads=None):
+    """Save a GEM-PRO project as a folder with one file per gene's Protein, writing only the proteins which changed.
+
+    Args:
+        project (GEMPRO): GEM-PRO project
+        project_dir (str): Path to the project folder, created if it does not exist
+        serializer (str): ``pickle`` or ``json`` (using json_tricks)
+        protocol (int): Pickle protocol to use. Default is 2 to remain compatible with Python 2
+        threads (int): Number of threads serializing and writing proteins, the number of CPUs if ``None``
+
+    Returns:
+        str: Path to the manifest of the project
+
+    """
+    if serializer not in _EXTENSIONS:
+        raise ValueError('{}: serializer must be one of {}'.format(serializer, sorted(_EXTENSIONS)))
+
+    project_dir = op.abspath(project_dir)
+    if not op.exists(op.join(project_dir, 'proteins')):
+        os.makedirs(op.join(project_dir, 'proteins'))
+
+    old_entries = {}
+    if op.exists(op.join(project_dir, MANIFEST_FILE)):
+        old_manifest = read_manifest(project_dir)
+        if old_manifest['serializer'] == serializer:
+            old_entries = old_manifest['proteins']
+        else:
+            old_entries = {k: {'file': v['file']} for k, v in old_manifest['proteins'].items()}
+
+    entries = OrderedDict()
+    used = set()
+    to_serialize = []
+    for g in project.genes:
+        old_entry = old_entries.get(g.id, {})
+        filename = old_entry.get('file')
+        if not filename or not filename.endswith(_EXTENSIONS[serializer]):
+            filename = _protein_filename(g.id, serializer, used)
+        used.add(filename)
+
+        # A protein which was never loaded is unchanged, keep (or copy) its file instead of serializing it again
+        loader = g.__dict__.get('_protein_loader')
+        if isinstance(loader, ProteinFile) and loader.serializer == serializer:
+            path = op.join(project_dir, filename)
+            if op.abspath(loader.path) != path:
+                shutil.copyfile(loader.path, path)
+            entries[g.id] = {'file': filename, 'sha256': loader.sha256}
+        else:
+            entries[g.id] = {'file': filename}
+            to_serialize.append((g, filename, old_entry.get('sha256')))
+
+    def write_protein(task):
+        g, filename, old_sha256 = task
+        data = _dumps(g.protein, serializer, protocol)
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = op.join(project_dir, filename)
+        changed = sha256 != old_sha256 or not op.exists(path)
+        if changed:
+            _write_atomic(path, data)
+        return g.id, sha256, changed
+
+    pool = ThreadPool(threads)
+    try:
+        written = 0
+        for gene_id, sha256, changed in pool.imap_unordered(write_protein, to_serialize):
+            entries[gene_id]['sha256'] = sha256
+            written += changed
+    finally:
+        pool.close()
+        pool.join()
+
+    project_file = 'project' + _EXTENSIONS[serializer]
+    with _detached_proteins(project.genes):
+        _write_atomic(op.join(project_dir, project_file), _dumps(project, serializer, protocol))
+
+    manifest = OrderedDict([('format', _FORMAT),
+                            ('id', project.id),
+                            ('serializer', serializer),
+                            ('project', project_file),
+                            ('proteins', entries)])
+    manifest_path = op.join(project_dir, MANIFEST_FILE)
+    _write_atomic(manifest_path, json.dumps(manifest, indent=1).encode('utf-8'))
+
+    # Remove files of genes which are not in the project anymore
+    for gene_id, old_entry in old_entries.items():
+        old_path = op.join(project_dir, old_entry['file'])
+        if old_entry['file'] not in used and op.exists(old_path):
+            os.remove(old_path)
+
+    log.info('{}: saved project with {} genes, wrote {} changed proteins'.format(project_dir, len(entries), written))
+    return manifest_path
+
+
+def load_project(project_dir, lazy=True, new_root_dir=None, threads=None):
+    """Open a GEM-PRO project saved with :func:`save_project`.
+
+    Args:
+        project_dir (str): Path to the project folder
+        lazy (bool): If the Protein of each gene should only be loaded the first time it is used
+        new_root_dir (str): Path to the new root directory of the project, if it was moved
+        threads (int): Number of threads loading proteins if ``lazy`` is False, the number of CPUs if ``None``
+
+    Returns:
+        GEMPRO: GEM-PRO project
+
+    """
+    project_dir = op.abspath(project_dir)
+    manifest = read_manifest(project_dir)
+    serializer = manifest['serializer']
+
+    with open(op.join(project_dir, manifest['project']), 'rb') as f:
+        project = _loads(f.read(), serializer)
+
+    for g in project.genes:
+        entry = manifest['proteins'].get(g.id)
+        if not entry:
+            log.warning('{}: no protein file for gene in project, protein not loaded'.format(g.id))
+            continue
+        g.set_protein_loader(ProteinFile(op.join(project_dir, entry['file']), serializer, entry.get('sha256')))
+
+    if new_root_dir:
+        project.root_dir = new_root_dir
+
+    if not lazy:
+        pool = ThreadPool(threads)
+        try:
+            pool.map(lambda g: g.protein, project.genes)
+        finally:
+            pool.close()
+            pool.join()
+
+    log.info('{}: opened project with {} genes'.format(project_dir, len(project.genes)))
+    return project
@@ -0,0 +1,489 @@
+"""
+ResultCache
+===========
+
+A content-addressed cache of the output files of external programs (needle, DSSP, MSMS, freesasa, BLAST, SCRATCH),
+which can be shared between projects.
+
+Results are stored under a key which is the SHA-256 hash of the program name, its version, its arguments and the
+*contents* of its input files - not their paths. A structure or sequence which shows up again in another GEM-PRO
+project, or in a moved or renamed file, finds the same key and its outputs are copied from the cache instead of
+running the program again, while any change to an input, a parameter or the installed program version gives a new key.
+
+Each entry is a folder in the cache directory holding the output files. The cache can be limited to a total size in
+bytes, in which case the least recently used entries are removed first.
+
+The cache is off by default. Turn it on for a session with :func:`set_result_cache`, or for every session by setting
+the ``SSBIO_CACHE_DIR`` environment variable (and optionally ``SSBIO_CACHE_MAX_SIZE``, in bytes). Programs run through
+the cache check for an entry instead of an existing output file, so a cache miss reruns the program even if an older
+output file exists at the same path.
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import os.path as op
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import ssbio.utils
+from ssbio.io import tracing
+
+log = logging.getLogger(__name__)
+
+_KEY_FORMAT = 1
+_TMP_PREFIX = '.tmp-'
+
+
+def _stored_name(i):
+    """Name of the i-th output file of a run in its cache entry"""
+    return 'output_{}'.format(i)
+
+
+class ResultCache(object):
+
+    """Content-addressed store of program output files, with least recently used eviction.
+
+    Args:
+        cache_dir (str): Path to the cache folder, created if it does not exist
+        max_size (int): Maximum total size of the cache in bytes, no limit if ``None``
+
+    """
+
+    def __init__(self, cache_dir, max_size=None):
+        if max_size is not None and max_size < 0:
+            raise ValueError('{}: max_size must be positive'.format(max_size))
+        self.cache_dir = op.abspath(cache_dir)
+        self.max_size = max_size
+        if not op.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        self._lock = threading.Lock()
+        self._file_hashes = {}
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return '<ResultCache at {}>'.format(self.cache_dir)
+
+    def __contains__(self, key):
+        return op.isdir(self._entry_dir(key))
+
+    def __len__(self):
+        return len(self._entries())
+
+    def _entry_dir(self, key):
+        return op.join(self.cache_dir, key[:2], key)
+
+    def _entries(self):
+        """Get the paths of all entry folders"""
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = op.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not op.isdir(prefix_dir):
+                continue
+            entries.extend(op.join(prefix_dir, x) for x in os.listdir(prefix_dir) if not x.startswith(_TMP_PREFIX))
+        return entries
+
+    @staticmethod
+    def _entry_size(entry_dir):
+        return sum(op.getsize(op.join(entry_dir, x)) for x in os.listdir(entry_dir))
+
+    def file_hash(self, path):
+        """Get the SHA-256 hash of a file's contents, remembered while its size and modification time don't change.
+
+        Args:
+            path (str): Path to file
+
+        Returns:
+            str: Hex digest
+
+        """
+        path = op.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            known = self._file_hashes.get(path)
+        if known and known[0] == (stat.st_size, stat.st_mtime):
+            return known[1]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+        with self._lock:
+            self._file_hashes[path] = ((stat.st_size, stat.st_mtime), digest)
+        return digest
+
+    def make_key(self, program, input_files=None, input_data=None, args=None, version=None):
+        """Get the cache key of a program run.
+
+        Args:
+            program (str): Name of the program
+            input_files (list): Paths to input files, which are hashed by their contents
+            input_data (list): Other inputs as strings or bytes, ie. sequences passed on the command line
+            args (dict): Parameters which change the results, must be JSON serializable
+            version (str): Version of the program, see :func:`program_version`
+
+        Returns:
+            str: Hex digest identifying the run
+
+        """
+        digest = hashlib.sha256()
+
+        def add(value):
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            digest.update(str(len(value)).encode('utf-8') + b':' + value)
+
+        add(_KEY_FORMAT)
+        add(program)
+        add(version or '')
+        add(json.dumps(args or {}, sort_keys=True, default=str))
+        for f in ssbio.utils.force_list(input_files):
+            add(self.file_hash(f))
+        for data in ssbio.utils.force_list(input_data):
+            add(data)
+        return digest.hexdigest()
+
+    def fetch(self, key, outfiles):
+        """Copy the output files of a cached run to where the program would have written them.
+
+        Output files are matched to the stored files by their order, so they may have other names than when they were
+        stored.
+
+        Args:
+            key (str): Cache key from :meth:`make_key`
+            outfiles (list): Paths to copy the outputs to
+
+        Returns:
+            bool: If the run was in the cache and all outputs were copied
+
+        """
+        entry_dir = self._entry_dir(key)
+        outfiles = ssbio.utils.force_list(outfiles)
+        try:
+            stored = set(os.listdir(entry_dir))
+        except OSError:
+            stored = set()
+        if not stored or not all(_stored_name(i) in stored for i in range(len(outfiles))):
+            with self._lock:
+                self.misses += 1
+            tracing.count('cache_misses')
+            return False
+
+        for i, f in enumerate(outfiles):
+            outdir = op.dirname(f)
+            if outdir and not op.exists(outdir):
+                os.makedirs(outdir)
+            shutil.copyfile(op.join(entry_dir, _stored_name(i)), f)
+        # Entries are ordered by the modification time of their folder for eviction
+        os.utime(entry_dir, None)
+        with self._lock:
+            self.hits += 1
+        tracing.count('cache_hits')
+        log.debug('{}: copied {} cached output files'.format(key, len(outfiles)))
+        return True
+
+    def store(self, key, outfiles):
+        """Store the output files of a program run.
+
+        Args:
+            key (str): Cache key from :meth:`make_key`
+            outfiles (list): Paths to output files, which must all exist
+
+        """
+        outfiles = ssbio.utils.force_list(outfiles)
+
+        entry_dir = self._entry_dir(key)
+        prefix_dir = op.dirname(entry_dir)
+        if not op.exists(prefix_dir):
+            try:
+                os.makedirs(prefix_dir)
+            except OSError:
+                # Made at the same time by another process
+                pass
+
+        # Outputs are copied to a temporary folder first so other processes never see a partial entry
+        tmp_dir = tempfile.mkdtemp(prefix=_TMP_PREFIX, dir=prefix_dir)
+        for i, f in enumerate(outfiles):
+            shutil.copyfile(f, op.join(tmp_dir, _stored_name(i)))
+        size = self._entry_size(tmp_dir)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Stored by another process already
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        with self._lock:
+            self.stores += 1
+            if self._size is not None:
+                self._size += size
+        log.debug('{}: stored {} output files'.format(key, len(outfiles)))
+
+        if self.max_size is not None and self.size > self.max_size:
+            self.evict()
+
+    def remove(self, key):
+        """Remove an entry from the cache.
+
+        Args:
+            key (str): Cache key from :meth:`make_key`
+
+        """
+        entry_dir = self._entry_dir(key)
+        if op.isdir(entry_dir):
+            size = self._entry_size(entry_dir)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            with self._lock:
+                if self._size is not None:
+                    self._size -= size
+
+    @property
+    def size(self):
+        """int: Total size of the cached files in bytes"""
+        if self._size is None:
+            size = sum(self._entry_size(x) for x in self._entries())
+            with self._lock:
+                self._size = size
+        return self._size
+
+    def evict(self, max_size=None):
+        """Remove the least recently used entries until the cache fits in a size.
+
+        Args:
+            max_size (int): Size in bytes to shrink the cache to, ``max_size`` of the cache by default
+
+        Returns:
+            int: Number of entries removed
+
+        """
+        if max_size is None:
+            max_size = self.max_size
+        if max_size is None:
+            return 0
+
+        # Sizes are read from disk again, as other processes may share the cache
+        entries = []
+        for entry_dir in self._entries():
+            try:
+                entries.append((op.getmtime(entry_dir), self._entry_size(entry_dir), entry_dir))
+            except OSError:
+                continue
+        entries.sort()
+        total = sum(x[1] for x in entries)
+
+        removed = 0
+        for _, size, entry_dir in entries:
+            if total <= max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._size = total
+            self.evictions += removed
+        if removed:
+            log.debug('{}: evicted {} entries'.format(self.cache_dir, removed))
+        return removed
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        for entry_dir in self._entries():
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+
+    def stats(self):
+        """Get the usage of the cache.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``stores`` and ``evictions`` in this session, and the current number of
+            ``entries``, total ``size`` in bytes and ``max_size``
+
+        """
+        entries = self._entries()
+        size = sum(self._entry_size(x) for x in entries)
+        with self._lock:
+            self._size = size
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': self.hits / float(lookups) if lookups else 0.0,
+                    'stores': self.stores,
+                    'evictions': self.evictions,
+                    'entries': len(entries),
+                    'size': size,
+                    'max_size': self.max_size}
+
+
+_result_cache = {'cache': None, 'configured': False}
+_program_versions = {}
+
+
+def set_result_cache(cache_dir=None, max_size=None):
+    """Turn on the result cache for this session, or turn it off.
+
+    Args:
+        cache_dir (str): Path to the cache folder, or ``None`` to turn the cache off
+        max_size (int): Maximum total size of the cache in bytes
+
+    Returns:
+        ResultCache: The cache, or ``None``
+
+    """
+    _result_cache['cache'] = ResultCache(cache_dir, max_size=max_size) if cache_dir else None
+    _result_cache['configured'] = True
+    return _result_cache['cache']
+
+
+def get_result_cache():
+    """Get the result cache of this session, set up from the ``SSBIO_CACHE_DIR`` and ``SSBIO_CACHE_MAX_SIZE``
+    environment variables unless :func:`set_result_cache` was called.
+
+    Returns:
+        ResultCache: The cache, or ``None`` if it is off
+
+    """
+    if not _result_cache['configured']:
+        max_size = os.environ.get('SSBIO_CACHE_MAX_SIZE')
+        set_result_cache(os.environ.get('SSBIO_CACHE_DIR'), max_size=int(max_size) if max_size else None)
+    return _result_cache['cache']
+
+
+def program_version(program, version_flag='-version'):
+    """Get a string identifying the installed version of a program, remembered for the session.
+
+    The first line printed by the program with the version flag is used. If there is no flag or the program prints
+    nothing, the path, size and modification time of the executable are used instead, so a reinstalled program still
+    changes the cache keys.
+
+    Args:
+        program (str): Name of or path to the program
+        version_flag (str): Command line flag which makes the program print its version, or ``None`` for programs
+            which would start a run with any argument
+
+    Returns:
+        str: Version string, empty if the program is not installed
+
+    """
+    if (program, version_flag) in _program_versions:
+        return _program_versions[(program, version_flag)]
+
+    path = shutil.which(program)
+    version = ''
+    if path:
+        if version_flag:
+            try:
+                with open(os.devnull, 'r') as devnull:
+                    command = subprocess.Popen([path, version_flag], stdin=devnull, stdout=subprocess.PIPE,
+                                               stderr=subprocess.STDOUT, universal_newlines=True)
+                    out, _ = command.communicate()
+                version = out.strip().split('\n')[0].strip()
+            except OSError:
+                pass
+        if not version:
+            stat = os.stat(path)
+            version = '{}:{}:{}'.format(path, stat.st_size, int(stat.st_mtime))
+
+    _program_versions[(program, version_flag)] = version
+    return version
+
+
+class CachedRun(object):
+
+    """One run of a program, which is looked up in and stored to the session's result cache.
+
+    Replaces the check with :func:`ssbio.utils.force_rerun` at the point a program would be run::
+
+        run = CachedRun('freesasa', outfiles=outfile, input_files=infile, args={'hetatm': True},
+                        version_flag='--version')
+        if run.needs_run(force_rerun):
+            ...  # run the program to write outfile
+            run.finish()
+
+    Without a cache, :meth:`needs_run` is the same as :func:`ssbio.utils.force_rerun` on the first output file, and
+    nothing is hashed.
+
+    Args:
+        program (str): Name of or path to the program
+        outfiles (list): Paths to the output files of the run
+        input_files (list): Paths to input files, hashed by their contents
+        input_data (list): Other inputs as strings or bytes, or a function which returns them and is only called if
+            there is a cache
+        args (dict): Parameters which change the results
+        version (str): Version of the program, found with :func:`program_version` if not given
+        version_flag (str): Command line flag which makes the program print its version
+        cache (ResultCache): Cache to use instead of the session's, see :func:`get_result_cache`
+
+    """
+
+    def __init__(self, program, outfiles, input_files=None, input_data=None, args=None, version=None,
+                 version_flag='-version', cache=None):
+        self.program = program
+        self.outfiles = ssbio.utils.force_list(outfiles)
+        self.cache = cache if cache is not None else get_result_cache()
+        self.key = None
+        if self.cache is not None:
+            if version is None:
+                version = program_version(program, version_flag=version_flag)
+            if callable(input_data):
+                input_data = input_data()
+            self.key = self.cache.make_key(op.basename(program), input_files=input_files, input_data=input_data,
+                                           args=args, version=version)
+
+    def needs_run(self, force_rerun=False):
+        """Check if the program must be run, copying its outputs from the cache if they are there.
+
+        Args:
+            force_rerun (bool): If the program should be run even if its results exist
+
+        Returns:
+            bool: If the program should be run
+
+        """
+        if self.cache is None:
+            return ssbio.utils.force_rerun(flag=force_rerun, outfile=self.outfiles[0])
+        if force_rerun:
+            return True
+        if self.cache.fetch(self.key, self.outfiles):
+            log.debug('{}: loaded {} results from cache'.format(self.outfiles[0], self.program))
+            return False
+        return True
+
+    def finish(self):
+        """Store the outputs of the run in the cache, if they were all written."""
+        if self.cache is None:
+            return
+        if all(ssbio.utils.is_non_zero_file(f) for f in self.outfiles):
+            self.cache.store(self.key, self.outfiles)
+        else:
+            log.debug('{}: {} outputs missing, not storing in cache'.format(self.outfiles[0], self.program))
+
+
+def model_fingerprint(model):
+    """Get a string which identifies the atoms of a Biopython Model, to use as a cache input for programs which run
+    on a parsed structure instead of a file.
+
+    Args:
+        model (Model): Biopython Model
+
+    Returns:
+        str: Atom identifiers and coordinates
+
+    """
+    lines = []
+    for atom in model.get_atoms():
+        res = atom.get_parent()
+        lines.append('{}|{}|{}|{}|{}|{:.3f},{:.3f},{:.3f}'.format(res.get_parent().id, res.id, res.get_resname(),
+                                                               atom.get_id(), atom.element, *atom.get_coord()))
+    return '\n'.join(lines)
@@ -0,0 +1,443 @@
+"""
+Tracing
+=======
+
+Record where time goes in a GEM-PRO or ATLAS run.
+
+The main methods of :class:`~ssbio.pipeline.gempro.GEMPRO`, :class:`~ssbio.core.protein.Protein` and
+:class:`~ssbio.pipeline.atlas.ATLAS`, external programs run through :mod:`ssbio.io.jobs` and downloads from web services
+are traced. While a :class:`Tracer` is enabled, each call is recorded as a span with its wall time, CPU time, bytes
+read and written, and counters such as result cache hits, subprocesses run and network requests. Counters of a span
+include those of the calls it made. Spans know the GEM-PRO or ATLAS step (the outermost traced method) and the gene
+(the nearest traced Protein method) they ran in, so the time of each step can be broken down per gene.
+
+Spans are exported as JSON, or in the Chrome trace event format which can be opened in ``chrome://tracing`` or
+Perfetto. When no tracer is enabled, traced functions only check a global variable before running.
+
+Example::
+
+    with Tracer() as tracer:
+        my_gempro.set_representative_structure()
+    tracer.summary(group_by=['step', 'gene'])
+    tracer.to_chrome_trace('trace.json')
+
+Bytes read and written are the input and output of the whole process during the span (from ``/proc/self/io``, only
+available on Linux), so they include other threads running at the same time. CPU time is the time of the thread the
+span ran in, and does not include programs it ran - see the ``subprocess_cpu_time`` counter for those. Spans in
+worker threads of a thread pool do not know the step they ran in.
+
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+_FORMAT = 1
+_tracer = None
+_PROC_IO = '/proc/self/io'
+
+if hasattr(time, 'thread_time'):
+    _cpu_time = time.thread_time
+else:
+    _cpu_time = time.clock
+
+COUNTERS = ['bytes_read', 'bytes_written', 'cache_hits', 'cache_misses', 'subprocesses', 'subprocess_cpu_time',
+            'network_requests']
+
+
+def _io_counters():
+    """Get the number of bytes read and written by the process so far, or ``None`` if it is not available"""
+    try:
+        with open(_PROC_IO) as f:
+            fields = dict(line.split(':') for line in f)
+        return int(fields['rchar']), int(fields['wchar'])
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+
+class Span(object):
+
+    """A traced call, recorded by a :class:`Tracer`.
+
+    Attributes:
+        name (str): Name of the traced function or block
+        category (str): ``gempro``, ``atlas``, ``protein``, ``subprocess``, ``network``, or another kind of work
+        step (str): Name of the outermost span of the thread, ie. the GEM-PRO or ATLAS method
+        gene (str): ID of the nearest Protein span of the thread
+        args (dict): Other information on the call
+        thread (int): ID of the thread the span ran in
+        start (float): Start time in seconds since the tracer was enabled
+        wall_time (float): Wall time in seconds
+        cpu_time (float): CPU time of the thread in seconds
+        counters (dict): Counters of the span and the spans it contains
+        error (str): Exception the span ended with
+        parent (Span): Span of the thread this span ran in, ``None`` for the outermost span
+
+    """
+
+    __slots__ = ['name', 'category', 'step', 'gene', 'args', 'thread', 'start', 'wall_time', 'cpu_time', 'counters',
+                 'error', 'parent', '_cpu_start', '_io_start']
+
+    def __init__(self, name, category, gene, args):
+        self.name = name
+        self.category = category
+        self.gene = gene
+        self.args = args
+        self.step = None
+        self.parent = None
+        self.counters = {}
+        self.wall_time = None
+        self.cpu_time = None
+        self.error = None
+
+    def to_dict(self):
+        return OrderedDict([('name', self.name), ('category', self.category), ('step', self.step),
+                            ('gene', self.gene), ('thread', self.thread), ('start', self.start),
+                            ('wall_time', self.wall_time), ('cpu_time', self.cpu_time),
+                            ('counters', self.counters), ('args', self.args), ('error', self.error)])
+
+
+class _SpanContext(object):
+
+    """Context manager recording a span in a tracer"""
+
+    __slots__ = ['tracer', 'span']
+
+    def __init__(self, tracer, span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self):
+        self.tracer._start(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is not None:
+            self.span.error = '{}: {}'.format(exc_type.__name__, exc_value)
+        self.tracer._finish(self.span)
+        return False
+
+
+class _NullSpan(object):
+
+    """Context manager doing nothing, used when tracing is disabled"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer(object):
+
+    """Collects spans of traced calls. Enable it with :meth:`enable` or by using it as a context manager.
+
+    Args:
+        measure_io (bool): If the bytes read and written by the process should be recorded for each span
+
+    """
+
+    def __init__(self, measure_io=True):
+        self.spans = []
+        self.measure_io = measure_io and _io_counters() is not None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.time()
+        self._perf_origin = time.perf_counter() if hasattr(time, 'perf_counter') else time.time()
+
+    def __repr__(self):
+        return '<Tracer {} spans at 0x{:x}>'.format(len(self.spans), id(self))
+
+    def __enter__(self):
+        return self.enable()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.disable()
+        return False
+
+    @property
+    def enabled(self):
+        """bool: If this tracer is the one recording traced calls"""
+        return _tracer is self
+
+    def enable(self):
+        """Record traced calls in this tracer, instead of the one enabled before.
+
+        Returns:
+            Tracer: This tracer
+
+        """
+        global _tracer
+        _tracer = self
+        return self
+
+    def disable(self):
+        """Stop recording traced calls."""
+        global _tracer
+        if _tracer is self:
+            _tracer = None
+
+    def _now(self):
+        return (time.perf_counter() if hasattr(time, 'perf_counter') else time.time()) - self._perf_origin
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, category=None, gene=None, **args):
+        """Get a context manager recording a block of code as a span.
+
+        Args:
+            name (str): Name of the span
+            category (str): Kind of work done
+            gene (str): Gene the block runs on, and the spans it contains, the gene of the enclosing span by default
+            **args: Other information on the block
+
+        """
+        return _SpanContext(self, Span(name, category, gene, args))
+
+    def _start(self, span):
+        stack = self._stack()
+        if stack:
+            span.step = stack[0].step
+            span.parent = stack[-1]
+            if span.gene is None:
+                span.gene = stack[-1].gene
+        else:
+            span.step = span.name
+        span.thread = threading.current_thread().ident
+        span._io_start = _io_counters() if self.measure_io else None
+        span._cpu_start = _cpu_time()
+        span.start = self._now()
+        stack.append(span)
+
+    def _finish(self, span):
+        span.wall_time = self._now() - span.start
+        span.cpu_time = _cpu_time() - span._cpu_start
+        if span._io_start is not None:
+            io_end = _io_counters()
+            if io_end is not None:
+                span.counters['bytes_read'] = span.counters.get('bytes_read', 0) + io_end[0] - span._io_start[0]
+                span.counters['bytes_written'] = (span.counters.get('bytes_written', 0) + io_end[1] -
+                                                  span._io_start[1])
+        span._io_start = span._cpu_start = None
+
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        else:
+            log.debug('{}: span finished out of order'.format(span.name))
+            if span in stack:
+                stack.remove(span)
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name, value=1):
+        """Add to a counter of the spans running in this thread.
+
+        Args:
+            name (str): Name of the counter
+            value (float): Amount to add
+
+        """
+        for span in self._stack():
+            span.counters[name] = span.counters.get(name, 0) + value
+
+    def clear(self):
+        """Remove the recorded spans."""
+        with self._lock:
+            self.spans = []
+
+    def to_dict(self):
+        """Get the recorded spans as a dictionary which can be written as JSON.
+
+        Returns:
+            dict: Format version, start time (in seconds since the epoch) and spans, ordered by start time
+
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda x: x.start)
+        return OrderedDict([('format', _FORMAT), ('start_time', self._origin),
+                            ('spans', [x.to_dict() for x in spans])])
+
+    def to_json(self, outfile):
+        """Save the recorded spans as JSON.
+
+        Args:
+            outfile (str): Path to the output file
+
+        Returns:
+            str: Path to the output file
+
+        """
+        with open(outfile, 'w') as f:
+            json.dump(self.to_dict(), f, default=repr)
+        return outfile
+
+    def to_chrome_trace(self, outfile):
+        """Save the recorded spans in the Chrome trace event format, to be opened in ``chrome://tracing`` or Perfetto.
+
+        Args:
+            outfile (str): Path to the output file
+
+        Returns:
+            str: Path to the output file
+
+        """
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            spans = sorted(self.spans, key=lambda x: x.start)
+        for span in spans:
+            args = OrderedDict([('step', span.step), ('gene', span.gene), ('cpu_time', span.cpu_time)])
+            args.update(span.counters)
+            args.update(span.args)
+            if span.error:
+                args['error'] = span.error
+            events.append(OrderedDict([('name', span.name), ('cat', span.category or ''), ('ph', 'X'),
+                                       ('ts', span.start * 1e6), ('dur', span.wall_time * 1e6),
+                                       ('pid', pid), ('tid', span.thread), ('args', args)]))
+        with open(outfile, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, default=repr)
+        return outfile
+
+    def summary(self, group_by=('name',)):
+        """Summarize the recorded spans.
+
+        Args:
+            group_by (list): Span attributes to group spans by, among ``name``, ``category``, ``step`` and ``gene``
+
+        Returns:
+            DataFrame: Number of spans (``calls``), total wall and CPU time and counters of each group, sorted by
+            wall time. Times and counters of a span already include those of the spans it contains, so spans running
+            inside a span of the same group are counted in ``calls`` only.
+
+        """
+        group_by = list(group_by)
+        with self._lock:
+            spans = list(self.spans)
+        records = []
+        for span in spans:
+            group = [getattr(span, key) for key in group_by]
+            record = {'calls': 1}
+            if not self._in_group(span.parent, group_by, group):
+                record.update(span.counters)
+                record['wall_time'] = span.wall_time
+                record['cpu_time'] = span.cpu_time
+            for key, value in zip(group_by, group):
+                record[key] = value
+            records.append(record)
+        columns = group_by + ['calls', 'wall_time', 'cpu_time']
+        df = pd.DataFrame.from_records(records, columns=columns + [x for x in COUNTERS if
+                                                                    any(x in s.counters for s in spans)])
+        if df.empty:
+            return df.set_index(group_by)
+        df = df.fillna({x: '' for x in group_by}).groupby(group_by).sum()
+        return df.sort_values('wall_time', ascending=False)
+
+    @staticmethod
+    def _in_group(span, group_by, group):
+        """Check if a span or one of the spans it ran in belongs to a group"""
+        while span is not None:
+            if [getattr(span, key) for key in group_by] == group:
+                return True
+            span = span.parent
+        return False
+
+
+def get_tracer():
+    """Get the enabled tracer.
+
+    Returns:
+        Tracer: The enabled tracer, or ``None`` if tracing is disabled
+
+    """
+    return _tracer
+
+
+def enable_tracing(measure_io=True):
+    """Start recording traced calls in a new tracer.
+
+    Args:
+        measure_io (bool): If the bytes read and written by the process should be recorded for each span
+
+    Returns:
+        Tracer: The new tracer
+
+    """
+    return Tracer(measure_io=measure_io).enable()
+
+
+def disable_tracing():
+    """Stop recording traced calls.
+
+    Returns:
+        Tracer: The tracer which was enabled, or ``None``
+
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name, category=None, gene=None, **args):
+    """Get a context manager recording a block of code as a span in the enabled tracer, or doing nothing if tracing is
+    disabled. See :meth:`Tracer.span`."""
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return tracer.span(name, category, gene, **args)
+
+
+def count(name, value=1):
+    """Add to a counter of the spans running in this thread, if tracing is enabled. See :meth:`Tracer.count`."""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def traced(category=None, name=None):
+    """Decorate a function or method so its calls are recorded as spans while tracing is enabled.
+
+    Calls of methods of objects with an ``id`` record it in the span arguments, and for the ``protein`` category it is
+    the gene of the span.
+
+    Args:
+        category (str): Kind of work the function does
+        name (str): Name of the spans, default is the qualified name of the function
+
+    """
+    def decorator(func):
+        span_name = name or getattr(func, '__qualname__', func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+
+            span_args = {}
+            gene = None
+            obj_id = getattr(args[0], 'id', None) if args else None
+            if isinstance(obj_id, str):
+                span_args['id'] = obj_id
+                if category == 'protein':
+                    gene = obj_id
+            with tracer.span(span_name, category, gene, **span_args):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
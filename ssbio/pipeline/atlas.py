@@ -1,4 +1,7 @@
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import os.path as op
 import sys
@@ -19,8 +22,10 @@ import ssbio.protein.sequence.properties.residues
 import ssbio.protein.sequence.utils.alignment
 import ssbio.protein.sequence.utils.blast
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.mutation_matrix
 from ssbio import utils
 from ssbio.core.object import Object
+from ssbio.io import tracing
 from ssbio.pipeline.gempro import GEMPRO
 
 try:
@@ -78,6 +83,12 @@ class ATLAS(Object):
         # Mark if the orthology matrix has gene IDs (thus we need to retrieve seqs from the genome file) or if
         # it is in the orthology matrix itself
         self._orthology_matrix_has_sequences = False
+        # Cutoffs the orthology matrix was made with, strains added to it later must use the same ones
+        self._orthology_matrix_cutoffs = None
+        # IDs of strains whose strain-specific models were built
+        self._built_strain_ids = []
+        # Alignment statistics of each reference gene, new alignments are folded into them
+        self._atlas_summary_cache = {}
 
         # Load the GEM-PRO (could be a model, could just be a list of genes)
         # Check if there is a genome file associated with this model - if not, write all sequences and use that
@@ -209,6 +220,7 @@ class ATLAS(Object):
     #
     #     return self.strains.get_by_id(new_id)
 
+    @tracing.traced('atlas')
     def load_strain(self, strain_id, strain_genome_file):
         """Load a strain as a new GEM-PRO by its ID and associated genome file. Stored in the ``strains`` attribute.
 
@@ -224,6 +236,7 @@ class ATLAS(Object):
         self.strains.append(strain_gp)
         return self.strains.get_by_id(strain_id)
 
+    @tracing.traced('atlas')
     def download_patric_genomes(self, ids, force_rerun=False):
         """Download genome files from PATRIC given a list of PATRIC genome IDs and load them as strains.
 
@@ -249,14 +262,18 @@ class ATLAS(Object):
 
         log.info('Created {} new strain GEM-PROs, accessible at "strains" attribute'.format(counter))
 
+    @tracing.traced('atlas')
     def get_orthology_matrix(self, pid_cutoff=None, bitscore_cutoff=None, evalue_cutoff=None, filter_condition='OR',
                              remove_strains_with_no_orthology=True,
                              remove_strains_with_no_differences=False,
-                             remove_genes_not_in_base_model=True):
+                             remove_genes_not_in_base_model=True, incremental=False):
         """Create the orthology matrix by finding best bidirectional BLAST hits. Genes = rows, strains = columns
 
         Runs run_makeblastdb, run_bidirectional_blast, and calculate_bbh for protein sequences.
 
+        In incremental mode, only strains which are not yet columns of the orthology matrix are BLASTed against the
+        reference, and their columns are appended to the existing matrix.
+
         Args:
             pid_cutoff (float): Minimum percent identity between BLAST hits to filter for in the range [0, 100]
             bitscore_cutoff (float): Minimum bitscore allowed between BLAST hits
@@ -269,12 +286,27 @@ class ATLAS(Object):
                 differences may be on the sequence level.
             remove_genes_not_in_base_model (bool): Remove genes from the orthology matrix which are not present in our
                 base model. This happens if we use a genome file for our model that has other genes in it.
+            incremental (bool): Only add strains which are not in the orthology matrix yet, using the same cutoffs
 
         Returns:
             DataFrame: Orthology matrix calculated from best bidirectional BLAST hits.
 
         """
         # TODO: document and test other cutoffs
+        cutoffs = [pid_cutoff, bitscore_cutoff, evalue_cutoff, filter_condition]
+
+        incremental = incremental and len(self.df_orthology_matrix) > 0
+        if incremental:
+            previous_cutoffs = getattr(self, '_orthology_matrix_cutoffs', None)
+            if previous_cutoffs is not None and list(previous_cutoffs) != cutoffs:
+                raise ValueError('Orthology matrix was made with cutoffs {}, strains must be added with the same '
+                                 'cutoffs (got {})'.format(previous_cutoffs, cutoffs))
+            strains = [x for x in self.strains if x.id not in self.df_orthology_matrix.columns]
+            if not strains:
+                log.info('No new strains to add to the orthology matrix')
+                return
+        else:
+            strains = self.strains
 
         # Get the path to the reference genome
         r_file = self.reference_gempro.genome_path
@@ -282,7 +314,7 @@ class ATLAS(Object):
         bbh_files = {}
 
         log.info('Running bidirectional BLAST and finding best bidirectional hits (BBH)...')
-        for strain_gempro in tqdm(self.strains):
+        for strain_gempro in tqdm(strains):
             g_file = strain_gempro.genome_path
 
             # Run bidirectional BLAST
@@ -300,17 +332,37 @@ class ATLAS(Object):
 
         # Make the orthologous genes matrix
         log.info('Creating orthology matrix from BBHs...')
-        ortho_matrix = ssbio.protein.sequence.utils.blast.create_orthology_matrix(r_name=self.reference_gempro.id,
-                                                                                  genome_to_bbh_files=bbh_files,
-                                                                                  pid_cutoff=pid_cutoff,
-                                                                                  bitscore_cutoff=bitscore_cutoff,
-                                                                                  evalue_cutoff=evalue_cutoff,
-                                                                                  filter_condition=filter_condition,
-                                                                                  outname='{}_{}_orthology.csv'.format(self.reference_gempro.id, 'prot'),
-                                                                                  outdir=self.data_dir)
+        outname = '{}_{}_orthology.csv'.format(self.reference_gempro.id, 'prot')
+        if incremental:
+            # Columns of the new strains only, appended to the existing matrix
+            ortho_matrix = ssbio.protein.sequence.utils.blast.create_orthology_matrix(r_name=self.reference_gempro.id,
+                                                                                      genome_to_bbh_files=bbh_files,
+                                                                                      pid_cutoff=pid_cutoff,
+                                                                                      bitscore_cutoff=bitscore_cutoff,
+                                                                                      evalue_cutoff=evalue_cutoff,
+                                                                                      filter_condition=filter_condition,
+                                                                                      outname='{}_{}_orthology_added.csv'.format(self.reference_gempro.id, 'prot'),
+                                                                                      outdir=self.data_dir,
+                                                                                      force_rerun=True)
+            df_added = pd.read_csv(ortho_matrix, index_col=0)
+            self.df_orthology_matrix = pd.merge(self.df_orthology_matrix, df_added,
+                                                left_index=True, right_index=True, how='outer')
+            ortho_matrix = op.join(self.data_dir, outname)
+            self.df_orthology_matrix.to_csv(ortho_matrix)
+            log.info('Added {} strains to the orthology matrix'.format(len(df_added.columns)))
+        else:
+            ortho_matrix = ssbio.protein.sequence.utils.blast.create_orthology_matrix(r_name=self.reference_gempro.id,
+                                                                                      genome_to_bbh_files=bbh_files,
+                                                                                      pid_cutoff=pid_cutoff,
+                                                                                      bitscore_cutoff=bitscore_cutoff,
+                                                                                      evalue_cutoff=evalue_cutoff,
+                                                                                      filter_condition=filter_condition,
+                                                                                      outname=outname,
+                                                                                      outdir=self.data_dir)
+            self.df_orthology_matrix = pd.read_csv(ortho_matrix, index_col=0)
+        self._orthology_matrix_cutoffs = cutoffs
 
         log.info('Saved orthology matrix at {}. See the "df_orthology_matrix" attribute.'.format(ortho_matrix))
-        self.df_orthology_matrix = pd.read_csv(ortho_matrix, index_col=0)
 
         # Filter the matrix to genes only in our analysis, and also check for strains with no differences or no orthologous genes
         self._filter_orthology_matrix(remove_strains_with_no_orthology=remove_strains_with_no_orthology,
@@ -490,18 +542,34 @@ class ATLAS(Object):
                                                          set_as_representative=True)
                 log.debug('{}: loaded sequence into strain model'.format(new_id))
 
-    def build_strain_specific_models(self, save_models=False):
+    @tracing.traced('atlas')
+    def build_strain_specific_models(self, save_models=False, incremental=False):
         """Using the orthologous genes matrix, create and modify the strain specific models based on if orthologous
             genes exist.
 
         Also store the sequences directly in the reference GEM-PRO protein sequence attribute for the strains.
+
+        Args:
+            save_models (bool): Save the strain-specific models in the model directory
+            incremental (bool): Only build models of strains which were added since the last time models were built
+
         """
 
         if len(self.df_orthology_matrix) == 0:
             raise RuntimeError('Empty orthology matrix')
 
+        built_strain_ids = getattr(self, '_built_strain_ids', None)
+        if built_strain_ids is None:
+            # ATLAS objects saved before built strains were tracked
+            built_strain_ids = []
+        if incremental:
+            strains = [x for x in self.strains if x.id not in built_strain_ids]
+        else:
+            strains = self.strains
+            built_strain_ids = []
+
         # Create an emptied copy of the reference GEM-PRO
-        for strain_gempro in tqdm(self.strains):
+        for strain_gempro in tqdm(strains):
             log.debug('{}: building strain specific model'.format(strain_gempro.id))
 
             # For each genome, load the metabolic model or genes from the reference GEM-PRO
@@ -526,31 +594,61 @@ class ATLAS(Object):
                                          filename=op.join(self.model_dir, '{}.json'.format(strain_gempro.id)))
                 strain_gempro.save_pickle(op.join(self.model_dir, '{}_gp.pckl'.format(strain_gempro.id)))
 
+            built_strain_ids.append(strain_gempro.id)
 
-        log.info('Created {} new strain-specific models and loaded in sequences'.format(len(self.strains)))
+        self._built_strain_ids = built_strain_ids
+        log.info('Created {} new strain-specific models and loaded in sequences'.format(len(strains)))
 
+    @tracing.traced('atlas')
     def align_orthologous_genes_pairwise(self, gapopen=10, gapextend=0.5):
-        """For each gene in the base strain, run a pairwise alignment for all orthologous gene sequences to it."""
+        """For each gene in the base strain, run a pairwise alignment for all orthologous gene sequences to it.
+
+        Sequences which are already aligned are skipped, and strains sharing an allele reuse its alignment, so after
+        adding strains only their new alleles are aligned.
+
+        """
         for ref_gene in tqdm(self.reference_gempro.genes):
-            if len(ref_gene.protein.sequences) > 1:
+            protein = ref_gene.protein
+            if len(protein.sequences) > 1:
+                # Only genes with sequences of new strains need to be looked at
+                if protein.representative_sequence and all(protein.sequence_alignments.has_id('{}_{}'.format(protein.id, x.id)) for x in protein.sequences
+                       if x.id != protein.representative_sequence.id):
+                    continue
                 alignment_dir = op.join(self.sequences_by_gene_dir, ref_gene.id)
                 if not op.exists(alignment_dir):
                     os.mkdir(alignment_dir)
-                ref_gene.protein.pairwise_align_sequences_to_representative(gapopen=gapopen, gapextend=gapextend,
-                                                                            outdir=alignment_dir, parse=True)
+                protein.pairwise_align_sequences_to_representative(gapopen=gapopen, gapextend=gapextend,
+                                                                   outdir=alignment_dir, parse=True,
+                                                                   reuse_identical=True)
 
     def align_orthologous_genes_multiple(self):
         """For each gene in the base strain, run a multiple alignment to all orthologous strain genes"""
         pass
 
-    def get_atlas_summary_df(self):
+    @tracing.traced('atlas')
+    def get_atlas_summary_df(self, processes=None, incremental=False):
         """Create a single data frame which summarizes all genes per row.
 
+        Alignment statistics of each gene are first collected into compact arrays, which are then summarized
+        independently per gene, optionally in a pool of worker processes.
+
+        The running statistics of each gene are kept, and in incremental mode only the alignments added since the
+        last summary (ie. of new strains) are collected and folded into them. Statistics of a gene are recalculated
+        from scratch if its earlier alignments were removed, replaced, or their annotations were changed.
+
+        Args:
+            processes (int): Number of worker processes to summarize genes with, default is to run in this process
+            incremental (bool): Fold only new alignments into the statistics kept from the last summary
+
         Returns:
             DataFrame: Pandas DataFrame of the results
 
         """
+        summary_cache = getattr(self, '_atlas_summary_cache', None) or {}
+        new_summary_cache = {}
+
         all_info = []
+        fold_tasks = []
         for g in self.reference_gempro.genes_with_a_representative_sequence:
             info = {}
             info['Gene_ID'] = g.id
@@ -565,89 +663,11 @@ class ATLAS(Object):
             rseq = p.representative_sequence
             info['RepSeq_ID'] = rseq.id
             info['RepSeq_sequence_length'] = rseq.seq_len
-            info['RepSeq_num_sequence_alignments'] = len([x for x in p.sequence_alignments if x.annotations['ssbio_type'] == 'seqalign'])
-            info['RepSeq_num_structure_alignments'] = len([x for x in p.sequence_alignments if x.annotations['ssbio_type'] == 'structalign'])
 
             # SeqRecord annotations (properties calculated that summarize the whole sequence)
             for annotation_name, annotation in rseq.annotations.items():
                 info['RepSeq_' + annotation_name] = annotation
 
-            # SeqRecord alignment annotations
-            all_num_mutations = []
-            all_num_deletions = []
-            all_len_deletions = []
-            all_num_insertions = []
-            all_len_insertions = []
-            all_percent_identity = []
-            all_percent_similarity = []
-            for aln in p.sequence_alignments:
-                # Gather the strain speicific stuff
-                if '{}_'.format(p.id) not in aln.annotations['b_seq']:
-                    continue
-                info[aln.annotations['b_seq'].split('{}_'.format(p.id))[1]] = aln.annotations['percent_identity']
-
-                # Gather the percent identities/similarities
-                all_percent_identity.append(aln.annotations['percent_identity'])
-                all_percent_similarity.append(aln.annotations['percent_similarity'])
-
-                # Gather the number of residues that are mutated (filter for different mutations of same residue)
-                num_mutations = len(list(set([x[1] for x in aln.annotations['mutations']])))
-                all_num_mutations.append(num_mutations)
-
-                # Gather the number of deletions as well as the length of the deletion
-                if not aln.annotations['deletions']:
-                    num_deletions = 0
-                    len_deletions = [0]
-                else:
-                    num_deletions = len(aln.annotations['deletions'])
-                    len_deletions = [x[1] for x in aln.annotations['deletions']]
-                all_num_deletions.append(num_deletions)
-                # Get the total length of the deletion for this one strain
-                avg_len_deletions = np.sum(len_deletions)
-                all_len_deletions.append(avg_len_deletions)
-
-                # Gather the number of insertions as well as the length of the insertion
-                if not aln.annotations['insertions']:
-                    num_insertions = 0
-                    len_insertions = [0]
-                else:
-                    num_insertions = len(aln.annotations['insertions'])
-                    len_insertions = [x[1] for x in aln.annotations['insertions']]
-                all_num_insertions.append(num_insertions)
-                # Get the total length of insertion for this one strain
-                avg_len_insertions = np.sum(len_insertions)
-                all_len_insertions.append(avg_len_insertions)
-
-            info['ATLAS_mean_num_mutations'] = np.mean(all_num_mutations)
-            info['ATLAS_mean_num_deletions'] = np.mean(all_num_deletions)
-            info['ATLAS_mean_len_deletions'] = np.mean(all_len_deletions)
-            info['ATLAS_mean_num_insertions'] = np.mean(all_num_insertions)
-            info['ATLAS_mean_len_insertions'] = np.mean(all_len_insertions)
-            info['ATLAS_mean_percent_identity'] = np.mean(all_percent_identity)
-            info['ATLAS_mean_percent_similarity'] = np.mean(all_percent_similarity)
-
-            # Other mutation analysis
-            single, fingerprint = p.sequence_mutation_summary()
-
-            # Mutations that show up in more than 10% of strains
-            singles = []
-            for k, v in single.items():
-                k = [str(x) for x in k]
-                if len(v) / len(p.sequence_alignments) >= 0.01:
-                    singles.append(''.join(k))  # len(v) is the number of strains which have this mutation
-            info['ATLAS_popular_mutations'] = ';'.join(singles)
-
-            # Mutation groups that show up in more than 10% of strains
-            allfingerprints = []
-            for k, v in fingerprint.items():
-                if len(v) / len(p.sequence_alignments) >= 0.01:
-                    fingerprints = []
-                    for m in k:
-                        y = [str(x) for x in m]
-                        fingerprints.append(''.join(y))
-                    allfingerprints.append('-'.join(fingerprints))
-            info['ATLAS_popular_mutation_groups'] = ';'.join(allfingerprints)
-
             # StructProp
             rstruct = p.representative_structure
             if rstruct:
@@ -668,6 +688,36 @@ class ATLAS(Object):
 
             all_info.append(info)
 
+            state = _atlas_reusable_summary(summary_cache.get(g.id), p) if incremental else None
+            num_folded = len(state['alignments']) if state else 0
+            if state and num_folded == len(p.sequence_alignments):
+                fold_tasks.append((state, None))
+            else:
+                fold_tasks.append((state, _atlas_alignment_arrays(p, start=num_folded)))
+
+        # Fold new alignments into the statistics of each gene
+        to_fold = [i for i, (_, arrays) in enumerate(fold_tasks) if arrays is not None]
+        log.debug('{}: folding new alignments of {} genes'.format(self.id, len(to_fold)))
+        if processes and processes > 1 and len(to_fold) > 1:
+            pool = multiprocessing.Pool(processes=processes)
+            try:
+                chunksize = max(1, len(to_fold) // (processes * 4))
+                folded = pool.map(_atlas_fold_task, [fold_tasks[i] for i in to_fold], chunksize=chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            folded = [_atlas_fold_task(fold_tasks[i]) for i in to_fold]
+        all_states = [state for state, _ in fold_tasks]
+        for i, state in zip(to_fold, folded):
+            all_states[i] = state
+
+        all_alignment_info = []
+        for info, state in zip(all_info, all_states):
+            new_summary_cache[info['Gene_ID']] = state
+            all_alignment_info.append(_atlas_alignment_summary(state))
+        self._atlas_summary_cache = new_summary_cache
+
         cols = ['Gene_ID', 'Gene_name', 'Protein_sequences', 'Protein_structures',
                 'RepSeq_ID', 'RepSeq_sequence_length',
                 'RepSeq_num_sequence_alignments', 'RepSeq_num_structure_alignments',
@@ -690,14 +740,27 @@ class ATLAS(Object):
                 'RepChain_percent_E-dssp', 'RepChain_percent_G-dssp', 'RepChain_percent_H-dssp',
                 'RepChain_percent_I-dssp', 'RepChain_percent_S-dssp', 'RepChain_percent_T-dssp',
                 'RepChain_SSBOND-biopython']
-        cols.extend([x.id for x in self.strains])
-
-        df_atlas_summary = pd.DataFrame(all_info, columns=cols)
+        strain_ids = [x.id for x in self.strains]
+
+        # Percent identity of each strain's gene to the reference gene, as one genes x strains matrix
+        strain_index = {s: i for i, s in enumerate(strain_ids)}
+        strain_percent_identity = np.full((len(all_info), len(strain_ids)), np.nan)
+        for i, (info, (alignment_info, aln_strains, aln_percent_identity)) in enumerate(zip(all_info,
+                                                                                          all_alignment_info)):
+            info.update(alignment_info)
+            ix = np.array([strain_index.get(s, -1) for s in aln_strains], dtype=np.int64)
+            found = ix >= 0
+            strain_percent_identity[i, ix[found]] = aln_percent_identity[found]
+
+        df_atlas_summary = pd.DataFrame.from_records(all_info, columns=cols)
+        df_atlas_summary = pd.concat([df_atlas_summary,
+                                      pd.DataFrame(strain_percent_identity, columns=strain_ids)], axis=1)
         # Drop columns that don't have anything in them
         df_atlas_summary.dropna(axis=1, how='all', inplace=True)
 
-        return df_atlas_summary
+        return df_atlas_summary.infer_objects()
 
+    @tracing.traced('atlas')
     def get_atlas_per_gene_mutation_df(self, gene_id):
         """Create a single data frame which summarizes a gene and its mutations.
 
@@ -717,12 +780,25 @@ class ATLAS(Object):
 
         g = self.reference_gempro.genes.get_by_id(gene_id)
 
-        single, fingerprint = g.protein.sequence_mutation_summary(alignment_type='seqalign')
+        single = g.protein.get_mutation_matrix(alignment_type='seqalign').single_mutations()
 
         structure_type_suffix = 'NA'
         appender = []
 
-        for k, strains in single.items():
+        # Residue properties and Grantham scores for all mutations at once
+        mutation_keys = list(single.keys())
+        df_mutation_props = ssbio.protein.sequence.properties.residues.annotate_mutations(
+                ref_aas=[k[0] for k in mutation_keys], mut_aas=[k[2] for k in mutation_keys])
+
+        # Get all per residue annotations - predicted from sequence and calculated from structure
+        residue_annotations = []
+        if mutation_keys:
+            residue_annotations = g.protein.get_residue_annotations_bulk(seq_resnums=[int(k[1]) for k in mutation_keys],
+                                                                         use_representatives=True).to_dict('records')
+
+        for k, mutation_props, residue_info in zip(mutation_keys, df_mutation_props.itertuples(index=False),
+                                                    residue_annotations):
+            strains = single[k]
             # Mutations in the strain
             to_append = {}
             orig_res = k[0]
@@ -738,18 +814,14 @@ class ATLAS(Object):
             to_append['at_disulfide_bridge'] = False
 
             # Residue properties
-            origres_props = ssbio.protein.sequence.properties.residues.residue_biochemical_definition(orig_res)
-            mutres_props = ssbio.protein.sequence.properties.residues.residue_biochemical_definition(mutated_res)
-            to_append['ref_residue_prop'] = origres_props
-            to_append['strain_residue_prop'] = mutres_props
+            to_append['ref_residue_prop'] = list(mutation_props.ref_residue_prop)
+            to_append['strain_residue_prop'] = list(mutation_props.mut_residue_prop)
 
             # Grantham score - score a mutation based on biochemical properties
-            grantham_s, grantham_txt = ssbio.protein.sequence.properties.residues.grantham_score(orig_res, mutated_res)
-            to_append['grantham_score'] = grantham_s
-            to_append['grantham_annotation'] = grantham_txt
+            to_append['grantham_score'] = int(mutation_props.grantham_score)
+            to_append['grantham_annotation'] = mutation_props.grantham_annotation
 
-            # Get all per residue annotations - predicted from sequence and calculated from structure
-            to_append.update(g.protein.get_residue_annotations(seq_resnum=resnum, use_representatives=True))
+            to_append.update(residue_info)
 
             # Check structure type
             if g.protein.representative_structure:
@@ -815,4 +887,195 @@ class ATLAS(Object):
         hboxes = [ipywidgets.HBox(views[i * 3:i * 3 + 3])
                   for i in range(int(math.ceil(len(views) / 3.0)))]
         vbox = ipywidgets.VBox(hboxes)
-        return vbox
\ No newline at end of file
+        return vbox
+
+
+# Alignment annotations which the ATLAS summary of a gene is calculated from
+_ATLAS_ALIGNMENT_ANNOTATIONS = ['b_seq', 'ssbio_type', 'percent_identity', 'percent_similarity', 'mutations',
+                                'deletions', 'insertions']
+
+
+def _atlas_alignment_key(alignment):
+    """Identify an alignment, the representative sequence it was made to, and the annotations it is summarized by"""
+    # Tuples and lists are hashed the same, since they are turned into each other when projects are saved as JSON
+    annotations = json.dumps([alignment.annotations.get(x) for x in _ATLAS_ALIGNMENT_ANNOTATIONS], default=str)
+    return alignment.id, alignment.annotations.get('a_seq'), hashlib.sha1(annotations.encode('utf-8')).hexdigest()
+
+
+def _atlas_reusable_summary(state, protein):
+    """Get the running alignment statistics of a gene if they can be updated incrementally.
+
+    Args:
+        state (dict): Statistics kept from the last summary, from :func:`_atlas_fold_alignments`
+        protein (Protein): Protein of the gene
+
+    Returns:
+        dict: ``state`` if the alignments it was made from are still the first alignments of the protein, with the
+        same annotations, or ``None`` if the statistics must be recalculated
+
+    """
+    if not state:
+        return None
+    folded = state['alignments']
+    alignments = protein.sequence_alignments
+    if len(folded) > len(alignments):
+        return None
+    if any(tuple(key) != _atlas_alignment_key(aln) for key, aln in zip(folded, alignments)):
+        return None
+    return state
+
+
+def _atlas_alignment_arrays(protein, start=0):
+    """Collect the alignment statistics of a protein as compact arrays, to be folded into the statistics of its gene by
+    :func:`_atlas_fold_alignments`.
+
+    Args:
+        protein (Protein): Protein with parsed alignments of strain sequences to its representative sequence
+        start (int): Only collect the alignments from this position on, ie. the ones added since the last summary
+
+    Returns:
+        dict: Arrays of per-alignment statistics and the mutation matrix of the alignments
+
+    """
+    strain_prefix = '{}_'.format(protein.id)
+    alignments = list(protein.sequence_alignments)[start:]
+    num_alignments = len(alignments)
+
+    ssbio_types = np.array([x.annotations['ssbio_type'] for x in alignments], dtype=object)
+    b_seqs = [x.annotations['b_seq'] for x in alignments]
+    is_strain = np.array([strain_prefix in x for x in b_seqs], dtype=bool)
+    strain_alignments = [x for x, keep in zip(alignments, is_strain) if keep]
+
+    deletions = [x.annotations['deletions'] or [] for x in strain_alignments]
+    insertions = [x.annotations['insertions'] or [] for x in strain_alignments]
+
+    if start:
+        mutation_matrix = ssbio.protein.sequence.utils.mutation_matrix.MutationMatrix.from_alignments(alignments)
+    else:
+        mutation_matrix = protein.get_mutation_matrix()
+
+    return {'alignments': [_atlas_alignment_key(x) for x in alignments],
+            'num_alignments': num_alignments,
+            'num_seqalign': int((ssbio_types == 'seqalign').sum()) if num_alignments else 0,
+            'num_structalign': int((ssbio_types == 'structalign').sum()) if num_alignments else 0,
+            'is_strain': is_strain,
+            'strains': [x.split(strain_prefix)[1] for x, keep in zip(b_seqs, is_strain) if keep],
+            'percent_identity': np.array([x.annotations['percent_identity'] for x in strain_alignments], dtype=float),
+            'percent_similarity': np.array([x.annotations['percent_similarity'] for x in strain_alignments],
+                                           dtype=float),
+            'num_deletions': np.array([len(x) for x in deletions], dtype=np.int64),
+            'len_deletions': np.array([sum(y[1] for y in x) for x in deletions], dtype=np.int64),
+            'num_insertions': np.array([len(x) for x in insertions], dtype=np.int64),
+            'len_insertions': np.array([sum(y[1] for y in x) for x in insertions], dtype=np.int64),
+            'mutation_matrix': mutation_matrix}
+
+
+_ATLAS_SUMMED_STATISTICS = ['num_mutations', 'num_deletions', 'len_deletions', 'num_insertions', 'len_insertions',
+                            'percent_identity', 'percent_similarity']
+
+
+def _atlas_fold_alignments(state, arrays):
+    """Fold the statistics of new alignments of a gene into its running statistics.
+
+    Means are kept as sums over strain alignments, and mutations and mutation groups as counts over all alignments, in
+    the order they are first seen, so folding alignments in batches gives the same summary as folding them at once.
+
+    Args:
+        state (dict): Running statistics of the gene, or ``None`` to start from no alignments
+        arrays (dict): Arrays of per-alignment statistics collected by :func:`_atlas_alignment_arrays`
+
+    Returns:
+        dict: New running statistics of the gene
+
+    """
+    if state:
+        # Copy the containers which are updated, the mutations and alignment keys in them are not changed
+        state = {k: copy(v) for k, v in state.items()}
+    else:
+        state = {'alignments': [], 'num_alignments': 0, 'num_seqalign': 0, 'num_structalign': 0,
+                 'num_strain_alignments': 0, 'sums': {x: 0 for x in _ATLAS_SUMMED_STATISTICS},
+                 'mutations': [], 'mutation_counts': [], 'mutation_groups': [], 'mutation_group_counts': [],
+                 'strains': [], 'percent_identity': []}
+
+    mutation_matrix = arrays['mutation_matrix']
+
+    # Number of residues that are mutated in each strain (different mutations of the same residue are counted once)
+    num_mutations = mutation_matrix.sequence_mutation_counts(unique_positions=True)[arrays['is_strain']]
+
+    state['alignments'].extend(list(x) for x in arrays['alignments'])
+    for x in ['num_alignments', 'num_seqalign', 'num_structalign']:
+        state[x] += arrays[x]
+    state['num_strain_alignments'] += len(arrays['strains'])
+    state['sums']['num_mutations'] += int(np.sum(num_mutations))
+    for x in _ATLAS_SUMMED_STATISTICS[1:]:
+        state['sums'][x] += arrays[x].sum().item()
+    state['strains'].extend(arrays['strains'])
+    state['percent_identity'].extend(arrays['percent_identity'].tolist())
+
+    # Lists of mutations may have been turned from tuples into lists when saved as JSON
+    mutation_index = {tuple(m): i for i, m in enumerate(state['mutations'])}
+    for m, count in zip(mutation_matrix.mutations, mutation_matrix.mutation_counts()):
+        if m in mutation_index:
+            state['mutation_counts'][mutation_index[m]] += int(count)
+        else:
+            mutation_index[m] = len(state['mutations'])
+            state['mutations'].append(m)
+            state['mutation_counts'].append(int(count))
+
+    group_index = {tuple(tuple(m) for m in k): i for i, k in enumerate(state['mutation_groups'])}
+    for k, sequences in mutation_matrix.mutation_groups().items():
+        if k in group_index:
+            state['mutation_group_counts'][group_index[k]] += len(sequences)
+        else:
+            group_index[k] = len(state['mutation_groups'])
+            state['mutation_groups'].append(k)
+            state['mutation_group_counts'].append(len(sequences))
+
+    return state
+
+
+def _atlas_fold_task(task):
+    """Fold new alignments into the statistics of a gene, given as a tuple of ``(state, arrays)``"""
+    return _atlas_fold_alignments(*task)
+
+
+def _atlas_alignment_summary(state):
+    """Summarize the alignment statistics of one gene, folded by :func:`_atlas_fold_alignments`.
+
+    Args:
+        state (dict): Running statistics of the gene
+
+    Returns:
+        tuple: (info, strains, percent_identity) - dictionary of ATLAS summary columns, and the strain IDs with the
+        percent identity of their alignment
+
+    """
+    num_alignments = state['num_alignments']
+    num_strain_alignments = state['num_strain_alignments']
+
+    def mean(name):
+        return state['sums'][name] / float(num_strain_alignments) if num_strain_alignments else np.nan
+
+    info = {}
+    info['RepSeq_num_sequence_alignments'] = state['num_seqalign']
+    info['RepSeq_num_structure_alignments'] = state['num_structalign']
+    info['ATLAS_mean_num_mutations'] = mean('num_mutations')
+    info['ATLAS_mean_num_deletions'] = mean('num_deletions')
+    info['ATLAS_mean_len_deletions'] = mean('len_deletions')
+    info['ATLAS_mean_num_insertions'] = mean('num_insertions')
+    info['ATLAS_mean_len_insertions'] = mean('len_insertions')
+    info['ATLAS_mean_percent_identity'] = mean('percent_identity')
+    info['ATLAS_mean_percent_similarity'] = mean('percent_similarity')
+
+    # Mutations and mutation groups that show up in more than 1% of strains
+    def popular(items, counts):
+        if not num_alignments:
+            return []
+        return [k for k, c in zip(items, counts) if c / float(num_alignments) >= 0.01]
+
+    singles = popular(state['mutations'], state['mutation_counts'])
+    info['ATLAS_popular_mutations'] = ';'.join(''.join(str(x) for x in m) for m in singles)
+    groups = popular(state['mutation_groups'], state['mutation_group_counts'])
+    info['ATLAS_popular_mutation_groups'] = ';'.join('-'.join(''.join(str(x) for x in m) for m in k) for k in groups)
+
+    return info, state['strains'], np.array(state['percent_identity'], dtype=float)
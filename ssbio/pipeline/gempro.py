@@ -3,11 +3,14 @@ GEMPRO
 ======
 """
 
+import functools
 import logging
 import os
 import os.path as op
 import shutil
+import weakref
 from copy import copy
+from multiprocessing.pool import ThreadPool
 
 import pandas as pd
 from Bio import SeqIO
@@ -21,18 +24,23 @@ import ssbio.core.modelpro
 import ssbio.databases.kegg
 import ssbio.databases.pdb
 import ssbio.databases.uniprot
+import ssbio.io.project
+import ssbio.protein.sequence.properties.composition
 import ssbio.protein.sequence.properties.residues
 import ssbio.protein.sequence.properties.tmhmm
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.letter_annotations
+import ssbio.protein.sequence.utils.seqstore
 import ssbio.protein.structure.properties.msms
 import ssbio.protein.structure.properties.quality
 import ssbio.protein.structure.properties.residues
 from ssbio import utils
 from ssbio.core.genepro import GenePro
 from ssbio.core.modelpro import ModelPro
-from ssbio.core.object import Object
+from ssbio.core.object import Object, json_schema, modified_version
 from ssbio.databases.kegg import KEGGProp
 from ssbio.databases.uniprot import UniProtProp
+from ssbio.io import tracing
 from ssbio.protein.sequence.properties.scratch import SCRATCH
 
 if utils.is_ipynb():
@@ -48,6 +56,53 @@ date = utils.Date()
 bs_unip = UniProt()
 bs_kegg = KEGG()
 
+# Cached df_* DataFrames of GEM-PRO projects, kept outside the projects so they are not saved with them
+_dataframe_caches = weakref.WeakKeyDictionary()
+
+
+def _genes_key(gempro):
+    """Get a key of the genes of a GEM-PRO project, which changes when genes are added, removed or replaced, or when
+    attributes of a gene, its protein, or the protein's representative structure are set."""
+    key = []
+    for g in gempro.genes:
+        # Proteins which are not loaded yet are left alone, replacing one changes the version of the gene
+        protein = g.__dict__.get('_protein')
+        if protein is None:
+            key.append((g.id, modified_version(g)))
+        else:
+            key.append((g.id, modified_version(g), modified_version(protein),
+                        modified_version(protein.representative_structure),
+                        len(protein.sequences), len(protein.structures)))
+    return tuple(key)
+
+
+def _cached_dataframe(func):
+    """Memoize a df_* property of a GEM-PRO project if caching was enabled with :meth:`GEMPRO.cache_dataframes`,
+    returning a copy of the cached DataFrame on each access."""
+    @functools.wraps(func)
+    def wrapper(self):
+        frames = _dataframe_caches.get(self)
+        if frames is None:
+            return func(self)
+        key = _genes_key(self)
+        cached = frames.get(func.__name__)
+        if cached is None or cached[0] != key:
+            cached = (key, func(self))
+            frames[func.__name__] = cached
+        return cached[1].copy()
+    return wrapper
+
+
+def _modifies_genes(func):
+    """Clear the cached df_* DataFrames of a GEM-PRO project after running a method which changes its genes."""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self.clear_cache()
+    return wrapper
+
 
 class GEMPRO(Object):
 
@@ -219,6 +274,14 @@ class GEMPRO(Object):
         else:
             return None
 
+    @property
+    def sequence_store_path(self):
+        """str: Path to the project sequence store, a single indexed FASTA file holding all protein sequences."""
+        if self.data_dir:
+            return op.join(self.data_dir, '{}_sequences.faa'.format(self.id))
+        else:
+            return None
+
     @property
     def genes_dir(self):
         """str: Directory where all gene specific information is stored."""
@@ -236,6 +299,66 @@ class GEMPRO(Object):
         else:
             return None
 
+    def save_project(self, project_dir, serializer='pickle', threads=None):
+        """Save the project as a folder with one file per gene's Protein, which can be opened lazily with
+        :func:`ssbio.io.project.load_project`. Saving into the folder the project was opened from only writes the
+        proteins which changed.
+
+        Args:
+            project_dir (str): Path to the project folder, created if it does not exist
+            serializer (str): ``pickle`` or ``json``
+            threads (int): Number of threads serializing and writing proteins, the number of CPUs if ``None``
+
+        Returns:
+            str: Path to the manifest of the project
+
+        """
+        return ssbio.io.project.save_project(self, project_dir, serializer=serializer, threads=threads)
+
+    def cache_dataframes(self, enabled=True):
+        """Cache the summary DataFrames (the ``df_*`` attributes), so they are only built once.
+
+        Caching is off by default. Cached DataFrames are rebuilt after GEM-PRO methods which change the genes, when
+        genes are added, removed or replaced, and when attributes of a gene, its protein, or the protein's
+        representative structure are set (ie. by setting the representative sequence or structure of a protein).
+        Changes made inside those attributes, like editing the annotations of a sequence in place, are not seen, so call
+        :meth:`clear_cache` after making them. The setting is not saved with the project.
+
+        Args:
+            enabled (bool): If the DataFrames should be cached, False clears the cache and turns caching off
+
+        """
+        if enabled:
+            _dataframe_caches.setdefault(self, {})
+        else:
+            _dataframe_caches.pop(self, None)
+
+    def clear_cache(self):
+        """Clear the cached summary DataFrames, see :meth:`cache_dataframes`."""
+        frames = _dataframe_caches.get(self)
+        if frames:
+            frames.clear()
+
+    def _select_genes(self, genes=None, among=None):
+        """Get the genes a method should run on.
+
+        Args:
+            genes (str, list): ID or IDs of genes to run on, all genes if ``None``
+            among (DictList): Genes to select from, default is all genes of the project
+
+        Returns:
+            DictList: GenePro objects of the selected genes, in the order of ``among``
+
+        """
+        if among is None:
+            among = self.genes
+        if genes is None:
+            return among
+        genes = set(ssbio.utils.force_list(genes))
+        return DictList(x for x in among if x.id in genes)
+
+    @tracing.traced('gempro')
+    @_modifies_genes
     def load_cobra_model(self, model):
         """Load a COBRApy Model object into the GEM-PRO project.
 
@@ -317,6 +440,8 @@ class GEMPRO(Object):
     #     else:
     #         self._genes = genes_list
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def add_gene_ids(self, genes_list):
         """Add gene IDs manually into the GEM-PRO project.
 
@@ -338,8 +463,10 @@ class GEMPRO(Object):
 
     ####################################################################################################################
     ### SEQUENCE RELATED METHODS ###
+    @tracing.traced('gempro')
+    @_modifies_genes
     def kegg_mapping_and_metadata(self, kegg_organism_code, custom_gene_mapping=None, outdir=None,
-                                  set_as_representative=False, force_rerun=False):
+                                  set_as_representative=False, force_rerun=False, genes=None):
         """Map all genes in the model to KEGG IDs using the KEGG service.
 
         Steps:
@@ -356,6 +483,7 @@ class GEMPRO(Object):
                 were not created initially
             set_as_representative (bool): If mapped KEGG IDs should be set as representative sequences
             force_rerun (bool): If you want to overwrite any existing mappings and files
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         """
 
@@ -364,7 +492,8 @@ class GEMPRO(Object):
 
         successfully_mapped_counter = 0
 
-        for g in tqdm(self.genes):
+        genes = self._select_genes(genes)
+        for g in tqdm(genes):
             if custom_gene_mapping:
                 kegg_g = custom_gene_mapping[g.id]
             else:
@@ -392,9 +521,11 @@ class GEMPRO(Object):
 
             log.debug('{}: loaded KEGG information for gene'.format(g.id))
 
-        log.info('{}/{}: number of genes mapped to KEGG'.format(successfully_mapped_counter, len(self.genes)))
+        log.info('{}/{}: number of genes mapped to KEGG'.format(successfully_mapped_counter, len(genes)))
         log.info('Completed ID mapping --> KEGG. See the "df_kegg_metadata" attribute for a summary dataframe.')
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def kegg_mapping_and_metadata_parallelize(self, sc, kegg_organism_code, custom_gene_mapping=None, outdir=None,
                                               set_as_representative=False, force_rerun=False):
         """Map all genes in the model to KEGG IDs using the KEGG service.
@@ -467,6 +598,7 @@ class GEMPRO(Object):
         log.info('Completed ID mapping --> KEGG. See the "df_kegg_metadata" attribute for a summary dataframe.')
 
     @property
+    @_cached_dataframe
     def df_kegg_metadata(self):
         """DataFrame: Pandas DataFrame of KEGG metadata per protein."""
         kegg_pre_df = []
@@ -502,8 +634,10 @@ class GEMPRO(Object):
                 kegg_missing.append(g.id)
         return list(set(kegg_missing))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def uniprot_mapping_and_metadata(self, model_gene_source, custom_gene_mapping=None, outdir=None,
-                                     set_as_representative=False, force_rerun=False):
+                                     set_as_representative=False, force_rerun=False, genes=None):
         """Map all genes in the model to UniProt IDs using the UniProt mapping service.
         Also download all metadata and sequences.
 
@@ -523,20 +657,22 @@ class GEMPRO(Object):
                 were not created initially
             set_as_representative (bool): If mapped UniProt IDs should be set as representative sequences
             force_rerun (bool): If you want to overwrite any existing mappings and files
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         """
+        genes = self._select_genes(genes)
 
         # Allow model gene --> custom ID mapping ({'TM_1012':'TM1012'})
         if custom_gene_mapping:
-            genes_to_map = list(custom_gene_mapping.values())
+            genes_to_map = [v for k, v in custom_gene_mapping.items() if genes.has_id(k)]
         else:
-            genes_to_map = [x.id for x in self.genes]
+            genes_to_map = [x.id for x in genes]
 
         # Map all IDs first to available UniProts
         genes_to_uniprots = bs_unip.mapping(fr=model_gene_source, to='ACC', query=genes_to_map)
 
         successfully_mapped_counter = 0
-        for g in tqdm(self.genes):
+        for g in tqdm(genes):
             if custom_gene_mapping and g.id in custom_gene_mapping.keys():
                 uniprot_gene = custom_gene_mapping[g.id]
             else:
@@ -559,9 +695,11 @@ class GEMPRO(Object):
                 if uniprot_prop.sequence_file or uniprot_prop.metadata_file:
                     successfully_mapped_counter += 1
 
-        log.info('{}/{}: number of genes mapped to UniProt'.format(successfully_mapped_counter, len(self.genes)))
+        log.info('{}/{}: number of genes mapped to UniProt'.format(successfully_mapped_counter, len(genes)))
         log.info('Completed ID mapping --> UniProt. See the "df_uniprot_metadata" attribute for a summary dataframe.')
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def manual_uniprot_mapping(self, gene_to_uniprot_dict, outdir=None, set_as_representative=True):
         """Read a manual dictionary of model gene IDs --> UniProt IDs. By default sets them as representative.
 
@@ -597,6 +735,7 @@ class GEMPRO(Object):
         log.info('Completed manual ID mapping --> UniProt. See the "df_uniprot_metadata" attribute for a summary dataframe.')
 
     @property
+    @_cached_dataframe
     def df_uniprot_metadata(self):
         """DataFrame: Pandas DataFrame of UniProt metadata per protein."""
         uniprot_pre_df = []
@@ -636,7 +775,10 @@ class GEMPRO(Object):
         return list(set(uniprot_missing))
 
     # TODO: should also have a seq --> uniprot id function (has to be 100% match) (also needs organism)
-    def manual_seq_mapping(self, gene_to_seq_dict, outdir=None, write_fasta_files=True, set_as_representative=True):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def manual_seq_mapping(self, gene_to_seq_dict, outdir=None, write_fasta_files=True, set_as_representative=True,
+                           use_sequence_store=False):
         """Read a manual input dictionary of model gene IDs --> protein sequences. By default sets them as representative.
 
         Args:
@@ -645,13 +787,22 @@ class GEMPRO(Object):
                 were not created initially
             write_fasta_files (bool): If individual protein FASTA files should be written out
             set_as_representative (bool): If mapped sequences should be set as representative
+            use_sequence_store (bool): If sequences should be appended to the project sequence store (see
+                :meth:`~ssbio.pipeline.gempro.GEMPRO.store_sequences`) instead of individual FASTA files
 
         """
+        if use_sequence_store:
+            if not self.sequence_store_path:
+                raise ValueError('GEM-PRO directories must be set to use the sequence store')
+            write_fasta_files = False
+
         if outdir:
             outdir_set = True
         else:
             outdir_set = False
 
+        loaded = []
+
         # Save the sequence information in individual FASTA files
         for g, s in gene_to_seq_dict.items():
             gene = self.genes.get_by_id(str(g))
@@ -664,11 +815,19 @@ class GEMPRO(Object):
             manual_info = gene.protein.load_manual_sequence(ident=g, seq=s, outdir=outdir,
                                                             write_fasta_file=write_fasta_files,
                                                             set_as_representative=set_as_representative)
+            loaded.append((gene.id, manual_info))
             log.debug('{}: loaded manually defined sequence information'.format(g))
 
+        if use_sequence_store:
+            ssbio.protein.sequence.utils.seqstore.write_seqprops_to_store(seqprops=[x[1] for x in loaded],
+                                                                          store=self.sequence_store_path,
+                                                                          keys=['{}|{}'.format(g, s.id) for g, s in loaded])
+
         log.info('Loaded in {} sequences'.format(len(gene_to_seq_dict)))
 
-    def set_representative_sequence(self, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def set_representative_sequence(self, force_rerun=False, genes=None):
         """Automatically consolidate loaded sequences (manual, UniProt, or KEGG) and set a single representative sequence.
 
         Manually set representative sequences override all existing mappings. UniProt mappings override KEGG mappings
@@ -676,13 +835,14 @@ class GEMPRO(Object):
 
         Args:
             force_rerun (bool): Set to True to recheck stored sequences
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         """
 
         # TODO: rethink use of multiple database sources - may lead to inconsistency with genome sources
 
         successfully_mapped_counter = 0
-        for g in tqdm(self.genes):
+        for g in tqdm(self._select_genes(genes)):
             repseq = g.protein.set_representative_sequence(force_rerun=force_rerun)
 
             if repseq:
@@ -694,6 +854,7 @@ class GEMPRO(Object):
         log.info('See the "df_representative_sequences" attribute for a summary dataframe.')
 
     @property
+    @_cached_dataframe
     def df_representative_sequences(self):
         """DataFrame: Pandas DataFrame of representative sequence information per protein."""
 
@@ -743,23 +904,115 @@ class GEMPRO(Object):
                 copied_seq_record.id = x.id
             tmp.append(copied_seq_record)
 
-        SeqIO.write(tmp, outfile, "fasta")
+        # Copy sequences directly from the sequence store if they are all in it
+        store = ssbio.protein.sequence.utils.seqstore.shared_sequence_store(tmp)
+        if store:
+            titles = {s.sequence_key: ssbio.protein.sequence.utils.seqstore.fasta_title(s) for s in tmp}
+            store.export(outfile=outfile, keys=[s.sequence_key for s in tmp], titles=titles, force_rerun=True)
+        else:
+            SeqIO.write(tmp, outfile, "fasta")
 
         log.info('{}: wrote all representative sequences to file'.format(outfile))
         self.genome_path = outfile
         return self.genome_path
 
-    def get_sequence_properties(self, representatives_only=True):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def store_sequences(self, representatives_only=False):
+        """Append all protein sequences to the project sequence store, a single indexed FASTA file located at
+        ``sequence_store_path``. Sequences are then loaded from the store instead of from individual FASTA files.
+
+        Sequences are stored under the key ``<gene ID>|<sequence ID>``. Sequences already in the store are skipped.
+
+        Args:
+            representatives_only (bool): If only the representative sequences should be stored
+
+        """
+        if not self.sequence_store_path:
+            raise ValueError('GEM-PRO directories must be set to use the sequence store')
+
+        seqprops = []
+        keys = []
+        seen = set()
+        for g in self.genes:
+            if representatives_only:
+                to_store = [g.protein.representative_sequence] if g.protein.representative_sequence else []
+            else:
+                to_store = list(g.protein.sequences)
+                if g.protein.representative_sequence:
+                    to_store.append(g.protein.representative_sequence)
+
+            for s in to_store:
+                if id(s) in seen or getattr(s, 'sequence_store_file', None):
+                    continue
+                seen.add(id(s))
+                seqprops.append(s)
+                keys.append('{}|{}'.format(g.id, s.id))
+
+        stored = ssbio.protein.sequence.utils.seqstore.write_seqprops_to_store(seqprops=seqprops,
+                                                                               store=self.sequence_store_path,
+                                                                               keys=keys)
+        log.info('{}: stored {} sequences'.format(self.sequence_store_path, len(stored)))
+
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_sequence_properties(self, representatives_only=True, batch=False, genes=None):
         """Run Biopython ProteinAnalysis and EMBOSS pepstats to summarize basic statistics of all protein sequences.
         Results are stored in the protein's respective SeqProp objects at ``.annotations``
 
+        With ``batch``, all sequences are analysed at once from their amino acid composition (see
+        :mod:`ssbio.protein.sequence.properties.composition`), which gives the same annotations as ProteinAnalysis
+        and the residue class percentages of EMBOSS pepstats (but not its other statistics) without running either
+        per sequence. Sequences with non-standard amino acids are still analysed individually.
+
         Args:
             representative_only (bool): If analysis should only be run on the representative sequences
+            batch (bool): If all sequences should be analysed at once, instead of running ProteinAnalysis and
+                EMBOSS pepstats on each sequence individually
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         """
-        for g in tqdm(self.genes):
-            g.protein.get_sequence_properties(representative_only=representatives_only)
+        genes = self._select_genes(genes)
+        if not batch:
+            for g in tqdm(genes):
+                g.protein.get_sequence_properties(representative_only=representatives_only)
+            return
+
+        seqprops = []
+        for g in genes:
+            if representatives_only:
+                if not g.protein.representative_sequence:
+                    log.warning('{}: no representative sequence set, cannot get sequence properties'.format(g.id))
+                    continue
+                to_analyze = [g.protein.representative_sequence]
+            else:
+                to_analyze = g.protein.sequences
+
+            for s in to_analyze:
+                if not s.seq:
+                    log.warning('{}: no sequence stored. Cannot get sequence properties.'.format(s.id))
+                    continue
+                seqprops.append(s)
+
+        all_info = ssbio.protein.sequence.properties.composition.batch_protein_analysis([s.seq for s in seqprops])
+        counter = 0
+        for s, info in zip(seqprops, all_info):
+            if not info:
+                log.debug('{}: sequence contains non-standard amino acids, analysing it individually'.format(s.id))
+                s.get_biopython_pepstats()
+                try:
+                    s.get_emboss_pepstats()
+                except (IOError, OSError) as e:
+                    log.error('{}: unable to run EMBOSS pepstats, {}'.format(s.id, e))
+                    continue
+            else:
+                s.annotations.update(info)
+            counter += 1
+
+        log.info('Calculated sequence properties for {} sequences'.format(counter))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def get_scratch_predictions(self, path_to_scratch, results_dir, scratch_basename='scratch', num_cores=1,
                                 exposed_buried_cutoff=25, custom_gene_mapping=None):
         """Run and parse ``SCRATCH`` results to predict secondary structure and solvent accessibility.
@@ -823,6 +1076,8 @@ class GEMPRO(Object):
 
         log.info('{}/{}: number of genes with SCRATCH predictions loaded'.format(counter, len(self.genes)))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def get_tmhmm_predictions(self, tmhmm_results, custom_gene_mapping=None):
         """Parse TMHMM results and store in the representative sequences.
 
@@ -868,6 +1123,8 @@ class GEMPRO(Object):
 
     ####################################################################################################################
     ### STRUCTURE RELATED METHODS ###
+    @tracing.traced('gempro')
+    @_modifies_genes
     def blast_seqs_to_pdb(self, seq_ident_cutoff=0, evalue=0.0001, all_genes=False, display_link=False,
                           outdir=None, force_rerun=False):
         """BLAST each representative protein sequence to the PDB. Saves raw BLAST results (XML files).
@@ -910,6 +1167,7 @@ class GEMPRO(Object):
         log.info('{}: number of genes with additional structures added from BLAST'.format(counter))
 
     @property
+    @_cached_dataframe
     def df_pdb_blast(self):
         """DataFrame: Get a dataframe of PDB BLAST results"""
 
@@ -925,7 +1183,9 @@ class GEMPRO(Object):
         else:
             return ssbio.utils.clean_df(df.set_index('gene'))
 
-    def map_uniprot_to_pdb(self, seq_ident_cutoff=0.0, outdir=None, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def map_uniprot_to_pdb(self, seq_ident_cutoff=0.0, outdir=None, force_rerun=False, genes=None):
         """Map all representative sequences' UniProt ID to PDB IDs using the PDBe "Best Structures" API.
         Will save a JSON file of the results to each protein's ``sequences`` folder.
 
@@ -937,15 +1197,17 @@ class GEMPRO(Object):
             seq_ident_cutoff (float): Sequence identity cutoff in decimal form
             outdir (str): Output directory to cache JSON results of search
             force_rerun (bool): Force re-downloading of JSON results if they already exist
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         Returns:
             list: A rank-ordered list of PDBProp objects that map to the UniProt ID
 
         """
+        genes = self._select_genes(genes, among=self.genes_with_a_representative_sequence)
 
         # First get all UniProt IDs and check if they have PDBs
         all_representative_uniprots = []
-        for g in self.genes_with_a_representative_sequence:
+        for g in genes:
             uniprot_id = g.protein.representative_sequence.uniprot
             if uniprot_id:
                 # TODO: add warning or something for isoform ids?
@@ -957,7 +1219,7 @@ class GEMPRO(Object):
 
         counter = 0
         # Now run the best_structures API for all genes
-        for g in tqdm(self.genes_with_a_representative_sequence):
+        for g in tqdm(genes):
             uniprot_id = g.protein.representative_sequence.uniprot
             if uniprot_id:
                 if '-' in uniprot_id:
@@ -975,6 +1237,7 @@ class GEMPRO(Object):
         log.info('Completed UniProt --> best PDB mapping. See the "df_pdb_ranking" attribute for a summary dataframe.')
 
     @property
+    @_cached_dataframe
     def df_pdb_ranking(self):
         """DataFrame: Get a dataframe of UniProt -> best structure in PDB results"""
         df = pd.DataFrame()
@@ -994,6 +1257,8 @@ class GEMPRO(Object):
         """list: List of genes with no mapping to any experimental PDB structure."""
         return [x.id for x in self.genes if not self.genes_with_experimental_structures.has_id(x.id)]
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def get_manual_homology_models(self, input_dict, outdir=None, clean=True, force_rerun=False):
         """Copy homology models to the GEM-PRO project.
 
@@ -1065,6 +1330,8 @@ class GEMPRO(Object):
 
         log.info('Updated homology model information for {} genes.'.format(counter))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def get_itasser_models(self, homology_raw_dir, custom_itasser_name_mapping=None, outdir=None, force_rerun=False):
         """Copy generated I-TASSER models from a directory to the GEM-PRO directory.
 
@@ -1111,6 +1378,7 @@ class GEMPRO(Object):
         log.info('Completed copying of {} I-TASSER models to GEM-PRO directory. See the "df_homology_models" attribute for a summary dataframe.'.format(counter))
 
     @property
+    @_cached_dataframe
     def df_homology_models(self):
         """DataFrame: Get a dataframe of I-TASSER homology model results"""
         df = pd.DataFrame()
@@ -1130,12 +1398,14 @@ class GEMPRO(Object):
         """list: List of genes with no mapping to any homology models."""
         return [x.id for x in self.genes if not self.genes_with_homology_models.has_id(x.id)]
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def set_representative_structure(self, seq_outdir=None, struct_outdir=None, pdb_file_type=None,
                                      engine='needle', always_use_homology=False, rez_cutoff=0.0,
                                      seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
                                      allow_mutants=True, allow_deletions=False,
                                      allow_insertions=False, allow_unresolved=True, skip_large_structures=False,
-                                     clean=True, force_rerun=False):
+                                     clean=True, force_rerun=False, genes=None):
         """Set all representative structure for proteins from a structure in the structures attribute.
 
         Each gene can have a combination of the following, which will be analyzed to set a representative structure.
@@ -1172,12 +1442,13 @@ class GEMPRO(Object):
                 and not clean it. If you don't want this to happen, set this to true.
             clean (bool): If structures should be cleaned
             force_rerun (bool): If sequence to structure alignment should be rerun
+            genes (str, list): ID or IDs of genes to run on, all genes by default
 
         Todo:
             - Remedy large structure representative setting
 
         """
-        for g in tqdm(self.genes):
+        for g in tqdm(self._select_genes(genes)):
             repstruct = g.protein.set_representative_structure(seq_outdir=seq_outdir,
                                                                struct_outdir=struct_outdir,
                                                                pdb_file_type=pdb_file_type,
@@ -1198,6 +1469,8 @@ class GEMPRO(Object):
                                                                                  len(self.genes)))
         log.info('See the "df_representative_structures" attribute for a summary dataframe.')
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def set_representative_structure_parallelize(self, sc, seq_outdir=None, struct_outdir=None, pdb_file_type=None,
                                      engine='needle', always_use_homology=False, rez_cutoff=0.0,
                                      seq_ident_cutoff=0.5, allow_missing_on_termini=0.2,
@@ -1238,6 +1511,7 @@ class GEMPRO(Object):
         log.info('See the "df_representative_structures" attribute for a summary dataframe.')
 
     @property
+    @_cached_dataframe
     def df_representative_structures(self):
         """DataFrame: Get a dataframe of representative protein structure information."""
         rep_struct_pre_df = []
@@ -1308,6 +1582,8 @@ class GEMPRO(Object):
         log.info('Prepared I-TASSER modeling folders for {} genes in folder {}'.format(counter,
                                                                                        self.homology_models_dir))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def pdb_downloader_and_metadata(self, outdir=None, pdb_file_type=None, force_rerun=False):
         """Download ALL mapped experimental structures to each protein's structures directory.
 
@@ -1332,6 +1608,8 @@ class GEMPRO(Object):
         log.info('Updated PDB metadata dataframe. See the "df_pdb_metadata" attribute for a summary dataframe.')
         log.info('Saved {} structures total'.format(counter))
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def download_all_pdbs(self, outdir=None, pdb_file_type=None, load_metadata=False, force_rerun=False):
         if not pdb_file_type:
             pdb_file_type = self.pdb_file_type
@@ -1344,6 +1622,7 @@ class GEMPRO(Object):
         return list(set(all_structures))
 
     @property
+    @_cached_dataframe
     def df_pdb_metadata(self):
         """DataFrame: Get a dataframe of PDB metadata (PDBs have to be downloaded first)."""
         df = pd.DataFrame()
@@ -1359,6 +1638,7 @@ class GEMPRO(Object):
             return ssbio.utils.clean_df(df.set_index('gene'))
 
     @property
+    @_cached_dataframe
     def df_proteins(self):
         """DataFrame: Get a summary dataframe of all proteins in the project."""
         pre_df = []
@@ -1383,7 +1663,9 @@ class GEMPRO(Object):
         else:
             return ssbio.utils.clean_df(df)
 
-    def get_dssp_annotations(self, representatives_only=True, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_dssp_annotations(self, representatives_only=True, force_rerun=False, engine='dssp'):
         """Run DSSP on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1392,12 +1674,16 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``dssp`` to run the DSSP executable, or ``builtin`` to assign secondary structure in process
 
         """
         for g in tqdm(self.genes):
-            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun,
+                                           engine=engine)
 
-    def get_dssp_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_dssp_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False, engine='dssp'):
         """Run DSSP on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1406,12 +1692,14 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``dssp`` to run the DSSP executable, or ``builtin`` to assign secondary structure in process
 
         """
         genes_rdd = sc.parallelize(self.genes)
 
         def get_dssp_annotation(g):
-            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+            g.protein.get_dssp_annotations(representative_only=representatives_only, force_rerun=force_rerun,
+                                           engine=engine)
             return g
 
         result = genes_rdd.map(get_dssp_annotation).collect()
@@ -1419,7 +1707,9 @@ class GEMPRO(Object):
             original_gene = self.genes.get_by_id(modified_g.id)
             original_gene.copy_modified_gene(modified_g)
 
-    def get_msms_annotations(self, representatives_only=True, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_msms_annotations(self, representatives_only=True, force_rerun=False, engine='msms'):
         """Run MSMS on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1428,12 +1718,16 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``msms`` to run the MSMS executable, or ``builtin`` to calculate residue depths in process
 
         """
         for g in tqdm(self.genes):
-            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun,
+                                           engine=engine)
 
-    def get_msms_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_msms_annotations_parallelize(self, sc, representatives_only=True, force_rerun=False, engine='msms'):
         """Run MSMS on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1442,12 +1736,14 @@ class GEMPRO(Object):
         Args:
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``msms`` to run the MSMS executable, or ``builtin`` to calculate residue depths in process
 
         """
         genes_rdd = sc.parallelize(self.genes)
 
         def get_msms_annotation(g):
-            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun)
+            g.protein.get_msms_annotations(representative_only=representatives_only, force_rerun=force_rerun,
+                                           engine=engine)
             return g
 
         result = genes_rdd.map(get_msms_annotation).collect()
@@ -1455,7 +1751,10 @@ class GEMPRO(Object):
             original_gene = self.genes.get_by_id(modified_g.id)
             original_gene.copy_modified_gene(modified_g)
 
-    def get_freesasa_annotations(self, include_hetatms=False, representatives_only=True, force_rerun=False):
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_freesasa_annotations(self, include_hetatms=False, representatives_only=True, force_rerun=False,
+                                 engine='freesasa', threads=1):
         """Run freesasa on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1465,15 +1764,33 @@ class GEMPRO(Object):
             include_hetatms (bool): If HETATMs should be included in calculations. Defaults to ``False``.
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``freesasa`` to run the freesasa executable, or ``builtin`` to calculate in process. See
+                :meth:`ssbio.protein.structure.structprop.StructProp.get_freesasa_annotations`.
+            threads (int): Number of genes to run at the same time in a thread pool
 
         """
-        for g in tqdm(self.genes):
+        def get_freesasa_annotation(g):
             g.protein.get_freesasa_annotations(include_hetatms=include_hetatms,
                                                representative_only=representatives_only,
-                                               force_rerun=force_rerun)
+                                               force_rerun=force_rerun,
+                                               engine=engine)
 
+        if threads and threads > 1:
+            pool = ThreadPool(processes=threads)
+            try:
+                for _ in tqdm(pool.imap_unordered(get_freesasa_annotation, self.genes), total=len(self.genes)):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for g in tqdm(self.genes):
+                get_freesasa_annotation(g)
+
+    @tracing.traced('gempro')
+    @_modifies_genes
     def get_freesasa_annotations_parallelize(self, sc, include_hetatms=False,
-                                             representatives_only=True, force_rerun=False):
+                                             representatives_only=True, force_rerun=False, engine='freesasa'):
         """Run freesasa on structures and store calculations.
 
         Annotations are stored in the protein structure's chain sequence at:
@@ -1483,6 +1800,7 @@ class GEMPRO(Object):
             include_hetatms (bool): If HETATMs should be included in calculations. Defaults to ``False``.
             representative_only (bool): If analysis should only be run on the representative structure
             force_rerun (bool): If calculations should be rerun even if an output file exists
+            engine (str): ``freesasa`` to run the freesasa executable, or ``builtin`` to calculate in process
 
         """
         genes_rdd = sc.parallelize(self.genes)
@@ -1490,7 +1808,8 @@ class GEMPRO(Object):
         def get_freesasa_annotation(g):
             g.protein.get_freesasa_annotations(include_hetatms=include_hetatms,
                                                representative_only=representatives_only,
-                                               force_rerun=force_rerun)
+                                               force_rerun=force_rerun,
+                                               engine=engine)
             return g
 
         result = genes_rdd.map(get_freesasa_annotation).collect()
@@ -1498,6 +1817,59 @@ class GEMPRO(Object):
             original_gene = self.genes.get_by_id(modified_g.id)
             original_gene.copy_modified_gene(modified_g)
 
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_hse_annotations(self, representatives_only=True, threads=1):
+        """Calculate half sphere exposures and contact numbers of structures and store calculations.
+
+        Annotations are stored in the protein structure's chain sequence at:
+        ``<chain_prop>.seq_record.letter_annotations['*-biopython']``
+
+        Args:
+            representative_only (bool): If analysis should only be run on the representative structure
+            threads (int): Number of genes to run at the same time in a thread pool
+
+        """
+        def get_hse_annotation(g):
+            g.protein.get_hse_annotations(representative_only=representatives_only)
+
+        if threads and threads > 1:
+            pool = ThreadPool(processes=threads)
+            try:
+                for _ in tqdm(pool.imap_unordered(get_hse_annotation, self.genes), total=len(self.genes)):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for g in tqdm(self.genes):
+                get_hse_annotation(g)
+
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def get_hse_annotations_parallelize(self, sc, representatives_only=True):
+        """Calculate half sphere exposures and contact numbers of structures and store calculations.
+
+        Annotations are stored in the protein structure's chain sequence at:
+        ``<chain_prop>.seq_record.letter_annotations['*-biopython']``
+
+        Args:
+            representative_only (bool): If analysis should only be run on the representative structure
+
+        """
+        genes_rdd = sc.parallelize(self.genes)
+
+        def get_hse_annotation(g):
+            g.protein.get_hse_annotations(representative_only=representatives_only)
+            return g
+
+        result = genes_rdd.map(get_hse_annotation).collect()
+        for modified_g in result:
+            original_gene = self.genes.get_by_id(modified_g.id)
+            original_gene.copy_modified_gene(modified_g)
+
+    @tracing.traced('gempro')
+    @_modifies_genes
     def find_disulfide_bridges(self, representatives_only=True):
         """Run Biopython's disulfide bridge finder and store found bridges.
 
@@ -1511,6 +1883,8 @@ class GEMPRO(Object):
         for g in tqdm(self.genes):
             g.protein.find_disulfide_bridges(representative_only=representatives_only)
 
+    @tracing.traced('gempro')
+    @_modifies_genes
     def find_disulfide_bridges_parallelize(self, sc, representatives_only=True):
         """Run Biopython's disulfide bridge finder and store found bridges.
 
@@ -1532,17 +1906,108 @@ class GEMPRO(Object):
             original_gene = self.genes.get_by_id(modified_g.id)
             original_gene.copy_modified_gene(modified_g)
 
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def annotate(self, which=None, representatives_only=True, threads=1, calculator_threads=None, genes=None):
+        """Calculate several structure properties from a single parse of each structure and store calculations.
+
+        Structures are streamed through :meth:`ssbio.protein.structure.structprop.StructProp.annotate`, which parses
+        each one once and shares its atom arrays between the in-process calculators. See that method for the
+        annotations available and where they are stored.
+
+        Args:
+            which (list): Annotations to calculate - ``dssp``, ``msms``, ``freesasa``, ``hse`` and ``disulfide`` by
+                default
+            representative_only (bool): If analysis should only be run on the representative structure
+            threads (int): Number of genes to run at the same time in a thread pool
+            calculator_threads (int): Number of calculators to run at the same time for each structure, one thread
+                per calculator by default
+            genes (str, list): ID or IDs of genes to run on, all genes by default
+
+        """
+        def annotate_gene(g):
+            g.protein.annotate(which=which, representative_only=representatives_only, threads=calculator_threads)
+
+        genes = self._select_genes(genes)
+        if threads and threads > 1:
+            pool = ThreadPool(processes=threads)
+            try:
+                for _ in tqdm(pool.imap_unordered(annotate_gene, genes), total=len(genes)):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for g in tqdm(genes):
+                annotate_gene(g)
+
+    @tracing.traced('gempro')
+    @_modifies_genes
+    def annotate_parallelize(self, sc, which=None, representatives_only=True, calculator_threads=None):
+        """Calculate several structure properties from a single parse of each structure and store calculations.
+
+        See :meth:`annotate`.
+
+        Args:
+            which (list): Annotations to calculate - ``dssp``, ``msms``, ``freesasa``, ``hse`` and ``disulfide`` by
+                default
+            representative_only (bool): If analysis should only be run on the representative structure
+            calculator_threads (int): Number of calculators to run at the same time for each structure
+
+        """
+        genes_rdd = sc.parallelize(self.genes)
+
+        def annotate_gene(g):
+            g.protein.annotate(which=which, representative_only=representatives_only, threads=calculator_threads)
+            return g
+
+        result = genes_rdd.map(annotate_gene).collect()
+        for modified_g in result:
+            original_gene = self.genes.get_by_id(modified_g.id)
+            original_gene.copy_modified_gene(modified_g)
+
+    def export_residue_annotations(self, outfile=None, file_format='npz', representatives_only=True,
+                                   force_rerun=False):
+        """Save the residue-level annotations of all proteins as a single columnar dataset, with one row per residue.
+
+        Sequences and structure chains are identified in the ``record_id`` column as ``<gene ID>|<sequence ID>`` and
+        ``<gene ID>|<structure ID>-<chain ID>``. Load the dataset with
+        :func:`ssbio.protein.sequence.utils.letter_annotations.load_residue_annotations`.
+
+        Args:
+            outfile (str): Path to output file, default is ``<data_dir>/<GEM-PRO ID>_residue_annotations.<file_format>``
+            file_format (str): ``npz``, ``npy`` (a folder of memory-mappable files), or ``parquet``
+            representatives_only (bool): If only the representative sequences and structures should be exported
+            force_rerun (bool): If an existing file should be overwritten
+
+        Returns:
+            str: Path to output file
+
+        """
+        if not outfile:
+            if not self.data_dir:
+                raise ValueError('Output file must be specified')
+            outfile = op.join(self.data_dir, '{}_residue_annotations.{}'.format(self.id, file_format))
+
+        records = []
+        for g in self.genes:
+            for label, record in g.protein.get_residue_annotation_records(representatives_only=representatives_only):
+                records.append(('{}|{}'.format(g.id, label), record))
+
+        dataset = ssbio.protein.sequence.utils.letter_annotations.residue_annotations_dataset(records)
+        outfile = ssbio.protein.sequence.utils.letter_annotations.save_residue_annotations(dataset=dataset,
+                                                                                           outfile=outfile,
+                                                                                           file_format=file_format,
+                                                                                           force_rerun=force_rerun)
+        log.info('{}: saved residue annotations of {} sequences and structures'.format(outfile, len(records)))
+        return outfile
+
     ### END STRUCTURE RELATED METHODS ###
     ####################################################################################################################
 
     def __json_encode__(self):
-        to_return = {}
-        # Don't save properties, methods in the JSON
-        for x in [a for a in dir(self) if not a.startswith('__') and not isinstance(getattr(type(self), a, None), property) and not callable(getattr(self,a))]:
-            if self.model and x == 'genes':
-                continue
-            to_return.update({x: getattr(self, x)})
-        return to_return
+        # Don't save properties, methods in the JSON, or genes which are saved with the model
+        return json_schema(type(self)).encode(self, exclude=['genes'] if self.model else None)
 
     def __json_decode__(self, **attrs):
         for k, v in attrs.items():
@@ -0,0 +1,523 @@
+"""
+Runner
+======
+
+Incremental runs of GEM-PRO pipeline steps, with a manifest of what each step consumed for each gene.
+
+A pipeline is a list of :class:`Step` objects, each one a GEM-PRO method which is run on a subset of genes (see the
+``genes`` argument of :meth:`~ssbio.pipeline.gempro.GEMPRO.set_representative_sequence` and the other pipeline methods).
+For each gene and step, the manifest records a hash of the step's inputs - its parameters, the gene data it reads and
+the outputs of the steps it depends on - and a hash of the gene data it produced. When the pipeline is run again, a
+step only runs for the genes whose inputs changed, or whose outputs are not the ones recorded (for example after going
+back to an older save of the project). Adding 20 genes to a project of 4,000 genes and running the pipeline again only
+runs the steps for those 20 genes.
+
+Steps which do not depend on each other run at the same time, and the genes of a step are run in chunks in a pool of
+threads. Steps running at the same time must not change the same data of a gene. The manifest is saved as chunks
+finish, and the project can be saved after each step, so a run which crashed resumes where it stopped.
+
+Example::
+
+    runner = PipelineRunner(my_gempro, steps=gempro_steps(model_gene_source='ENSEMBLGENOME_ID'),
+                            project_dir='my_gempro_project')
+    runner.plan()  # Genes each step would run on
+    runner.run()
+
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import os.path as op
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ssbio.utils
+from ssbio.databases.kegg import KEGGProp
+from ssbio.databases.uniprot import UniProtProp
+
+log = logging.getLogger(__name__)
+
+_FORMAT = 1
+MANIFEST_FILE = 'pipeline_manifest.json'
+
+# SHA-256 of files by their path, size and modification time
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+def _hash(obj):
+    """SHA-256 of an object written as JSON, values which cannot be written as JSON are hashed by their repr"""
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+
+def file_fingerprint(path):
+    """Get the SHA-256 of the contents of a file, remembered until its size or modification time change.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: SHA-256 hex digest, or ``None`` if the file does not exist
+
+    """
+    if not path or not op.exists(path):
+        return None
+    stat = os.stat(path)
+    key = (op.abspath(path), stat.st_size, stat.st_mtime)
+    with _file_hashes_lock:
+        digest = _file_hashes.get(key)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(functools.partial(f.read, 1 << 20), b''):
+                sha256.update(block)
+        digest = sha256.hexdigest()
+        with _file_hashes_lock:
+            _file_hashes[key] = digest
+    return digest
+
+
+def sequence_fingerprint(seqprop):
+    """Get the ID and the SHA-256 of the sequence of a SeqProp.
+
+    Args:
+        seqprop (SeqProp): Sequence
+
+    Returns:
+        list: ``[ID, SHA-256]``, the hash is an empty string if no sequence is stored
+
+    """
+    seq_str = seqprop.seq_str
+    return [seqprop.id, hashlib.sha256(seq_str.encode('utf-8')).hexdigest() if seq_str else '']
+
+
+class Step(object):
+
+    """A step of a GEM-PRO pipeline: a GEM-PRO method which is run on a subset of genes.
+
+    Args:
+        name (str): Name of the step, unique in a pipeline
+        method (str, callable): Name of the GEM-PRO method to run, or a function called as
+            ``method(gempro, genes=gene_ids, **params)``
+        params (dict): Keyword arguments of the method, they are part of the inputs of every gene
+        depends_on (list): Names of the steps whose outputs this step reads
+        inputs (callable): Function ``inputs(gempro, gene)`` describing the data of a gene the step reads, other than
+            the outputs of the steps it depends on, as an object which can be written as JSON
+        outputs (callable): Function ``outputs(gempro, gene)`` describing the data of a gene the step produces
+        version (str): Version of the step, change it to run the step again for all genes
+
+    """
+
+    def __init__(self, name, method, params=None, depends_on=None, inputs=None, outputs=None, version=None):
+        self.name = name
+        self.method = method
+        self.params = params or {}
+        self.depends_on = ssbio.utils.force_list(depends_on) if depends_on else []
+        self.inputs = inputs
+        self.outputs = outputs
+        self.version = version
+
+    def __repr__(self):
+        return '<Step {} at 0x{:x}>'.format(self.name, id(self))
+
+    def __call__(self, gempro, gene_ids):
+        if callable(self.method):
+            return self.method(gempro, genes=gene_ids, **self.params)
+        return getattr(gempro, self.method)(genes=gene_ids, **self.params)
+
+    def input_description(self, gempro, gene):
+        return self.inputs(gempro, gene) if self.inputs else None
+
+    def output_description(self, gempro, gene):
+        return self.outputs(gempro, gene) if self.outputs else None
+
+
+def _sequences_of_type(seq_type):
+    def sequences(gempro, gene):
+        return sorted(sequence_fingerprint(x) for x in gene.protein.sequences if isinstance(x, seq_type))
+    return sequences
+
+
+def _all_sequences(gempro, gene):
+    return sorted(sequence_fingerprint(x) for x in gene.protein.sequences)
+
+
+def _representative_sequence(gempro, gene):
+    repseq = gene.protein.representative_sequence
+    if not repseq:
+        return None
+    return [sequence_fingerprint(repseq), repseq.uniprot]
+
+
+def _representative_sequence_annotations(gempro, gene):
+    repseq = gene.protein.representative_sequence
+    if not repseq:
+        return None
+    return sorted(repseq.annotations)
+
+
+def _structures(experimental):
+    def structures(gempro, gene):
+        # Representative structures are copies of other structures named REP-<ID>
+        return sorted(x.id for x in gene.protein.structures
+                      if not x.id.startswith('REP-') and (not experimental or x.is_experimental))
+    return structures
+
+
+def _representative_structure(gempro, gene):
+    repstruct = gene.protein.representative_structure
+    if not repstruct:
+        return None
+    path = repstruct.structure_path if repstruct.structure_file else None
+    return [repstruct.id, gene.protein.representative_chain, file_fingerprint(path)]
+
+
+def _structure_annotations(gempro, gene):
+    repstruct = gene.protein.representative_structure
+    repchain = gene.protein.representative_chain
+    if not repstruct or not repchain or not repstruct.chains.has_id(repchain):
+        return None
+    seq_record = repstruct.chains.get_by_id(repchain).seq_record
+    if not seq_record:
+        return None
+    return [sorted(seq_record.letter_annotations), sorted(seq_record.annotations)]
+
+
+def gempro_steps(kegg_organism_code=None, model_gene_source=None, custom_gene_mapping=None, outdir=None,
+                 sequence_properties=True, pdb_seq_ident_cutoff=0.0, representative_structure_params=None,
+                 annotate_params=None):
+    """Get the steps of the standard GEM-PRO pipeline: ID mapping to KEGG and UniProt, representative sequence,
+    sequence properties, UniProt to PDB mapping, representative structure and structure annotations.
+
+    Sequence properties and the PDB mapping both only depend on the representative sequence, so they run at the same
+    time.
+
+    Args:
+        kegg_organism_code (str): The three letter KEGG code of your organism, the KEGG mapping is skipped if ``None``
+        model_gene_source (str): The database source of your model gene IDs for the UniProt mapping service, the
+            UniProt mapping is skipped if ``None``
+        custom_gene_mapping (dict): Mapping of model gene IDs to the IDs to map to KEGG and UniProt. Only the entry of
+            a gene is part of its inputs, so adding entries for new genes does not rerun the others.
+        outdir (str): Path to output directory of downloaded files, must be set if GEM-PRO directories were not
+            created initially
+        sequence_properties (bool): If sequence properties of representative sequences should be calculated
+        pdb_seq_ident_cutoff (float): Sequence identity cutoff of the UniProt to PDB mapping, in decimal form
+        representative_structure_params (dict): Keyword arguments of
+            :meth:`~ssbio.pipeline.gempro.GEMPRO.set_representative_structure`
+        annotate_params (dict): Keyword arguments of :meth:`~ssbio.pipeline.gempro.GEMPRO.annotate`, structure
+            annotations are skipped if ``None``
+
+    Returns:
+        list: Steps of the pipeline
+
+    """
+    def gene_mapping(gempro, gene):
+        if custom_gene_mapping:
+            return custom_gene_mapping.get(gene.id)
+        return None
+
+    def with_mapping(method_name):
+        def method(gempro, genes, **params):
+            return getattr(gempro, method_name)(custom_gene_mapping=custom_gene_mapping, genes=genes, **params)
+        return method
+
+    steps = []
+    mapping_steps = []
+    if kegg_organism_code:
+        steps.append(Step('kegg_mapping', with_mapping('kegg_mapping_and_metadata'),
+                          params={'kegg_organism_code': kegg_organism_code, 'outdir': outdir},
+                          inputs=gene_mapping, outputs=_sequences_of_type(KEGGProp)))
+        mapping_steps.append('kegg_mapping')
+    if model_gene_source:
+        # Both mappings load sequences into the same proteins, so they do not run at the same time
+        steps.append(Step('uniprot_mapping', with_mapping('uniprot_mapping_and_metadata'),
+                          params={'model_gene_source': model_gene_source, 'outdir': outdir},
+                          depends_on=list(mapping_steps), inputs=gene_mapping,
+                          outputs=_sequences_of_type(UniProtProp)))
+        mapping_steps.append('uniprot_mapping')
+
+    steps.append(Step('representative_sequence', 'set_representative_sequence', depends_on=mapping_steps,
+                      inputs=_all_sequences, outputs=_representative_sequence))
+    if sequence_properties:
+        steps.append(Step('sequence_properties', 'get_sequence_properties', depends_on='representative_sequence',
+                          outputs=_representative_sequence_annotations))
+    steps.append(Step('pdb_mapping', 'map_uniprot_to_pdb',
+                      params={'seq_ident_cutoff': pdb_seq_ident_cutoff, 'outdir': outdir},
+                      depends_on='representative_sequence', outputs=_structures(experimental=True)))
+    steps.append(Step('representative_structure', 'set_representative_structure',
+                      params=representative_structure_params or {},
+                      depends_on=['representative_sequence', 'pdb_mapping'], inputs=_structures(experimental=False),
+                      outputs=_representative_structure))
+    if annotate_params is not None:
+        steps.append(Step('annotate', 'annotate', params=annotate_params, depends_on='representative_structure',
+                          outputs=_structure_annotations))
+    return steps
+
+
+class PipelineRunner(object):
+
+    """Run the steps of a GEM-PRO pipeline only for the genes whose inputs changed since the last run.
+
+    Args:
+        gempro (GEMPRO): GEM-PRO project
+        steps (list): :class:`Step` objects of the pipeline, in any order
+        manifest_path (str): Path to the manifest, default is ``pipeline_manifest.json`` in the data directory of the
+            project
+        threads (int): Number of chunks of genes to run at the same time
+        chunk_size (int): Maximum number of genes a step method is called with at once
+        project_dir (str): Path to a project folder to save the project in with
+            :meth:`~ssbio.pipeline.gempro.GEMPRO.save_project` after each step, so it can be reopened after a crash
+        save_interval (float): Minimum number of seconds between saves of the manifest while steps are running
+
+    """
+
+    def __init__(self, gempro, steps, manifest_path=None, threads=1, chunk_size=100, project_dir=None,
+                 save_interval=10):
+        if not manifest_path:
+            if not gempro.data_dir:
+                raise ValueError('Manifest path must be specified')
+            manifest_path = op.join(gempro.data_dir, MANIFEST_FILE)
+        if chunk_size < 1:
+            raise ValueError('{}: chunk size must be at least 1'.format(chunk_size))
+
+        self.gempro = gempro
+        self.steps = OrderedDict((x.name, x) for x in self._sort_steps(steps))
+        self.manifest_path = manifest_path
+        self.threads = threads or 1
+        self.chunk_size = chunk_size
+        self.project_dir = project_dir
+        self.save_interval = save_interval
+        self.manifest = self._read_manifest()
+
+    @staticmethod
+    def _sort_steps(steps):
+        """Order steps so each one comes after the steps it depends on"""
+        by_name = OrderedDict()
+        for step in steps:
+            if step.name in by_name:
+                raise ValueError('{}: step name used more than once'.format(step.name))
+            by_name[step.name] = step
+        for step in steps:
+            for dependency in step.depends_on:
+                if dependency not in by_name:
+                    raise ValueError('{}: step depends on unknown step {}'.format(step.name, dependency))
+
+        ordered = []
+        placed = set()
+        while len(ordered) < len(by_name):
+            ready = [x for x in by_name.values() if x.name not in placed and all(d in placed for d in x.depends_on)]
+            if not ready:
+                raise ValueError('Steps {} depend on each other'.format(sorted(set(by_name) - placed)))
+            ordered.extend(ready)
+            placed.update(x.name for x in ready)
+        return ordered
+
+    def _read_manifest(self):
+        if not op.exists(self.manifest_path):
+            return {'format': _FORMAT, 'gempro': self.gempro.id, 'steps': {}, 'failures': {}}
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != _FORMAT:
+            raise ValueError('{}: unsupported manifest format {}'.format(self.manifest_path, manifest.get('format')))
+        return manifest
+
+    def save_manifest(self):
+        """Save the manifest, leaving out the genes which are not in the project anymore."""
+        gene_ids = set(x.id for x in self.gempro.genes)
+        for section in ['steps', 'failures']:
+            for name, entries in self.manifest[section].items():
+                self.manifest[section][name] = {k: v for k, v in entries.items() if k in gene_ids}
+
+        # Write through a temporary file so a crash while saving does not leave a truncated manifest
+        fd, tmp_path = tempfile.mkstemp(dir=op.dirname(op.abspath(self.manifest_path)), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.manifest, f, indent=1, sort_keys=True)
+            shutil.move(tmp_path, self.manifest_path)
+        except Exception:
+            if op.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def input_hash(self, step, gene):
+        """Get the hash of the inputs of a step for a gene, from its current data.
+
+        Args:
+            step (Step): Pipeline step
+            gene (GenePro): Gene
+
+        Returns:
+            str: SHA-256 of the step parameters, the gene data the step reads and the outputs of the steps it
+            depends on
+
+        """
+        dependency_outputs = [self.output_hash(self.steps[x], gene) for x in step.depends_on]
+        return _hash([step.name, step.version, step.params, gene.id, step.input_description(self.gempro, gene),
+                      dependency_outputs])
+
+    def output_hash(self, step, gene):
+        """Get the hash of the current outputs of a step for a gene."""
+        return _hash(step.output_description(self.gempro, gene))
+
+    def is_up_to_date(self, step, gene):
+        """Check if a step ran for a gene with its current inputs and produced its current outputs.
+
+        Args:
+            step (Step): Pipeline step
+            gene (GenePro): Gene
+
+        Returns:
+            bool: If the step does not need to run for the gene
+
+        """
+        entry = self.manifest['steps'].get(step.name, {}).get(gene.id)
+        if not entry or gene.id in self.manifest['failures'].get(step.name, {}):
+            return False
+        return entry['outputs'] == self.output_hash(step, gene) and entry['inputs'] == self.input_hash(step, gene)
+
+    def _select_genes(self, genes):
+        if genes is None:
+            return list(self.gempro.genes)
+        genes = set(ssbio.utils.force_list(genes))
+        return [x for x in self.gempro.genes if x.id in genes]
+
+    def plan(self, genes=None, force=False):
+        """Get the genes each step would run on, assuming steps run for a gene if a step they depend on does.
+
+        Args:
+            genes (str, list): ID or IDs of genes to consider, all genes by default
+            force (bool): If all steps should run for all genes
+
+        Returns:
+            OrderedDict: Gene IDs for each step name, in the order steps would run
+
+        """
+        genes = self._select_genes(genes)
+        planned = OrderedDict()
+        for step in self.steps.values():
+            upstream = set()
+            for dependency in step.depends_on:
+                upstream.update(planned[dependency])
+            planned[step.name] = [x.id for x in genes
+                                  if force or x.id in upstream or not self.is_up_to_date(step, x)]
+        return planned
+
+    def _record(self, step, genes, error=None):
+        """Record the inputs and outputs of a step for genes it ran on, or the error it failed with"""
+        entries = self.manifest['steps'].setdefault(step.name, {})
+        failures = self.manifest['failures'].setdefault(step.name, {})
+        for g in genes:
+            if error:
+                failures[g.id] = error
+                continue
+            failures.pop(g.id, None)
+            # Inputs are hashed after running, as a step may add to the data it reads
+            entries[g.id] = {'inputs': self.input_hash(step, g), 'outputs': self.output_hash(step, g)}
+
+    def run(self, genes=None, steps=None, force=False):
+        """Run the steps of the pipeline for the genes whose inputs changed.
+
+        Args:
+            genes (str, list): ID or IDs of genes to consider, all genes by default
+            steps (str, list): Names of the steps to run, all steps by default. The outputs of steps which are not run
+                are still part of the inputs of the steps which depend on them.
+            force (bool): If the steps should run for all genes considered, even if they are up to date
+
+        Returns:
+            OrderedDict: For each step name, a dictionary with the number of genes it ran on (``run``), which were up
+            to date (``skipped``), and which it failed on or did not run on because a step it depends on failed
+            (``failed``)
+
+        """
+        genes = self._select_genes(genes)
+        if steps is None:
+            selected = list(self.steps)
+        else:
+            selected = ssbio.utils.force_list(steps)
+            for name in selected:
+                if name not in self.steps:
+                    raise ValueError('{}: no step with this name'.format(name))
+        selected = [x for x in self.steps if x in selected]
+
+        summary = OrderedDict((x, {'run': 0, 'skipped': 0, 'failed': 0}) for x in selected)
+        blocked = dict((x, set()) for x in selected)
+        pending = list(selected)
+        finished = set()
+        remaining_chunks = {}
+        running = {}
+        checkpoint = False
+        last_save = time.time()
+
+        executor = ThreadPoolExecutor(max_workers=self.threads)
+        try:
+            while pending or running:
+                # Start the steps whose dependencies finished
+                started = True
+                while started:
+                    started = False
+                    for name in list(pending):
+                        step = self.steps[name]
+                        if any(d in pending or (d in remaining_chunks and d not in finished) for d in step.depends_on):
+                            continue
+                        pending.remove(name)
+                        started = True
+
+                        for dependency in step.depends_on:
+                            blocked[name].update(blocked.get(dependency, ()))
+                        to_run = [x for x in genes if x.id not in blocked[name] and
+                                  (force or not self.is_up_to_date(step, x))]
+                        summary[name]['skipped'] = len(genes) - len(to_run) - len(blocked[name])
+                        summary[name]['failed'] = len(blocked[name])
+                        if to_run:
+                            log.info('{}: running step for {} genes'.format(name, len(to_run)))
+                        chunks = [to_run[i:i + self.chunk_size] for i in range(0, len(to_run), self.chunk_size)]
+                        remaining_chunks[name] = len(chunks)
+                        for chunk in chunks:
+                            running[executor.submit(step, self.gempro, [x.id for x in chunk])] = (step, chunk)
+                        if not chunks:
+                            finished.add(name)
+
+                if not running:
+                    continue
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    step, chunk = running.pop(future)
+                    error = future.exception()
+                    if error:
+                        log.error('{}: step failed for {} genes: {}'.format(step.name, len(chunk), error))
+                        self._record(step, chunk, error='{}: {}'.format(type(error).__name__, error))
+                        blocked[step.name].update(x.id for x in chunk)
+                        summary[step.name]['failed'] += len(chunk)
+                    else:
+                        self._record(step, chunk)
+                        summary[step.name]['run'] += len(chunk)
+
+                    remaining_chunks[step.name] -= 1
+                    if not remaining_chunks[step.name]:
+                        finished.add(step.name)
+                        checkpoint = True
+                        log.info('{}: step finished'.format(step.name))
+
+                # Only save the project when no step is changing it
+                if checkpoint and self.project_dir and not running:
+                    self.gempro.save_project(self.project_dir)
+                    checkpoint = False
+                if time.time() - last_save >= self.save_interval:
+                    self.save_manifest()
+                    last_save = time.time()
+        finally:
+            executor.shutdown(wait=True)
+            self.save_manifest()
+
+        for name, counts in summary.items():
+            log.info('{}: ran for {} genes, {} up to date, {} failed'.format(name, counts['run'], counts['skipped'],
+                                                                             counts['failed']))
+        return summary
@@ -0,0 +1,255 @@
+"""
+Composition
+===========
+
+Batch calculation of global protein sequence properties using amino acid composition matrices.
+
+All sequences are encoded once into integer codes, from which a count matrix of the 20 standard amino acids
+(``ACDEFGHIKLMNPQRSTVWY``, one column each) is built. Properties that Biopython's ``ProteinAnalysis`` computes one
+sequence at a time are then calculated for all sequences at once with matrix operations. Results are returned with the
+same annotation keys as :func:`ssbio.protein.sequence.properties.residues.biopython_protein_analysis` and
+:func:`ssbio.protein.sequence.properties.residues.emboss_pepstats_parser`.
+
+"""
+
+import logging
+
+import numpy as np
+from Bio.Data import IUPACData
+from Bio.SeqUtils import IsoelectricPoint
+from Bio.SeqUtils import ProtParamData
+
+import ssbio.protein.sequence.utils
+
+log = logging.getLogger(__name__)
+
+
+AA_ORDER = 'ACDEFGHIKLMNPQRSTVWY'
+"""str: Order of amino acids in the columns of a composition matrix"""
+
+_aa_index = {aa: i for i, aa in enumerate(AA_ORDER)}
+_unknown_code = len(AA_ORDER)
+
+# Lookup table of ASCII byte --> amino acid column, anything else gets the unknown code
+_byte_to_code = np.full(256, _unknown_code, dtype=np.uint8)
+for _aa, _i in _aa_index.items():
+    _byte_to_code[ord(_aa)] = _i
+    _byte_to_code[ord(_aa.lower())] = _i
+
+_aa_weights = np.array([IUPACData.protein_weights[aa] for aa in AA_ORDER] + [np.nan])
+_water_weight = 18.0153
+
+# Dipeptide instability weights (Guruprasad et al. 1990), unknown residues have no weight
+_diwv_matrix = np.full((_unknown_code + 1, _unknown_code + 1), np.nan)
+for _this, _nexts in ProtParamData.DIWV.items():
+    for _next, _v in _nexts.items():
+        _diwv_matrix[_aa_index[_this], _aa_index[_next]] = _v
+
+# EMBOSS pepstats residue classes, only the 20 standard amino acids can be counted here
+_pepstats_classes = [('tiny', 'ACGST'),
+                     ('small', 'ACDGNPSTV'),
+                     ('aliphatic', 'AILV'),
+                     ('aromatic', 'FHWY'),
+                     ('non-polar', 'ACFGILMPVWY'),
+                     ('polar', 'DEHKNQRST'),
+                     ('charged', 'DEHKR'),
+                     ('basic', 'HKR'),
+                     ('acidic', 'DE')]
+_pepstats_class_matrix = np.array([[aa in members for aa in AA_ORDER] for _, members in _pepstats_classes],
+                                  dtype=float).T
+
+
+def encode_sequences(seqs):
+    """Encode a list of sequences into a single array of amino acid codes.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+
+    Returns:
+        tuple: (codes, lengths) - 1D uint8 array of all residues concatenated (indices into ``AA_ORDER``, 20 for
+        anything else) and a 1D array of the length of each sequence
+
+    """
+    seq_strs = [ssbio.protein.sequence.utils.cast_to_str(s) for s in seqs]
+    lengths = np.array([len(s) for s in seq_strs], dtype=np.int64)
+    raw = np.frombuffer(''.join(seq_strs).encode('ascii', 'replace'), dtype=np.uint8)
+    return _byte_to_code[raw], lengths
+
+
+def composition_matrix(seqs):
+    """Count the 20 standard amino acids in a list of sequences.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+
+    Returns:
+        tuple: (counts, lengths, num_unknown) - ``(n, 20)`` integer matrix of amino acid counts with columns ordered
+        as ``AA_ORDER``, array of sequence lengths, and array of the number of non-standard residues in each sequence
+
+    """
+    codes, lengths = encode_sequences(seqs)
+    return _composition_from_codes(codes, lengths)
+
+
+def _composition_from_codes(codes, lengths):
+    n = len(lengths)
+    rows = np.repeat(np.arange(n), lengths)
+    counts = np.bincount(rows * (_unknown_code + 1) + codes, minlength=n * (_unknown_code + 1))
+    counts = counts.reshape(n, _unknown_code + 1)
+    return counts[:, :_unknown_code], lengths, counts[:, _unknown_code]
+
+
+def isoelectric_point(counts, nterm_codes, cterm_codes, pH=7.775, min_=4.05, max_=12.):
+    """Calculate the isoelectric point of many sequences at once, with the same bisection as Biopython's
+    ``IsoelectricPoint.pi()`` carried out for all sequences in parallel.
+
+    Args:
+        counts (ndarray): ``(n, 20)`` matrix of amino acid counts, see :func:`composition_matrix`
+        nterm_codes (ndarray): Code of the first residue of each sequence
+        cterm_codes (ndarray): Code of the last residue of each sequence
+        pH (float): Starting pH
+        min_ (float): Lower bound of the pH interval
+        max_ (float): Upper bound of the pH interval
+
+    Returns:
+        ndarray: Isoelectric point of each sequence
+
+    """
+    n = len(counts)
+    content = {aa: counts[:, _aa_index[aa]].astype(float) for aa in IsoelectricPoint.charged_aas}
+    content['Nterm'] = np.ones(n)
+    content['Cterm'] = np.ones(n)
+
+    # Sequence specific pKs of the termini
+    pos_pKs = {k: np.full(n, v) for k, v in IsoelectricPoint.positive_pKs.items()}
+    neg_pKs = {k: np.full(n, v) for k, v in IsoelectricPoint.negative_pKs.items()}
+    for aa, pK in IsoelectricPoint.pKnterminal.items():
+        pos_pKs['Nterm'][nterm_codes == _aa_index[aa]] = pK
+    for aa, pK in IsoelectricPoint.pKcterminal.items():
+        neg_pKs['Cterm'][cterm_codes == _aa_index[aa]] = pK
+
+    pH = np.full(n, pH)
+    min_ = np.full(n, min_)
+    max_ = np.full(n, max_)
+
+    # Interval widths are the same for every sequence, so they all need the same number of iterations
+    while max_[0] - min_[0] > 0.0001 if n else False:
+        positive_charge = np.zeros(n)
+        for aa, pK in pos_pKs.items():
+            positive_charge += content[aa] * (1.0 / (10 ** (pH - pK) + 1.0))
+        negative_charge = np.zeros(n)
+        for aa, pK in neg_pKs.items():
+            negative_charge += content[aa] * (1.0 / (10 ** (pK - pH) + 1.0))
+        positive = (positive_charge - negative_charge) > 0.0
+
+        min_ = np.where(positive, pH, min_)
+        max_ = np.where(positive, max_, pH)
+        pH = (min_ + max_) / 2
+
+    return pH
+
+
+def protein_analysis_arrays(seqs):
+    """Calculate Biopython ``ProteinAnalysis`` and EMBOSS pepstats style properties for many sequences at once.
+
+    Sequences which Biopython would not be able to analyse (empty, or containing residues other than the 20 standard
+    amino acids) are flagged in the ``valid`` array and their values should not be used.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+
+    Returns:
+        dict: Dictionary of property name to array, with one entry per sequence. ``amino_acids_percent`` and
+        ``pepstats_percents`` are matrices with columns ordered as ``AA_ORDER`` and the pepstats residue classes.
+
+    """
+    codes, lengths = encode_sequences(seqs)
+    counts, lengths, num_unknown = _composition_from_codes(codes, lengths)
+    n = len(lengths)
+    valid = (lengths > 0) & (num_unknown == 0)
+    safe_lengths = np.where(lengths > 0, lengths, 1).astype(float)
+    rows = np.repeat(np.arange(n), lengths)
+
+    percent = counts / safe_lengths[:, None]
+    results = {'valid': valid, 'length': lengths, 'amino_acids_percent': percent}
+
+    # Sum residue weights in sequence order so values match Biopython exactly
+    residue_weights = np.bincount(rows, weights=_aa_weights[codes], minlength=n)
+    results['molecular_weight'] = residue_weights - (lengths - 1) * _water_weight
+
+    def _sum_percents(aas):
+        total = np.zeros(n)
+        for aa in aas:
+            total = total + percent[:, _aa_index[aa]]
+        return total
+
+    results['aromaticity'] = _sum_percents('YWF')
+    results['percent_helix_naive'] = _sum_percents('VIYFWL')
+    results['percent_turn_naive'] = _sum_percents('NPGS')
+    results['percent_strand_naive'] = _sum_percents('EMAL')
+
+    # Instability index from dipeptides within each sequence
+    same_seq = rows[:-1] == rows[1:]
+    dipeptide_weights = _diwv_matrix[codes[:-1][same_seq], codes[1:][same_seq]]
+    score = np.bincount(rows[:-1][same_seq], weights=dipeptide_weights, minlength=n)
+    results['instability_index'] = (10.0 / safe_lengths) * score
+
+    # Termini for the isoelectric point
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    nterm = np.full(n, _unknown_code, dtype=np.uint8)
+    cterm = np.full(n, _unknown_code, dtype=np.uint8)
+    has_res = lengths > 0
+    nterm[has_res] = codes[starts[has_res]]
+    cterm[has_res] = codes[ends[has_res] - 1]
+    results['isoelectric_point'] = isoelectric_point(counts, nterm, cterm)
+
+    results['pepstats_percents'] = percent.dot(_pepstats_class_matrix)
+
+    return results
+
+
+def batch_protein_analysis(seqs, pepstats=True):
+    """Get global sequence properties of many sequences at once, as annotation dictionaries.
+
+    Returns the same keys as :func:`ssbio.protein.sequence.properties.residues.biopython_protein_analysis`, and
+    if ``pepstats`` is True the residue class percentages of
+    :func:`ssbio.protein.sequence.properties.residues.emboss_pepstats_parser` as well.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+        pepstats (bool): If EMBOSS pepstats residue class percentages should be included
+
+    Returns:
+        list: Dictionary of sequence properties for each sequence, or None if the sequence could not be analysed
+
+    """
+    if not len(seqs):
+        return []
+
+    arrays = protein_analysis_arrays(seqs)
+
+    all_info = []
+    for i in range(len(arrays['valid'])):
+        if not arrays['valid'][i]:
+            all_info.append(None)
+            continue
+
+        info_dict = {}
+        info_dict['amino_acids_percent-biop'] = dict(zip(AA_ORDER, arrays['amino_acids_percent'][i].tolist()))
+        info_dict['monoisotopic-biop'] = False
+        info_dict['molecular_weight-biop'] = float(arrays['molecular_weight'][i])
+        info_dict['aromaticity-biop'] = float(arrays['aromaticity'][i])
+        info_dict['instability_index-biop'] = float(arrays['instability_index'][i])
+        info_dict['isoelectric_point-biop'] = float(arrays['isoelectric_point'][i])
+        info_dict['percent_helix_naive-biop'] = float(arrays['percent_helix_naive'][i])
+        info_dict['percent_turn_naive-biop'] = float(arrays['percent_turn_naive'][i])
+        info_dict['percent_strand_naive-biop'] = float(arrays['percent_strand_naive'][i])
+
+        if pepstats:
+            for (prop, _), v in zip(_pepstats_classes, arrays['pepstats_percents'][i].tolist()):
+                info_dict['percent_{}-pepstats'.format(prop)] = v
+
+        all_info.append(info_dict)
+
+    return all_info
@@ -16,6 +16,7 @@ except ImportError:
     from urllib2 import HTTPCookieProcessor
 
 import math
+import numpy as np
 import scipy.constants
 import ssbio.protein.sequence.utils
 
@@ -74,4 +75,26 @@ def get_foldrate_at_temp(ref_rate, new_temp, ref_temp=37.0):
     # Calculate folding rate at desired temperature
     rate = math.exp(preFactor - slope / (float(new_temp) + 273.15))
 
-    return rate
\ No newline at end of file
+    return rate
+
+
+def get_foldrate_at_temps(ref_rates, new_temps, ref_temp=37.0):
+    """Scale the predicted kinetic folding rates of many proteins to many temperatures at once, based on the
+    relationship ln(k_f)∝1/T. See :func:`~ssbio.protein.sequence.properties.kinetic_folding_rate.get_foldrate_at_temp`.
+
+    Args:
+        ref_rates (list, ndarray): Kinetic folding rates calculated at the reference temperature
+        new_temps (float, list, ndarray): Temperatures in degrees C
+        ref_temp (float): Reference temperature, default to 37 C
+
+    Returns:
+        ndarray: ``(len(ref_rates), len(new_temps))`` matrix of kinetic folding rates k_f
+
+    """
+    slope = 22000
+
+    ref_rates = np.atleast_1d(np.asarray(ref_rates, dtype=float))[:, None]
+    new_temps = np.atleast_1d(np.asarray(new_temps, dtype=float))
+
+    pre_factors = ref_rates + slope / (float(ref_temp) + 273.15)
+    return np.exp(pre_factors - slope / (new_temps + 273.15))
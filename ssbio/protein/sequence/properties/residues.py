@@ -1,7 +1,11 @@
 import logging
 
+import numpy as np
+import pandas as pd
 from Bio.PDB.Polypeptide import one_to_three
+from Bio.SeqUtils import ProtParamData
 from Bio.SeqUtils.ProtParam import ProteinAnalysis
+from Bio.SubsMat import MatrixInfo
 
 import ssbio.protein.sequence.utils
 import ssbio.utils
@@ -83,6 +87,116 @@ _human_readable_pepstats = {'A_percent-biop': '% Ala',
 'mol_percent_acidic-pepstats': 'Molar % of acidic residues (B, D, E, Z)'}
 
 
+_aa_property_classes_one = {aa: [k for k, v in _aa_property_dict_one.items() if aa in v]
+                            for aa in set(x for v in _aa_property_dict_one.values() for x in v)}
+
+_grantham_dict = {
+    'S': {'R': 110, 'L': 145, 'P': 74, 'T': 58, 'A': 99, 'V': 124, 'G': 56, 'I': 142, 'F': 155, 'Y': 144, 'C': 112,
+          'H': 89, 'Q': 68, 'N': 46, 'K': 121, 'D': 65, 'E': 80, 'M': 135, 'W': 177},
+    'R': {'R': 0, 'L': 102, 'P': 103, 'T': 71, 'A': 112, 'V': 96, 'G': 125, 'I': 97, 'F': 97, 'Y': 77, 'C': 180,
+          'H': 29, 'Q': 43, 'N': 86, 'K': 26, 'D': 96, 'E': 54, 'M': 91, 'W': 101, 'S': 0},
+    'L': {'R': 0, 'L': 0, 'P': 98, 'T': 92, 'A': 96, 'V': 32, 'G': 138, 'I': 5, 'F': 22, 'Y': 36, 'C': 198, 'H': 99,
+          'Q': 113, 'N': 153, 'K': 107, 'D': 172, 'E': 138, 'M': 15, 'W': 61, 'S': 0},
+    'P': {'R': 0, 'L': 0, 'P': 0, 'T': 38, 'A': 27, 'V': 68, 'G': 42, 'I': 95, 'F': 114, 'Y': 110, 'C': 169,
+          'H': 77, 'Q': 76, 'N': 91, 'K': 103, 'D': 108, 'E': 93, 'M': 87, 'W': 147, 'S': 0},
+    'T': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 58, 'V': 69, 'G': 59, 'I': 89, 'F': 103, 'Y': 92, 'C': 149, 'H': 47,
+          'Q': 42, 'N': 65, 'K': 78, 'D': 85, 'E': 65, 'M': 81, 'W': 128, 'S': 0},
+    'A': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 64, 'G': 60, 'I': 94, 'F': 113, 'Y': 112, 'C': 195, 'H': 86,
+          'Q': 91, 'N': 111, 'K': 106, 'D': 126, 'E': 107, 'M': 84, 'W': 148, 'S': 0},
+    'V': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 109, 'I': 29, 'F': 50, 'Y': 55, 'C': 192, 'H': 84,
+          'Q': 96, 'N': 133, 'K': 97, 'D': 152, 'E': 121, 'M': 21, 'W': 88, 'S': 0},
+    'G': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 135, 'F': 153, 'Y': 147, 'C': 159, 'H': 98,
+          'Q': 87, 'N': 80, 'K': 127, 'D': 94, 'E': 98, 'M': 127, 'W': 184, 'S': 0},
+    'I': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 21, 'Y': 33, 'C': 198, 'H': 94,
+          'Q': 109, 'N': 149, 'K': 102, 'D': 168, 'E': 134, 'M': 10, 'W': 61, 'S': 0},
+    'F': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 22, 'C': 205, 'H': 100,
+          'Q': 116, 'N': 158, 'K': 102, 'D': 177, 'E': 140, 'M': 28, 'W': 40, 'S': 0},
+    'Y': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 194, 'H': 83,
+          'Q': 99, 'N': 143, 'K': 85, 'D': 160, 'E': 122, 'M': 36, 'W': 37, 'S': 0},
+    'C': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 174,
+          'Q': 154, 'N': 139, 'K': 202, 'D': 154, 'E': 170, 'M': 196, 'W': 215, 'S': 0},
+    'H': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 24,
+          'N': 68, 'K': 32, 'D': 81, 'E': 40, 'M': 87, 'W': 115, 'S': 0},
+    'Q': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 46, 'K': 53, 'D': 61, 'E': 29, 'M': 101, 'W': 130, 'S': 0},
+    'N': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 94, 'D': 23, 'E': 42, 'M': 142, 'W': 174, 'S': 0},
+    'K': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 0, 'D': 101, 'E': 56, 'M': 95, 'W': 110, 'S': 0},
+    'D': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 0, 'D': 0, 'E': 45, 'M': 160, 'W': 181, 'S': 0},
+    'E': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 126, 'W': 152, 'S': 0},
+    'M': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 0, 'W': 67, 'S': 0},
+    'W': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
+          'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 0, 'W': 0, 'S': 0}}
+
+# Precomputed substitution tables, indexed by residue code (see _aa_codes). The last code is X, for any unknown residue
+_aa_codes = 'ACDEFGHIKLMNPQRSTVWYX'
+_aa_code_index = {aa: i for i, aa in enumerate(_aa_codes)}
+_unknown_aa_code = _aa_code_index['X']
+
+_byte_to_aa_code = np.full(256, _unknown_aa_code, dtype=np.uint8)
+for _aa, _i in _aa_code_index.items():
+    _byte_to_aa_code[ord(_aa)] = _i
+
+
+def _substitution_table(score_function):
+    table = np.full((len(_aa_codes), len(_aa_codes)), np.nan)
+    for i, ref_aa in enumerate(_aa_codes):
+        for j, mut_aa in enumerate(_aa_codes):
+            score = score_function(ref_aa, mut_aa)
+            if score is not None:
+                table[i, j] = score
+    return table
+
+
+def _grantham_table_score(ref_aa, mut_aa):
+    if ref_aa not in _grantham_dict or mut_aa not in _grantham_dict:
+        return None
+    if ref_aa == mut_aa:
+        return 0
+    if _grantham_dict[ref_aa].get(mut_aa, 0) != 0:
+        return _grantham_dict[ref_aa][mut_aa]
+    return _grantham_dict[mut_aa].get(ref_aa, 0)
+
+
+def _blosum62_table_score(ref_aa, mut_aa):
+    if (ref_aa, mut_aa) in MatrixInfo.blosum62:
+        return MatrixInfo.blosum62[(ref_aa, mut_aa)]
+    return MatrixInfo.blosum62.get((mut_aa, ref_aa))
+
+
+def _hydrophobicity_table_score(ref_aa, mut_aa):
+    if ref_aa not in ProtParamData.kd or mut_aa not in ProtParamData.kd:
+        return None
+    return ProtParamData.kd[mut_aa] - ProtParamData.kd[ref_aa]
+
+
+_aa_property_class_names = list(_aa_property_dict_one.keys())
+_aa_property_class_matrix = np.array([[aa in _aa_property_dict_one[k] for k in _aa_property_class_names]
+                                      for aa in _aa_codes])
+"""ndarray: (21, 7) boolean membership of each residue code in each class of ``_aa_property_dict_one``"""
+
+grantham_table = _substitution_table(_grantham_table_score)
+"""ndarray: (21, 21) Grantham distance between residue codes, NaN if a residue is unknown"""
+
+blosum62_table = _substitution_table(_blosum62_table_score)
+"""ndarray: (21, 21) BLOSUM62 substitution score between residue codes"""
+
+hydrophobicity_delta_table = _substitution_table(_hydrophobicity_table_score)
+"""ndarray: (21, 21) Change in Kyte-Doolittle hydrophobicity when mutating from one residue code to another"""
+
+_grantham_annotations = ['Unknown', 'Radical', 'Moderately Radical', 'Moderately Conservative', 'Conservative']
+
+_aa_property_class_lists = np.empty(len(_aa_codes), dtype=object)
+_aa_property_class_lists[:] = [_aa_property_classes_one.get(aa, []) for aa in _aa_codes]
+
+property_class_change_table = (_aa_property_class_matrix[:, None, :] != _aa_property_class_matrix[None, :, :]).any(axis=2)
+"""ndarray: (21, 21) If mutating from one residue code to another changes any biochemical property class"""
+
+
 def biopython_protein_analysis(inseq):
     """Utiize Biopython's ProteinAnalysis module to return general sequence properties of an amino acid string.
 
@@ -185,58 +299,12 @@ def emboss_pepstats_parser(infile):
 
 def residue_biochemical_definition(res):
     # TODO: docstring
-    resprop = []
-    for k, v in _aa_property_dict_one.items():
-        if res in v:
-            resprop.append(k)
-
-    return resprop
+    return list(_aa_property_classes_one.get(res, []))
 
 
 def grantham_score(ref_aa, mut_aa):
     """https://github.com/ashutoshkpandey/Annotation/blob/master/Grantham_score_calculator.py"""
-    grantham = {
-        'S': {'R': 110, 'L': 145, 'P': 74, 'T': 58, 'A': 99, 'V': 124, 'G': 56, 'I': 142, 'F': 155, 'Y': 144, 'C': 112,
-              'H': 89, 'Q': 68, 'N': 46, 'K': 121, 'D': 65, 'E': 80, 'M': 135, 'W': 177},
-        'R': {'R': 0, 'L': 102, 'P': 103, 'T': 71, 'A': 112, 'V': 96, 'G': 125, 'I': 97, 'F': 97, 'Y': 77, 'C': 180,
-              'H': 29, 'Q': 43, 'N': 86, 'K': 26, 'D': 96, 'E': 54, 'M': 91, 'W': 101, 'S': 0},
-        'L': {'R': 0, 'L': 0, 'P': 98, 'T': 92, 'A': 96, 'V': 32, 'G': 138, 'I': 5, 'F': 22, 'Y': 36, 'C': 198, 'H': 99,
-              'Q': 113, 'N': 153, 'K': 107, 'D': 172, 'E': 138, 'M': 15, 'W': 61, 'S': 0},
-        'P': {'R': 0, 'L': 0, 'P': 0, 'T': 38, 'A': 27, 'V': 68, 'G': 42, 'I': 95, 'F': 114, 'Y': 110, 'C': 169,
-              'H': 77, 'Q': 76, 'N': 91, 'K': 103, 'D': 108, 'E': 93, 'M': 87, 'W': 147, 'S': 0},
-        'T': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 58, 'V': 69, 'G': 59, 'I': 89, 'F': 103, 'Y': 92, 'C': 149, 'H': 47,
-              'Q': 42, 'N': 65, 'K': 78, 'D': 85, 'E': 65, 'M': 81, 'W': 128, 'S': 0},
-        'A': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 64, 'G': 60, 'I': 94, 'F': 113, 'Y': 112, 'C': 195, 'H': 86,
-              'Q': 91, 'N': 111, 'K': 106, 'D': 126, 'E': 107, 'M': 84, 'W': 148, 'S': 0},
-        'V': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 109, 'I': 29, 'F': 50, 'Y': 55, 'C': 192, 'H': 84,
-              'Q': 96, 'N': 133, 'K': 97, 'D': 152, 'E': 121, 'M': 21, 'W': 88, 'S': 0},
-        'G': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 135, 'F': 153, 'Y': 147, 'C': 159, 'H': 98,
-              'Q': 87, 'N': 80, 'K': 127, 'D': 94, 'E': 98, 'M': 127, 'W': 184, 'S': 0},
-        'I': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 21, 'Y': 33, 'C': 198, 'H': 94,
-              'Q': 109, 'N': 149, 'K': 102, 'D': 168, 'E': 134, 'M': 10, 'W': 61, 'S': 0},
-        'F': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 22, 'C': 205, 'H': 100,
-              'Q': 116, 'N': 158, 'K': 102, 'D': 177, 'E': 140, 'M': 28, 'W': 40, 'S': 0},
-        'Y': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 194, 'H': 83,
-              'Q': 99, 'N': 143, 'K': 85, 'D': 160, 'E': 122, 'M': 36, 'W': 37, 'S': 0},
-        'C': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 174,
-              'Q': 154, 'N': 139, 'K': 202, 'D': 154, 'E': 170, 'M': 196, 'W': 215, 'S': 0},
-        'H': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 24,
-              'N': 68, 'K': 32, 'D': 81, 'E': 40, 'M': 87, 'W': 115, 'S': 0},
-        'Q': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 46, 'K': 53, 'D': 61, 'E': 29, 'M': 101, 'W': 130, 'S': 0},
-        'N': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 94, 'D': 23, 'E': 42, 'M': 142, 'W': 174, 'S': 0},
-        'K': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 0, 'D': 101, 'E': 56, 'M': 95, 'W': 110, 'S': 0},
-        'D': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 0, 'D': 0, 'E': 45, 'M': 160, 'W': 181, 'S': 0},
-        'E': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 126, 'W': 152, 'S': 0},
-        'M': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 0, 'W': 67, 'S': 0},
-        'W': {'R': 0, 'L': 0, 'P': 0, 'T': 0, 'A': 0, 'V': 0, 'G': 0, 'I': 0, 'F': 0, 'Y': 0, 'C': 0, 'H': 0, 'Q': 0,
-              'N': 0, 'K': 0, 'D': 0, 'E': 0, 'M': 0, 'W': 0, 'S': 0}}
-
+    grantham = _grantham_dict
     score = 0
 
     if ref_aa not in grantham or mut_aa not in grantham:
@@ -261,6 +329,67 @@ def grantham_score(ref_aa, mut_aa):
         return score, "Conservative"
 
 
+def encode_residues(aas):
+    """Encode single letter amino acids as residue codes indexing the precomputed substitution tables.
+
+    Args:
+        aas (str, list, ndarray): String of amino acids, or list/array of single letter amino acids
+
+    Returns:
+        ndarray: Residue codes, anything which is not one of the 20 standard amino acids is coded as X
+
+    """
+    if isinstance(aas, str):
+        return _byte_to_aa_code[np.frombuffer(aas.encode('ascii', 'replace'), dtype=np.uint8)]
+
+    aas = np.asarray(aas, dtype=str)
+    if aas.size and aas.dtype.itemsize > 4 and np.char.str_len(aas).max() > 1:
+        raise ValueError('Amino acids must be given as single letters')
+    # Each single letter is one UCS4 code point, anything outside of ASCII is unknown
+    code_points = np.ascontiguousarray(aas.astype('U1')).view(np.uint32)
+    return _byte_to_aa_code[np.minimum(code_points, 255)]
+
+
+def annotate_mutations(ref_aas, mut_aas):
+    """Annotate many amino acid substitutions at once using the precomputed substitution tables.
+
+    Grantham scores and annotations are the same as returned by :func:`grantham_score`.
+
+    Args:
+        ref_aas (str, list, ndarray): Reference amino acids
+        mut_aas (str, list, ndarray): Mutated amino acids, in the same order
+
+    Returns:
+        DataFrame: One row per mutation with the columns ``ref_residue``, ``mut_residue``, ``ref_residue_prop``,
+        ``mut_residue_prop``, ``grantham_score``, ``grantham_annotation``, ``property_class_change``, ``blosum62``
+        and ``hydrophobicity_delta``. The residue property lists are shared between rows and should not be modified.
+
+    """
+    ref_codes = encode_residues(ref_aas)
+    mut_codes = encode_residues(mut_aas)
+    if len(ref_codes) != len(mut_codes):
+        raise ValueError('Number of reference and mutated amino acids must be the same')
+
+    grantham = grantham_table[ref_codes, mut_codes]
+    unknown = np.isnan(grantham)
+    scores = np.where(unknown, 0, grantham).astype(int)
+    annotation_codes = np.select([unknown, scores > 150, scores > 100, scores > 50], [0, 1, 2, 3], default=4)
+
+    return pd.DataFrame({'ref_residue': pd.Categorical.from_codes(ref_codes, categories=list(_aa_codes)),
+                         'mut_residue': pd.Categorical.from_codes(mut_codes, categories=list(_aa_codes)),
+                         'ref_residue_prop': _aa_property_class_lists[ref_codes],
+                         'mut_residue_prop': _aa_property_class_lists[mut_codes],
+                         'grantham_score': scores,
+                         'grantham_annotation': pd.Categorical.from_codes(annotation_codes,
+                                                                          categories=_grantham_annotations),
+                         'property_class_change': property_class_change_table[ref_codes, mut_codes],
+                         'blosum62': blosum62_table[ref_codes, mut_codes],
+                         'hydrophobicity_delta': hydrophobicity_delta_table[ref_codes, mut_codes]},
+                        columns=['ref_residue', 'mut_residue', 'ref_residue_prop', 'mut_residue_prop',
+                                 'grantham_score', 'grantham_annotation', 'property_class_change', 'blosum62',
+                                 'hydrophobicity_delta'])
+
+
 def flexibility_index(aa_one):
     """From Smith DK, Radivoja P, ObradovicZ, et al. Improved amino acid flexibility parameters, Protein Sci.2003, 12:1060
 
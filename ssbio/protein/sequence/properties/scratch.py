@@ -3,6 +3,7 @@ import os.path as op
 
 import ssbio.protein.sequence.utils.fasta
 import ssbio.utils
+from ssbio.io.resultcache import CachedRun
 
 log = logging.getLogger(__name__)
 
@@ -60,10 +61,15 @@ class SCRATCH():
         self.out_accpro = '{}.acc'.format(outname)
         self.out_accpro20 = '{}.acc20'.format(outname)
 
-        # TODO: check for multiple output files in command_runner
-        ssbio.utils.command_runner(
-            shell_command='{} {} {} {}'.format(path_to_scratch, self.seq_file, outname, num_cores),
-            force_rerun_flag=force_rerun, outfile_checker='{}.ss'.format(outname))
+        # All four predictions are looked up in the result cache, the number of cores doesn't change them
+        cached_run = CachedRun(path_to_scratch,
+                               outfiles=[self.out_sspro, self.out_sspro8, self.out_accpro, self.out_accpro20],
+                               input_files=self.seq_file, version_flag=None)
+        if cached_run.needs_run(force_rerun):
+            ssbio.utils.command_runner(
+                shell_command='{} {} {} {}'.format(path_to_scratch, self.seq_file, outname, num_cores),
+                force_rerun_flag=True, outfile_checker='{}.ss'.format(outname))
+            cached_run.finish()
 
     def sspro_results(self):
         """Parse the SSpro output file and return a dict of secondary structure compositions.
@@ -26,8 +26,10 @@ __author__ = 'Ke Chen'
 __email__ = "kec003@ucsd.edu"
 
 import math
+import numpy as np
 import scipy.constants
 import ssbio.protein.sequence.utils
+import ssbio.protein.sequence.properties.composition as composition
 
 # Oobatake dG constants
 ## dG and dCp from Table 8 in Oobatake paper.
@@ -193,6 +195,154 @@ def get_dG_at_T(seq, temp):
     return dG, keq, method
 
 
+# Oobatake parameters as vectors ordered like the columns of a composition matrix
+_oobatake_dH_vector = np.array([oobatake_dictionary[aa]['dH'] * 1000 for aa in composition.AA_ORDER])
+_oobatake_dS_vector = np.array([oobatake_dictionary[aa]['dS'] for aa in composition.AA_ORDER])
+_oobatake_dCp_vector = np.array([oobatake_dictionary[aa]['dCp'] for aa in composition.AA_ORDER])
+
+
+def oobatake_composition_matrix(seqs):
+    """Get the amino acid count matrix of many sequences for the Oobatake method.
+
+    Selenocysteine (U) is counted as cysteine, as in ``oobatake_dictionary``. Sequences containing other residues
+    which have no Oobatake parameters are marked as invalid.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+
+    Returns:
+        tuple: (counts, lengths, valid) - ``(n, 20)`` count matrix, array of sequence lengths, boolean array of valid
+        sequences
+
+    """
+    seq_strs = [ssbio.protein.sequence.utils.cast_to_str(s).replace('U', 'C') for s in seqs]
+    counts, lengths, num_unknown = composition.composition_matrix(seq_strs)
+    return counts, lengths, num_unknown == 0
+
+
+def calculate_oobatake_dG_matrix(counts, temps):
+    """Get free energy of unfolding (dG) using the Oobatake method for many sequences and temperatures at once.
+
+    Args:
+        counts (ndarray): ``(n, 20)`` matrix of amino acid counts, see :func:`oobatake_composition_matrix`
+        temps (float, list, ndarray): Temperatures in degrees C
+
+    Returns:
+        ndarray: ``(n, len(temps))`` matrix of dG (cal/mol)
+
+    """
+    counts = np.atleast_2d(counts)
+    temps_k = np.atleast_1d(np.asarray(temps, dtype=float)) + 273.15
+    T0 = 298.15
+
+    H0 = counts.dot(_oobatake_dH_vector)[:, None]
+    S0 = counts.dot(_oobatake_dS_vector)[:, None]
+    dCp = counts.dot(_oobatake_dCp_vector)[:, None]
+
+    dH = H0 + dCp * (temps_k - T0)
+    dS = S0 + dCp * np.log(temps_k / T0)
+    return dH - temps_k * dS - 563.552
+
+
+def calculate_dill_dG_matrix(seq_lens, temps):
+    """Get free energy of unfolding (dG) using the Dill method for many sequence lengths and temperatures at once.
+
+    Args:
+        seq_lens (list, ndarray): Lengths of amino acid sequences
+        temps (float, list, ndarray): Temperatures in degrees C
+
+    Returns:
+        ndarray: ``(n, len(temps))`` matrix of dG (J/mol)
+
+    """
+    seq_lens = np.atleast_1d(np.asarray(seq_lens, dtype=float))[:, None]
+    temps_k = np.atleast_1d(np.asarray(temps, dtype=float)) + 273.15
+    Th = 373.5
+    Ts = 385
+
+    dH = (4.0 * seq_lens + 143) * 1000
+    dS = 13.27 * seq_lens + 448
+    dCp = (0.049 * seq_lens + 0.85) * 1000
+    return dH + dCp * (temps_k - Th) - temps_k * dS - temps_k * dCp * np.log(temps_k / Ts)
+
+
+def get_dG_at_temps(seqs, temps):
+    """Predict dG for many sequences over a range of temperatures, using the same choice of the Dill or Oobatake
+    methods as :func:`get_dG_at_T`.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+        temps (float, list, ndarray): Temperatures in degrees C
+
+    Returns:
+        (tuple): tuple containing:
+
+            dG (ndarray): ``(n, len(temps))`` matrix of free energy of unfolding dG (cal/mol), NaN for sequences with
+                unknown residues
+            keq (ndarray): ``(n, len(temps))`` matrix of equilibrium constants Keq
+            methods (list): Method used for each sequence
+
+    """
+    r_cal = scipy.constants.R / scipy.constants.calorie
+    temps = np.atleast_1d(np.asarray(temps, dtype=float))
+
+    counts, lengths, valid = oobatake_composition_matrix(seqs)
+
+    # Oobatake is used if dG > 0 anywhere in the range 20-50 C, otherwise Dill
+    use_oobatake = (calculate_oobatake_dG_matrix(counts, np.arange(20, 51)) > 0).any(axis=1)
+
+    dG = np.where(use_oobatake[:, None],
+                  calculate_oobatake_dG_matrix(counts, temps),
+                  0.238846 * calculate_dill_dG_matrix(lengths, temps))
+    dG[~valid] = np.nan
+    keq = np.exp(-1 * dG / (r_cal * (temps + 273.15)))
+
+    methods = ['Oobatake' if o else 'Dill' for o in use_oobatake]
+    return dG, keq, methods
+
+
+def get_oobatake_Tm(seqs, max_temp=200.):
+    """Get the melting temperature (Tm), where the Oobatake dG of unfolding is zero, for many sequences at once.
+
+    The Oobatake dG is largest at the temperature where dS is zero, and Tm is the root of dG above that temperature,
+    found by bisection for all sequences together.
+
+    Args:
+        seqs (list): List of sequence strings, Biopython Seq or SeqRecord objects
+        max_temp (float): Highest temperature (degrees C) to search for Tm
+
+    Returns:
+        ndarray: Tm in degrees C, NaN for sequences which are not stable at any temperature or have unknown residues
+
+    """
+    counts, lengths, valid = oobatake_composition_matrix(seqs)
+    T0 = 298.15
+    S0 = counts.dot(_oobatake_dS_vector)
+    dCp = counts.dot(_oobatake_dCp_vector)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        low = np.where(dCp > 0, T0 * np.exp(-S0 / dCp), np.nan) - 273.15
+    high = np.full(len(counts), float(max_temp))
+    low = np.clip(low, -273.15 + 1e-6, max_temp)
+
+    H0 = counts.dot(_oobatake_dH_vector)
+
+    def _dG(t):
+        temp_k = t + 273.15
+        return H0 + dCp * (temp_k - T0) - temp_k * (S0 + dCp * np.log(temp_k / T0)) - 563.552
+
+    with np.errstate(invalid='ignore'):
+        has_root = valid & (dCp > 0) & (_dG(low) > 0) & (_dG(high) < 0)
+
+        for _ in range(60):
+            mid = (low + high) / 2
+            positive = _dG(mid) > 0
+            low = np.where(positive, mid, low)
+            high = np.where(positive, high, mid)
+
+    return np.where(has_root, (low + high) / 2, np.nan)
+
+
 # TODO: clean up execution script to run on FASTA file(s)
 # if __name__ == '__main__':
 #     from ssbio import utils
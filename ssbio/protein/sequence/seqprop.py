@@ -7,7 +7,7 @@ import os.path as op
 import pandas as pd
 import requests
 import logging
-from copy import copy, deepcopy
+from copy import copy
 from slugify import Slugify
 
 from Bio import SeqIO
@@ -16,11 +16,13 @@ from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 from Bio.SeqFeature import SeqFeature, FeatureLocation, ExactPosition
 
-from ssbio.core.object import Object
+from ssbio.core.object import Object, attribute_dict, json_schema
 import ssbio.utils
 import ssbio.databases.pdb
 import ssbio.protein.sequence.utils
 import ssbio.protein.sequence.utils.fasta
+import ssbio.protein.sequence.utils.letter_annotations
+import ssbio.protein.sequence.utils.seqstore
 import ssbio.protein.sequence.properties.residues
 
 custom_slugify = Slugify(safe_chars='-_.')
@@ -51,11 +53,14 @@ class SeqProp(SeqRecord):
         pfam (str, list): PFAMs mapped to this sequence
         ec_number (str, list): EC numbers mapped to this sequence
         sequence_file (str): FASTA file for this sequence
+        sequence_store_file (str): Path to the project sequence store (indexed FASTA file) holding this sequence,
+            relative to ``sequence_dir`` if it is set
+        sequence_key (str): Key of this sequence in the sequence store
         metadata_file (str): Metadata file (any format) for this sequence
         feature_file (str): GFF file for this sequence
         features (list): List of protein sequence features, which define regions of the protein
         annotations (dict): Annotations of this protein sequence, which summarize global properties
-        letter_annotations (RestrictedDict): Residue-level annotations, which describe single residue properties
+        letter_annotations (ResidueAnnotations): Residue-level annotations, which describe single residue properties
 
     Todo:
         - Properly inherit methods from the Object class...
@@ -95,6 +100,8 @@ class SeqProp(SeqRecord):
         # Files, sequences, features
         self._sequence_dir = None
         self.sequence_file = None
+        self.sequence_store_file = None
+        self.sequence_key = None
         self._metadata_dir = None
         self.metadata_file = None
         self._feature_dir = None
@@ -123,9 +130,14 @@ class SeqProp(SeqRecord):
 
     @property
     def seq(self):
-        """Seq: Dynamically loaded Seq object from the sequence file"""
+        """Seq: Dynamically loaded Seq object from the sequence store or sequence file"""
 
-        if self.sequence_file:
+        if getattr(self, 'sequence_store_file', None):
+            log.debug('{}: reading sequence from sequence store {}'.format(self.id, self.sequence_store_path))
+            store = ssbio.protein.sequence.utils.seqstore.load_sequence_store(self.sequence_store_path)
+            return store.get_seq(self.sequence_key)
+
+        elif self.sequence_file:
             file_to_load = copy(self.sequence_path)
             log.debug('{}: reading sequence from sequence file {}'.format(self.id, file_to_load))
             tmp_sr = SeqIO.read(file_to_load, 'fasta')
@@ -147,6 +159,9 @@ class SeqProp(SeqRecord):
         elif self.sequence_file:
             raise ValueError('{}: unable to set sequence, sequence file is associated with this object'.format(self.id))
 
+        elif getattr(self, 'sequence_store_file', None):
+            raise ValueError('{}: unable to set sequence, sequence store is associated with this object'.format(self.id))
+
         elif type(s) == str or type(s) == Seq:
             self._seq = ssbio.protein.sequence.utils.cast_to_seq(obj=s)
 
@@ -191,6 +206,20 @@ class SeqProp(SeqRecord):
         else:
             self._features = []
 
+    @property
+    def letter_annotations(self):
+        """ResidueAnnotations: Residue-level annotations, with numeric and single letter annotations stored as NumPy
+        arrays"""
+        return ssbio.protein.sequence.utils.letter_annotations.use_residue_annotations(self)
+
+    @letter_annotations.setter
+    def letter_annotations(self, value):
+        if not isinstance(value, dict):
+            raise TypeError('The per-letter-annotations should be a (restricted) dictionary.')
+        length = len(self.seq) if self.seq is not None else 0
+        self._per_letter_annotations = ssbio.protein.sequence.utils.letter_annotations.ResidueAnnotations(length=length,
+                                                                                                         annotations=value)
+
     @property
     def seq_str(self):
         """str: Get the sequence formatted as a string"""
@@ -204,6 +233,10 @@ class SeqProp(SeqRecord):
     def seq_len(self):
         """int: Get the sequence length"""
 
+        if getattr(self, 'sequence_store_file', None):
+            store = ssbio.protein.sequence.utils.seqstore.load_sequence_store(self.sequence_store_path)
+            return store.length(self.sequence_key)
+
         if not self.seq:
             return 0
 
@@ -232,6 +265,17 @@ class SeqProp(SeqRecord):
 
         self._sequence_dir = path
 
+    @property
+    def sequence_store_path(self):
+        """str: Path to the sequence store holding this sequence"""
+        if not getattr(self, 'sequence_store_file', None):
+            raise OSError('Sequence store not set')
+
+        # Older objects store the absolute path
+        if op.isabs(self.sequence_store_file) or not self._sequence_dir:
+            return self.sequence_store_file
+        return op.normpath(op.join(self.sequence_dir, self.sequence_store_file))
+
     @property
     def sequence_path(self):
         if not self.sequence_file:
@@ -409,7 +453,7 @@ class SeqProp(SeqRecord):
                 else:
                     setattr(self, key, value)
 
-    def get_dict(self, only_attributes=None, exclude_attributes=None, df_format=False):
+    def get_dict(self, only_attributes=None, exclude_attributes=None, df_format=False, copy=True):
         """Get a dictionary of this object's attributes. Optional format for storage in a Pandas DataFrame.
 
         Args:
@@ -418,58 +462,23 @@ class SeqProp(SeqRecord):
             df_format (bool): If dictionary values should be formatted for a dataframe
                 (everything possible is transformed into strings, int, or float -
                 if something can't be transformed it is excluded)
+            copy (bool): If attribute values should be deep copied. Set to False to get the attributes themselves,
+                which must then not be modified.
 
         Returns:
             dict: Dictionary of attributes
 
         """
+        return attribute_dict(self, only_attributes=only_attributes, exclude_attributes=exclude_attributes,
+                              df_format=df_format, copy=copy)
 
-        # Choose attributes to return, return everything in the object if a list is not specified
-        if not only_attributes:
-            keys = list(self.__dict__.keys())
-        else:
-            keys = ssbio.utils.force_list(only_attributes)
-
-        # Remove keys you don't want returned
-        if exclude_attributes:
-            exclude_attributes = ssbio.utils.force_list(exclude_attributes)
-            for x in exclude_attributes:
-                if x in keys:
-                    keys.remove(x)
-
-        # Copy attributes into a new dictionary
-        df_dict = {}
-        for k, orig_v in self.__dict__.items():
-            if k in keys:
-                v = deepcopy(orig_v)
-                if df_format:
-                    if v and not isinstance(v, str) and not isinstance(v, int) and not isinstance(v,
-                                                                                                  float) and not isinstance(
-                            v, bool):
-                        try:
-                            df_dict[k] = ssbio.utils.force_string(deepcopy(v))
-                        except TypeError:
-                            log.warning('{}: excluding attribute from dict, cannot transform into string'.format(k))
-                    elif not v and not isinstance(v, int) and not isinstance(v, float):
-                        df_dict[k] = None
-                    else:
-                        df_dict[k] = deepcopy(v)
-                else:
-                    df_dict[k] = deepcopy(v)
-        return df_dict
-
-    def save_pickle(self, outfile, protocol=2):
+    def save_pickle(self, outfile, protocol=2, compression=None):
         import ssbio.io
-        ssbio.io.save_pickle(self, outfile, protocol)
+        return ssbio.io.save_pickle(self, outfile, protocol, compression=compression)
 
     def __json_encode__(self):
-        to_return = {}
         # Don't save properties, methods in the JSON
-        for x in [a for a in dir(self) if
-                  not a.startswith('__') and not a.startswith('_{}__'.format(type(self).__name__)) and not isinstance(
-                          getattr(type(self), a, None), property) and not callable(getattr(self, a))]:
-            to_return.update({x: getattr(self, x)})
-        return to_return
+        return json_schema(type(self)).encode(self)
 
     def save_json(self, outfile, compression=False):
         import ssbio.io
@@ -504,6 +513,31 @@ class SeqProp(SeqRecord):
         # The Seq as it will now be dynamically loaded from the file
         self.sequence_path = outfile
 
+    def write_to_sequence_store(self, store, key=None):
+        """Append the protein sequence to a project sequence store, ``seq`` will now load directly from the store.
+
+        Args:
+            store (SequenceStore, str): SequenceStore object, or path to its FASTA file
+            key (str): Key to store the sequence under, default is the sequence ID
+
+        """
+        if not self.seq:
+            raise ValueError('{}: no sequence available, unable to write to sequence store'.format(self.id))
+
+        if not key:
+            key = self.id
+        ssbio.protein.sequence.utils.seqstore.write_seqprops_to_store(seqprops=[self], store=store, keys=[key])
+
+    def sequence_store_unset(self):
+        """Copy the sequence to memory and remove the association with the sequence store."""
+        if not self.sequence_store_file:
+            raise IOError('No sequence store to unset')
+
+        tmp = self.seq
+        self.sequence_store_file = None
+        self.sequence_key = None
+        self.seq = tmp
+
     def write_gff_file(self, outfile, force_rerun=False):
         """Write a GFF file for the protein features, ``features`` will now load directly from this file.
 
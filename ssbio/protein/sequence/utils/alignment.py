@@ -5,7 +5,6 @@ Sequence Alignment
 
 import logging
 import os.path as op
-import subprocess
 import tempfile
 from collections import defaultdict
 from itertools import count, groupby
@@ -17,8 +16,10 @@ from Bio import pairwise2
 from Bio.Align import MultipleSeqAlignment
 from Bio.SubsMat import MatrixInfo as matlist
 
+import ssbio.io.jobs
 import ssbio.protein.sequence.utils
 import ssbio.utils
+from ssbio.io.resultcache import CachedRun
 
 log = logging.getLogger(__name__)
 
@@ -160,17 +161,18 @@ def run_needle_alignment(seq_a, seq_b, gapopen=10, gapextend=0.5,
     else:
         outfile = op.join(outdir, outfile)
 
-    # Check if the outfile already exists, if so just return the filename
-    if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        seq_a = ssbio.protein.sequence.utils.cast_to_str(seq_a)
-        seq_b = ssbio.protein.sequence.utils.cast_to_str(seq_b)
+    seq_a = ssbio.protein.sequence.utils.cast_to_str(seq_a)
+    seq_b = ssbio.protein.sequence.utils.cast_to_str(seq_b)
 
+    # Check if the outfile already exists (or the alignment is in the result cache), if so just return the filename
+    cached_run = CachedRun('needle', outfiles=outfile, input_data=[seq_a, seq_b],
+                           args={'gapopen': gapopen, 'gapextend': gapextend})
+    if cached_run.needs_run(force_rerun):
         cmd = 'needle -outfile="{}" -asequence=asis::{} -bsequence=asis::{} -gapopen={} -gapextend={}'.format(outfile, seq_a, seq_b, gapopen, gapextend)
-        command = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   shell=True)
-        out, err = command.communicate()
+        result = ssbio.io.jobs.run(cmd)
+        if not result.ok:
+            log.error('{}: {}'.format(outfile, result.describe()))
+        cached_run.finish()
         # needle_cline = NeedleCommandline(asequence="asis::"+seq_a, bsequence="asis::"+seq_b,
         #                                  gapopen=gapopen, gapextend=gapextend,
         #                                  outfile=outfile)
@@ -218,21 +220,22 @@ def run_needle_alignment_on_files(id_a, faa_a, id_b, faa_b, gapopen=10, gapexten
     else:
         outfile = op.join(outdir, outfile)
 
-    # Check if the outfile already exists
-    if op.exists(outfile) and not force_rerun:
+    # Check if the outfile already exists (or the alignment is in the result cache)
+    cached_run = CachedRun('needle', outfiles=outfile, input_files=[faa_a, faa_b],
+                           args={'gapopen': gapopen, 'gapextend': gapextend})
+    if cached_run.cache is None and op.exists(outfile) and not force_rerun:
         return outfile
     # If it doesn't exist, or force_rerun=True, run the alignment
-    else:
+    elif cached_run.needs_run(force_rerun):
         cmd = 'needle -outfile="{}" -asequence="{}" -bsequence="{}" -gapopen={} -gapextend={}'.format(outfile,
                                                                                                       faa_a,
                                                                                                       faa_b,
                                                                                                       gapopen,
                                                                                                       gapextend)
-        command = subprocess.Popen(cmd,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   shell=True)
-        out, err = command.communicate()
+        result = ssbio.io.jobs.run(cmd)
+        if not result.ok:
+            log.error('{}: {}'.format(outfile, result.describe()))
+        cached_run.finish()
 
     return outfile
 
@@ -431,8 +434,8 @@ def get_deletions(aln_df):
 
         deletion_length = deletion_end_ix - deletion_start_ix + 1
 
-        id_a_pos_deletion_start = aln_df.ix[deletion_start_ix].id_a_pos
-        id_a_pos_deletion_end = aln_df.ix[deletion_end_ix].id_a_pos
+        id_a_pos_deletion_start = aln_df.loc[deletion_start_ix].id_a_pos
+        id_a_pos_deletion_end = aln_df.loc[deletion_end_ix].id_a_pos
 
         deletion_region = (id_a_pos_deletion_start, id_a_pos_deletion_end)
 
@@ -490,8 +493,8 @@ def get_insertions(aln_df):
         else:
             insertion_length = insertion_end - insertion_start - 1
 
-        id_a_pos_insertion_start = aln_df.ix[insertion_start].id_a_pos
-        id_a_pos_insertion_end = aln_df.ix[insertion_end].id_a_pos
+        id_a_pos_insertion_start = aln_df.loc[insertion_start].id_a_pos
+        id_a_pos_insertion_end = aln_df.loc[insertion_end].id_a_pos
 
         # Checking if insertion is at the beginning or end
         if np.isnan(id_a_pos_insertion_start) and id_a_pos_insertion_end == 1:
@@ -8,6 +8,7 @@ import subprocess
 import pandas as pd
 import os.path as op
 from ssbio import utils
+from ssbio.io.resultcache import CachedRun
 import logging
 try:
     from IPython.display import clear_output
@@ -97,35 +98,38 @@ def run_bidirectional_blast(reference, other_genome, dbtype, outdir=''):
     r_folder, r_name, r_ext = utils.split_folder_and_path(reference)
     g_folder, g_name, g_ext = utils.split_folder_and_path(other_genome)
 
-    # make sure BLAST DBs have been made
-    run_makeblastdb(infile=reference, dbtype=dbtype, outdir=r_folder)
-    run_makeblastdb(infile=other_genome, dbtype=dbtype, outdir=g_folder)
-
     # Reference vs genome
     r_vs_g = r_name + '_vs_' + g_name + '_blast.out'
     r_vs_g = op.join(outdir, r_vs_g)
-    if op.exists(r_vs_g) and os.stat(r_vs_g).st_size != 0:
+    cached_run = CachedRun(command, outfiles=r_vs_g, input_files=[reference, other_genome], args={'outfmt': 6})
+    if not cached_run.needs_run():
         log.debug('{} vs {} BLAST already run'.format(r_name, g_name))
     else:
+        # make sure the BLAST DB has been made
+        run_makeblastdb(infile=other_genome, dbtype=dbtype, outdir=g_folder)
         cmd = '{} -query {} -db {} -outfmt 6 -out {}'.format(command, reference, op.join(g_folder, g_name), r_vs_g)
         log.debug('Running: {}'.format(cmd))
         retval = subprocess.call(cmd, shell=True)
         if retval == 0:
             log.debug('BLASTed {} vs {}'.format(g_name, r_name))
+            cached_run.finish()
         else:
             log.error('Error running {}, exit code {}'.format(command, retval))
 
     # Genome vs reference
     g_vs_r = g_name + '_vs_' + r_name + '_blast.out'
     g_vs_r = op.join(outdir, g_vs_r)
-    if op.exists(g_vs_r) and os.stat(g_vs_r).st_size != 0:
+    cached_run = CachedRun(command, outfiles=g_vs_r, input_files=[other_genome, reference], args={'outfmt': 6})
+    if not cached_run.needs_run():
         log.debug('{} vs {} BLAST already run'.format(g_name, r_name))
     else:
+        run_makeblastdb(infile=reference, dbtype=dbtype, outdir=r_folder)
         cmd = '{} -query {} -db {} -outfmt 6 -out {}'.format(command, other_genome, op.join(r_folder, r_name), g_vs_r)
         log.debug('Running: {}'.format(cmd))
         retval = subprocess.call(cmd, shell=True)
         if retval == 0:
             log.debug('BLASTed {} vs {}'.format(g_name, r_name))
+            cached_run.finish()
         else:
             log.error('Error running {}, exit code {}'.format(command, retval))
 
@@ -219,12 +223,12 @@ def calculate_bbh(blast_results_1, blast_results_2, r_name=None, g_name=None, ou
         res = bbh1[bbh1.gene == g]
         if len(res) == 0:
             continue
-        best_hit = res.ix[res.PID.idxmax()].copy()
+        best_hit = res.loc[res.PID.idxmax()].copy()
         best_gene = best_hit.subject
         res2 = bbh2[bbh2.gene == best_gene]
         if len(res2) == 0:
             continue
-        best_hit2 = res2.ix[res2.PID.idxmax()]
+        best_hit2 = res2.loc[res2.PID.idxmax()]
         best_gene2 = best_hit2.subject
         if g == best_gene2:
             best_hit['BBH'] = '<=>'
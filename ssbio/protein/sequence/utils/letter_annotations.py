@@ -0,0 +1,427 @@
+"""
+Letter Annotations
+==================
+
+Columnar storage of per-residue annotations, such as ``SS-dssp``, ``RSA-dssp``, ``RES_DEPTH-msms``, or the
+``<aln_id>_chain_index`` sequence to structure mappings.
+
+:class:`ResidueAnnotations` is a drop-in replacement for the ``letter_annotations`` dictionary of a Biopython
+SeqRecord, which stores numeric and single letter annotations as typed NumPy arrays instead of lists of Python objects.
+Annotations are returned as :class:`AnnotationView` objects, which act like lists and write changes back to the stored
+arrays, so slicing, adding, comparing, and editing annotations works as in Biopython, while the stored arrays can be
+shared without copying through :meth:`ResidueAnnotations.column`. Annotations of many sequences can
+be exported as one columnar dataset to a NumPy ``.npz`` file, a folder of memory-mappable ``.npy`` files, or a Parquet
+file (which requires ``pyarrow`` or ``fastparquet``).
+
+"""
+
+import logging
+import os
+import os.path as op
+
+import numpy as np
+import pandas as pd
+import ssbio.utils
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+log = logging.getLogger(__name__)
+
+
+def to_column(value):
+    """Convert a per-residue annotation to a typed NumPy array, if it can be stored as one.
+
+    Lists and tuples of numbers become float, integer, or boolean arrays, and lists of single letters become ``U1``
+    arrays. Strings, arrays, and anything else (ie. lists with mixed types or ``None`` values) are returned unchanged.
+
+    Args:
+        value (str, list, tuple, ndarray): Per-residue annotation
+
+    Returns:
+        str, ndarray, list, tuple: Annotation as a NumPy array, or the original value
+
+    """
+    if not isinstance(value, (list, tuple)) or not value:
+        return value
+
+    column = np.asarray(value)
+    if column.ndim != 1:
+        return value
+    if column.dtype.kind in 'biuf':
+        return column
+    # NumPy will convert numbers to strings if they are mixed with letters
+    if column.dtype.kind == 'U' and column.dtype.itemsize == 4 and all(isinstance(x, str) for x in value):
+        return column
+    return value
+
+
+class ResidueAnnotations(dict):
+
+    """Dictionary of per-residue annotations which stores values as typed NumPy columns where possible.
+
+    Only values with the same length as the sequence are allowed, as in the ``letter_annotations`` of a SeqRecord.
+    Annotations stored as arrays are returned as :class:`AnnotationView` objects, so editing a returned value in place
+    changes the stored annotation, as with a dictionary of lists. :meth:`items` and :meth:`values` return copies as
+    plain lists, which is what dictionaries are written to JSON with. Use :meth:`column` or :meth:`columns` to get the
+    stored arrays without copying them.
+
+    Args:
+        length (int): Length of the sequence
+        annotations (dict): Optional initial annotations
+
+    """
+
+    def __init__(self, length, annotations=None):
+        dict.__init__(self)
+        self._length = int(length)
+        if annotations:
+            self.update(annotations)
+
+    def __setitem__(self, key, value):
+        # Values are set before the length when unpickling
+        if not hasattr(value, '__len__') or not hasattr(value, '__getitem__') or \
+                (hasattr(self, '_length') and len(value) != self._length):
+            raise TypeError('We only allow python sequences (lists, tuples or strings) of length {}.'.format(
+                    getattr(self, '_length', None)))
+        dict.__setitem__(self, key, to_column(value))
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, np.ndarray):
+            return AnnotationView(self, key)
+        return value
+
+    def __eq__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return self.__class__, (self._length, dict(self.columns()))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        return _to_list(dict.pop(self, key, *default))
+
+    def items(self):
+        return [(k, _to_list(v)) for k, v in self.columns()]
+
+    def values(self):
+        return [_to_list(v) for v in dict.values(self)]
+
+    def copy(self):
+        return self.__class__(self._length, dict(self.columns()))
+
+    def update(self, new_dict=None, **kwargs):
+        if new_dict is None:
+            new_dict = {}
+        if isinstance(new_dict, ResidueAnnotations):
+            new_dict = dict(new_dict.columns())
+        for k, v in dict(new_dict, **kwargs).items():
+            self[k] = v
+
+    def column(self, key):
+        """Get an annotation as it is stored, as a NumPy array where possible, without copying it.
+
+        The array is shared with the annotations, so it should be replaced rather than edited in place.
+
+        Args:
+            key (str): Annotation name
+
+        Returns:
+            ndarray, str, list: Stored annotation
+
+        """
+        return dict.__getitem__(self, key)
+
+    def columns(self):
+        """list: ``(key, stored annotation)`` tuples of all annotations, see :meth:`column`"""
+        return list(dict.items(self))
+
+    @property
+    def nbytes(self):
+        """int: Number of bytes used by the annotations stored as NumPy arrays"""
+        return sum(v.nbytes for v in dict.values(self) if isinstance(v, np.ndarray))
+
+    def to_dataframe(self):
+        """Get the annotations as a DataFrame, with one row per residue and one column per annotation.
+
+        Returns:
+            DataFrame: Annotations indexed by residue number
+
+        """
+        columns = {k: list(v) if isinstance(v, str) else v for k, v in self.columns()}
+        return pd.DataFrame(columns, index=pd.RangeIndex(1, self._length + 1, name='resnum'))
+
+
+class AnnotationView(Sequence):
+
+    """List-like view of an annotation stored in a :class:`ResidueAnnotations` dictionary.
+
+    Items are read from the stored array as Python objects, and setting an item writes it back to the array. If the new
+    value does not fit the type of the array (ie. a float in an integer array, or ``None``), the annotation is stored
+    again from a list, with a new type. Slicing, adding, and copying a view gives a plain list.
+
+    Args:
+        annotations (ResidueAnnotations): Dictionary the annotation is stored in
+        key (str): Annotation name
+
+    """
+
+    __slots__ = ['_annotations', '_key']
+    __hash__ = None
+
+    def __init__(self, annotations, key):
+        self._annotations = annotations
+        self._key = key
+
+    def _column(self):
+        return dict.__getitem__(self._annotations, self._key)
+
+    def __len__(self):
+        return len(self._column())
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        value = self._column()[index]
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __setitem__(self, index, value):
+        column = self._column()
+        if isinstance(column, np.ndarray) and not isinstance(index, slice) and _fits(column, value):
+            column[index] = value
+        else:
+            values = _to_list(column)
+            values[index] = value
+            self._annotations[self._key] = values
+
+    def __eq__(self, other):
+        if isinstance(other, AnnotationView):
+            other = other.tolist()
+        return self.tolist() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __add__(self, other):
+        if isinstance(other, AnnotationView):
+            other = other.tolist()
+        return self.tolist() + other
+
+    def __radd__(self, other):
+        return other + self.tolist()
+
+    def __repr__(self):
+        return repr(self.tolist())
+
+    def __reduce__(self):
+        return list, (self.tolist(),)
+
+    def __array__(self, dtype=None):
+        return np.asarray(self._column(), dtype=dtype)
+
+    def tolist(self):
+        """list: Copy of the annotation as a list of Python objects"""
+        return _to_list(self._column())
+
+
+def _fits(column, value):
+    """Check if a value can be set in a NumPy column without changing it (ie. truncating a float in an integer
+    column)."""
+    kind = column.dtype.kind
+    if isinstance(value, (bool, np.bool_)):
+        return kind == 'b'
+    if kind in 'iu':
+        if not isinstance(value, (int, np.integer)):
+            return False
+        info = np.iinfo(column.dtype)
+        return info.min <= value <= info.max
+    if kind == 'f':
+        return isinstance(value, (int, float, np.integer, np.floating))
+    if kind == 'U':
+        return isinstance(value, str) and len(value) <= column.dtype.itemsize // 4
+    return False
+
+
+def _to_list(value):
+    """Convert a stored NumPy column back to a list of Python objects."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def annotation_columns(seq_record):
+    """Get the letter annotations of a SeqRecord as stored, without converting NumPy columns to lists.
+
+    Args:
+        seq_record (SeqRecord): Biopython SeqRecord or SeqProp
+
+    Returns:
+        list: ``(key, annotation)`` tuples
+
+    """
+    annotations = seq_record.letter_annotations
+    if isinstance(annotations, ResidueAnnotations):
+        return annotations.columns()
+    return list(annotations.items())
+
+
+def use_residue_annotations(seq_record):
+    """Store the letter annotations of a SeqRecord as a :class:`ResidueAnnotations` dictionary, in place.
+
+    Args:
+        seq_record (SeqRecord): Biopython SeqRecord or SeqProp
+
+    Returns:
+        ResidueAnnotations: Letter annotations of the SeqRecord
+
+    """
+    current = getattr(seq_record, '_per_letter_annotations', None)
+    if not isinstance(current, ResidueAnnotations):
+        length = getattr(current, '_length', None)
+        if length is None:
+            length = len(seq_record.seq) if seq_record.seq is not None else 0
+        seq_record._per_letter_annotations = ResidueAnnotations(length=length, annotations=current)
+    return seq_record._per_letter_annotations
+
+
+def residue_annotations_dataset(records):
+    """Combine the letter annotations of many sequences into one columnar dataset.
+
+    Each annotation becomes one column covering all residues of all sequences. Sequences which do not have an
+    annotation are filled with NaN for numeric columns and an empty string for text columns. Annotations which cannot
+    be stored as typed columns are stored as object columns.
+
+    Args:
+        records (list): SeqRecord objects, or ``(record_id, SeqRecord)`` tuples to label the residues of each record
+
+    Returns:
+        dict: Dictionary of column name to 1D array, including the columns ``record_id``, ``resnum``, and ``residue``
+
+    """
+    labeled = [r if isinstance(r, tuple) else (r.id, r) for r in records]
+    lengths = np.array([len(r.seq) for _, r in labeled], dtype=np.int64)
+    total = int(lengths.sum())
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+
+    dataset = {'record_id': np.repeat(np.array([str(x) for x, _ in labeled]), lengths),
+               'resnum': np.arange(total, dtype=np.int64) - np.repeat(starts, lengths) + 1,
+               'residue': np.frombuffer(''.join(str(r.seq) for _, r in labeled).encode(), dtype='S1').astype('U1')}
+
+    # Columns are typed by the first record which has the annotation
+    columns = {}
+    for (_, record), start, length in zip(labeled, starts, lengths):
+        for k, v in annotation_columns(record):
+            v = to_column(list(v)) if isinstance(v, str) else to_column(v)
+            if not isinstance(v, np.ndarray):
+                v = pd.Series(list(v), dtype=object).values
+            if k not in columns:
+                if v.dtype.kind in 'biuf':
+                    columns[k] = np.full(total, np.nan)
+                elif v.dtype.kind == 'U':
+                    columns[k] = np.full(total, '', dtype='U1')
+                else:
+                    columns[k] = np.full(total, None, dtype=object)
+            column = columns[k]
+            if column.dtype.kind == 'U' and v.dtype.kind != 'U':
+                column = columns[k] = column.astype(object)
+            elif column.dtype.kind == 'f' and v.dtype.kind not in 'biuf':
+                column = columns[k] = column.astype(object)
+            column[start:start + length] = v
+
+    for k in columns:
+        if k in dataset:
+            log.warning('{}: letter annotation has the same name as a dataset column, not exported'.format(k))
+            continue
+        dataset[k] = columns[k]
+    return dataset
+
+
+def save_residue_annotations(dataset, outfile, file_format='npz', force_rerun=False):
+    """Save a residue annotation dataset made with :func:`residue_annotations_dataset`.
+
+    Args:
+        dataset (dict): Dictionary of column name to 1D array
+        outfile (str): Path to output file, or folder if ``file_format`` is ``npy``
+        file_format (str): ``npz`` for a single NumPy file, ``npy`` for a folder of one NumPy file per column which
+            can be memory-mapped when loaded, or ``parquet``
+        force_rerun (bool): If an existing file should be overwritten
+
+    Returns:
+        str: Path to output file or folder
+
+    """
+    if file_format not in ['npz', 'npy', 'parquet']:
+        raise ValueError('{}: file format must be "npz", "npy", or "parquet"'.format(file_format))
+
+    if not ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
+        log.debug('{}: residue annotations already saved'.format(outfile))
+        return outfile
+
+    # Column names are stored separately since they may contain characters which are invalid for file names
+    names = list(dataset.keys())
+    if file_format == 'npz':
+        arrays = {'column_{}'.format(i): _storable(dataset[k]) for i, k in enumerate(names)}
+        np.savez(outfile, column_names=np.array(names), **arrays)
+        if not op.exists(outfile) and op.exists(outfile + '.npz'):
+            os.replace(outfile + '.npz', outfile)
+    elif file_format == 'npy':
+        if not op.exists(outfile):
+            os.mkdir(outfile)
+        np.save(op.join(outfile, 'column_names.npy'), np.array(names))
+        for i, k in enumerate(names):
+            np.save(op.join(outfile, 'column_{}.npy'.format(i)), _storable(dataset[k]))
+    else:
+        df = pd.DataFrame({k: _storable(v) for k, v in dataset.items()})
+        df.to_parquet(outfile, index=False)
+
+    log.debug('{}: saved residue annotations for {} residues'.format(outfile, len(dataset['resnum'])))
+    return outfile
+
+
+def _storable(column):
+    """Convert object columns to strings so they can be saved without pickling."""
+    if column.dtype.kind == 'O':
+        return np.array([ssbio.utils.force_string(x) if x is not None else '' for x in column])
+    return column
+
+
+def load_residue_annotations(infile, mmap_mode=None):
+    """Load a residue annotation dataset saved with :func:`save_residue_annotations`.
+
+    Args:
+        infile (str): Path to ``.npz`` or ``.parquet`` file, or folder of ``.npy`` files
+        mmap_mode (str): Memory-map mode for columns in a folder of ``.npy`` files, ie. ``r`` for read-only access
+            without loading the columns into memory
+
+    Returns:
+        dict: Dictionary of column name to 1D array
+
+    """
+    if op.isdir(infile):
+        names = np.load(op.join(infile, 'column_names.npy')).tolist()
+        return {k: np.load(op.join(infile, 'column_{}.npy'.format(i)), mmap_mode=mmap_mode)
+                for i, k in enumerate(names)}
+
+    if infile.endswith('.parquet'):
+        df = pd.read_parquet(infile)
+        return {k: df[k].values for k in df.columns}
+
+    with np.load(infile) as data:
+        names = data['column_names'].tolist()
+        return {k: data['column_{}'.format(i)] for i, k in enumerate(names)}
@@ -0,0 +1,143 @@
+"""
+ResidueMapping
+==============
+
+Bidirectional mapping of residue numbers between a protein sequence and a chain of a protein structure.
+
+A mapping is built once from the parsed pairwise alignment of a sequence to a structure's chain, which is stored as
+the ``<SeqProp_ID>_<StructProp_ID>-<Chain_ID>_chain_index`` letter annotation of the sequence, and the
+``structure_resnums`` letter annotation of the chain's SeqRecord. Forward and reverse lookups are then answered for
+many residue numbers at once with NumPy index arrays.
+
+"""
+
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+class ResidueMapping(object):
+
+    """Residue number mapping between a sequence and a structure's chain, stored as NumPy index arrays.
+
+    Sequence residue numbers are 1-based positions in the sequence. Structure residue numbers are the residue numbers
+    in the structure file, which are not necessarily consecutive or starting at 1.
+
+    Args:
+        chain_index (list): For each residue of the sequence, the 1-based index of the aligned residue in the chain
+            sequence, or NaN if there is none (the ``<aln_id>_chain_index`` letter annotation)
+        structure_resnums (list): For each residue of the chain sequence, its residue number in the structure, or Inf
+            if the residue has no coordinates (the ``structure_resnums`` letter annotation)
+        seq_str (str): Optional sequence, to check if mapped residues are the same
+        chain_seq_str (str): Optional chain sequence, to check if mapped residues are the same
+        id (str): Optional ID of the mapping, usually the alignment ID
+
+    Attributes:
+        seq_to_chain_index (ndarray): 0-based chain index for each sequence position, -1 if the residue is not aligned
+        seq_to_structure_resnum (ndarray): Structure residue number for each sequence position, only valid where
+            ``seq_mapped`` is True
+        seq_mapped (ndarray): If each sequence position maps to a structure residue with coordinates
+        residues_match (ndarray): If each sequence position has the same residue in the structure, or None if the
+            sequences were not provided
+
+    """
+
+    def __init__(self, chain_index, structure_resnums, seq_str=None, chain_seq_str=None, id=None):
+        self.id = id
+
+        chain_index = np.asarray(chain_index, dtype=float)
+        structure_resnums = np.asarray(structure_resnums, dtype=float)
+        self.seq_len = len(chain_index)
+        self.chain_len = len(structure_resnums)
+
+        # Forward: sequence position --> chain index --> structure residue number
+        in_chain = np.isfinite(chain_index)
+        self.seq_to_chain_index = np.full(self.seq_len, -1, dtype=np.int64)
+        self.seq_to_chain_index[in_chain] = chain_index[in_chain].astype(np.int64) - 1
+
+        struct_resnums = np.full(self.seq_len, np.inf)
+        struct_resnums[in_chain] = structure_resnums[self.seq_to_chain_index[in_chain]]
+        self.seq_mapped = np.isfinite(struct_resnums)
+        self.seq_to_structure_resnum = np.where(self.seq_mapped, struct_resnums, 0).astype(np.int64)
+
+        # Reverse: structure residue numbers sorted for binary search, with their sequence residue numbers.
+        # Residues with insertion codes share a residue number, the first one in the sequence is used for those.
+        mapped_positions = np.flatnonzero(self.seq_mapped)
+        mapped_struct_resnums = self.seq_to_structure_resnum[mapped_positions]
+        order = np.argsort(mapped_struct_resnums, kind='mergesort')
+        self._sorted_structure_resnums = mapped_struct_resnums[order]
+        self._sorted_seq_resnums = mapped_positions[order] + 1
+
+        self.residues_match = None
+        if seq_str is not None and chain_seq_str is not None:
+            seq_arr = np.frombuffer(str(seq_str).encode(), dtype=np.uint8)
+            chain_arr = np.frombuffer(str(chain_seq_str).encode(), dtype=np.uint8)
+            self.residues_match = np.zeros(self.seq_len, dtype=bool)
+            self.residues_match[in_chain] = seq_arr[in_chain] == chain_arr[self.seq_to_chain_index[in_chain]]
+
+    def __repr__(self):
+        return '<{} {} ({} of {} residues mapped) at 0x{:x}>'.format(self.__class__.__name__, self.id,
+                                                                   self.num_mapped, self.seq_len, id(self))
+
+    @property
+    def num_mapped(self):
+        """int: Number of sequence residues which map to a structure residue with coordinates"""
+        return int(self.seq_mapped.sum())
+
+    def _seq_positions(self, seq_resnums):
+        seq_resnums = np.atleast_1d(np.asarray(seq_resnums, dtype=np.int64))
+        in_seq = (seq_resnums >= 1) & (seq_resnums <= self.seq_len)
+        return seq_resnums, np.where(in_seq, seq_resnums - 1, 0), in_seq
+
+    def seq_to_chain(self, seq_resnums):
+        """Map sequence residue numbers to 0-based indices in the chain sequence.
+
+        Args:
+            seq_resnums (int, list, ndarray): Residue numbers in the sequence
+
+        Returns:
+            tuple: (chain_indices, found) - array of chain indices and boolean array of which residues are aligned to
+            the chain. Chain indices are only valid where found is True.
+
+        """
+        _, positions, in_seq = self._seq_positions(seq_resnums)
+        chain_indices = self.seq_to_chain_index[positions]
+        found = in_seq & (chain_indices >= 0)
+        return np.where(found, chain_indices, 0), found
+
+    def seq_to_structure(self, seq_resnums):
+        """Map sequence residue numbers to structure residue numbers.
+
+        Args:
+            seq_resnums (int, list, ndarray): Residue numbers in the sequence
+
+        Returns:
+            tuple: (structure_resnums, found) - array of structure residue numbers and boolean array of which residues
+            map to a structure residue with coordinates. Structure residue numbers are only valid where found is True.
+
+        """
+        _, positions, in_seq = self._seq_positions(seq_resnums)
+        found = in_seq & self.seq_mapped[positions]
+        return np.where(found, self.seq_to_structure_resnum[positions], 0), found
+
+    def structure_to_seq(self, structure_resnums):
+        """Map structure residue numbers to sequence residue numbers.
+
+        Args:
+            structure_resnums (int, list, ndarray): Residue numbers in the structure
+
+        Returns:
+            tuple: (seq_resnums, found) - array of sequence residue numbers and boolean array of which residues map to
+            the sequence. Sequence residue numbers are only valid where found is True.
+
+        """
+        structure_resnums = np.atleast_1d(np.asarray(structure_resnums, dtype=np.int64))
+        num_sorted = len(self._sorted_structure_resnums)
+        if not num_sorted:
+            return np.zeros(len(structure_resnums), dtype=np.int64), np.zeros(len(structure_resnums), dtype=bool)
+
+        ix = np.minimum(np.searchsorted(self._sorted_structure_resnums, structure_resnums), num_sorted - 1)
+        found = self._sorted_structure_resnums[ix] == structure_resnums
+        return np.where(found, self._sorted_seq_resnums[ix], 0), found
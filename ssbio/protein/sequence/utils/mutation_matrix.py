@@ -0,0 +1,238 @@
+"""
+MutationMatrix
+==============
+
+Sparse matrix of point mutations found in many pairwise alignments to one reference sequence.
+
+Each row of the matrix is an aligned sequence (ie. the same gene in another strain) and each column is a single point
+mutation ``(reference residue, residue number, mutated residue)``. Mutations are read from the ``mutations`` annotation
+which is stored in an alignment when it is parsed, and rows and columns are kept in the order they are first seen, so
+summaries match :meth:`ssbio.core.protein.Protein.sequence_mutation_summary`.
+
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse
+
+log = logging.getLogger(__name__)
+
+
+class MutationMatrix(object):
+
+    """Sparse sequence × mutation matrix, with queries for mutation frequencies and groups of co-occurring mutations.
+
+    Args:
+        sequence_ids (list): ID of the aligned sequence in each row
+        mutations (list): Mutation tuple ``(reference residue, residue number, mutated residue)`` of each column
+        matrix (csr_matrix): Boolean sparse matrix of shape ``(len(sequence_ids), len(mutations))``
+        alignment_ids (list): Optional ID of the alignment each row was read from
+
+    Attributes:
+        sequence_ids (list): ID of the aligned sequence in each row
+        mutations (list): Mutation tuple of each column
+        matrix (csr_matrix): Boolean sparse matrix of which sequences have which mutations
+        alignment_ids (list): ID of the alignment each row was read from
+
+    """
+
+    def __init__(self, sequence_ids, mutations, matrix, alignment_ids=None):
+        self.sequence_ids = list(sequence_ids)
+        self.mutations = list(mutations)
+        self.matrix = scipy.sparse.csr_matrix(matrix, dtype=bool)
+        self.alignment_ids = list(alignment_ids) if alignment_ids is not None else list(sequence_ids)
+        self._mutation_index = {m: i for i, m in enumerate(self.mutations)}
+        self._resnums = np.array([m[1] for m in self.mutations], dtype=np.int64)
+
+        if self.matrix.shape != (len(self.sequence_ids), len(self.mutations)):
+            raise ValueError('Matrix shape {} does not match the number of sequences ({}) and mutations '
+                             '({})'.format(self.matrix.shape, len(self.sequence_ids), len(self.mutations)))
+
+    def __repr__(self):
+        return '<{} {} sequences x {} mutations at 0x{:x}>'.format(self.__class__.__name__, self.num_sequences,
+                                                                   self.num_mutations, id(self))
+
+    @classmethod
+    def from_alignments(cls, alignments, alignment_ids=None, alignment_type=None):
+        """Build a mutation matrix from parsed pairwise alignments.
+
+        Args:
+            alignments (list): ``MultipleSeqAlignment`` objects with the ``mutations`` and ``b_seq`` annotations
+            alignment_ids (str, list): Only use the alignments with these IDs
+            alignment_type (str): Only use alignments with this ``ssbio_type`` annotation, ``seqalign`` or
+                ``structalign``
+
+        Returns:
+            MutationMatrix: Matrix with one row per alignment
+
+        """
+        if alignment_ids and isinstance(alignment_ids, str):
+            alignment_ids = [alignment_ids]
+
+        sequence_ids = []
+        used_alignment_ids = []
+        mutation_index = OrderedDict()
+        rows = []
+        cols = []
+
+        for alignment in alignments:
+            if alignment_ids and alignment.id not in alignment_ids:
+                continue
+            if alignment_type and alignment.annotations['ssbio_type'] != alignment_type:
+                continue
+
+            row = len(sequence_ids)
+            sequence_ids.append(alignment.annotations['b_seq'])
+            used_alignment_ids.append(alignment.id)
+
+            for m in alignment.annotations['mutations']:
+                m = tuple(m)
+                if m not in mutation_index:
+                    mutation_index[m] = len(mutation_index)
+                rows.append(row)
+                cols.append(mutation_index[m])
+
+        matrix = scipy.sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)),
+                                         shape=(len(sequence_ids), len(mutation_index)))
+        return cls(sequence_ids=sequence_ids, mutations=list(mutation_index.keys()), matrix=matrix,
+                   alignment_ids=used_alignment_ids)
+
+    @property
+    def num_sequences(self):
+        """int: Number of aligned sequences (rows)"""
+        return len(self.sequence_ids)
+
+    @property
+    def num_mutations(self):
+        """int: Number of distinct mutations (columns)"""
+        return len(self.mutations)
+
+    def mutation_counts(self):
+        """Get the number of sequences which have each mutation.
+
+        Returns:
+            ndarray: Count for each mutation, in the order of ``mutations``
+
+        """
+        return np.bincount(self.matrix.indices, minlength=self.num_mutations)
+
+    def mutation_frequencies(self, num_total=None):
+        """Get the fraction of sequences which have each mutation.
+
+        Args:
+            num_total (int): Number of sequences to divide by, default is the number of rows in the matrix
+
+        Returns:
+            ndarray: Frequency of each mutation, in the order of ``mutations``
+
+        """
+        if num_total is None:
+            num_total = self.num_sequences
+        if not num_total:
+            return np.zeros(self.num_mutations)
+        return self.mutation_counts() / float(num_total)
+
+    def sequence_mutation_counts(self, unique_positions=False):
+        """Get the number of mutations in each aligned sequence.
+
+        Args:
+            unique_positions (bool): If different mutations at the same residue number should only be counted once
+
+        Returns:
+            ndarray: Count for each sequence, in the order of ``sequence_ids``
+
+        """
+        if not unique_positions:
+            return np.diff(self.matrix.indptr)
+
+        rows = np.repeat(np.arange(self.num_sequences), np.diff(self.matrix.indptr))
+        if not len(rows):
+            return np.zeros(self.num_sequences, dtype=np.int64)
+        # Count distinct (row, residue number) pairs
+        pairs = np.unique(np.stack([rows, self._resnums[self.matrix.indices]]), axis=1)
+        return np.bincount(pairs[0], minlength=self.num_sequences)
+
+    def sequences_with_mutation(self, mutation):
+        """Get the IDs of the sequences which have a mutation.
+
+        Args:
+            mutation (tuple): Mutation tuple ``(reference residue, residue number, mutated residue)``
+
+        Returns:
+            list: Sequence IDs, in row order
+
+        """
+        col = self._mutation_index.get(tuple(mutation))
+        if col is None:
+            return []
+        rows = self.matrix[:, col].nonzero()[0]
+        return [self.sequence_ids[i] for i in np.sort(rows)]
+
+    def single_mutations(self):
+        """Get the sequences which have each single mutation.
+
+        Returns:
+            dict: Dictionary of ``{mutation: list of sequence IDs}``, as the first dictionary returned by
+            :meth:`ssbio.core.protein.Protein.sequence_mutation_summary`
+
+        """
+        by_column = self.matrix.tocsc()
+        sequence_ids = np.array(self.sequence_ids, dtype=object)
+        single = OrderedDict()
+        for i, m in enumerate(self.mutations):
+            rows = by_column.indices[by_column.indptr[i]:by_column.indptr[i + 1]]
+            single[m] = sequence_ids[np.sort(rows)].tolist()
+        return dict(single)
+
+    def mutation_groups(self):
+        """Get the sequences which have each combination ("fingerprint") of co-occurring mutations.
+
+        Returns:
+            dict: Dictionary of ``{mutation group: list of sequence IDs}``, as the second dictionary returned by
+            :meth:`ssbio.core.protein.Protein.sequence_mutation_summary`. Sequences without mutations are not included.
+
+        """
+        groups = OrderedDict()
+        indptr = self.matrix.indptr
+        indices = self.matrix.indices
+        for row in range(self.num_sequences):
+            cols = indices[indptr[row]:indptr[row + 1]]
+            if not len(cols):
+                continue
+            # Mutations are listed by residue number, as in the alignment
+            key = tuple(self.mutations[c] for c in cols[np.argsort(self._resnums[cols], kind='mergesort')])
+            groups.setdefault(key, []).append(self.sequence_ids[row])
+        return dict(groups)
+
+    def popular_mutations(self, min_frequency, num_total=None):
+        """Get the mutations which are found in at least a fraction of sequences.
+
+        Args:
+            min_frequency (float): Minimum fraction of sequences with the mutation
+            num_total (int): Number of sequences to divide by, default is the number of rows in the matrix
+
+        Returns:
+            list: Mutation tuples, in the order of ``mutations``
+
+        """
+        frequencies = self.mutation_frequencies(num_total=num_total)
+        return [self.mutations[i] for i in np.flatnonzero(frequencies >= min_frequency)]
+
+    def popular_mutation_groups(self, min_frequency, num_total=None):
+        """Get the combinations of co-occurring mutations which are found in at least a fraction of sequences.
+
+        Args:
+            min_frequency (float): Minimum fraction of sequences with the exact mutation group
+            num_total (int): Number of sequences to divide by, default is the number of rows in the matrix
+
+        Returns:
+            list: Mutation groups, as tuples of mutation tuples
+
+        """
+        if num_total is None:
+            num_total = self.num_sequences
+        if not num_total:
+            return []
+        return [k for k, v in self.mutation_groups().items() if len(v) / float(num_total) >= min_frequency]
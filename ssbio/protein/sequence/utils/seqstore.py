@@ -0,0 +1,444 @@
+"""
+SequenceStore
+=============
+
+A single, indexed FASTA file which holds all the protein sequences of a project. Instead of writing one FASTA file per
+sequence, sequences are appended to one file and an index in the ``samtools faidx`` format (``.fai``) records where
+each one is located, so a sequence can be read back with a single seek.
+
+The store is append-only - adding a sequence under a key that already exists appends the new record and the index
+entry is updated to point to it. Earlier records remain in the file until :meth:`SequenceStore.compact` is run.
+
+"""
+
+import logging
+import os
+import os.path as op
+
+from Bio.SeqRecord import SeqRecord
+
+import ssbio.protein.sequence.utils
+import ssbio.utils
+
+log = logging.getLogger(__name__)
+
+_open_stores = {}
+
+
+def load_sequence_store(fasta_path):
+    """Return the SequenceStore for a FASTA file, reusing one which has already been opened in this session.
+
+    Args:
+        fasta_path (str): Path to the store's FASTA file
+
+    Returns:
+        SequenceStore: Store for that file
+
+    """
+    key = op.abspath(fasta_path)
+    if key not in _open_stores:
+        _open_stores[key] = SequenceStore(fasta_path)
+    return _open_stores[key]
+
+
+def fasta_title(seq_record):
+    """Get the FASTA title line for a SeqRecord, formatted as Biopython's ``SeqIO.write`` would.
+
+    Args:
+        seq_record (SeqRecord): Biopython SeqRecord, or SeqProp
+
+    Returns:
+        str: FASTA title without the leading ``>``
+
+    """
+    ident = seq_record.id
+    description = seq_record.description
+    if description and description.split(None, 1)[0] == ident:
+        title = description
+    elif description:
+        title = '{} {}'.format(ident, description)
+    else:
+        title = ident
+    return title.replace('\n', ' ').replace('\r', ' ')
+
+
+def shared_sequence_store(seqprops):
+    """Return the SequenceStore which holds every sequence in a list of SeqProps, if there is a single one.
+
+    Args:
+        seqprops (list): List of SeqProp objects
+
+    Returns:
+        SequenceStore: Store holding all of the sequences, or None if any sequence is not in the same store
+
+    """
+    store_files = set(op.abspath(s.sequence_store_path) if getattr(s, 'sequence_store_file', None) else None
+                      for s in seqprops)
+    if len(store_files) != 1 or None in store_files:
+        return None
+
+    store = load_sequence_store(store_files.pop())
+    if not all(s.sequence_key in store for s in seqprops):
+        return None
+    return store
+
+
+class SequenceStore(object):
+
+    """Append-only, indexed FASTA file to store many protein sequences in one place.
+
+    Sequences are written on a single line each, so the index entry for a key gives the byte offset and length of the
+    full sequence. The index is kept next to the FASTA file with the extension ``.fai`` and is readable by
+    ``samtools faidx`` as long as keys have not been overwritten.
+
+    Args:
+        fasta_path (str): Path to the store's FASTA file, which is created if it does not exist
+
+    Attributes:
+        fasta_path (str): Path to the store's FASTA file
+        index_path (str): Path to the ``.fai`` index file
+
+    """
+
+    def __init__(self, fasta_path):
+        self.fasta_path = op.abspath(fasta_path)
+        self.index_path = self.fasta_path + '.fai'
+        self._index = {}
+        self._titles = {}
+        self._handle = None
+
+        if not op.exists(self.fasta_path):
+            outdir = op.dirname(self.fasta_path)
+            if not op.exists(outdir):
+                raise OSError('{}: folder does not exist'.format(outdir))
+            open(self.fasta_path, 'a').close()
+            open(self.index_path, 'w').close()
+
+        if op.exists(self.index_path) and op.getsize(self.index_path) > 0:
+            self._load_index()
+        else:
+            self.reindex()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __repr__(self):
+        return '<{} {} ({} sequences) at 0x{:x}>'.format(self.__class__.__name__, self.fasta_path, len(self), id(self))
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_handle'] = None
+        return state
+
+    def _load_index(self):
+        """Read the ``.fai`` index file. Later lines for a key take precedence over earlier ones."""
+        with open(self.index_path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                key, length, offset, linebases, linebytes = line.rstrip('\n').split('\t')[:5]
+                self._index[key] = (int(length), int(offset), int(linebases), int(linebytes))
+
+    def title(self, key):
+        """Get the FASTA title line of a stored sequence. Title lines are not part of the index, so after the store
+        is opened each one is read the first time it is needed.
+
+        Args:
+            key (str): Key of the sequence
+
+        Returns:
+            str: FASTA title without the leading ``>``
+
+        """
+        if key not in self._titles:
+            if key not in self._index:
+                raise KeyError('{}: sequence not in store {}'.format(key, self.fasta_path))
+            self._titles[key] = self._read_title(self._read_handle(), self._index[key][1])
+        return self._titles[key]
+
+    @staticmethod
+    def _read_title(handle, offset, chunk_size=1024):
+        """Read the title line ending where the sequence at an offset starts, reading back in chunks to the newline
+        ending the record before it"""
+        raw = b''
+        start = offset
+        while start > 0:
+            read_from = max(0, start - chunk_size)
+            handle.seek(read_from)
+            raw = handle.read(start - read_from) + raw
+            start = read_from
+            newline = raw.rfind(b'\n', 0, len(raw) - 1)
+            if newline != -1:
+                raw = raw[newline + 1:]
+                break
+        return raw[1:].rstrip(b'\r\n').decode()
+
+    def reindex(self):
+        """Rebuild the index by scanning the FASTA file. Only needed if the ``.fai`` file is missing."""
+        self._index = {}
+        self._titles = {}
+        offset = 0
+        key = None
+        with open(self.fasta_path, 'rb') as f:
+            for line in f:
+                if line.startswith(b'>'):
+                    key = line[1:].split(None, 1)[0].decode()
+                    self._titles[key] = line[1:].rstrip(b'\r\n').decode()
+                    seq_offset = offset + len(line)
+                    self._index[key] = (0, seq_offset, 0, 0)
+                elif key is not None:
+                    linebases = len(line.rstrip(b'\r\n'))
+                    length, seq_offset, first_linebases, first_linebytes = self._index[key]
+                    if not first_linebases:
+                        first_linebases, first_linebytes = linebases, len(line)
+                    self._index[key] = (length + linebases, seq_offset, first_linebases, first_linebytes)
+                offset += len(line)
+
+        with open(self.index_path, 'w') as f:
+            for k, v in self._index.items():
+                f.write('{}\t{}\t{}\t{}\t{}\n'.format(k, *v))
+
+    def _read_handle(self):
+        if self._handle is None or self._handle.closed:
+            self._handle = open(self.fasta_path, 'rb')
+        return self._handle
+
+    def close(self):
+        """Close the open file handle of the store, if any."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def keys(self):
+        """list: Keys of all sequences in the store, in the order they were first added"""
+        return list(self._index.keys())
+
+    def length(self, key):
+        """Get the length of a stored sequence without reading it.
+
+        Args:
+            key (str): Key of the sequence
+
+        Returns:
+            int: Sequence length
+
+        """
+        return self._index[key][0]
+
+    def add(self, seq, key=None, description=None):
+        """Append a single sequence to the store.
+
+        Args:
+            seq (str, Seq, SeqRecord): Sequence string, Biopython Seq or SeqRecord object
+            key (str): Key to store the sequence under, required if seq is a string or Seq object
+            description (str): Optional description to write on the FASTA title line
+
+        Returns:
+            str: Key of the stored sequence
+
+        """
+        return self.add_many([(key, seq, description)])[0]
+
+    def add_many(self, sequences):
+        """Append many sequences to the store, opening the file only once.
+
+        Args:
+            sequences (list, dict): SeqRecord objects, ``(key, sequence)`` or ``(key, sequence, description)`` tuples,
+                or a dictionary of keys to sequences
+
+        Returns:
+            list: Keys of the stored sequences
+
+        """
+        if isinstance(sequences, dict):
+            sequences = list(sequences.items())
+
+        to_write = []
+        for s in sequences:
+            if isinstance(s, SeqRecord):
+                key, seq, title = s.id, s.seq, fasta_title(s)
+            else:
+                key, seq = s[0], s[1]
+                description = s[2] if len(s) > 2 else None
+                if not key and isinstance(seq, SeqRecord):
+                    key = seq.id
+                if not key:
+                    raise ValueError('Key must be specified if sequence is a string or Seq object')
+                title = '{} {}'.format(key, description) if description else key
+
+            if ' ' in key or '\t' in key:
+                raise ValueError('{}: sequence keys cannot contain whitespace'.format(key))
+            seq_str = ssbio.protein.sequence.utils.cast_to_str(seq)
+            to_write.append((key, title, seq_str))
+
+        self.close()
+        new_index = []
+        with open(self.fasta_path, 'ab') as f:
+            offset = f.tell()
+            for key, title, seq_str in to_write:
+                header = '>{}\n'.format(title).encode()
+                body = seq_str.encode() + b'\n'
+                f.write(header)
+                f.write(body)
+                entry = (len(seq_str), offset + len(header), len(seq_str), len(body))
+                offset += len(header) + len(body)
+                self._index[key] = entry
+                self._titles[key] = title
+                new_index.append((key, entry))
+
+        with open(self.index_path, 'a') as f:
+            for key, entry in new_index:
+                f.write('{}\t{}\t{}\t{}\t{}\n'.format(key, *entry))
+
+        log.debug('{}: appended {} sequences to store'.format(self.fasta_path, len(new_index)))
+        return [x[0] for x in new_index]
+
+    def _read_raw(self, handle, key):
+        length, offset, linebases, linebytes = self._index[key]
+        handle.seek(offset)
+        if not length:
+            return b''
+        if length == linebases:
+            return handle.read(length)
+        # Multi-line records, only present if the FASTA file was written by something else
+        num_lines = (length - 1) // linebases + 1
+        raw = handle.read(num_lines * linebytes)
+        return b''.join(raw.split())[:length]
+
+    def get(self, key):
+        """Get a sequence string from the store.
+
+        Args:
+            key (str): Key of the sequence
+
+        Returns:
+            str: Sequence string
+
+        """
+        if key not in self._index:
+            raise KeyError('{}: sequence not in store {}'.format(key, self.fasta_path))
+        return self._read_raw(self._read_handle(), key).decode()
+
+    def get_seq(self, key):
+        """Get a sequence from the store as a Biopython Seq object.
+
+        Args:
+            key (str): Key of the sequence
+
+        Returns:
+            Seq: Sequence
+
+        """
+        return ssbio.protein.sequence.utils.cast_to_seq(self.get(key))
+
+    def get_many(self, keys=None):
+        """Get many sequence strings from the store, reading them in file order.
+
+        Args:
+            keys (list): Keys of the sequences, all are returned if not provided
+
+        Returns:
+            dict: Dictionary of keys to sequence strings
+
+        """
+        if keys is None:
+            keys = self.keys()
+        keys = ssbio.utils.force_list(keys)
+        missing = [k for k in keys if k not in self._index]
+        if missing:
+            raise KeyError('{}: sequences not in store {}'.format(missing, self.fasta_path))
+
+        handle = self._read_handle()
+        results = {}
+        for k in sorted(set(keys), key=lambda x: self._index[x][1]):
+            results[k] = self._read_raw(handle, k).decode()
+        return {k: results[k] for k in keys}
+
+    def export(self, outfile, keys=None, titles=None, force_rerun=False):
+        """Write sequences from the store into a new FASTA file, copying the stored bytes without parsing them.
+
+        Args:
+            outfile (str): Path to new FASTA file
+            keys (list): Keys of the sequences to write, in order. All are written if not provided
+            titles (dict): Optional mapping of keys to new FASTA title lines (ie. to rename IDs)
+            force_rerun (bool): If an existing file should be overwritten
+
+        Returns:
+            str: Path to FASTA file
+
+        """
+        if keys is None:
+            keys = self.keys()
+        if not titles:
+            titles = {}
+
+        if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
+            handle = self._read_handle()
+            with open(outfile, 'wb') as f:
+                for k in keys:
+                    f.write('>{}\n'.format(titles[k] if k in titles else self.title(k)).encode())
+                    f.write(self._read_raw(handle, k))
+                    f.write(b'\n')
+
+        return outfile
+
+    def compact(self):
+        """Rewrite the FASTA file and index so that only the latest record for each key is kept."""
+        tmp_file = self.fasta_path + '.tmp'
+        self.export(tmp_file, force_rerun=True)
+        self.close()
+        os.replace(tmp_file, self.fasta_path)
+        self.reindex()
+
+
+def write_seqprops_to_store(seqprops, store, keys=None):
+    """Append the sequences of many SeqProps to a sequence store in one write, and point each SeqProp to it.
+
+    SeqProps without a sequence are skipped. After this, the ``seq`` attribute of each SeqProp is loaded from the store.
+
+    Args:
+        seqprops (list): List of SeqProp objects
+        store (SequenceStore, str): SequenceStore object, or path to its FASTA file
+        keys (list): Keys to store the sequences under, in the same order as seqprops. Default is the sequence IDs.
+
+    Returns:
+        list: Keys of the stored sequences
+
+    """
+    if isinstance(store, str):
+        store = load_sequence_store(store)
+    if not keys:
+        keys = [s.id for s in seqprops]
+    if len(keys) != len(seqprops):
+        raise ValueError('Number of keys must match number of sequences')
+
+    to_add = []
+    to_point = []
+    for s, k in zip(seqprops, keys):
+        seq = s.seq
+        if not seq:
+            log.debug('{}: no sequence stored, not writing to sequence store'.format(s.id))
+            continue
+        title = fasta_title(s)
+        description = title.split(None, 1)[1] if ' ' in title else None
+        to_add.append((k, seq, description))
+        to_point.append((s, k))
+
+    stored = store.add_many(to_add)
+
+    for s, k in to_point:
+        s._seq = None
+        # Relative to the sequence folder like sequence files, so the path stays valid if the project is moved
+        if getattr(s, '_sequence_dir', None):
+            s.sequence_store_file = op.relpath(store.fasta_path, op.abspath(s.sequence_dir))
+        else:
+            s.sequence_store_file = store.fasta_path
+        s.sequence_key = k
+
+    return stored
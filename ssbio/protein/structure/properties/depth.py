@@ -0,0 +1,126 @@
+"""
+Residue Depth
+=============
+
+Residue depth calculated in process, as an alternative to running MSMS through Biopython's ``ResidueDepth``.
+
+The molecular surface is approximated by a point cloud: the solvent accessible test points of each atom (see
+:func:`ssbio.protein.structure.properties.sasa.exposed_points`) are moved onto the atom's van der Waals sphere, and
+points lining internal cavities are removed, as MSMS only triangulates the external surface by default. Cavities are
+found as connected sets of probe positions whose surface normals point inward, so separate bodies in an assembly all
+keep their surfaces. The depth of an atom is the distance to the closest surface point, found with a KD-tree, and
+results are reported in the same layout as :func:`ssbio.protein.structure.properties.msms.get_msms_df`. No executable
+is run and no temporary files are written.
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+import ssbio.protein.structure.properties.sasa as sasa
+from ssbio.protein.structure.properties.structure_arrays import StructureArrays
+
+log = logging.getLogger(__name__)
+
+
+def surface_points(coords, radii, probe_radius=1.5, n_points=100, exclude_cavities=True, pairs=None):
+    """Get points on the molecular surface of a set of atoms.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Atom radii
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom
+        exclude_cavities (bool): If points lining internal cavities should be removed
+        pairs (tuple): Optional (i, j) neighbor pairs from
+            :func:`ssbio.protein.structure.properties.sasa.neighbor_pairs`
+
+    Returns:
+        ndarray: Surface point coordinates, shape ``(n_surface_points, 3)``
+
+    """
+    coords = np.asarray(coords, dtype=float)
+    radii = np.asarray(radii, dtype=float)
+    exposed = sasa.exposed_points(coords, radii, probe_radius=probe_radius, n_points=n_points, pairs=pairs)
+    atom_ix, point_ix = np.nonzero(exposed)
+    directions = sasa.sphere_points(n_points)[point_ix]
+
+    if exclude_cavities and len(atom_ix) > 1:
+        # Probe positions are linked if they are closer than about one and a half times the spacing of test points
+        probes = coords[atom_ix] + (radii[atom_ix] + probe_radius)[:, None] * directions
+        spacing = np.sqrt(4 * np.pi / n_points) * (radii.max() + probe_radius)
+        pairs = cKDTree(probes).query_pairs(r=1.5 * spacing, output_type='ndarray')
+        graph = coo_matrix((np.ones(len(pairs), dtype=bool), (pairs[:, 0], pairs[:, 1])),
+                           shape=(len(probes), len(probes)))
+        num_components, labels = connected_components(graph, directed=False)
+        if num_components > 1:
+            # Surface normals point away from the center of an external surface, and into the center of a cavity
+            counts = np.bincount(labels).astype(float)
+            centers = np.column_stack([np.bincount(labels, weights=probes[:, k]) for k in range(3)]) / counts[:, None]
+            outward = np.sum(directions * (probes - centers[labels]), axis=1)
+            external = (np.bincount(labels, weights=outward) > 0)[labels]
+            log.debug('Removed {} surface points in internal cavities'.format((~external).sum()))
+            atom_ix = atom_ix[external]
+            directions = directions[external]
+
+    return coords[atom_ix] + radii[atom_ix, None] * directions
+
+
+def get_residue_depth_df(model, probe_radius=1.5, n_points=100, exclude_cavities=True, arrays=None):
+    """Calculate the depth of residues in a Biopython Model, without running MSMS.
+
+    All atoms of the model except hydrogens and waters form the surface, and depths are reported for amino acid
+    residues as in :func:`ssbio.protein.structure.properties.msms.get_msms_df`. Depths are in units Angstroms.
+
+    Args:
+        model (Model): Biopython Structure Model
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom for the surface
+        exclude_cavities (bool): If surfaces of internal cavities should be excluded
+        arrays (StructureArrays): Atom arrays of the model, if already extracted
+
+    Returns:
+        DataFrame: Depths with the columns ``chain``, ``resnum``, ``icode``, ``res_depth`` (average depth of all atoms
+        in a residue) and ``ca_depth`` (depth of the alpha carbon atom)
+
+    """
+    cols = ['chain', 'resnum', 'icode', 'res_depth', 'ca_depth']
+
+    if arrays is None:
+        arrays = StructureArrays(model)
+
+    residues = np.flatnonzero(arrays.is_aa)
+    if not len(residues):
+        return pd.DataFrame(columns=cols)
+
+    # Index of each atom's residue in the results, -1 for atoms of other residues
+    result_index = np.full(arrays.num_residues, -1, dtype=np.int64)
+    result_index[residues] = np.arange(len(residues))
+    residue_index = result_index[arrays.atom_residues]
+
+    coords = arrays.coords
+    radii = sasa.structure_radii(arrays)
+    candidates = arrays.atom_pairs(2 * (radii.max() + probe_radius))
+    pairs = sasa.neighbor_pairs(coords, radii + probe_radius, candidates=candidates)
+    surface = surface_points(coords, radii, probe_radius=probe_radius, n_points=n_points,
+                             exclude_cavities=exclude_cavities, pairs=pairs)
+    depths = cKDTree(surface).query(coords)[0]
+
+    in_residue = residue_index >= 0
+    num_atoms = np.bincount(residue_index[in_residue], minlength=len(residues))
+    res_depths = np.bincount(residue_index[in_residue], weights=depths[in_residue],
+                             minlength=len(residues)) / np.maximum(num_atoms, 1)
+    ca_atoms = arrays.residue_atoms('CA')[residues]
+    ca_depths = np.full(len(residues), np.nan)
+    ca_depths[ca_atoms >= 0] = depths[ca_atoms[ca_atoms >= 0]]
+
+    df = pd.DataFrame.from_records([(arrays.chain_ids[r], arrays.residues[r][1].id[1], arrays.residues[r][1].id[2])
+                                    for r in residues], columns=['chain', 'resnum', 'icode'])
+    df['res_depth'] = res_depths
+    df['ca_depth'] = ca_depths
+    return df[cols]
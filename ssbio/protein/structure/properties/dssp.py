@@ -1,6 +1,11 @@
+import os
+import re
+import tempfile
 import pandas as pd
 import logging
+import ssbio.io.jobs
 import ssbio.utils
+from ssbio.io.resultcache import CachedRun, program_version
 from collections import defaultdict
 from six import iteritems
 from Bio import PDB
@@ -11,51 +16,109 @@ from Bio.PDB.Polypeptide import one_to_three
 log = logging.getLogger(__name__)
 
 
-def get_dssp_df(model, pdb_file, dssp_exec='dssp', outfile=None, outdir=None, outext='_dssp.df', force_rerun=False):
+def parse_dssp(model, dssp_file):
+    """Parse a DSSP output file into a DataFrame of per-residue properties of a structure.
+
+    Args:
+        model (Model): Biopython Model object of the structure DSSP was run on
+        dssp_file (str): Path to the DSSP output file
+
+    Returns:
+        DataFrame: DSSP results, empty if they do not match the structure
+
+    """
+    try:
+        # TODO: errors with non-standard residues, ie. MSE in 4Q6U or 1nfr
+        dssp = PDB.DSSP(model=model, in_file=dssp_file, file_type='DSSP')
+    except KeyError:
+        return pd.DataFrame()
+
+    if len(dssp.property_list) == 0:
+        return pd.DataFrame()
+
+    # Reorganize the results into a DataFrame
+    appender = []
+    for k in dssp.property_keys:
+        to_append = []
+        x = dssp.property_dict[k]
+        chain = k[0]
+        residue = k[1]
+        het = residue[0]
+        resnum = residue[1]
+        icode = residue[2]
+        to_append.extend([chain, resnum, icode])
+        to_append.extend(x)
+        appender.append(to_append)
+
+    cols = ['chain', 'resnum', 'icode',
+            'dssp_index', 'aa', 'ss', 'exposure_rsa', 'phi', 'psi',
+            'NH_O_1_relidx', 'NH_O_1_energy', 'O_NH_1_relidx',
+            'O_NH_1_energy', 'NH_O_2_relidx', 'NH_O_2_energy',
+            'O_NH_2_relidx', 'O_NH_2_energy']
+
+    df = pd.DataFrame.from_records(appender, columns=cols)
+
+    # Adding additional columns
+    df = df[df['aa'].isin(list(aa1))]
+    df['aa_three'] = df['aa'].apply(one_to_three)
+    df['max_acc'] = df['aa_three'].map(residue_max_acc['Sander'].get)
+    df[['exposure_rsa', 'max_acc']] = df[['exposure_rsa', 'max_acc']].astype(float)
+    df['exposure_asa'] = df['exposure_rsa'] * df['max_acc']
+
+    return df
+
+
+def dssp_command(dssp_exec, pdb_file):
+    """Get the command to run DSSP on a structure file and print the results in the classic DSSP format.
+
+    DSSP 4 (mkdssp) prints mmCIF by default, so the DSSP output format is requested for it.
+
+    Args:
+        dssp_exec (str): Name of or path to the DSSP program
+        pdb_file (str): Path to the structure file
+
+    Returns:
+        list: Program and its arguments
+
+    """
+    command = [dssp_exec]
+    version = re.search(r'version\s+(\d+)\.', program_version(dssp_exec, version_flag='--version'))
+    if version and int(version.group(1)) >= 4:
+        command.append('--output-format=dssp')
+    command.append(pdb_file)
+    return command
+
+
+def get_dssp_df(model, pdb_file, dssp_exec='dssp', outfile=None, outdir=None, outext='_dssp.df', force_rerun=False,
+                timeout=None):
     # Create the output file name
     outfile = ssbio.utils.outfile_maker(inname=pdb_file, outname=outfile, outdir=outdir, outext=outext)
 
-    if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
-        try:
-            # TODO: errors with non-standard residues, ie. MSE in 4Q6U or 1nfr
-            # TODO: write command line executor for DSSP and parser for raw DSSP results
-            dssp = PDB.DSSP(model=model, in_file=pdb_file, dssp=dssp_exec)
-        except KeyError:
-            return pd.DataFrame()
+    # Newer versions of DSSP are installed as mkdssp
+    if dssp_exec == 'dssp' and not ssbio.utils.program_exists('dssp') and ssbio.utils.program_exists('mkdssp'):
+        dssp_exec = 'mkdssp'
 
-        if len(dssp.property_list) == 0:
+    cached_run = CachedRun(dssp_exec, outfiles=outfile, input_files=pdb_file, version_flag='--version')
+    if cached_run.needs_run(force_rerun):
+        # Run DSSP in the job pool so it is stopped at the time limit if it hangs on a structure
+        result = ssbio.io.jobs.run(dssp_command(dssp_exec, pdb_file), timeout=timeout)
+        if not result.ok or not result.stdout.strip():
+            log.error('{}: DSSP failed ({}) {}'.format(pdb_file, result.describe(), result.stderr.strip()))
             return pd.DataFrame()
 
-        # Reorganize the results into a csv file
-        appender = []
-        for k in dssp.property_keys:
-            to_append = []
-            x = dssp.property_dict[k]
-            chain = k[0]
-            residue = k[1]
-            het = residue[0]
-            resnum = residue[1]
-            icode = residue[2]
-            to_append.extend([chain, resnum, icode])
-            to_append.extend(x)
-            appender.append(to_append)
-
-        cols = ['chain', 'resnum', 'icode',
-                'dssp_index', 'aa', 'ss', 'exposure_rsa', 'phi', 'psi',
-                'NH_O_1_relidx', 'NH_O_1_energy', 'O_NH_1_relidx',
-                'O_NH_1_energy', 'NH_O_2_relidx', 'NH_O_2_energy',
-                'O_NH_2_relidx', 'O_NH_2_energy']
-
-        df = pd.DataFrame.from_records(appender, columns=cols)
+        dssp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.dssp', delete=False)
+        try:
+            with dssp_file:
+                dssp_file.write(result.stdout)
+            df = parse_dssp(model=model, dssp_file=dssp_file.name)
+        finally:
+            os.remove(dssp_file.name)
 
-        # Adding additional columns
-        df = df[df['aa'].isin(list(aa1))]
-        df['aa_three'] = df['aa'].apply(one_to_three)
-        df['max_acc'] = df['aa_three'].map(residue_max_acc['Sander'].get)
-        df[['exposure_rsa', 'max_acc']] = df[['exposure_rsa', 'max_acc']].astype(float)
-        df['exposure_asa'] = df['exposure_rsa'] * df['max_acc']
+        if df.empty:
+            return df
 
         df.to_csv(outfile)
+        cached_run.finish()
     else:
         log.debug('{}: already ran DSSP and force_rerun={}, loading results'.format(outfile, force_rerun))
         df = pd.read_csv(outfile, index_col=0)
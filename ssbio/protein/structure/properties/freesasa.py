@@ -1,8 +1,11 @@
-import subprocess
+import logging
+import ssbio.io.jobs
 import ssbio.utils
 import os
 import os.path as op
 from collections import OrderedDict
+from ssbio.io.resultcache import CachedRun
+log = logging.getLogger(__name__)
 
 
 def run_freesasa(infile, outfile, include_hetatms=True, outdir=None, force_rerun=False):
@@ -24,18 +27,19 @@ def run_freesasa(infile, outfile, include_hetatms=True, outdir=None, force_rerun
 
     outfile = op.join(outdir, outfile)
 
-    if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
+    cached_run = CachedRun('freesasa', outfiles=outfile, input_files=infile, args={'hetatm': include_hetatms},
+                           version_flag='--version')
+    if cached_run.needs_run(force_rerun):
         if op.exists(outfile):
             os.remove(outfile)
         if include_hetatms:
             shell_command = 'freesasa --format=rsa --hetatm {} -o {}'.format(infile, outfile)
         else:
             shell_command = 'freesasa --format=rsa {} -o {}'.format(infile, outfile)
-        command = subprocess.Popen(shell_command,
-                                   stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE,
-                                   shell=True)
-        out, err = command.communicate()
+        result = ssbio.io.jobs.run(shell_command)
+        if not result.ok:
+            log.error('{}: {}'.format(infile, result.describe()))
+        cached_run.finish()
 
     return outfile
 
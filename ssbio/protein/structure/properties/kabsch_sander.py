@@ -0,0 +1,427 @@
+"""
+Kabsch-Sander
+=============
+
+Secondary structure assignment calculated in process, as an alternative to running the DSSP executable through
+Biopython's ``DSSP`` module.
+
+This follows the DSSP definitions (Kabsch W, Sander C (1983) Biopolymers 22: 2577-2637) as implemented in DSSP 2.2:
+backbone hydrogen bond energies are calculated from the electrostatic model for all pairs of residues with alpha carbons
+closer than 9 Angstroms, each residue keeps its two strongest bonds as donor and acceptor, and bonds with energies
+below -0.5 kcal/mol define turns, helices (``H``, ``G``, ``I``), bridges and ladders (``B``, ``E``), hydrogen bonded
+turns (``T``) and bends (``S``). All steps work on NumPy arrays of backbone atoms, so any structure Biopython can parse
+(PDB, mmCIF, MMTF) can be used and non-standard amino acids such as selenomethionine are treated like any other residue.
+
+Accessible surface areas are calculated with :func:`ssbio.protein.structure.properties.sasa.shrake_rupley` using the
+DSSP atom radii, and results are reported in the same layout as
+:func:`ssbio.protein.structure.properties.dssp.get_dssp_df`.
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from Bio.PDB.DSSP import residue_max_acc
+from Bio.PDB.Polypeptide import is_aa, three_to_one
+from scipy.spatial import cKDTree
+
+import ssbio.protein.structure.properties.sasa as sasa
+from ssbio.protein.structure.properties.structure_arrays import StructureArrays
+
+log = logging.getLogger(__name__)
+
+
+MIN_CA_DISTANCE = 9.0
+"""float: Maximum distance between alpha carbons of residues to calculate hydrogen bond energies for"""
+
+MAX_HBOND_ENERGY = -0.5
+"""float: Maximum energy of a hydrogen bond, in kcal/mol"""
+
+MIN_HBOND_ENERGY = -9.9
+"""float: Minimum energy of a hydrogen bond, in kcal/mol"""
+
+MAX_PEPTIDE_BOND_LENGTH = 2.5
+"""float: Maximum distance between C and N atoms of consecutive residues before the chain is considered broken"""
+
+# Electrostatic model of q1 * q2 * f with partial charges 0.42e and 0.20e, and f = 332 kcal * Angstrom / mol
+_COUPLING_CONSTANT = 0.42 * 0.20 * 332
+_MIN_DISTANCE = 0.5
+
+_DSSP_RADII = {'N': 1.65, 'CA': 1.87, 'C': 1.76, 'O': 1.4}
+_DSSP_SIDE_CHAIN_RADIUS = 1.8
+
+_BACKBONE = ['N', 'CA', 'C', 'O']
+
+
+def hbond_energies(donor_n, donor_h, acceptor_c, acceptor_o):
+    """Calculate the energies of backbone N-H --> O=C hydrogen bonds.
+
+    Args:
+        donor_n (ndarray): Coordinates of the donor N atoms, shape ``(n_bonds, 3)``
+        donor_h (ndarray): Coordinates of the donor H atoms
+        acceptor_c (ndarray): Coordinates of the acceptor C atoms
+        acceptor_o (ndarray): Coordinates of the acceptor O atoms
+
+    Returns:
+        ndarray: Energy of each bond, in kcal/mol, rounded to 0.001 and at least -9.9
+
+    """
+    r_on = np.linalg.norm(acceptor_o - donor_n, axis=-1)
+    r_ch = np.linalg.norm(acceptor_c - donor_h, axis=-1)
+    r_oh = np.linalg.norm(acceptor_o - donor_h, axis=-1)
+    r_cn = np.linalg.norm(acceptor_c - donor_n, axis=-1)
+
+    too_close = (r_on < _MIN_DISTANCE) | (r_ch < _MIN_DISTANCE) | (r_oh < _MIN_DISTANCE) | (r_cn < _MIN_DISTANCE)
+    with np.errstate(divide='ignore'):
+        energies = _COUPLING_CONSTANT * (1 / r_on + 1 / r_ch - 1 / r_oh - 1 / r_cn)
+    # Round half away from zero, as DSSP does
+    energies = np.sign(energies) * np.floor(np.abs(energies) * 1000 + 0.5) / 1000
+    energies[too_close] = MIN_HBOND_ENERGY
+    return np.maximum(energies, MIN_HBOND_ENERGY)
+
+
+def _dihedrals(p0, p1, p2, p3):
+    """Dihedral angles in degrees of rows of four points."""
+    b0 = p0 - p1
+    b1 = p2 - p1
+    b2 = p3 - p2
+    b1 = b1 / np.linalg.norm(b1, axis=-1)[:, None]
+    v = b0 - np.sum(b0 * b1, axis=-1)[:, None] * b1
+    w = b2 - np.sum(b2 * b1, axis=-1)[:, None] * b1
+    x = np.sum(v * w, axis=-1)
+    y = np.sum(np.cross(b1, v) * w, axis=-1)
+    return np.degrees(np.arctan2(y, x))
+
+
+def _best_two(keys, partners, energies, n):
+    """For each of ``n`` residues, get the two partners with the lowest negative energy."""
+    best_partners = np.full((n, 2), -1, dtype=np.int64)
+    best_energies = np.zeros((n, 2))
+
+    keep = energies < 0
+    keys, partners, energies = keys[keep], partners[keep], energies[keep]
+    order = np.lexsort((energies, keys))
+    keys, partners, energies = keys[order], partners[order], energies[order]
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], dtype=np.int64)
+    rank = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+    top = rank < 2
+    best_partners[keys[top], rank[top]] = partners[top]
+    best_energies[keys[top], rank[top]] = energies[top]
+    return best_partners, best_energies
+
+
+class _Backbone(object):
+
+    """Backbone atom arrays and hydrogen bonds of the residues with complete backbones."""
+
+    def __init__(self, n, ca, c, o, chain_ids, is_proline, ca_pairs=None):
+        self.n = n
+        self.ca = ca
+        self.c = c
+        self.o = o
+        self.size = len(n)
+
+        # A new segment starts at each chain and each missing peptide bond
+        breaks = np.ones(self.size, dtype=bool)
+        if self.size > 1:
+            peptide_bond = np.linalg.norm(n[1:] - c[:-1], axis=1)
+            breaks[1:] = (chain_ids[1:] != chain_ids[:-1]) | (peptide_bond > MAX_PEPTIDE_BOND_LENGTH)
+        self.segment = np.cumsum(breaks) - 1
+        # Residue numbers as in DSSP output, where each break takes up one number
+        self.number = np.arange(1, self.size + 1) + self.segment
+
+        # Amide hydrogens are placed along the bisector of the previous residue's C=O bond
+        self.h = n.copy()
+        follows = np.flatnonzero(~breaks)
+        co = c[follows - 1] - o[follows - 1]
+        self.h[follows] = n[follows] + co / np.linalg.norm(co, axis=1)[:, None]
+
+        self._calculate_hbonds(is_proline, ca_pairs)
+
+    def _calculate_hbonds(self, is_proline, pairs=None):
+        if pairs is None:
+            if self.size > 1:
+                pairs = cKDTree(self.ca).query_pairs(r=MIN_CA_DISTANCE, output_type='ndarray')
+            else:
+                pairs = np.zeros((0, 2), dtype=np.int64)
+        i, j = pairs[:, 0], pairs[:, 1]
+        close = np.linalg.norm(self.ca[i] - self.ca[j], axis=1) < MIN_CA_DISTANCE
+        i, j = i[close], j[close]
+
+        # Bonds from the N-H of a residue to the C=O of the residue just before it are not considered
+        not_next = j != i + 1
+        donors = np.concatenate([i, j[not_next]])
+        acceptors = np.concatenate([j, i[not_next]])
+        not_proline = ~is_proline[donors]
+        donors, acceptors = donors[not_proline], acceptors[not_proline]
+
+        energies = hbond_energies(self.n[donors], self.h[donors], self.c[acceptors], self.o[acceptors])
+        self.acceptor_partners, self.acceptor_energies = _best_two(donors, acceptors, energies, self.size)
+        self.donor_partners, self.donor_energies = _best_two(acceptors, donors, energies, self.size)
+
+    def no_break(self, a, b):
+        """If residues ``a`` to ``b`` are in the same unbroken segment, for arrays of indices."""
+        a = np.asarray(a)
+        b = np.asarray(b)
+        valid = (a >= 0) & (b >= 0) & (a < self.size) & (b < self.size)
+        result = np.zeros(np.broadcast(a, b).shape, dtype=bool)
+        result[valid] = self.segment[a[valid]] == self.segment[b[valid]]
+        return result
+
+    def test_bond(self, donor, acceptor):
+        """If the N-H of ``donor`` is hydrogen bonded to the C=O of ``acceptor``, for arrays of indices."""
+        donor = np.asarray(donor)
+        acceptor = np.asarray(acceptor)
+        valid = (donor >= 0) & (acceptor >= 0) & (donor < self.size) & (acceptor < self.size)
+        result = np.zeros(np.broadcast(donor, acceptor).shape, dtype=bool)
+        d = donor[valid]
+        a = acceptor[valid]
+        result[valid] = (((self.acceptor_partners[d, 0] == a) & (self.acceptor_energies[d, 0] < MAX_HBOND_ENERGY)) |
+                         ((self.acceptor_partners[d, 1] == a) & (self.acceptor_energies[d, 1] < MAX_HBOND_ENERGY)))
+        return result
+
+
+def _turns(backbone):
+    """Boolean arrays of n-turns starting at each residue, for n = 3, 4, 5."""
+    turns = {}
+    for stride in (3, 4, 5):
+        starts = np.arange(backbone.size)
+        turns[stride] = backbone.no_break(starts, starts + stride) & backbone.test_bond(starts + stride, starts)
+    return turns
+
+
+def _bridges(backbone, chain_ids):
+    """Beta bridges merged into ladders, as lists of ``(type, i residues, j residues)`` in DSSP order."""
+    n = backbone.size
+    bonded = np.flatnonzero(backbone.acceptor_energies.ravel() < MAX_HBOND_ENERGY)
+    donor = bonded // 2
+    acceptor = backbone.acceptor_partners.ravel()[bonded]
+
+    # Every bridge pattern includes at least one bond, so candidate pairs are found from the bonds
+    candidates = np.concatenate([np.stack([donor - 1, acceptor], axis=1),
+                                 np.stack([acceptor, donor - 1], axis=1),
+                                 np.stack([donor - 1, acceptor + 1], axis=1),
+                                 np.stack([acceptor + 1, donor - 1], axis=1),
+                                 np.stack([donor, acceptor], axis=1)])
+    candidates = np.sort(candidates, axis=1)
+    candidates = np.unique(candidates, axis=0) if len(candidates) else candidates.reshape(0, 2)
+    i, j = candidates[:, 0], candidates[:, 1]
+    possible = (i >= 1) & (i + 4 < n) & (j >= i + 3) & (j + 1 < n)
+    i, j = i[possible], j[possible]
+    possible = backbone.no_break(i - 1, i + 1) & backbone.no_break(j - 1, j + 1)
+    i, j = i[possible], j[possible]
+
+    test = backbone.test_bond
+    parallel = (test(i + 1, j) & test(j, i - 1)) | (test(j + 1, i) & test(i, j - 1))
+    antiparallel = ~parallel & ((test(i + 1, j - 1) & test(j + 1, i - 1)) | (test(j, i) & test(i, j)))
+
+    # Consecutive bridges form ladders
+    ladders = []
+    ladder_ends = {}
+    is_bridge = parallel | antiparallel
+    for bi, bj, is_parallel in zip(i[is_bridge], j[is_bridge], parallel[is_bridge]):
+        key = (is_parallel, bi, bj)
+        ix = ladder_ends.pop(key, None)
+        if ix is None:
+            ladders.append([is_parallel, [bi], [bj]])
+            ix = len(ladders) - 1
+        else:
+            ladders[ix][1].append(bi)
+            if is_parallel:
+                ladders[ix][2].append(bj)
+            else:
+                ladders[ix][2].insert(0, bj)
+        ladder_ends[(is_parallel, bi + 1, bj + 1 if is_parallel else ladders[ix][2][0] - 1)] = ix
+
+    # Ladders separated by a bulge are joined
+    ladders.sort(key=lambda x: (chain_ids[x[1][0]], x[1][0]))
+    a = 0
+    while a < len(ladders):
+        b = a + 1
+        while b < len(ladders):
+            is_parallel, i_a, j_a = ladders[a]
+            i_b, j_b = ladders[b][1], ladders[b][2]
+            ibi, iei, jbi, jei = i_a[0], i_a[-1], j_a[0], j_a[-1]
+            ibj, iej, jbj, jej = i_b[0], i_b[-1], j_b[0], j_b[-1]
+            if chain_ids[ibj] != chain_ids[ibi] or ibj - iei >= 6:
+                break
+            if (ladders[b][0] != is_parallel or
+                    not backbone.no_break(min(ibi, ibj), max(iei, iej)) or
+                    not backbone.no_break(min(jbi, jbj), max(jei, jej)) or
+                    (iei >= ibj and ibi <= iej)):
+                b += 1
+                continue
+            # The gap on the j side must be positive
+            gap = jbj - jei if is_parallel else jbi - jej
+            bulge = 0 <= gap and ((gap < 6 and ibj - iei < 3) or gap < 3)
+            if bulge:
+                i_a.extend(i_b)
+                if is_parallel:
+                    j_a.extend(j_b)
+                else:
+                    j_a[:0] = j_b
+                del ladders[b]
+            else:
+                b += 1
+        a += 1
+
+    return ladders
+
+
+def _assign(backbone, chain_ids):
+    """Secondary structure code of each residue with a complete backbone."""
+    n = backbone.size
+    ss = np.full(n, ' ', dtype='U1')
+    index = np.arange(n)
+
+    # Bridges and strands
+    for is_parallel, i, j in _bridges(backbone, chain_ids):
+        code = 'E' if len(i) > 1 else 'B'
+        for first, last in ((i[0], i[-1]), (j[0], j[-1])):
+            span = ss[first:last + 1]
+            span[span != 'E'] = code
+
+    # Helices, from two consecutive n-turns
+    turns = _turns(backbone)
+    starts = {stride: turns[stride] & np.r_[False, turns[stride][:-1]] for stride in (3, 4, 5)}
+
+    alpha = index[starts[4] & (index >= 1) & (index + 4 < n)]
+    if len(alpha):
+        ss[(alpha[:, None] + np.arange(4)).ravel()] = 'H'
+
+    for stride, code, allowed in ((3, 'G', (' ', 'G')), (5, 'I', (' ', 'I', 'H'))):
+        helix = index[starts[stride] & (index >= 1) & (index + stride < n)]
+        if not len(helix):
+            continue
+        span = (helix[:, None] + np.arange(stride)).ravel()
+        empty = np.isin(ss[span], allowed).reshape(-1, stride).all(axis=1)
+        ss[(helix[empty][:, None] + np.arange(stride)).ravel()] = code
+
+    # Hydrogen bonded turns and bends
+    in_turn = np.zeros(n, dtype=bool)
+    for stride in (3, 4, 5):
+        for k in range(1, stride):
+            in_turn[k:] |= turns[stride][:n - k]
+
+    bend = np.zeros(n, dtype=bool)
+    middle = index[(index >= 2) & (index + 2 < n)]
+    middle = middle[backbone.no_break(middle - 2, middle + 2)]
+    before = backbone.ca[middle] - backbone.ca[middle - 2]
+    after = backbone.ca[middle + 2] - backbone.ca[middle]
+    cos_kappa = np.sum(before * after, axis=1) / (np.linalg.norm(before, axis=1) * np.linalg.norm(after, axis=1))
+    bend[middle] = np.degrees(np.arccos(np.clip(cos_kappa, -1, 1))) > 70
+
+    loop = (ss == ' ') & (index >= 1) & (index + 1 < n)
+    ss[loop & in_turn] = 'T'
+    ss[loop & ~in_turn & bend] = 'S'
+    return ss
+
+
+def get_secondary_structure_df(model, n_points=200, arrays=None):
+    """Assign secondary structure to residues in a Biopython Model, without running DSSP.
+
+    Secondary structure codes are ``H`` (alpha helix), ``B`` (isolated beta bridge), ``E`` (strand), ``G`` (3-10
+    helix), ``I`` (pi helix), ``T`` (hydrogen bonded turn), ``S`` (bend) and ``-`` (loop). Residues without a complete
+    backbone are not part of any bond, and are reported as loops with undefined angles and a ``dssp_index`` of 0.
+
+    Args:
+        model (Model): Biopython Structure Model
+        n_points (int): Number of test points per atom for accessible surface areas
+        arrays (StructureArrays): Atom arrays of the model, if already extracted
+
+    Returns:
+        DataFrame: Results with the same columns as :func:`ssbio.protein.structure.properties.dssp.get_dssp_df`, for
+        each standard amino acid residue. Angles are in degrees, 360 when undefined, ``exposure_rsa`` is the fraction
+        of the maximum accessibility (Sander) and hydrogen bond columns give the offset to the partner residue and the
+        bond energy in kcal/mol.
+
+    """
+    cols = ['chain', 'resnum', 'icode',
+            'dssp_index', 'aa', 'ss', 'exposure_rsa', 'phi', 'psi',
+            'NH_O_1_relidx', 'NH_O_1_energy', 'O_NH_1_relidx',
+            'O_NH_1_energy', 'NH_O_2_relidx', 'NH_O_2_energy',
+            'O_NH_2_relidx', 'O_NH_2_energy',
+            'aa_three', 'max_acc', 'exposure_asa']
+
+    if arrays is None:
+        arrays = StructureArrays(model)
+
+    residue_ids = np.flatnonzero(arrays.is_aa)
+    if not len(residue_ids):
+        return pd.DataFrame(columns=cols)
+    residues = [arrays.residues[r] for r in residue_ids]
+
+    backbone_atoms = np.column_stack([arrays.residue_atoms(a)[residue_ids] for a in _BACKBONE])
+    backbone_residues = np.flatnonzero((backbone_atoms >= 0).all(axis=1))
+    backbone_atoms = backbone_atoms[backbone_residues]
+
+    # Secondary structure and angles of residues with complete backbones
+    num_residues = len(residues)
+    ss = np.full(num_residues, '-', dtype='U1')
+    phi = np.full(num_residues, 360.0)
+    psi = np.full(num_residues, 360.0)
+    dssp_index = np.zeros(num_residues, dtype=np.int64)
+    hbond_relidx = np.zeros((num_residues, 4), dtype=np.int64)
+    hbond_energy = np.zeros((num_residues, 4))
+
+    if len(backbone_residues):
+        coords = arrays.coords[backbone_atoms]
+        chain_ids = arrays.chain_ids[residue_ids[backbone_residues]]
+        is_proline = arrays.res_names[residue_ids[backbone_residues]] == 'PRO'
+        ca_pairs = arrays.atom_pairs(MIN_CA_DISTANCE, atoms=backbone_atoms[:, 1], atom_name='CA')
+        backbone = _Backbone(coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3], chain_ids, is_proline,
+                             ca_pairs=ca_pairs)
+
+        assigned = _assign(backbone, chain_ids)
+        assigned[assigned == ' '] = '-'
+        ss[backbone_residues] = assigned
+        dssp_index[backbone_residues] = backbone.number
+
+        index = np.arange(backbone.size)
+        has_phi = index[backbone.no_break(index - 1, index)]
+        phi[backbone_residues[has_phi]] = _dihedrals(backbone.c[has_phi - 1], backbone.n[has_phi],
+                                                     backbone.ca[has_phi], backbone.c[has_phi])
+        has_psi = index[backbone.no_break(index, index + 1)]
+        psi[backbone_residues[has_psi]] = _dihedrals(backbone.n[has_psi], backbone.ca[has_psi],
+                                                     backbone.c[has_psi], backbone.n[has_psi + 1])
+
+        # Columns are ordered as N-H-->O 1, O-->H-N 1, N-H-->O 2, O-->H-N 2
+        for col, (partners, energies) in enumerate([(backbone.acceptor_partners, backbone.acceptor_energies),
+                                                    (backbone.donor_partners, backbone.donor_energies)]):
+            for rank in (0, 1):
+                found = partners[:, rank] >= 0
+                relidx = np.zeros(backbone.size, dtype=np.int64)
+                relidx[found] = backbone.number[partners[found, rank]] - backbone.number[found]
+                hbond_relidx[backbone_residues, 2 * rank + col] = relidx
+                hbond_energy[backbone_residues, 2 * rank + col] = energies[:, rank]
+
+    # Accessible surface areas with the DSSP radii
+    atoms = np.flatnonzero(arrays.is_aa[arrays.atom_residues])
+    result_index = np.full(arrays.num_residues, -1, dtype=np.int64)
+    result_index[residue_ids] = np.arange(num_residues)
+    radii = np.array([_DSSP_RADII.get(name, _DSSP_SIDE_CHAIN_RADIUS) for name in arrays.atom_names[atoms]])
+    atom_coords = arrays.coords[atoms]
+    if len(atoms):
+        candidates = arrays.atom_pairs(2 * (radii.max() + sasa.PROBE_RADIUS), atoms=atoms)
+        pairs = sasa.neighbor_pairs(atom_coords, radii + sasa.PROBE_RADIUS, candidates=candidates)
+    else:
+        pairs = None
+    atom_areas = sasa.shrake_rupley(atom_coords, radii, probe_radius=sasa.PROBE_RADIUS, n_points=n_points,
+                                    pairs=pairs)
+    asa = np.bincount(result_index[arrays.atom_residues[atoms]], weights=atom_areas, minlength=num_residues)
+
+    records = []
+    for ix, (chain_id, res) in enumerate(residues):
+        if not is_aa(res, standard=True):
+            continue
+        aa_three = res.get_resname()
+        max_acc = residue_max_acc['Sander'][aa_three]
+        records.append([chain_id, res.id[1], res.id[2],
+                        dssp_index[ix], three_to_one(aa_three), ss[ix], asa[ix] / max_acc, phi[ix], psi[ix],
+                        hbond_relidx[ix, 0], hbond_energy[ix, 0], hbond_relidx[ix, 1], hbond_energy[ix, 1],
+                        hbond_relidx[ix, 2], hbond_energy[ix, 2], hbond_relidx[ix, 3], hbond_energy[ix, 3],
+                        aa_three, float(max_acc), asa[ix]])
+
+    return pd.DataFrame.from_records(records, columns=cols)
@@ -6,6 +6,7 @@ from Bio import PDB
 from tqdm import tqdm
 
 import ssbio.utils
+from ssbio.io.resultcache import CachedRun, model_fingerprint
 from ssbio.protein.structure.utils.structureio import StructureIO
 
 log = logging.getLogger(__name__)
@@ -36,7 +37,10 @@ def get_msms_df(model, pdb_id, outfile=None, outdir=None, outext='_msms.df', for
     # Create the output file name
     outfile = ssbio.utils.outfile_maker(inname=pdb_id, outname=outfile, outdir=outdir, outext=outext)
 
-    if ssbio.utils.force_rerun(flag=force_rerun, outfile=outfile):
+    # MSMS runs on the atoms of the model, which identify the run in the result cache
+    cached_run = CachedRun('msms', outfiles=outfile, input_data=lambda: model_fingerprint(model),
+                           version_flag=None)
+    if cached_run.needs_run(force_rerun):
         # Run MSMS with Biopython
         try:
             rd = PDB.ResidueDepth(model)
@@ -59,6 +63,7 @@ def get_msms_df(model, pdb_id, outfile=None, outdir=None, outext='_msms.df', for
 
         df = pd.DataFrame.from_records(appender, columns=['chain', 'resnum', 'icode', 'res_depth', 'ca_depth'])
         df.to_csv(outfile)
+        cached_run.finish()
     else:
         log.debug('{}: already ran MSMS and force_rerun={}, loading results'.format(outfile, force_rerun))
         df = pd.read_csv(outfile, index_col=0)
@@ -5,15 +5,17 @@ Structure Residues
 
 import logging
 from collections import defaultdict
-from copy import deepcopy
 
+import numpy as np
+import pandas as pd
 from Bio.Alphabet import IUPAC
 from Bio.PDB import Polypeptide
-from Bio.PDB.HSExposure import ExposureCN, HSExposureCA, HSExposureCB
 from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
 import ssbio.protein.sequence.utils
+import ssbio.protein.sequence.utils.letter_annotations
+from ssbio.protein.structure.properties.structure_arrays import StructureArrays
 from ssbio.protein.structure.utils.structureio import StructureIO
 
 log = logging.getLogger(__name__)
@@ -166,6 +168,7 @@ def get_structure_seqrecords(model):
                 continue
 
         chain_seq_record = SeqRecord(Seq(chain_seq, IUPAC.protein), id=chain.get_id())
+        ssbio.protein.sequence.utils.letter_annotations.use_residue_annotations(chain_seq_record)
         chain_seq_record.letter_annotations['structure_resnums'] = chain_resnums
         structure_seq_records.append(chain_seq_record)
 
@@ -236,7 +239,27 @@ def get_structure_seqs(pdb_file, file_type):
     return structure_seqs
 
 
-def match_structure_sequence(orig_seq, new_seq, match='X', fill_with='X', ignore_excess=False):
+def structure_sequence_positions(orig_seq, match='X'):
+    """Get the positions in a structure sequence which are not filled in, to reuse when matching many property lists
+    to the same sequence with :func:`match_structure_sequence`.
+
+    Examples:
+        >>> structure_sequence_positions('AXBXCXD')
+        [0, 2, 4, 6]
+
+    Args:
+        orig_seq (str, Seq, SeqRecord): Sequence to match to
+        match (str): Character which marks filled in positions
+
+    Returns:
+        list: Indices of orig_seq which are not the match character
+
+    """
+    orig_seq = ssbio.protein.sequence.utils.cast_to_str(orig_seq)
+    return [i for i, s in enumerate(orig_seq) if s != match]
+
+
+def match_structure_sequence(orig_seq, new_seq, match='X', fill_with='X', ignore_excess=False, positions=None):
     """Correct a sequence to match inserted X's in a structure sequence
 
     This is useful for mapping a sequence obtained from structural tools like MSMS or DSSP
@@ -272,6 +295,8 @@ def match_structure_sequence(orig_seq, new_seq, match='X', fill_with='X', ignore
         match (str): What to match
         fill_with: What to fill in when matches are found
         ignore_excess (bool): If excess sequence on the tail end of new_seq should be ignored
+        positions (list): Indices of orig_seq which are not the match character, from
+            :func:`structure_sequence_positions`. Calculated if not provided.
 
     Returns:
         str, tuple, list: new_seq which will match the length of orig_seq
@@ -290,21 +315,23 @@ def match_structure_sequence(orig_seq, new_seq, match='X', fill_with='X', ignore
     if not isinstance(new_seq, str) and not isinstance(new_seq, tuple) and not isinstance(new_seq, list):
         raise ValueError('Invalid sequence provided, must be string, tuple, or list')
 
-    orig_seq = ssbio.protein.sequence.utils.cast_to_str(orig_seq)
-    new_thing = deepcopy(new_seq)
-    if isinstance(new_seq, tuple):
-        new_thing = list(new_thing)
+    if positions is None:
+        positions = structure_sequence_positions(orig_seq, match=match)
 
-    for i, s in enumerate(orig_seq):
-        if s == match:
-            if isinstance(new_thing, str):
-                new_thing = new_thing[:i] + fill_with + new_thing[i:]
-            if isinstance(new_thing, list):
-                new_thing.insert(i, fill_with)
+    # Scatter the new values into the positions which are not filled in
+    new_thing = [fill_with] * len(orig_seq)
+    for i, v in zip(positions, new_seq):
+        new_thing[i] = v
 
-    new_thing = new_thing[:len(orig_seq)]
+    # If there are fewer values than positions, the unfilled positions are left out
+    num_values = min(len(new_seq), len(positions))
+    if num_values < len(positions):
+        unfilled = set(positions[num_values:])
+        new_thing = [v for i, v in enumerate(new_thing) if i not in unfilled]
 
-    if isinstance(new_seq, tuple):
+    if isinstance(new_seq, str):
+        new_thing = ''.join(new_thing)
+    elif isinstance(new_seq, tuple):
         new_thing = tuple(new_thing)
 
     return new_thing
@@ -339,38 +366,131 @@ def distance_to_site(residue_of_interest, residues, model):
     pass
 
 
-# TODO: half sphere exposure
-def hse_output(pdb_file, file_type):
-    """
-    The solvent exposure of an amino acid residue is important for analyzing,
-    understanding and predicting aspects of protein structure and function [73].
-    A residue's solvent exposure can be classified as four categories: exposed, partly exposed,
-    buried and deeply buried residues. Hamelryck  et al. [73] established a new 2D measure that provides a
-    different view of solvent exposure, i.e. half-sphere exposure (HSE). By conceptually dividing the sphere
-    of a residue into two halves- HSE-up and HSE-down, HSE provides a more detailed description of an amino
-    acid residue's spatial neighborhood. HSE is calculated by the hsexpo module implemented in the BioPython
-    package [74] from a PDB file.
+def _rotate(vectors, axes, theta):
+    """Rotate rows of vectors by an angle (in radians) around rows of axes, with Rodrigues' formula."""
+    axes = axes / np.linalg.norm(axes, axis=1)[:, None]
+    cos = np.cos(theta)
+    sin = np.sin(theta)
+    return (vectors * cos + np.cross(axes, vectors) * sin +
+            axes * np.sum(axes * vectors, axis=1)[:, None] * (1 - cos))
+
+
+def get_hse_df(model, radius=12.0, offset=0, method='cb', arrays=None):
+    """Calculate the half sphere exposure (HSE) and contact number (CN) of residues in a Biopython Model.
+
+    The solvent exposure of an amino acid residue is important for analyzing, understanding and predicting aspects of
+    protein structure and function. Hamelryck established a 2D measure of exposure, half sphere exposure, by
+    conceptually dividing the sphere around a residue's alpha carbon into two halves, HSE-up (in the direction of the
+    side chain) and HSE-down, and counting the alpha carbons in each half. The contact number is the total count.
+
+    Values are the same as Biopython's ``HSExposureCB`` (or ``HSExposureCA``) and ``ExposureCN``, which loop over
+    every pair of residues, but are counted here for all residues at once from the pairs of alpha carbons found with
+    a KD-tree.
 
     http://onlinelibrary.wiley.com/doi/10.1002/prot.20379/abstract
 
     Args:
-        pdb_file:
+        model (Model): Biopython Structure Model
+        radius (float): Radius of the sphere around each alpha carbon, in Angstroms
+        offset (int): Number of flanking residues in the same peptide which are not counted
+        method (str): ``cb`` to split the sphere with the CA-CB vector (HSE-beta, with a pseudo CB for glycines), or
+            ``ca`` to use the direction from the two flanking alpha carbons (HSE-alpha)
+        arrays (StructureArrays): Atom arrays of the model, if already extracted
 
     Returns:
+        DataFrame: Counts with the columns ``chain``, ``resnum``, ``icode``, ``hse_up``, ``hse_down`` and ``cn`` for
+        each standard amino acid residue, NaN when a value can't be calculated (ie. a residue is missing atoms)
+
+    """
+    if method not in ['cb', 'ca']:
+        raise ValueError('{}: method must be "cb" or "ca"'.format(method))
+
+    cols = ['chain', 'resnum', 'icode', 'hse_up', 'hse_down', 'cn']
+
+    if arrays is None:
+        arrays = StructureArrays(model)
+
+    residue_ids = np.flatnonzero(arrays.is_standard_aa)
+    if not len(residue_ids):
+        return pd.DataFrame(columns=cols)
+
+    residues = [(arrays.chain_ids[r], arrays.residues[r][1].id[1], arrays.residues[r][1].id[2]) for r in residue_ids]
+    ca_atoms = arrays.residue_atoms('CA')[residue_ids]
+    ca = arrays.residue_coords('CA')[residue_ids]
+    chains = arrays.chain_ids[residue_ids]
+    has_ca = ca_atoms >= 0
+
+    # Peptides are runs of residues in a chain with alpha carbons closer than 4.3 Angstroms, as with CaPPBuilder
+    connected = np.zeros(len(residues), dtype=bool)
+    if len(residues) > 1:
+        with np.errstate(invalid='ignore'):
+            connected[1:] = ((chains[1:] == chains[:-1]) & has_ca[1:] & has_ca[:-1] &
+                             (np.linalg.norm(ca[1:] - ca[:-1], axis=1) < 4.3))
+    peptide = np.cumsum(~connected)
+    position = np.arange(len(residues))
+
+    # Direction of the upper half sphere
+    if method == 'cb':
+        up = arrays.residue_coords('CB')[residue_ids] - ca
+        n = arrays.residue_coords('N')[residue_ids]
+        c = arrays.residue_coords('C')[residue_ids]
+        gly = (arrays.res_names[residue_ids] == 'GLY') & has_ca & ~np.isnan(n).any(axis=1) & ~np.isnan(c).any(axis=1)
+        # The pseudo CB of glycine is N rotated by -120 degrees around the CA-C axis
+        up[gly] = _rotate(n[gly] - ca[gly], c[gly] - ca[gly], -np.pi * 120.0 / 180.0)
+    else:
+        up = np.full_like(ca, np.nan)
+        middle = np.flatnonzero(connected[:-1] & connected[1:])
+        if len(middle):
+            d1 = ca[middle] - ca[middle - 1]
+            d3 = ca[middle] - ca[middle + 1]
+            up[middle] = (d1 / np.linalg.norm(d1, axis=1)[:, None] +
+                          d3 / np.linalg.norm(d3, axis=1)[:, None])
+    has_up = has_ca & ~np.isnan(up).any(axis=1)
+
+    # Count the alpha carbons around each alpha carbon, in both directions of each pair
+    ca_index = np.flatnonzero(has_ca)
+    pairs = arrays.atom_pairs(radius, atoms=ca_atoms[ca_index], atom_name='CA')
+    i = np.concatenate([ca_index[pairs[:, 0]], ca_index[pairs[:, 1]]])
+    j = np.concatenate([ca_index[pairs[:, 1]], ca_index[pairs[:, 0]]])
+    d = ca[j] - ca[i]
+    keep = np.linalg.norm(d, axis=1) < radius
+    keep &= ~((peptide[i] == peptide[j]) & (np.abs(position[i] - position[j]) <= offset))
+    i, j, d = i[keep], j[keep], d[keep]
+
+    cn = np.bincount(i, minlength=len(residues)).astype(float)
+    is_up = np.sum(d * up[i], axis=1) > 0
+    hse_up = np.bincount(i[is_up], minlength=len(residues)).astype(float)
+    hse_down = np.bincount(i[~is_up], minlength=len(residues)).astype(float)
+
+    cn[~has_ca] = np.nan
+    hse_up[~has_up] = np.nan
+    hse_down[~has_up] = np.nan
+
+    df = pd.DataFrame.from_records(residues, columns=['chain', 'resnum', 'icode'])
+    df['hse_up'] = hse_up
+    df['hse_down'] = hse_down
+    df['cn'] = cn
+    return df[cols]
+
+
+def hse_output(pdb_file, file_type=None):
+    """Calculate the half sphere exposure (HSE) and contact number (CN) of residues in the first model of a
+    structure file. See :func:`get_hse_df`.
+
+    Args:
+        pdb_file (str): Path to structure file
+        file_type (str): Type of structure file, guessed from the extension if not provided
+
+    Returns:
+        DataFrame: Counts with the columns ``chain``, ``resnum``, ``icode``, ``hse_up``, ``hse_down`` and ``cn``
 
     """
     # Get the first model
-    my_structure = StructureIO(pdb_file)
+    my_structure = StructureIO(pdb_file, file_type=file_type)
     model = my_structure.first_model
+    return get_hse_df(model)
 
-    # Calculate HSEalpha
-    exp_ca = HSExposureCA(model)
-    # Calculate HSEbeta
-    exp_cb = HSExposureCB(model)
-    # Calculate classical coordination number
-    exp_fs = ExposureCN(model)
 
-    return
 # def magni(a, b, c):
 #     """Calculate the magnitude of distance vector
 #     """
@@ -0,0 +1,434 @@
+"""
+SASA
+====
+
+Solvent accessible surface area (SASA) of protein structures, calculated in process with NumPy.
+
+Atoms are given the ProtOr radii used by default in `freesasa`_, and the accessible area of each atom is calculated
+with the Shrake-Rupley or Lee-Richards algorithm over a neighbor list built with a KD-tree. Per-residue results are
+reported in the same all atoms/side chain/main chain/non-polar/polar categories, with relative values to the same
+reference areas, as :func:`ssbio.protein.structure.properties.freesasa.parse_rsa_data`. No executable is run and no
+files are written, so any structure which can be parsed (PDB, mmCIF, MMTF) can be used.
+
+.. _freesasa: http://freesasa.github.io/
+
+"""
+
+import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from ssbio.protein.structure.properties.structure_arrays import StructureArrays
+
+log = logging.getLogger(__name__)
+
+PROBE_RADIUS = 1.4
+"""float: Radius of the solvent probe, in Angstroms"""
+
+# ProtOr radii (Tsai et al. 1999) for atoms of standard residues
+_BACKBONE_RADII = {'N': 1.64, 'CA': 1.88, 'C': 1.61, 'O': 1.42, 'OXT': 1.46}
+_C3H0 = {'ARG': ['CZ'], 'ASN': ['CG'], 'ASP': ['CG'], 'GLN': ['CD'], 'GLU': ['CD'], 'HIS': ['CG'], 'PHE': ['CG'],
+         'TRP': ['CG', 'CD2', 'CE2'], 'TYR': ['CG', 'CZ']}
+_C3H1 = {'HIS': ['CD2', 'CE1'], 'PHE': ['CD1', 'CD2', 'CE1', 'CE2', 'CZ'],
+         'TRP': ['CD1', 'CE3', 'CZ2', 'CZ3', 'CH2'], 'TYR': ['CD1', 'CD2', 'CE1', 'CE2']}
+_O1H0 = {'ASN': ['OD1'], 'ASP': ['OD1'], 'GLN': ['OE1'], 'GLU': ['OE1']}
+_SIDE_CHAIN_RADII = {'C': 1.88, 'N': 1.64, 'O': 1.46, 'S': 1.77, 'SE': 1.90}
+
+# Van der Waals radii for atoms of other residues
+_ELEMENT_RADII = {'C': 1.70, 'N': 1.55, 'O': 1.52, 'S': 1.80, 'P': 1.80, 'SE': 1.90, 'F': 1.47, 'CL': 1.75,
+                  'BR': 1.85, 'I': 1.98}
+_DEFAULT_RADIUS = 1.80
+
+MAIN_CHAIN_ATOMS = frozenset(['N', 'CA', 'C', 'O', 'OXT'])
+"""frozenset: Names of main chain atoms"""
+
+POLAR_ELEMENTS = frozenset(['N', 'O', 'S'])
+"""frozenset: Elements of polar atoms"""
+
+SASA_CATEGORIES = ['all_atoms', 'side_chain', 'main_chain', 'non_polar', 'all_polar']
+"""list: Categories of atoms that per-residue areas are reported for"""
+
+residue_reference_sasa = {
+    'ALA': {'all_atoms': 108.76, 'side_chain': 64.80, 'main_chain': 43.96, 'non_polar': 71.01, 'all_polar': 37.75},
+    'ARG': {'all_atoms': 238.17, 'side_chain': 196.17, 'main_chain': 42.00, 'non_polar': 73.17, 'all_polar': 165.00},
+    'ASN': {'all_atoms': 145.01, 'side_chain': 103.48, 'main_chain': 41.53, 'non_polar': 41.55, 'all_polar': 103.46},
+    'ASP': {'all_atoms': 142.76, 'side_chain': 100.47, 'main_chain': 42.29, 'non_polar': 42.49, 'all_polar': 100.27},
+    'CYS': {'all_atoms': 132.20, 'side_chain': 89.66, 'main_chain': 42.55, 'non_polar': 39.47, 'all_polar': 92.74},
+    'GLN': {'all_atoms': 178.83, 'side_chain': 136.83, 'main_chain': 42.00, 'non_polar': 46.98, 'all_polar': 131.85},
+    'GLU': {'all_atoms': 174.18, 'side_chain': 132.18, 'main_chain': 42.00, 'non_polar': 51.70, 'all_polar': 122.48},
+    'GLY': {'all_atoms': 81.09, 'side_chain': 0.00, 'main_chain': 81.09, 'non_polar': 36.44, 'all_polar': 44.65},
+    'HIS': {'all_atoms': 182.97, 'side_chain': 143.87, 'main_chain': 39.09, 'non_polar': 97.03, 'all_polar': 85.94},
+    'ILE': {'all_atoms': 175.73, 'side_chain': 134.23, 'main_chain': 41.49, 'non_polar': 138.87, 'all_polar': 36.85},
+    'LEU': {'all_atoms': 179.56, 'side_chain': 139.78, 'main_chain': 39.78, 'non_polar': 142.39, 'all_polar': 37.16},
+    'LYS': {'all_atoms': 204.98, 'side_chain': 162.98, 'main_chain': 42.00, 'non_polar': 111.10, 'all_polar': 93.88},
+    'MET': {'all_atoms': 193.10, 'side_chain': 151.10, 'main_chain': 42.00, 'non_polar': 117.62, 'all_polar': 75.48},
+    'PHE': {'all_atoms': 199.88, 'side_chain': 161.45, 'main_chain': 38.43, 'non_polar': 164.94, 'all_polar': 34.94},
+    'PRO': {'all_atoms': 137.21, 'side_chain': 109.70, 'main_chain': 27.51, 'non_polar': 121.12, 'all_polar': 16.09},
+    'SER': {'all_atoms': 118.34, 'side_chain': 74.93, 'main_chain': 43.41, 'non_polar': 46.96, 'all_polar': 71.38},
+    'THR': {'all_atoms': 140.60, 'side_chain': 98.64, 'main_chain': 41.96, 'non_polar': 74.45, 'all_polar': 66.15},
+    'TRP': {'all_atoms': 249.19, 'side_chain': 206.60, 'main_chain': 42.59, 'non_polar': 187.55, 'all_polar': 61.64},
+    'TYR': {'all_atoms': 214.19, 'side_chain': 175.76, 'main_chain': 38.43, 'non_polar': 133.07, 'all_polar': 81.12},
+    'VAL': {'all_atoms': 151.97, 'side_chain': 110.46, 'main_chain': 41.50, 'non_polar': 115.09, 'all_polar': 36.87}}
+"""dict: ProtOr reference areas of residues in an Ala-X-Ala tripeptide, as used by freesasa for relative values"""
+
+
+def atom_radius(res_name, atom_name, element):
+    """Get the radius of an atom, ProtOr radii for standard residues and van der Waals radii for others.
+
+    Args:
+        res_name (str): Three letter residue name
+        atom_name (str): Atom name
+        element (str): Element of the atom
+
+    Returns:
+        float: Radius in Angstroms
+
+    """
+    element = element.upper()
+    if res_name in residue_reference_sasa:
+        if atom_name in _BACKBONE_RADII:
+            return _BACKBONE_RADII[atom_name]
+        if element == 'C':
+            if atom_name in _C3H0.get(res_name, []):
+                return 1.61
+            if atom_name in _C3H1.get(res_name, []):
+                return 1.76
+        if element == 'O' and atom_name in _O1H0.get(res_name, []):
+            return 1.42
+        if element in _SIDE_CHAIN_RADII:
+            return _SIDE_CHAIN_RADII[element]
+    return _ELEMENT_RADII.get(element, _DEFAULT_RADIUS)
+
+
+def sphere_points(n_points):
+    """Get points evenly distributed on a unit sphere, with the golden section spiral.
+
+    Args:
+        n_points (int): Number of points
+
+    Returns:
+        ndarray: Array of shape ``(n_points, 3)``
+
+    """
+    i = np.arange(n_points) + 0.5
+    z = 1 - 2 * i / n_points
+    r = np.sqrt(1 - z * z)
+    theta = np.pi * (3 - np.sqrt(5)) * i
+    return np.column_stack([r * np.cos(theta), r * np.sin(theta), z])
+
+
+def neighbor_pairs(coords, radii, candidates=None):
+    """Get all pairs of atoms whose spheres overlap.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Sphere radius of each atom (atom radius plus probe radius)
+        candidates (ndarray): Optional pairs of shape ``(n_pairs, 2)`` to test instead of searching a KD-tree, which
+            must include all pairs closer than twice the largest radius, ie. from
+            :meth:`ssbio.protein.structure.properties.structure_arrays.StructureArrays.atom_pairs`
+
+    Returns:
+        tuple: (i, j) - arrays of atom indices, containing each pair in both directions and sorted by i
+
+    """
+    if len(coords) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    if candidates is None:
+        pairs = cKDTree(coords).query_pairs(r=2 * radii.max(), output_type='ndarray')
+    else:
+        pairs = candidates
+    if not len(pairs):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    a, b = pairs[:, 0], pairs[:, 1]
+    overlap = np.sum((coords[a] - coords[b]) ** 2, axis=1) < (radii[a] + radii[b]) ** 2
+    a, b = a[overlap], b[overlap]
+    i = np.concatenate([a, b])
+    j = np.concatenate([b, a])
+    order = np.argsort(i, kind='mergesort')
+    return i[order], j[order]
+
+
+def _pair_blocks(i, max_pairs):
+    """Split pairs sorted by atom into blocks of about max_pairs, without splitting the pairs of one atom."""
+    bounds = np.r_[np.flatnonzero(np.r_[True, i[1:] != i[:-1]]), len(i)] if len(i) else np.zeros(1, dtype=np.int64)
+    p0 = 0
+    while p0 < len(i):
+        p1 = bounds[np.searchsorted(bounds, p0 + max_pairs, side='right') - 1]
+        if p1 <= p0:
+            # One atom has more than max_pairs pairs
+            p1 = bounds[np.searchsorted(bounds, p0, side='right')]
+        yield p0, p1
+        p0 = p1
+
+
+def exposed_points(coords, radii, probe_radius=PROBE_RADIUS, n_points=100, pairs=None):
+    """Find which test points on each atom's solvent accessible sphere are not inside any neighboring sphere.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Atom radii
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom, placed as in :func:`sphere_points`
+        pairs (tuple): Optional (i, j) neighbor pairs from :func:`neighbor_pairs`
+
+    Returns:
+        ndarray: Boolean array of shape ``(n_atoms, n_points)``
+
+    """
+    coords = np.asarray(coords, dtype=float)
+    sphere_radii = np.asarray(radii, dtype=float) + probe_radius
+    if pairs is None:
+        pairs = neighbor_pairs(coords, sphere_radii)
+    i, j = pairs
+
+    points = sphere_points(n_points)
+    exposed = np.ones((len(coords), n_points), dtype=bool)
+    for p0, p1 in _pair_blocks(i, max_pairs=max(1, 2000000 // n_points)):
+        bi, bj = i[p0:p1], j[p0:p1]
+        # A point at R_i * u on sphere i is inside sphere j if u . d > (R_i^2 + |d|^2 - R_j^2) / 2 R_i
+        delta = coords[bj] - coords[bi]
+        ri = sphere_radii[bi]
+        threshold = (ri ** 2 + np.sum(delta ** 2, axis=1) - sphere_radii[bj] ** 2) / (2 * ri)
+        inside = np.dot(delta, points.T) > threshold[:, None]
+        atom_starts = np.flatnonzero(np.r_[True, bi[1:] != bi[:-1]])
+        exposed[bi[atom_starts]] = ~np.logical_or.reduceat(inside, atom_starts, axis=0)
+
+    return exposed
+
+
+def shrake_rupley(coords, radii, probe_radius=PROBE_RADIUS, n_points=100, pairs=None):
+    """Calculate the solvent accessible surface area of atoms with the Shrake-Rupley algorithm.
+
+    Each atom's sphere is covered with test points, and the area is the fraction of points not inside any neighboring
+    sphere.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Atom radii
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom
+        pairs (tuple): Optional (i, j) neighbor pairs from :func:`neighbor_pairs`
+
+    Returns:
+        ndarray: Area of each atom, in square Angstroms
+
+    """
+    sphere_radii = np.asarray(radii, dtype=float) + probe_radius
+    exposed = exposed_points(coords, radii, probe_radius=probe_radius, n_points=n_points, pairs=pairs)
+    return 4 * np.pi * sphere_radii ** 2 * exposed.sum(axis=1) / float(n_points)
+
+
+def lee_richards(coords, radii, probe_radius=PROBE_RADIUS, n_slices=20, pairs=None):
+    """Calculate the solvent accessible surface area of atoms with the Lee-Richards algorithm.
+
+    Each atom's sphere is cut into slices along the z axis, and the area is summed from the exact length of the arcs
+    of each slice's circle which are not inside any neighboring sphere.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Atom radii
+        probe_radius (float): Radius of the solvent probe
+        n_slices (int): Number of slices per atom
+        pairs (tuple): Optional (i, j) neighbor pairs from :func:`neighbor_pairs`
+
+    Returns:
+        ndarray: Area of each atom, in square Angstroms
+
+    """
+    coords = np.asarray(coords, dtype=float)
+    sphere_radii = np.asarray(radii, dtype=float) + probe_radius
+    if pairs is None:
+        pairs = neighbor_pairs(coords, sphere_radii)
+    i, j = pairs
+
+    two_pi = 2 * np.pi
+    n_atoms = len(coords)
+    # Slice positions as a fraction of each atom's radius, from the bottom to the top of the sphere
+    fractions = -1 + (2 * np.arange(n_slices) + 1) / float(n_slices)
+    circle_fractions = np.sqrt(1 - fractions ** 2)
+
+    covered = np.zeros(n_atoms * n_slices)
+    for p0, p1 in _pair_blocks(i, max_pairs=max(1, 2000000 // n_slices)):
+        bi, bj = i[p0:p1], j[p0:p1]
+        ri, rj = sphere_radii[bi, None], sphere_radii[bj, None]
+        delta = coords[bj] - coords[bi]
+        xy_dist = np.hypot(delta[:, 0], delta[:, 1])[:, None]
+        # Radius of each slice's circle, and of the neighbor's sphere cut by the same plane
+        circle = ri * circle_fractions[None, :]
+        plane_z = ri * fractions[None, :] - delta[:, 2, None]
+        neighbor_circle_sq = rj ** 2 - plane_z ** 2
+        neighbor_circle = np.sqrt(np.clip(neighbor_circle_sq, 0, None))
+
+        cuts = neighbor_circle_sq > 0
+        full = cuts & (xy_dist + circle <= neighbor_circle)
+        arcs = cuts & ~full & (xy_dist < circle + neighbor_circle) & (xy_dist + neighbor_circle > circle)
+
+        groups = bi[:, None] * n_slices + np.arange(n_slices)[None, :]
+        full_groups = groups[full]
+
+        # Covered arc of the slice's circle, centered at the direction of the neighbor
+        row, col = np.nonzero(arcs)
+        d = xy_dist[row, 0]
+        c = circle[row, col]
+        half_width = np.arccos(np.clip((c ** 2 + d ** 2 - neighbor_circle[row, col] ** 2) / (2 * c * d), -1, 1))
+        start = np.mod(np.arctan2(delta[row, 1], delta[row, 0]) - half_width, two_pi)
+        end = start + 2 * half_width
+        arc_groups = groups[row, col]
+
+        # Split arcs which wrap around zero
+        wraps = end > two_pi
+        arc_groups = np.concatenate([arc_groups, arc_groups[wraps]])
+        start = np.concatenate([start, np.zeros(wraps.sum())])
+        end = np.concatenate([np.minimum(end, two_pi), end[wraps] - two_pi])
+
+        # Length of the union of arcs in each slice, offsetting slices so a running maximum does not cross them
+        offset = arc_groups * 2 * two_pi
+        start = start + offset
+        order = np.argsort(start)
+        arc_groups = arc_groups[order]
+        start = start[order]
+        end = end[order] + offset[order]
+        previous_end = np.r_[-np.inf, np.maximum.accumulate(end)[:-1]]
+        union = np.clip(end - np.maximum(start, previous_end), 0, None)
+        covered += np.bincount(arc_groups, weights=union, minlength=n_atoms * n_slices)
+        covered[full_groups] = two_pi
+
+    exposed = np.clip(two_pi - covered.reshape(n_atoms, n_slices), 0, None)
+    slice_width = 2 * sphere_radii / n_slices
+    return sphere_radii * slice_width * exposed.sum(axis=1)
+
+
+def atom_sasa(coords, radii, algorithm='shrake-rupley', probe_radius=PROBE_RADIUS, n_points=100, n_slices=20,
+              pairs=None):
+    """Calculate the solvent accessible surface area of atoms.
+
+    Args:
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        radii (ndarray): Atom radii
+        algorithm (str): ``shrake-rupley`` or ``lee-richards``
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom for Shrake-Rupley
+        n_slices (int): Number of slices per atom for Lee-Richards
+        pairs (tuple): Optional (i, j) neighbor pairs from :func:`neighbor_pairs`
+
+    Returns:
+        ndarray: Area of each atom, in square Angstroms
+
+    """
+    if algorithm == 'shrake-rupley':
+        return shrake_rupley(coords, radii, probe_radius=probe_radius, n_points=n_points, pairs=pairs)
+    elif algorithm == 'lee-richards':
+        return lee_richards(coords, radii, probe_radius=probe_radius, n_slices=n_slices, pairs=pairs)
+    else:
+        raise ValueError('{}: algorithm must be "shrake-rupley" or "lee-richards"'.format(algorithm))
+
+
+def structure_radii(arrays):
+    """Get the radius of each atom of a structure, with :func:`atom_radius`.
+
+    Args:
+        arrays (StructureArrays): Atom arrays of the structure
+
+    Returns:
+        ndarray: Radii in Angstroms, shared by all calculations on the same arrays
+
+    """
+    def calculate():
+        return np.array([atom_radius(arrays.res_names[r], name, element) for r, name, element in
+                         zip(arrays.atom_residues, arrays.atom_names, arrays.elements)], dtype=float)
+
+    return arrays.shared('protor_radii', calculate)
+
+
+def residue_sasa(structure, include_hetatms=False, ignore_hets=True, algorithm='shrake-rupley',
+                 probe_radius=PROBE_RADIUS, n_points=100, n_slices=20, arrays=None):
+    """Calculate per-residue solvent accessible surface areas of a structure.
+
+    Args:
+        structure (Structure, Model): Biopython Structure or Model, the first model of a Structure is used
+        include_hetatms (bool): If HETATMs (other than water) should be included in calculations
+        ignore_hets (bool): If residues without reference areas (ie. HETATMs) should be excluded from the results
+        algorithm (str): ``shrake-rupley`` or ``lee-richards``
+        probe_radius (float): Radius of the solvent probe
+        n_points (int): Number of test points per atom for Shrake-Rupley
+        n_slices (int): Number of slices per atom for Lee-Richards
+        arrays (StructureArrays): Atom arrays of the structure, if already extracted
+
+    Returns:
+        dict: Per-residue dictionary of SASA values in the format of
+        :func:`ssbio.protein.structure.properties.freesasa.parse_rsa_data`. Relative values are percentages, and Inf
+        where there is no reference area.
+
+    """
+    if arrays is None:
+        arrays = StructureArrays(structure)
+
+    results = OrderedDict()
+    selected = np.ones(arrays.num_atoms, dtype=bool)
+    if not include_hetatms:
+        selected &= arrays.hetflags[arrays.atom_residues] == ' '
+    atoms = np.flatnonzero(selected)
+    if not len(atoms):
+        return results
+
+    # Residues are numbered by their order in the selected atoms
+    residue_ids, residue_index = np.unique(arrays.atom_residues[atoms], return_inverse=True)
+    coords = arrays.coords[atoms]
+    radii = structure_radii(arrays)[atoms]
+    candidates = arrays.atom_pairs(2 * (radii.max() + probe_radius), atoms=atoms)
+    pairs = neighbor_pairs(coords, radii + probe_radius, candidates=candidates)
+    areas = atom_sasa(coords, radii, algorithm=algorithm, probe_radius=probe_radius, n_points=n_points,
+                      n_slices=n_slices, pairs=pairs)
+
+    main_chain = np.array([name in MAIN_CHAIN_ATOMS for name in arrays.atom_names[atoms]], dtype=bool)
+    polar = np.array([element in POLAR_ELEMENTS for element in arrays.elements[atoms]], dtype=bool)
+    masks = {'all_atoms': np.ones(len(atoms), dtype=bool),
+             'side_chain': ~main_chain,
+             'main_chain': main_chain,
+             'non_polar': ~polar,
+             'all_polar': polar}
+    totals = {k: np.bincount(residue_index, weights=np.where(m, areas, 0), minlength=len(residue_ids))
+              for k, m in masks.items()}
+
+    for r, res_ix in enumerate(residue_ids):
+        chain_id, res = arrays.residues[res_ix]
+        res_name = arrays.res_names[res_ix]
+        reference = residue_reference_sasa.get(res_name) if res.id[0] == ' ' else None
+        if not reference and ignore_hets:
+            continue
+        info = {'res_name': res_name}
+        for k in SASA_CATEGORIES:
+            info[k + '_abs'] = float(totals[k][r])
+            ref = reference.get(k) if reference else None
+            info[k + '_rel'] = 100 * info[k + '_abs'] / ref if ref else float('Inf')
+        results[(chain_id, (' ', res.id[1], res.id[2]))] = info
+
+    return results
+
+
+def batch_residue_sasa(structures, threads=1, **kwargs):
+    """Calculate per-residue solvent accessible surface areas of many structures.
+
+    Args:
+        structures (list): Biopython Structure or Model objects
+        threads (int): Number of threads to run calculations in. NumPy releases the GIL for most of the calculation.
+        **kwargs: Options for :func:`residue_sasa`
+
+    Returns:
+        list: Per-residue dictionaries of SASA values, in the order of structures
+
+    """
+    def calc(structure):
+        return residue_sasa(structure, **kwargs)
+
+    if threads and threads > 1 and len(structures) > 1:
+        pool = ThreadPool(processes=threads)
+        try:
+            return pool.map(calc, structures)
+        finally:
+            pool.close()
+            pool.join()
+    return [calc(s) for s in structures]
@@ -0,0 +1,182 @@
+"""
+Structure Arrays
+================
+
+Coordinates and atom/residue identifiers of a Biopython Model, extracted once into NumPy arrays so that several
+property calculators can share them.
+
+The in-process calculators (:mod:`~ssbio.protein.structure.properties.sasa`,
+:mod:`~ssbio.protein.structure.properties.depth`, :mod:`~ssbio.protein.structure.properties.kabsch_sander` and the half
+sphere exposure in :mod:`~ssbio.protein.structure.properties.residues`) all accept a :class:`StructureArrays` object.
+Neighbor lists found with a KD-tree are cached at the largest distance asked for and filtered for smaller ones, so a
+structure's atoms are only searched once no matter how many calculators use them. Caches are guarded by a lock, and
+calculators may run in separate threads on the same object.
+
+"""
+
+import logging
+import threading
+
+import numpy as np
+from Bio.PDB.Polypeptide import is_aa
+from scipy.spatial import cKDTree
+
+log = logging.getLogger(__name__)
+
+
+class StructureArrays(object):
+
+    """Atom coordinates and residue identifiers of a Biopython Model, with shared neighbor lists.
+
+    Waters and hydrogen (or deuterium) atoms are excluded. Residues are listed in the order of the model's chains,
+    including residues which have no heavy atoms.
+
+    Args:
+        model (Model): Biopython Structure Model, or a Structure, in which case its first model is used
+
+    Attributes:
+        residues (list): Tuples of (chain ID, Biopython Residue)
+        chain_ids (ndarray): Chain ID of each residue
+        res_names (ndarray): Three letter name of each residue
+        hetflags (ndarray): Hetero flag of each residue, ``' '`` for standard records
+        is_aa (ndarray): If each residue is an amino acid, including non-standard ones
+        is_standard_aa (ndarray): If each residue is one of the 20 standard amino acids
+        atoms (list): Biopython Atom objects
+        coords (ndarray): Atom coordinates, shape ``(n_atoms, 3)``
+        atom_residues (ndarray): Index in ``residues`` of each atom
+        atom_names (ndarray): Name of each atom
+        elements (ndarray): Upper case element of each atom
+
+    """
+
+    def __init__(self, model):
+        if model.level == 'S':
+            model = model.child_list[0]
+        self.model = model
+
+        self.residues = []
+        self.atoms = []
+        atom_residues = []
+        for chain in model:
+            for res in chain:
+                if res.id[0] == 'W':
+                    continue
+                res_atoms = [a for a in res if a.element not in ('H', 'D')]
+                atom_residues.extend([len(self.residues)] * len(res_atoms))
+                self.residues.append((chain.id, res))
+                self.atoms.extend(res_atoms)
+
+        self.chain_ids = np.array([chain_id for chain_id, _ in self.residues], dtype=object)
+        self.res_names = np.array([res.get_resname() for _, res in self.residues], dtype=object)
+        self.hetflags = np.array([res.id[0] for _, res in self.residues], dtype=object)
+        self.is_aa = np.array([is_aa(res) for _, res in self.residues], dtype=bool)
+        self.is_standard_aa = np.array([is_aa(res, standard=True) for _, res in self.residues], dtype=bool)
+
+        self.coords = np.array([a.get_coord() for a in self.atoms], dtype=float).reshape(-1, 3)
+        self.atom_residues = np.array(atom_residues, dtype=np.int64)
+        self.atom_names = np.array([a.get_id() for a in self.atoms], dtype=object)
+        self.elements = np.array([a.element.upper() for a in self.atoms], dtype=object)
+
+        self._lock = threading.RLock()
+        self._shared = {}
+        self._pairs = {}
+
+    @property
+    def num_residues(self):
+        return len(self.residues)
+
+    @property
+    def num_atoms(self):
+        return len(self.atoms)
+
+    def shared(self, key, calculate):
+        """Get a value shared between calculators, calculating it on first use.
+
+        Args:
+            key (str): Name of the value
+            calculate (function): Function with no arguments that returns the value
+
+        Returns:
+            object: The stored value
+
+        """
+        with self._lock:
+            if key not in self._shared:
+                self._shared[key] = calculate()
+            return self._shared[key]
+
+    def residue_atoms(self, atom_name):
+        """Get the index of a named atom in each residue.
+
+        Args:
+            atom_name (str): Atom name, ie. ``CA``
+
+        Returns:
+            ndarray: Atom index of each residue, -1 for residues without the atom
+
+        """
+        def calculate():
+            ix = np.full(self.num_residues, -1, dtype=np.int64)
+            atoms = np.flatnonzero(self.atom_names == atom_name)
+            ix[self.atom_residues[atoms]] = atoms
+            return ix
+
+        return self.shared('residue_atoms_' + atom_name, calculate)
+
+    def residue_coords(self, atom_name):
+        """Get the coordinates of a named atom in each residue.
+
+        Args:
+            atom_name (str): Atom name, ie. ``CA``
+
+        Returns:
+            ndarray: Coordinates of shape ``(n_residues, 3)``, NaN for residues without the atom
+
+        """
+        ix = self.residue_atoms(atom_name)
+        coords = np.full((self.num_residues, 3), np.nan)
+        coords[ix >= 0] = self.coords[ix[ix >= 0]]
+        return coords
+
+    def atom_pairs(self, cutoff, atoms=None, atom_name=None):
+        """Get pairs of atoms closer than a distance.
+
+        Pairs are found once for each ``atom_name`` (all atoms when ``None``) at the largest cutoff asked for, and
+        filtered for smaller cutoffs and subsets of atoms.
+
+        Args:
+            cutoff (float): Maximum distance in Angstroms
+            atoms (ndarray): Indices of a subset of atoms to get pairs of, which must all be named ``atom_name`` if
+                that is given. Pair indices are then positions in this array.
+            atom_name (str): Only search among atoms with this name, ie. ``CA``
+
+        Returns:
+            ndarray: Pairs of shape ``(n_pairs, 2)``, each pair once with the lower index first
+
+        """
+        with self._lock:
+            cached = self._pairs.get(atom_name)
+            if cached is None or cached[0] < cutoff:
+                if atom_name is None:
+                    searched = np.arange(self.num_atoms)
+                else:
+                    searched = np.flatnonzero(self.atom_names == atom_name)
+                if len(searched) > 1:
+                    pairs = cKDTree(self.coords[searched]).query_pairs(r=cutoff, output_type='ndarray')
+                else:
+                    pairs = np.zeros((0, 2), dtype=np.int64)
+                a, b = searched[pairs[:, 0]], searched[pairs[:, 1]]
+                distances = np.linalg.norm(self.coords[a] - self.coords[b], axis=1)
+                cached = (cutoff, a, b, distances)
+                self._pairs[atom_name] = cached
+                log.debug('Found {} atom pairs within {} Angstroms'.format(len(a), cutoff))
+
+        _, a, b, distances = cached
+        keep = distances <= cutoff
+        if atoms is not None:
+            local = np.full(self.num_atoms, -1, dtype=np.int64)
+            local[atoms] = np.arange(len(atoms))
+            a, b = local[a], local[b]
+            keep &= (a >= 0) & (b >= 0)
+        a, b = a[keep], b[keep]
+        return np.column_stack([np.minimum(a, b), np.maximum(a, b)])
@@ -10,11 +10,16 @@ import numpy as np
 import pandas as pd
 from cobra.core import DictList
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 import ssbio.protein.sequence.utils.alignment
+import ssbio.protein.structure.properties.depth
 import ssbio.protein.structure.properties.dssp
+import ssbio.protein.structure.properties.kabsch_sander
 import ssbio.protein.structure.properties.msms
 import ssbio.protein.structure.properties.residues
 import ssbio.protein.structure.properties.quality
+import ssbio.protein.structure.properties.sasa
+import ssbio.protein.structure.properties.structure_arrays
 import ssbio.protein.structure.properties.freesasa as fs
 import ssbio.utils
 from ssbio.core.object import Object
@@ -293,7 +298,7 @@ class StructProp(Object):
 
         # Remove keys you don't want returned
         if exclude_attributes:
-            exclude_attributes = ssbio.utils.force_list(exclude_attributes)
+            exclude_attributes = list(ssbio.utils.force_list(exclude_attributes))
             for x in exclude_attributes:
                 if x in keys:
                     keys.remove(x)
@@ -302,13 +307,13 @@ class StructProp(Object):
 
         exclude_attributes.extend(['mapped_chains', 'chains'])
 
-        final_dict = {k: v for k, v in Object.get_dict(self, only_attributes=keys, exclude_attributes=exclude_attributes,
-                                                       df_format=df_format).items()}
+        final_dict = Object.get_dict(self, only_attributes=keys, exclude_attributes=exclude_attributes,
+                                     df_format=df_format)
 
         chain_prop = self.chains.get_by_id(chain)
         # Filter out keys that show up in StructProp
         if not chain_keys:
-            chain_keys = [x for x in chain_prop.get_dict().keys() if x not in final_dict]
+            chain_keys = [x for x in chain_prop.__dict__ if x not in final_dict]
 
         chain_dict = chain_prop.get_dict(only_attributes=chain_keys, df_format=df_format)
         final_dict.update(chain_dict)
@@ -329,6 +334,10 @@ class StructProp(Object):
 
         disulfide_bridges = ssbio.protein.structure.properties.residues.search_ss_bonds(parsed.first_model,
                                                                                         threshold=threshold)
+        self._store_disulfide_bridges(disulfide_bridges)
+
+    def _store_disulfide_bridges(self, disulfide_bridges):
+        """Store disulfide bridges from :func:`ssbio.protein.structure.properties.residues.search_ss_bonds`"""
         if not disulfide_bridges:
             log.debug('{}: no disulfide bridges found'.format(self.id))
 
@@ -337,7 +346,18 @@ class StructProp(Object):
             log.debug('{}: found {} disulfide bridges'.format(chain, len(bridges)))
             log.debug('{}: stored disulfide bridges in the chain\'s seq_record letter_annotations'.format(chain))
 
-    def get_dssp_annotations(self, outdir, force_rerun=False):
+    @staticmethod
+    def _chain_positions(chain_prop, positions=None):
+        """Get the structure residue positions of a chain's sequence, looked up in a dictionary of chain IDs to
+        positions if one is provided, so they are only found once when storing many annotations"""
+        if positions is None:
+            return ssbio.protein.structure.properties.residues.structure_sequence_positions(chain_prop.seq_record)
+        if chain_prop.id not in positions:
+            positions[chain_prop.id] = ssbio.protein.structure.properties.residues.structure_sequence_positions(
+                    chain_prop.seq_record)
+        return positions[chain_prop.id]
+
+    def get_dssp_annotations(self, outdir=None, force_rerun=False, engine='dssp'):
         """Run DSSP on this structure and store the DSSP annotations in the corresponding ChainProp SeqRecords
 
         Calculations are stored in the ChainProp's ``letter_annotations`` at the following keys:
@@ -349,13 +369,18 @@ class StructProp(Object):
             * ``PSI-dssp``
 
         Args:
-            outdir (str): Path to where DSSP dataframe will be stored.
+            outdir (str): Path to where DSSP dataframe will be stored, not used by the ``builtin`` engine
             force_rerun (bool): If DSSP results should be recalculated
+            engine (str): ``dssp`` to run the DSSP executable, or ``builtin`` to assign secondary structure in process
+                with :func:`ssbio.protein.structure.properties.kabsch_sander.get_secondary_structure_df`
 
         TODO:
             * Also parse global properties, like total accessible surface area. Don't think Biopython parses those?
 
         """
+        if engine not in ['dssp', 'builtin']:
+            raise ValueError('{}: engine must be "dssp" or "builtin"'.format(engine))
+
         if self.structure:
             parsed = self.structure
         else:
@@ -365,58 +390,60 @@ class StructProp(Object):
             log.error('{}: unable to open structure to run DSSP'.format(self.id))
             return
 
-        log.debug('{}: running DSSP'.format(self.id))
-        dssp_results = ssbio.protein.structure.properties.dssp.get_dssp_df(model=parsed.first_model,
-                                                                           pdb_file=self.structure_path,
-                                                                           outdir=outdir,
-                                                                           force_rerun=force_rerun)
+        if engine == 'builtin':
+            log.debug('{}: assigning secondary structure'.format(self.id))
+            dssp_results = ssbio.protein.structure.properties.kabsch_sander.get_secondary_structure_df(
+                    model=parsed.first_model)
+        else:
+            log.debug('{}: running DSSP'.format(self.id))
+            dssp_results = ssbio.protein.structure.properties.dssp.get_dssp_df(model=parsed.first_model,
+                                                                               pdb_file=self.structure_path,
+                                                                               outdir=outdir,
+                                                                               force_rerun=force_rerun)
+
+        self._store_dssp_annotations(dssp_results)
 
+    def _store_dssp_annotations(self, dssp_results, positions=None):
+        """Store results from :func:`ssbio.protein.structure.properties.dssp.get_dssp_df`"""
         if dssp_results.empty:
             log.error('{}: unable to run DSSP'.format(self.id))
             return
 
-        chains = dssp_results.chain.unique()
         dssp_summary = ssbio.protein.structure.properties.dssp.secondary_structure_summary(dssp_results)
 
-        for chain in chains:
-            ss = dssp_results[dssp_results.chain == chain].ss.tolist()
-            exposure_rsa = dssp_results[dssp_results.chain == chain].exposure_rsa.tolist()
-            exposure_asa = dssp_results[dssp_results.chain == chain].exposure_asa.tolist()
-            phi = dssp_results[dssp_results.chain == chain].phi.tolist()
-            psi = dssp_results[dssp_results.chain == chain].psi.tolist()
-
+        for chain, chain_results in dssp_results.groupby('chain', sort=False):
             chain_prop = self.chains.get_by_id(chain)
             chain_seq = chain_prop.seq_record
-
-            # Making sure the X's are filled in
-            ss = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                      new_seq=ss,
-                                                                                      fill_with='-')
-            exposure_rsa = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                                new_seq=exposure_rsa,
-                                                                                                fill_with=float('Inf'))
-            exposure_asa = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                                new_seq=exposure_asa,
-                                                                                                fill_with=float('Inf'))
-            phi = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                       new_seq=phi,
-                                                                                       fill_with=float('Inf'))
-            psi = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                       new_seq=psi,
-                                                                                       fill_with=float('Inf'))
-
-            chain_prop.seq_record.annotations.update(dssp_summary[chain])
-
-            chain_prop.seq_record.letter_annotations['SS-dssp'] = ss
-            chain_prop.seq_record.letter_annotations['RSA-dssp'] = exposure_rsa
-            chain_prop.seq_record.letter_annotations['ASA-dssp'] = exposure_asa
-            chain_prop.seq_record.letter_annotations['PHI-dssp'] = phi
-            chain_prop.seq_record.letter_annotations['PSI-dssp'] = psi
+            chain_positions = self._chain_positions(chain_prop, positions)
+
+            for col, key, fill_with in [('ss', 'SS-dssp', '-'),
+                                        ('exposure_rsa', 'RSA-dssp', float('Inf')),
+                                        ('exposure_asa', 'ASA-dssp', float('Inf')),
+                                        ('phi', 'PHI-dssp', float('Inf')),
+                                        ('psi', 'PSI-dssp', float('Inf'))]:
+                # Making sure the X's are filled in
+                values = ssbio.protein.structure.properties.residues.match_structure_sequence(
+                        orig_seq=chain_seq, new_seq=chain_results[col].tolist(), fill_with=fill_with,
+                        positions=chain_positions)
+                chain_seq.letter_annotations[key] = values
+
+            chain_seq.annotations.update(dssp_summary[chain])
             log.debug('{}: stored DSSP annotations in chain seq_record letter_annotations'.format(chain))
 
-    def get_msms_annotations(self, outdir, force_rerun=False):
-        """Run MSMS on this structure and store the residue depths/ca depths in the corresponding ChainProp SeqRecords
+    def get_msms_annotations(self, outdir=None, force_rerun=False, engine='msms'):
+        """Calculate residue depths of this structure and store the residue depths/ca depths in the corresponding
+        ChainProp SeqRecords
+
+        Args:
+            outdir (str): Path to where the MSMS results will be stored, not used by the ``builtin`` engine
+            force_rerun (bool): If MSMS should be rerun even if a results file exists
+            engine (str): ``msms`` to run the MSMS executable, or ``builtin`` to calculate depths in process with
+                :func:`ssbio.protein.structure.properties.depth.get_residue_depth_df`
+
         """
+        if engine not in ['msms', 'builtin']:
+            raise ValueError('{}: engine must be "msms" or "builtin"'.format(engine))
+
         # Now can run on Biopython Model objects exclusively thanks to Biopython updates
         # if self.file_type != 'pdb':
         #     raise ValueError('{}: unable to run MSMS with "{}" file type. Please change file type to "pdb"'.format(self.id,
@@ -431,42 +458,107 @@ class StructProp(Object):
             log.error('{}: unable to open structure to run MSMS'.format(self.id))
             return
 
-        log.debug('{}: running MSMS'.format(self.id))
-        # PDB ID is currently set to the structure file so the output name is the same with _msms.df appended to it
-        msms_results = ssbio.protein.structure.properties.msms.get_msms_df(model=parsed.first_model, pdb_id=self.structure_path,
-                                                                           outdir=outdir, force_rerun=force_rerun)
+        if engine == 'builtin':
+            log.debug('{}: calculating residue depths'.format(self.id))
+            msms_results = ssbio.protein.structure.properties.depth.get_residue_depth_df(model=parsed.first_model)
+        else:
+            log.debug('{}: running MSMS'.format(self.id))
+            # PDB ID is currently set to the structure file so the output name is the same with _msms.df appended to it
+            msms_results = ssbio.protein.structure.properties.msms.get_msms_df(model=parsed.first_model,
+                                                                               pdb_id=self.structure_path,
+                                                                               outdir=outdir, force_rerun=force_rerun)
+        self._store_msms_annotations(msms_results)
+
+    def _store_msms_annotations(self, msms_results, positions=None):
+        """Store results from :func:`ssbio.protein.structure.properties.msms.get_msms_df`"""
         if msms_results.empty:
             log.error('{}: unable to run MSMS'.format(self.id))
             return
 
-        chains = msms_results.chain.unique()
+        for chain, chain_results in msms_results.groupby('chain', sort=False):
+            chain_prop = self.chains.get_by_id(chain)
+            chain_seq = chain_prop.seq_record
+            chain_positions = self._chain_positions(chain_prop, positions)
+
+            for col, key in [('res_depth', 'RES_DEPTH-msms'),
+                             ('ca_depth', 'CA_DEPTH-msms')]:
+                # Making sure the X's are filled in
+                values = ssbio.protein.structure.properties.residues.match_structure_sequence(
+                        orig_seq=chain_seq, new_seq=chain_results[col].tolist(), fill_with=float('Inf'),
+                        positions=chain_positions)
+                chain_seq.letter_annotations[key] = values
+            log.debug('{}: stored residue depths in chain seq_record letter_annotations'.format(chain))
+
+    def get_hse_annotations(self, radius=12.0, offset=0):
+        """Calculate the half sphere exposures and contact numbers of this structure and store them in the
+        corresponding ChainProp SeqRecords
+
+        Calculations are stored in the ChainProp's ``letter_annotations`` at the following keys:
+
+            * ``HSE_UP-biopython``
+            * ``HSE_DOWN-biopython``
+            * ``CN-biopython``
+
+        Values are the same as Biopython's ``HSExposureCB`` and ``ExposureCN``, see
+        :func:`ssbio.protein.structure.properties.residues.get_hse_df`.
+
+        Args:
+            radius (float): Radius of the sphere around each alpha carbon, in Angstroms
+            offset (int): Number of flanking residues in the same peptide which are not counted
+
+        """
+        if self.structure:
+            parsed = self.structure
+        else:
+            parsed = self.parse_structure()
+
+        if not parsed:
+            log.error('{}: unable to open structure to calculate half sphere exposures'.format(self.id))
+            return
+
+        hse_results = ssbio.protein.structure.properties.residues.get_hse_df(parsed.first_model, radius=radius,
+                                                                             offset=offset)
+        self._store_hse_annotations(hse_results)
 
-        for chain in chains:
-            res_depths = msms_results[msms_results.chain == chain].res_depth.tolist()
-            ca_depths = msms_results[msms_results.chain == chain].ca_depth.tolist()
+    def _store_hse_annotations(self, hse_results, positions=None):
+        """Store results from :func:`ssbio.protein.structure.properties.residues.get_hse_df`"""
+        if hse_results.empty:
+            log.error('{}: unable to calculate half sphere exposures'.format(self.id))
+            return
 
+        for chain, chain_results in hse_results.groupby('chain', sort=False):
             chain_prop = self.chains.get_by_id(chain)
             chain_seq = chain_prop.seq_record
+            chain_positions = self._chain_positions(chain_prop, positions)
 
-            # Making sure the X's are filled in
-            res_depths = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                              new_seq=res_depths,
-                                                                                              fill_with=float('Inf'))
+            for col, key in [('hse_up', 'HSE_UP-biopython'),
+                             ('hse_down', 'HSE_DOWN-biopython'),
+                             ('cn', 'CN-biopython')]:
+                # Making sure the X's are filled in
+                values = ssbio.protein.structure.properties.residues.match_structure_sequence(
+                        orig_seq=chain_seq, new_seq=chain_results[col].tolist(), fill_with=float('Inf'),
+                        positions=chain_positions)
+                chain_seq.letter_annotations[key] = values
+            log.debug('{}: stored half sphere exposures in chain seq_record letter_annotations'.format(chain))
 
-            ca_depths = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain_seq,
-                                                                                             new_seq=ca_depths,
-                                                                                             fill_with=float('Inf'))
+    def get_freesasa_annotations(self, outdir=None, include_hetatms=False, force_rerun=False, engine='freesasa'):
+        """Calculate solvent accessible surface areas of this structure and store them in the corresponding ChainProps
 
-            chain_prop.seq_record.letter_annotations['RES_DEPTH-msms'] = res_depths
-            chain_prop.seq_record.letter_annotations['CA_DEPTH-msms'] = ca_depths
-            log.debug('{}: stored residue depths in chain seq_record letter_annotations'.format(chain))
+        Args:
+            outdir (str): Path to where the freesasa RSA file will be stored, not used by the ``builtin`` engine
+            include_hetatms (bool): If HETATMs should be included in calculations
+            force_rerun (bool): If freesasa should be rerun even if an RSA file exists
+            engine (str): ``freesasa`` to run the freesasa executable (PDB files only), or ``builtin`` to calculate
+                areas in process with :func:`ssbio.protein.structure.properties.sasa.residue_sasa`, using the same
+                Lee-Richards algorithm and ProtOr radii as freesasa, for any structure file type
 
-    def get_freesasa_annotations(self, outdir, include_hetatms=False, force_rerun=False):
-        """Run ``freesasa`` on this structure and store the calculated properties in the corresponding ChainProps
         """
-        if self.file_type != 'pdb':
-            log.error('{}: unable to run freesasa with "{}" file type. Please change file type to "pdb"'.format(self.id,
-                                                                                                                self.file_type))
+        if engine not in ['freesasa', 'builtin']:
+            raise ValueError('{}: engine must be "freesasa" or "builtin"'.format(engine))
+
+        if engine == 'freesasa' and self.file_type != 'pdb':
+            log.error('{}: unable to run freesasa with "{}" file type. Please change file type to "pdb" or use the '
+                      '"builtin" engine'.format(self.id, self.file_type))
             return
 
         # Parse the structure to store chain sequences
@@ -479,22 +571,32 @@ class StructProp(Object):
             log.error('{}: unable to open structure to run freesasa'.format(self.id))
             return
 
-        # Set outfile name
-        log.debug('{}: running freesasa'.format(self.id))
-        if include_hetatms:
-            outfile = '{}.freesasa_het.rsa'.format(self.id)
+        if engine == 'builtin':
+            log.debug('{}: calculating SASA'.format(self.id))
+            result_parsed = ssbio.protein.structure.properties.sasa.residue_sasa(parsed.first_model,
+                                                                                include_hetatms=include_hetatms,
+                                                                                algorithm='lee-richards')
         else:
-            outfile = '{}.freesasa_nohet.rsa'.format(self.id)
+            # Set outfile name
+            log.debug('{}: running freesasa'.format(self.id))
+            if include_hetatms:
+                outfile = '{}.freesasa_het.rsa'.format(self.id)
+            else:
+                outfile = '{}.freesasa_nohet.rsa'.format(self.id)
 
-        # Run freesasa
-        result = fs.run_freesasa(infile=self.structure_path,
-                                 outfile=outfile,
-                                 include_hetatms=include_hetatms,
-                                 outdir=outdir,
-                                 force_rerun=force_rerun)
+            # Run freesasa
+            result = fs.run_freesasa(infile=self.structure_path,
+                                     outfile=outfile,
+                                     include_hetatms=include_hetatms,
+                                     outdir=outdir,
+                                     force_rerun=force_rerun)
+            result_parsed = fs.parse_rsa_data(result)
 
-        # Parse results
-        result_parsed = fs.parse_rsa_data(result)
+        self._store_freesasa_annotations(result_parsed, include_hetatms=include_hetatms)
+
+    def _store_freesasa_annotations(self, result_parsed, include_hetatms=False, positions=None):
+        """Store results from :func:`ssbio.protein.structure.properties.freesasa.parse_rsa_data`"""
+        # Group results by chain
         prop_dict = defaultdict(lambda: defaultdict(list))
         for k, v in result_parsed.items():
             chain = k[0]
@@ -525,14 +627,112 @@ class StructProp(Object):
             all_props_renamed[k] = v + suffix
 
         for chain in self.chains:
+            chain_positions = self._chain_positions(chain, positions)
             for prop in all_props:
                 prop_list = ssbio.protein.structure.properties.residues.match_structure_sequence(orig_seq=chain.seq_record,
                                                                                                  new_seq=prop_dict[chain.id][prop],
                                                                                                  fill_with=float('Inf'),
-                                                                                                 ignore_excess=True)
+                                                                                                 ignore_excess=True,
+                                                                                                 positions=chain_positions)
                 chain.seq_record.letter_annotations[all_props_renamed[prop]] = prop_list
             log.debug('{}: stored freesasa calculations in chain seq_record letter_annotations'.format(chain))
 
+    def annotate(self, which=None, include_hetatms=False, threads=None):
+        """Calculate several properties of this structure from a single parse, and store them in the corresponding
+        ChainProp SeqRecords
+
+        The structure is parsed once and its atoms are extracted into a
+        :class:`~ssbio.protein.structure.properties.structure_arrays.StructureArrays` object, which the in-process
+        calculators share along with its neighbor lists. Calculators run at the same time in a thread pool, and all
+        results are then stored at the same keys as the single methods, with the ``builtin`` engines:
+
+            * ``dssp``: :meth:`get_dssp_annotations`
+            * ``msms``: :meth:`get_msms_annotations`
+            * ``freesasa``: :meth:`get_freesasa_annotations`
+            * ``hse``: :meth:`get_hse_annotations`
+            * ``disulfide``: :meth:`find_disulfide_bridges`
+
+        Args:
+            which (list): Annotations to calculate, all of the above by default
+            include_hetatms (bool): If HETATMs should be included in freesasa calculations
+            threads (int): Number of calculators to run at the same time, one thread per calculator by default
+
+        """
+        all_annotations = ['dssp', 'msms', 'freesasa', 'hse', 'disulfide']
+        if which is None:
+            which = all_annotations
+        else:
+            which = ssbio.utils.force_list(which)
+            unknown = [x for x in which if x not in all_annotations]
+            if unknown:
+                raise ValueError('{}: annotations must be in {}'.format(unknown, all_annotations))
+            which = [x for x in all_annotations if x in which]
+
+        if self.structure:
+            parsed = self.structure
+        else:
+            parsed = self.parse_structure()
+
+        if not parsed:
+            log.error('{}: unable to open structure to calculate annotations'.format(self.id))
+            return
+
+        model = parsed.first_model
+        arrays = ssbio.protein.structure.properties.structure_arrays.StructureArrays(model)
+
+        # Neighbor lists are found once at the largest distance needed, here the residue depth probe
+        if arrays.num_atoms and any(x in which for x in ['dssp', 'msms', 'freesasa']):
+            radii = ssbio.protein.structure.properties.sasa.structure_radii(arrays)
+            arrays.atom_pairs(2 * (radii.max() + 1.5))
+        if 'hse' in which:
+            arrays.atom_pairs(12.0, atom_name='CA')
+        elif 'dssp' in which:
+            arrays.atom_pairs(ssbio.protein.structure.properties.kabsch_sander.MIN_CA_DISTANCE, atom_name='CA')
+
+        calculators = {
+            'dssp': lambda: ssbio.protein.structure.properties.kabsch_sander.get_secondary_structure_df(
+                    model=model, arrays=arrays),
+            'msms': lambda: ssbio.protein.structure.properties.depth.get_residue_depth_df(model=model, arrays=arrays),
+            'freesasa': lambda: ssbio.protein.structure.properties.sasa.residue_sasa(model,
+                                                                                    include_hetatms=include_hetatms,
+                                                                                    algorithm='lee-richards',
+                                                                                    arrays=arrays),
+            'hse': lambda: ssbio.protein.structure.properties.residues.get_hse_df(model, arrays=arrays),
+            'disulfide': lambda: ssbio.protein.structure.properties.residues.search_ss_bonds(model)
+        }
+
+        def calculate(annotation):
+            try:
+                return annotation, calculators[annotation]()
+            except Exception as e:
+                log.error('{}: unable to calculate {} annotations: {}'.format(self.id, annotation, e))
+                return annotation, None
+
+        log.debug('{}: calculating {} annotations'.format(self.id, ', '.join(which)))
+        if threads is None:
+            threads = len(which)
+        if threads > 1 and len(which) > 1:
+            pool = ThreadPool(processes=threads)
+            try:
+                results = dict(pool.map(calculate, which))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = dict(calculate(x) for x in which)
+
+        # Store everything in one pass, finding the sequence positions of each chain once
+        positions = {}
+        storers = {'dssp': self._store_dssp_annotations,
+                   'msms': self._store_msms_annotations,
+                   'freesasa': lambda x, positions: self._store_freesasa_annotations(
+                           x, include_hetatms=include_hetatms, positions=positions),
+                   'hse': self._store_hse_annotations,
+                   'disulfide': lambda x, positions: self._store_disulfide_bridges(x)}
+        for annotation in which:
+            if results[annotation] is not None:
+                storers[annotation](results[annotation], positions=positions)
+
     def view_structure(self, only_chains=None, opacity=1.0, recolor=False, gui=False):
         """Use NGLviewer to display a structure in a Jupyter notebook
 
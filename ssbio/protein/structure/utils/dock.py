@@ -8,6 +8,7 @@ import pandas as pd
 import os.path as op
 import logging
 from ssbio.core.object import Object
+import ssbio.io.jobs
 import ssbio.utils
 
 log = logging.getLogger(__name__)
@@ -157,7 +158,7 @@ class DOCK(Object):
                 f.write('writeMol2(models, "{}")\n'.format(prep_mol2))
 
             cmd = 'chimera --nogui {} {}'.format(self.structure_path, prep_py)
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
             os.remove(prep_py)
             os.remove('{}c'.format(prep_py))
 
@@ -202,7 +203,7 @@ class DOCK(Object):
                 f.write('write format pdb 0 {}\n'.format(receptor_noh))
 
             cmd = 'chimera --nogui {}'.format(prly_com)
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
             os.remove(prly_com)
 
         if ssbio.utils.is_non_zero_file(receptor_mol2) and ssbio.utils.is_non_zero_file(receptor_noh):
@@ -229,7 +230,7 @@ class DOCK(Object):
 
         if ssbio.utils.force_rerun(flag=force_rerun, outfile=dms):
             cmd = 'dms {} -n -w 1.4 -o {}'.format(self.receptorpdb_path, dms)
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
 
         self.dms_path = dms
 
@@ -266,7 +267,7 @@ class DOCK(Object):
 
             os.chdir(self.dock_dir)
             cmd = "sphgen_cpp"
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
             os.remove(insph)
 
         if ssbio.utils.is_non_zero_file(sph):
@@ -308,7 +309,7 @@ class DOCK(Object):
                 mol2_maker.write('runCommand("close all")')
 
             cmd = 'chimera --nogui {}'.format(mol2maker)
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
             os.remove(mol2maker)
             os.remove('{}c'.format(mol2maker))
 
@@ -337,7 +338,7 @@ class DOCK(Object):
             cmd = "sphere_selector {} {} {}".format(self.sphgen_path, self.bindingsite_path, radius)
             rename = "mv selected_spheres.sph {}".format(selsph)
 
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
             os.system(rename)
 
         if ssbio.utils.is_non_zero_file(selsph):
@@ -387,9 +388,10 @@ class DOCK(Object):
                 f.write("1\n")
                 f.write("{}".format(op.basename(boxfile)))
 
-            cmd = "showbox < {}".format(boxscript)
+            with open(boxscript) as f:
+                box_input = f.read()
             os.chdir(self.dock_dir)
-            os.system(cmd)
+            ssbio.io.jobs.run('showbox', stdin=box_input)
 
         if ssbio.utils.is_non_zero_file(boxfile):
             self.box_path = boxfile
@@ -442,7 +444,7 @@ score_grid_prefix              {}_grid
 
             os.chdir(self.dock_dir)
             cmd = "grid -i {} -o {}".format(op.basename(gridscript), op.basename(out_name))
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
 
         if ssbio.utils.is_non_zero_file(out_name):
             self.grid_path = out_name
@@ -548,7 +550,7 @@ rank_ligands                                                 yes
 
             os.chdir(self.dock_dir)
             cmd = "dock6 -i {} -o {} -v".format(in_name, out_name)
-            os.system(cmd)
+            ssbio.io.jobs.run(cmd)
 
         if ssbio.utils.is_non_zero_file(ranked_out):
             self.dock_flexible_outfile = out_name
@@ -0,0 +1,673 @@
+"""
+Benchmarks
+==========
+
+Time and memory use of the hot paths of ssbio, measured on the files in ``ssbio/test/test_files`` and on synthetic
+inputs scaled up from them. Nothing is downloaded and no external programs are run, so the benchmarks can be run
+offline and give comparable results between versions.
+
+Each benchmark is run a few times, and its fastest, median and mean wall time, CPU time, and the peak memory allocated
+while it runs (measured with ``tracemalloc`` in a separate run) are saved as JSON. Results of two versions are compared
+with :func:`compare_results`.
+
+Example: run all benchmarks with inputs 10 times larger than the test files, and save the results
+    $ python -m ssbio.test.benchmarks --scale 10 --outfile before.json
+
+Example: run the structure benchmarks only, and compare them to earlier results
+    $ python -m ssbio.test.benchmarks --only structure --outfile after.json --compare before.json
+
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import os.path as op
+import platform
+import shutil
+import string
+import sys
+import tempfile
+import textwrap
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from Bio import AlignIO
+from Bio.PDB import PDBIO
+from Bio.PDB.Chain import Chain
+from Bio.PDB.DSSP import residue_max_acc
+from Bio.PDB.Model import Model
+from Bio.PDB.Structure import Structure
+
+import ssbio.io
+import ssbio.io.project
+import ssbio.protein.sequence.utils.alignment
+import ssbio.protein.sequence.utils.blast
+import ssbio.protein.structure.properties.dssp
+import ssbio.protein.structure.properties.freesasa
+import ssbio.protein.structure.properties.kabsch_sander
+import ssbio.protein.structure.properties.residues
+import ssbio.utils
+from ssbio.pipeline.gempro import GEMPRO
+from ssbio.protein.structure.utils.structureio import StructureIO
+
+log = logging.getLogger(__name__)
+
+_FORMAT = 1
+TEST_FILES = op.join(op.dirname(op.abspath(__file__)), 'test_files')
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+BENCHMARKS = OrderedDict()
+"""dict: Setup function of each benchmark, which returns the functions to time for each of its cases"""
+
+
+def benchmark(name):
+    """Register a benchmark. The decorated function is called with a :class:`BenchmarkData`, prepares the inputs and
+    returns a dict of case names and functions without arguments to time."""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+class BenchmarkData(object):
+
+    """Inputs shared by the benchmarks, created the first time they are needed.
+
+    Args:
+        tmp_dir (str): Path to a folder for files written by the benchmarks
+        scale (int): How many times larger than the test files the synthetic inputs are
+        seed (int): Seed of the random generator of synthetic inputs
+
+    """
+
+    def __init__(self, tmp_dir, scale=10, seed=0):
+        self.tmp_dir = tmp_dir
+        self.scale = scale
+        self.seed = seed
+        self._cache = {}
+
+    def random(self, name):
+        """Get a random generator for one benchmark, so its inputs do not depend on the benchmarks run before it"""
+        return np.random.RandomState([self.seed] + [ord(x) for x in name])
+
+    def path(self, *parts):
+        """Get a path in the temporary folder, creating its parent folder"""
+        path = op.join(self.tmp_dir, *parts)
+        if not op.exists(op.dirname(path)):
+            os.makedirs(op.dirname(path))
+        return path
+
+    def get(self, key, factory):
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def structure(self, filename):
+        return self.get(filename, lambda: StructureIO(op.join(TEST_FILES, 'structures', filename)))
+
+    def scaled_structure_file(self):
+        """Write a PDB file with copies of chain A of 1kf6 next to each other, as many as there are chains in 1kf6
+        times the scale"""
+        model = self.structure('1kf6.pdb').first_model
+        return self.get('scaled_structure_file', lambda: _write_scaled_structure(
+            model['A'], len(model) * self.scale, self.path('structures', 'scaled.pdb')))
+
+    def scaled_structure(self):
+        return self.get('scaled_structure', lambda: StructureIO(self.scaled_structure_file()))
+
+    def secondary_structure(self, key, model):
+        return self.get(('secondary_structure', key),
+                        lambda: ssbio.protein.structure.properties.kabsch_sander.get_secondary_structure_df(model))
+
+
+def _random_sequence(random, length):
+    return ''.join(random.choice(list(AMINO_ACIDS), size=length))
+
+
+def _mutated_alignment(random, length, mutation_rate=0.05, indel_rate=0.01):
+    """Make a pairwise alignment of a random sequence and a copy of it with mutations, insertions and deletions"""
+    a_seq = _random_sequence(random, length)
+    a_aln, b_aln = [], []
+    for aa in a_seq:
+        r = random.random_sample()
+        if r < indel_rate:
+            a_aln.append(aa)
+            b_aln.append('-')
+        elif r < 2 * indel_rate:
+            insertion = _random_sequence(random, random.randint(1, 5))
+            a_aln.extend(['-'] * len(insertion) + [aa])
+            b_aln.extend(list(insertion) + [aa])
+        elif r < 2 * indel_rate + mutation_rate:
+            a_aln.append(aa)
+            b_aln.append(random.choice([x for x in AMINO_ACIDS if x != aa]))
+        else:
+            a_aln.append(aa)
+            b_aln.append(aa)
+    return ''.join(a_aln), ''.join(b_aln)
+
+
+def _write_scaled_structure(chain, copies, outfile):
+    """Write a structure made of copies of a chain, shifted so they do not touch each other"""
+    n_atoms = len(list(chain.get_atoms()))
+    # PDB files only have room for 99999 atoms and one character chain IDs
+    copies = max(1, min(copies, 99999 // n_atoms, len(string.ascii_letters + string.digits)))
+    structure = Structure('scaled')
+    model = Model(0)
+    structure.add(model)
+    for i, chain_id in enumerate((string.ascii_letters + string.digits)[:copies]):
+        new_chain = Chain(chain_id)
+        for residue in chain:
+            new_residue = residue.copy()
+            new_residue.detach_parent()
+            for atom in new_residue:
+                atom.set_coord(atom.get_coord() + np.array([100. * i, 0., 0.], dtype='f'))
+            new_chain.add(new_residue)
+        model.add(new_chain)
+    io = PDBIO()
+    io.set_structure(structure)
+    io.save(outfile)
+    return outfile
+
+
+def _write_dssp_file(df, outfile):
+    """Write secondary structure results in the layout of a DSSP output file"""
+    lines = ['==== Secondary Structure Definition by the program DSSP ====',
+             '  #  RESIDUE AA STRUCTURE BP1 BP2  ACC     N-H-->O    O-->H-N    N-H-->O    O-->H-N    '
+             'TCO  KAPPA ALPHA  PHI   PSI    X-CA   Y-CA   Z-CA']
+    for i, r in enumerate(df.itertuples(), 1):
+        acc = 0 if pd.isnull(r.exposure_asa) else int(round(r.exposure_asa))
+        lines.append('{:5d}{:5d}{}{} {}  {}{}{:4d}{:7d},{:4.1f}{:6d},{:4.1f}{:6d},{:4.1f}{:6d},{:4.1f}  {:6.3f}{:6.1f}'
+                     '{:6.1f}{:6.1f}{:6.1f}{:7.1f}{:7.1f}{:7.1f}'.format(
+                         i, int(r.resnum), r.icode if r.icode.strip() else ' ', r.chain, r.aa,
+                         ' ' if r.ss == '-' else r.ss, ' ' * 17, acc,
+                         int(r.NH_O_1_relidx), r.NH_O_1_energy, int(r.O_NH_1_relidx), r.O_NH_1_energy,
+                         int(r.NH_O_2_relidx), r.NH_O_2_energy, int(r.O_NH_2_relidx), r.O_NH_2_energy,
+                         0., 360., 360., r.phi, r.psi, 0., 0., 0.))
+    with open(outfile, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return outfile
+
+
+def _write_rsa_file(df, outfile):
+    """Write accessible surface areas in the layout of a NACCESS or freesasa RSA file"""
+    lines = ['REM  File of summed (Sum) and % (per.) accessibilities for',
+             'REM RES _ NUM      All-atoms   Total-Side   Main-Chain    Non-polar    All polar',
+             'REM                ABS   REL    ABS   REL    ABS   REL    ABS   REL    ABS   REL']
+    for r in df.itertuples():
+        asa = 0. if pd.isnull(r.exposure_asa) else r.exposure_asa
+        rel = 100 * asa / residue_max_acc['Sander'].get(r.aa_three, asa or 1.)
+        values = [asa, rel, .7 * asa, .7 * rel, .3 * asa, .3 * rel, .5 * asa, .5 * rel, .5 * asa, .5 * rel]
+        lines.append('RES {:3s} {}{:4d}{}  {:6.2f} {:5.1f} {:6.2f} {:5.1f} {:6.2f} {:5.1f} {:6.2f} {:5.1f} '
+                     '{:6.2f} {:5.1f}'.format(r.aa_three, r.chain, int(r.resnum),
+                                              r.icode if r.icode.strip() else ' ', *values))
+    with open(outfile, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return outfile
+
+
+def _write_needle_file(alignments, outfile):
+    """Write pairwise alignments in the EMBOSS srspair layout of needle output files"""
+    lines = ['########################################', '# Program: needle', '# Align_format: srspair',
+             '########################################']
+    for a_id, b_id, a_aln, b_aln in alignments:
+        identity = sum(a == b for a, b in zip(a_aln, b_aln))
+        gaps = a_aln.count('-') + b_aln.count('-')
+        length = len(a_aln)
+        lines.extend(['', '#=======================================', '#', '# Aligned_sequences: 2',
+                      '# 1: {}'.format(a_id), '# 2: {}'.format(b_id), '# Matrix: EBLOSUM62',
+                      '# Gap_penalty: 10.0', '# Extend_penalty: 0.5', '#', '# Length: {}'.format(length),
+                      '# Identity:   {}/{} ({:.1f}%)'.format(identity, length, 100. * identity / length),
+                      '# Similarity: {}/{} ({:.1f}%)'.format(identity, length, 100. * identity / length),
+                      '# Gaps:       {}/{} ({:.1f}%)'.format(gaps, length, 100. * gaps / length),
+                      '# Score: {:.1f}'.format(5. * identity), '#', '#', '#=======================================',
+                      ''])
+        a_pos = b_pos = 0
+        for start in range(0, length, 50):
+            a_part, b_part = a_aln[start:start + 50], b_aln[start:start + 50]
+            a_start, b_start = a_pos + 1, b_pos + 1
+            a_pos += len(a_part) - a_part.count('-')
+            b_pos += len(b_part) - b_part.count('-')
+            match = ''.join('|' if a == b else '.' if '-' not in (a, b) else ' ' for a, b in zip(a_part, b_part))
+            lines.extend(['{:13s} {:6d} {} {:6d}'.format(a_id, a_start, a_part, a_pos),
+                          '{:13s}        {}'.format('', match),
+                          '{:13s} {:6d} {} {:6d}'.format(b_id, b_start, b_part, b_pos), ''])
+        lines.extend(['', '#---------------------------------------', '#---------------------------------------'])
+    with open(outfile, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return outfile
+
+
+def _write_blast_results(random, query_genes, subject_genes, hits, outfile):
+    """Write tabular BLAST results (-outfmt 6) of query genes with random hits against subject genes"""
+    with open(outfile, 'w') as f:
+        for i, gene in enumerate(query_genes):
+            # The gene at the same position in the other genome is the best hit, the others are random
+            subjects = [subject_genes[i]] + list(random.choice(subject_genes, size=hits - 1))
+            for rank, subject in enumerate(subjects):
+                pid = 100. - 5 * rank - random.random_sample()
+                length = random.randint(100, 500)
+                f.write('\t'.join(str(x) for x in [gene, subject, round(pid, 2), length, int(length * (100 - pid) / 100),
+                                                   0, 1, length, 1, length, 1e-50 * 10 ** rank,
+                                                   round(2 * length * pid / 100, 1)]) + '\n')
+    return outfile
+
+
+@benchmark('alignment_df')
+def _alignment_df(data):
+    needle_file = op.join(TEST_FILES, 'sequences', 'Rv0973c_Rv0973c_1126684.4.needle')
+    bundled = [str(x.seq) for x in AlignIO.read(needle_file, 'emboss')]
+    synthetic = _mutated_alignment(data.random('alignment_df'), 670 * data.scale)
+    get_alignment_df = ssbio.protein.sequence.utils.alignment.get_alignment_df
+    return OrderedDict([('bundled', lambda: get_alignment_df(bundled[0], bundled[1], 'a', 'b')),
+                        ('synthetic', lambda: get_alignment_df(synthetic[0], synthetic[1], 'a', 'b'))])
+
+
+@benchmark('indels')
+def _indels(data):
+    alignment = ssbio.protein.sequence.utils.alignment
+    aln_df = alignment.get_alignment_df(*_mutated_alignment(data.random('indels'), 670 * data.scale),
+                                        a_seq_id='a', b_seq_id='b')
+
+    def find_indels():
+        alignment.get_mutations(aln_df)
+        alignment.get_deletions(aln_df)
+        alignment.get_insertions(aln_df)
+
+    return OrderedDict([('synthetic', find_indels)])
+
+
+@benchmark('needle_statistics')
+def _needle_statistics(data):
+    random = data.random('needle_statistics')
+    alignments = []
+    for i in range(10 * data.scale):
+        alignments.append(('a{}'.format(i), 'b{}'.format(i)) +
+                          _mutated_alignment(random, random.randint(100, 700)))
+    synthetic = _write_needle_file(alignments, data.path('sequences', 'synthetic.needle'))
+    needle_statistics = ssbio.protein.sequence.utils.alignment.needle_statistics
+    bundled = op.join(TEST_FILES, 'sequences', 'Rv0973c_Rv0973c_1126684.4.needle')
+    return OrderedDict([('bundled', lambda: needle_statistics(bundled)),
+                        ('synthetic', lambda: needle_statistics(synthetic))])
+
+
+@benchmark('calculate_bbh')
+def _calculate_bbh(data):
+    random = data.random('calculate_bbh')
+    n_genes = 200 * data.scale
+    ref_genes = ['ref_{}'.format(i) for i in range(n_genes)]
+    other_genes = ['other_{}'.format(i) for i in range(n_genes)]
+    blast_1 = _write_blast_results(random, ref_genes, other_genes, 5, data.path('bbh', 'ref_vs_other_blast.out'))
+    blast_2 = _write_blast_results(random, other_genes, ref_genes, 5, data.path('bbh', 'other_vs_ref_blast.out'))
+    outdir = op.dirname(blast_1)
+
+    def calculate_bbh():
+        # Results are not calculated again if the output file exists
+        outfile = op.join(outdir, 'ref_vs_other_bbh.csv')
+        if op.exists(outfile):
+            os.remove(outfile)
+        ssbio.protein.sequence.utils.blast.calculate_bbh(blast_1, blast_2, outdir=outdir)
+
+    return OrderedDict([('synthetic', calculate_bbh)])
+
+
+@benchmark('create_orthology_matrix')
+def _create_orthology_matrix(data):
+    random = data.random('create_orthology_matrix')
+    n_genes = 200 * data.scale
+    bbh_files = OrderedDict()
+    for g in range(10):
+        genes = ['g{}_{}'.format(g, i) for i in range(n_genes)]
+        df = pd.DataFrame({'gene': ['ref_{}'.format(i) for i in range(n_genes)], 'subject': genes,
+                           'PID': 100 * random.random_sample(n_genes), 'eVal': 10. ** -random.randint(1, 100, n_genes),
+                           'bitScore': 1000 * random.random_sample(n_genes),
+                           'BBH': random.choice(['<=>', '->'], size=n_genes, p=[.8, .2])})
+        bbh_files['genome_{}'.format(g)] = data.path('orthology', 'ref_vs_genome_{}_bbh.csv'.format(g))
+        df.to_csv(bbh_files['genome_{}'.format(g)])
+    outdir = op.dirname(bbh_files['genome_0'])
+
+    def create_orthology_matrix():
+        ssbio.protein.sequence.utils.blast.create_orthology_matrix('ref', bbh_files, pid_cutoff=50,
+                                                                   bitscore_cutoff=100, evalue_cutoff=1e-5,
+                                                                   outdir=outdir, force_rerun=True)
+
+    return OrderedDict([('synthetic', create_orthology_matrix)])
+
+
+@benchmark('structure_parsing')
+def _structure_parsing(data):
+    cases = OrderedDict()
+    for file_type in ['pdb', 'cif', 'mmtf']:
+        files = sorted(x for x in os.listdir(op.join(TEST_FILES, 'structures')) if x.endswith('.' + file_type))
+        if not files:
+            log.info('No {} files in the test files, not timing their parsing'.format(file_type))
+            continue
+        # The largest file of each format
+        path = max((op.join(TEST_FILES, 'structures', x) for x in files), key=op.getsize)
+        cases[file_type] = lambda path=path: StructureIO(path)
+    scaled = data.scaled_structure_file()
+    cases['pdb_synthetic'] = lambda: StructureIO(scaled)
+    return cases
+
+
+@benchmark('structure_seqrecords')
+def _structure_seqrecords(data):
+    residues = ssbio.protein.structure.properties.residues
+    bundled = data.structure('1kf6.pdb').first_model
+    scaled = data.scaled_structure().first_model
+    return OrderedDict([('bundled', lambda: residues.get_structure_seqrecords(bundled)),
+                        ('synthetic', lambda: residues.get_structure_seqrecords(scaled))])
+
+
+@benchmark('ss_bonds')
+def _ss_bonds(data):
+    residues = ssbio.protein.structure.properties.residues
+    bundled = data.structure('1kf6.pdb').first_model
+    scaled = data.scaled_structure().first_model
+    return OrderedDict([('bundled', lambda: residues.search_ss_bonds(bundled)),
+                        ('synthetic', lambda: residues.search_ss_bonds(scaled))])
+
+
+@benchmark('match_structure_sequence')
+def _match_structure_sequence(data):
+    random = data.random('match_structure_sequence')
+    length = 1000 * data.scale
+    # Structure sequence with unresolved residues, and a property of each resolved residue
+    structure_seq = ''.join(np.where(random.random_sample(length) < .1, 'X',
+                                     random.choice(list(AMINO_ACIDS), size=length)))
+    values = list(random.random_sample(len(structure_seq) - structure_seq.count('X')))
+    match = ssbio.protein.structure.properties.residues.match_structure_sequence
+    return OrderedDict([('synthetic', lambda: match(structure_seq, values, fill_with=float('Inf')))])
+
+
+@benchmark('dssp_parsing')
+def _dssp_parsing(data):
+    parse_dssp = ssbio.protein.structure.properties.dssp.parse_dssp
+    cases = OrderedDict()
+    for name, model in [('bundled', data.structure('1kf6.pdb').first_model),
+                        ('synthetic', data.scaled_structure().first_model)]:
+        dssp_file = _write_dssp_file(data.secondary_structure(name, model), data.path('dssp', name + '.dssp'))
+        cases[name] = lambda model=model, dssp_file=dssp_file: parse_dssp(model, dssp_file)
+    return cases
+
+
+@benchmark('freesasa_parsing')
+def _freesasa_parsing(data):
+    parse_rsa_data = ssbio.protein.structure.properties.freesasa.parse_rsa_data
+    cases = OrderedDict()
+    for name, model in [('bundled', data.structure('1kf6.pdb').first_model),
+                        ('synthetic', data.scaled_structure().first_model)]:
+        rsa_file = _write_rsa_file(data.secondary_structure(name, model), data.path('freesasa', name + '.rsa'))
+        cases[name] = lambda rsa_file=rsa_file: parse_rsa_data(rsa_file)
+    return cases
+
+
+@benchmark('gempro_save_load')
+def _gempro_save_load(data):
+    random = data.random('gempro_save_load')
+    n_genes = 100 * data.scale
+    gempro = GEMPRO(gem_name='benchmark', root_dir=data.path('gempro', ''),
+                    genes_and_sequences={'b{:05d}'.format(i): _random_sequence(random, random.randint(100, 700))
+                                         for i in range(n_genes)})
+    json_file = data.path('gempro', 'benchmark.json')
+    pickle_file = data.path('gempro', 'benchmark.pckl')
+    project_dir = data.path('gempro', 'project', '')
+
+    def save_project():
+        # Saving into an existing project only writes the proteins which changed
+        if op.exists(project_dir):
+            shutil.rmtree(project_dir)
+        gempro.save_project(project_dir)
+
+    def load_project():
+        project = ssbio.io.project.load_project(project_dir)
+        for g in project.genes:
+            g.protein
+
+    return OrderedDict([('save_json', lambda: gempro.save_json(json_file)),
+                        ('load_json', lambda: ssbio.io.load_json(json_file)),
+                        ('save_pickle', lambda: gempro.save_pickle(pickle_file)),
+                        ('load_pickle', lambda: ssbio.io.load_pickle(pickle_file)),
+                        ('save_project', save_project),
+                        ('load_project', load_project)])
+
+
+def time_function(func, repeat=5, min_time=0.05, measure_memory=True):
+    """Time a function, and measure the peak memory it allocates.
+
+    Args:
+        func (function): Function without arguments
+        repeat (int): Number of times to time the function
+        min_time (float): Minimum time in seconds of each timing, the function is called several times per timing if
+            it is faster than that
+        measure_memory (bool): If the peak memory allocated should be measured, in an additional run with
+            ``tracemalloc``
+
+    Returns:
+        dict: Fastest, median and mean wall time and mean CPU time of a call in seconds, number of timings and calls
+        per timing, and peak memory allocated in bytes
+
+    """
+    # The first call is a warm up, and shows how many calls fit in each timing
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    number = max(1, int(math.ceil(min_time / first))) if first > 0 else 1
+
+    wall_times, cpu_times = [], []
+    for _ in range(repeat):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        for _ in range(number):
+            func()
+        wall_times.append((time.perf_counter() - start) / number)
+        cpu_times.append((time.process_time() - cpu_start) / number)
+
+    result = OrderedDict([('min_time', min(wall_times)), ('median_time', float(np.median(wall_times))),
+                          ('mean_time', float(np.mean(wall_times))), ('cpu_time', float(np.mean(cpu_times))),
+                          ('repeat', repeat), ('number', number), ('peak_memory', None)])
+
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            func()
+            result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def _versions():
+    versions = OrderedDict([('python', platform.python_version())])
+    for module in ['ssbio', 'Bio', 'numpy', 'pandas', 'scipy', 'cobra']:
+        try:
+            from pkg_resources import get_distribution
+            name = {'Bio': 'biopython'}.get(module, module)
+            versions[module] = get_distribution(name).version
+        except Exception:
+            versions[module] = getattr(sys.modules.get(module), '__version__', None)
+    return versions
+
+
+def run_benchmarks(names=None, scale=10, repeat=5, measure_memory=True, seed=0, tmp_dir=None):
+    """Run benchmarks. A benchmark which fails is reported with its error instead of its timings.
+
+    Args:
+        names (str, list): Names of benchmarks to run, or parts of them, all benchmarks if ``None``
+        scale (int): How many times larger than the test files the synthetic inputs are
+        repeat (int): Number of times to time each case
+        measure_memory (bool): If the peak memory allocated by each case should be measured
+        seed (int): Seed of the random generator of synthetic inputs
+        tmp_dir (str): Path to the folder for files written by the benchmarks, a temporary folder which is removed
+            afterwards if ``None``
+
+    Returns:
+        dict: Versions, settings, and results of each case, as ``<benchmark>.<case>``
+
+    """
+    if names:
+        names = ssbio.utils.force_list(names)
+        selected = [x for x in BENCHMARKS if any(n in x for n in names)]
+        if not selected:
+            raise ValueError('{}: no benchmarks match, choose from {}'.format(names, list(BENCHMARKS)))
+    else:
+        selected = list(BENCHMARKS)
+
+    remove_tmp_dir = tmp_dir is None
+    if remove_tmp_dir:
+        tmp_dir = tempfile.mkdtemp(prefix='ssbio_benchmarks_')
+    data = BenchmarkData(tmp_dir, scale=scale, seed=seed)
+
+    results = OrderedDict()
+    try:
+        for name in selected:
+            try:
+                cases = BENCHMARKS[name](data)
+            except Exception as e:
+                log.error('{}: unable to prepare benchmark: {}'.format(name, e))
+                results[name] = {'error': '{}: {}'.format(type(e).__name__, e)}
+                continue
+
+            for case, func in cases.items():
+                key = '{}.{}'.format(name, case)
+                try:
+                    results[key] = time_function(func, repeat=repeat, measure_memory=measure_memory)
+                    log.info('{}: {:.4f}s'.format(key, results[key]['min_time']))
+                except Exception as e:
+                    log.error('{}: benchmark failed: {}'.format(key, e))
+                    results[key] = {'error': '{}: {}'.format(type(e).__name__, e)}
+    finally:
+        if remove_tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return OrderedDict([('format', _FORMAT),
+                        ('date', time.strftime('%Y-%m-%dT%H:%M:%S')),
+                        ('platform', platform.platform()),
+                        ('versions', _versions()),
+                        ('settings', OrderedDict([('scale', scale), ('repeat', repeat), ('seed', seed)])),
+                        ('results', results)])
+
+
+def save_results(results, outfile):
+    """Save benchmark results as JSON.
+
+    Args:
+        results (dict): Results from :func:`run_benchmarks`
+        outfile (str): Path to the output file
+
+    Returns:
+        str: Path to the output file
+
+    """
+    with open(outfile, 'w') as f:
+        json.dump(results, f, indent=1)
+    return outfile
+
+
+def load_results(infile):
+    """Load benchmark results saved with :func:`save_results`.
+
+    Args:
+        infile (str): Path to the results file
+
+    Returns:
+        dict: Benchmark results
+
+    """
+    with open(infile) as f:
+        results = json.load(f, object_pairs_hook=OrderedDict)
+    if results.get('format') != _FORMAT:
+        raise ValueError('{}: unsupported benchmark results format {}'.format(infile, results.get('format')))
+    return results
+
+
+def compare_results(baseline, results, threshold=0.2):
+    """Compare benchmark results with results of an earlier version.
+
+    Fastest times are compared, since they are the least affected by other programs running at the same time.
+
+    Args:
+        baseline (dict): Earlier results from :func:`run_benchmarks` or :func:`load_results`
+        results (dict): New results
+        threshold (float): Relative increase of time or peak memory counted as a regression
+
+    Returns:
+        DataFrame: Times and peak memory of the cases run in both, their ratios (new / baseline), and if they
+        regressed, ordered by time ratio
+
+    """
+    if baseline['settings'].get('scale') != results['settings'].get('scale'):
+        log.warning('Results were run with different scales ({} and {}), synthetic inputs differ'.format(
+            baseline['settings'].get('scale'), results['settings'].get('scale')))
+
+    rows = []
+    for key, new in results['results'].items():
+        old = baseline['results'].get(key)
+        if not old or 'error' in old or 'error' in new:
+            continue
+        time_ratio = new['min_time'] / old['min_time'] if old['min_time'] else float('nan')
+        if new.get('peak_memory') is not None and old.get('peak_memory'):
+            memory_ratio = float(new['peak_memory']) / old['peak_memory']
+        else:
+            memory_ratio = float('nan')
+        rows.append(OrderedDict([('case', key),
+                                 ('baseline_time', old['min_time']), ('time', new['min_time']),
+                                 ('time_ratio', time_ratio),
+                                 ('baseline_peak_memory', old.get('peak_memory')),
+                                 ('peak_memory', new.get('peak_memory')),
+                                 ('memory_ratio', memory_ratio),
+                                 ('regression', time_ratio > 1 + threshold or memory_ratio > 1 + threshold)]))
+
+    columns = ['case', 'baseline_time', 'time', 'time_ratio', 'baseline_peak_memory', 'peak_memory', 'memory_ratio',
+               'regression']
+    df = pd.DataFrame.from_records(rows, columns=columns).set_index('case')
+    return df.sort_values('time_ratio', ascending=False)
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                description=textwrap.dedent("""\
+                                ssbio benchmarks - benchmarks.py
+                                --------------------------------
+                                Time the hot paths of ssbio on the test files and synthetic inputs, and save the
+                                results as JSON to compare them between versions.
+
+                                Example: run all benchmarks
+                                $ python -m ssbio.test.benchmarks --outfile results.json
+
+                                Example: run the alignment benchmarks on inputs 100 times larger than the test files
+                                $ python -m ssbio.test.benchmarks --only alignment indels --scale 100
+
+                                Example: compare with earlier results
+                                $ python -m ssbio.test.benchmarks --outfile new.json --compare results.json
+                                """))
+    p.add_argument('--outfile', '-o', default='ssbio_benchmarks.json', help='JSON file to save the results to')
+    p.add_argument('--only', nargs='+', default=None,
+                   help='Benchmarks to run, or parts of their names, from: {}'.format(', '.join(BENCHMARKS)))
+    p.add_argument('--scale', '-s', type=int, default=10,
+                   help='How many times larger than the test files the synthetic inputs are')
+    p.add_argument('--repeat', '-r', type=int, default=5, help='Number of times to time each case')
+    p.add_argument('--no-memory', action='store_true', help='Do not measure the peak memory of each case')
+    p.add_argument('--compare', '-c', default=None, help='JSON file of earlier results to compare with')
+    p.add_argument('--threshold', '-t', type=float, default=0.2,
+                   help='Relative increase of time or memory counted as a regression')
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    log.setLevel(logging.INFO)
+    results = run_benchmarks(names=args.only, scale=args.scale, repeat=args.repeat,
+                             measure_memory=not args.no_memory)
+    save_results(results, args.outfile)
+    print('Benchmark results at: {}'.format(args.outfile))
+
+    if args.compare:
+        comparison = compare_results(load_results(args.compare), results, threshold=args.threshold)
+        with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 200):
+            print(comparison)
+        if comparison.regression.any():
+            print('Regressions: {}'.format(', '.join(comparison[comparison.regression].index)))
+            sys.exit(1)
@@ -1,6 +1,7 @@
 import os.path as op
 import pytest
 import tempfile
+from Bio.PDB import PDBParser
 
 
 @pytest.fixture(scope='module')
@@ -28,6 +29,18 @@ def test_files_structures(test_files):
     return op.join(test_files, 'structures')
 
 
+@pytest.fixture(scope='module')
+def structure_1ecp(test_files_structures):
+    """Biopython Structure of 1ecp, parsed from its PDB file"""
+    return PDBParser(QUIET=True).get_structure('1ecp', op.join(test_files_structures, '1ecp.pdb'))
+
+
+@pytest.fixture(scope='module')
+def structure_1cbn(test_files_structures):
+    """Biopython Structure of 1cbn, parsed from its PDB file"""
+    return PDBParser(QUIET=True).get_structure('1cbn', op.join(test_files_structures, '1cbn.pdb'))
+
+
 @pytest.fixture(scope='module')
 def test_files_models(test_files):
     """SBML model files"""
@@ -0,0 +1,36 @@
+import copy
+
+import pytest
+
+from ssbio.test import benchmarks
+
+
+def test_run_benchmarks(tmpdir):
+    results = benchmarks.run_benchmarks(names=['needle_statistics', 'match_structure_sequence'], scale=1, repeat=2,
+                                        tmp_dir=str(tmpdir))
+    assert list(results['results']) == ['needle_statistics.bundled', 'needle_statistics.synthetic',
+                                        'match_structure_sequence.synthetic']
+    for result in results['results'].values():
+        assert 'error' not in result
+        assert 0 < result['min_time'] <= result['median_time']
+        assert result['repeat'] == 2 and result['peak_memory'] > 0
+
+    with pytest.raises(ValueError):
+        benchmarks.run_benchmarks(names='nothing')
+
+    # Results are saved as JSON, and regressions are found by comparing them
+    outfile = benchmarks.save_results(results, str(tmpdir.join('results.json')))
+    baseline = benchmarks.load_results(outfile)
+    slower = copy.deepcopy(baseline)
+    slower['results']['needle_statistics.synthetic']['min_time'] *= 2
+    df = benchmarks.compare_results(baseline, slower)
+    assert df.index[0] == 'needle_statistics.synthetic'
+    assert df.time_ratio.iloc[0] == pytest.approx(2)
+    assert df.regression.tolist() == [True, False, False]
+
+
+def test_run_all_benchmarks(tmpdir):
+    results = benchmarks.run_benchmarks(scale=1, repeat=1, measure_memory=False, tmp_dir=str(tmpdir))
+    assert sorted(set(x.split('.')[0] for x in results['results'])) == sorted(benchmarks.BENCHMARKS)
+    errors = {k: v['error'] for k, v in results['results'].items() if 'error' in v}
+    assert not errors
@@ -1,6 +1,23 @@
 import unittest
 
-from ssbio.core.object import Object
+from ssbio.core.object import Object, json_schema
+
+
+class SchemaTester(Object):
+    version = 2
+
+    def __init__(self, id):
+        Object.__init__(self, id=id)
+        self.__hidden = 'private'
+        self.callback = len
+
+    @property
+    def double_id(self):
+        return self.id * 2
+
+    def method(self):
+        pass
+
 
 class TestObject(unittest.TestCase):
     """Unit tests for Object"""
@@ -29,4 +46,28 @@ class TestObject(unittest.TestCase):
 
     def test_get_dict(self):
         gotdict = self.ob.get_dict(only_attributes='id')
-        self.assertEqual(gotdict, {'id':'idtester'})
\ No newline at end of file
+        self.assertEqual(gotdict, {'id':'idtester'})
+
+    def test_json_encode(self):
+        ob = SchemaTester(id='schema')
+        ob.extra = [1, 2]
+        encoded = ob.__json_encode__()
+        self.assertEqual(list(encoded), ['description', 'extra', 'id', 'notes', 'version'])
+        self.assertEqual(encoded['version'], 2)
+        self.assertIs(json_schema(SchemaTester), json_schema(SchemaTester))
+
+        # Instance attributes override class attributes
+        ob.version = 3
+        self.assertEqual(ob.__json_encode__()['version'], 3)
+
+        decoded = SchemaTester.__new__(SchemaTester)
+        decoded.__dict__.update(encoded)
+        self.assertEqual(decoded.__json_encode__(), encoded)
+
+    def test_get_dict_copy(self):
+        ob = Object(id='copytester')
+        ob.pdbs = ['1abc', '2abc']
+        self.assertIsNot(ob.get_dict()['pdbs'], ob.pdbs)
+        self.assertIs(ob.get_dict(copy=False)['pdbs'], ob.pdbs)
+        self.assertEqual(ob.get_dict(df_format=True, only_attributes=['id', 'pdbs', 'description']),
+                         {'id': 'copytester', 'pdbs': '1abc;2abc', 'description': None})
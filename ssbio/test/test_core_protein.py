@@ -1,4 +1,7 @@
+import os.path as op
+import pandas as pd
 import pytest
+import ssbio.protein.sequence.utils.alignment
 from ssbio.core.protein import Protein
 
 # import os.path as op
@@ -107,4 +110,146 @@ from ssbio.core.protein import Protein
 #         self.prot.set_representative_structure(seq_outdir=op.join('test_files','out'),
 #                                                struct_outdir=op.join('test_files','out'),
 #                                                pdb_file_type='cif')
-#         self.assertEqual('1ecp-A', self.prot.representative_structure.id)
\ No newline at end of file
+#         self.assertEqual('1ecp-A', self.prot.representative_structure.id)
+
+def _protein_with_structure(test_files_sequences, test_files_structures, test_files_tempdir, resnum_offset=0):
+    """Load a protein with a sequence mapped to chain A of a structure, optionally renumbering the structure"""
+    prot = Protein(ident='P0ABP8')
+    seqprop = prot.load_manual_sequence_file('P0ABP8', op.join(test_files_sequences, 'P0ABP8.fasta'),
+                                             set_as_representative=True)
+    structprop = prot.load_pdb('1ecp', pdb_file=op.join(test_files_structures, '1ecp.pdb'), file_type='pdb')
+    prot.align_seqprop_to_structprop(seqprop, structprop, chains='A', engine='biopython', outdir=test_files_tempdir,
+                                     parse=False, force_rerun=True)
+    aln = prot.sequence_alignments.get_by_id('P0ABP8_1ecp-A')
+    aln_df = ssbio.protein.sequence.utils.alignment.get_alignment_df(str(aln[0].seq), str(aln[1].seq))
+    seqprop.letter_annotations['P0ABP8_1ecp-A_chain_index'] = aln_df[pd.notnull(aln_df.id_a_pos)].id_b_pos.tolist()
+    seqprop.letter_annotations['SS-test'] = 'H' * len(seqprop)
+
+    chain_record = structprop.chains.get_by_id('A').seq_record
+    chain_record.letter_annotations['RSA-test'] = [x / 100. for x in range(len(chain_record))]
+    if resnum_offset:
+        chain_record.letter_annotations['structure_resnums'] = [x + resnum_offset for x in
+                                                                chain_record.letter_annotations['structure_resnums']]
+    return prot
+
+
+@pytest.fixture(scope='module')
+def protein_with_structure(test_files_sequences, test_files_structures, test_files_tempdir):
+    """Protein with a sequence mapped to chain A of a structure"""
+    return _protein_with_structure(test_files_sequences, test_files_structures, test_files_tempdir)
+
+
+@pytest.fixture(scope='module')
+def protein_with_offset_structure(test_files_sequences, test_files_structures, test_files_tempdir):
+    """Protein with a sequence mapped to chain A of a structure which is not numbered from 1"""
+    return _protein_with_structure(test_files_sequences, test_files_structures, test_files_tempdir, resnum_offset=5)
+
+
+def test_get_residue_annotations_bulk(protein_with_structure):
+    prot = protein_with_structure
+    seqprop = prot.sequences.get_by_id('P0ABP8')
+    structprop = prot.structures.get_by_id('1ecp')
+    resnums = [1, 2, 50, 239, 2]
+
+    bulk = prot.get_residue_annotations_bulk(resnums, seqprop=seqprop, structprop=structprop, chain_id='A')
+    assert bulk.seq_resnum.tolist() == resnums
+
+    for (_, row), resnum in zip(bulk.iterrows(), resnums):
+        single = prot.get_residue_annotations(resnum, seqprop=seqprop, structprop=structprop, chain_id='A')
+        assert row.dropna().to_dict() == single
+
+    with pytest.raises(ValueError):
+        prot.get_residue_annotations_bulk([0], seqprop=seqprop, structprop=structprop, chain_id='A')
+
+
+def test_get_residue_annotations_offset_numbering(protein_with_structure, protein_with_offset_structure):
+    resnums = [10, 50, 120]
+    offset_prot = protein_with_offset_structure
+    seqprop = offset_prot.sequences.get_by_id('P0ABP8')
+    structprop = offset_prot.structures.get_by_id('1ecp')
+    bulk = offset_prot.get_residue_annotations_bulk(resnums, seqprop=seqprop, structprop=structprop, chain_id='A')
+
+    prot = protein_with_structure
+    for (_, row), resnum in zip(bulk.iterrows(), resnums):
+        single = offset_prot.get_residue_annotations(resnum, seqprop=seqprop, structprop=structprop, chain_id='A')
+        assert row.dropna().to_dict() == single
+
+        # Only the structure residue numbers differ from the structure numbered from 1
+        expected = prot.get_residue_annotations(resnum, seqprop=prot.sequences.get_by_id('P0ABP8'),
+                                                structprop=prot.structures.get_by_id('1ecp'), chain_id='A')
+        expected['struct_resnum'] += 5
+        assert single == expected
+
+
+def test_map_resnums(protein_with_structure):
+    prot = protein_with_structure
+    seqprop = prot.sequences.get_by_id('P0ABP8')
+    structprop = prot.structures.get_by_id('1ecp')
+    chain_record = structprop.chains.get_by_id('A').seq_record
+
+    mapping = prot.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id='A')
+    assert prot.get_residue_mapping(seqprop=seqprop, structprop=structprop, chain_id='A') is mapping
+
+    resnums = list(range(1, len(seqprop) + 1))
+    seq_to_struct = prot.map_seqprop_resnums_to_structprop_resnums(resnums, seqprop=seqprop, structprop=structprop,
+                                                                   chain_id='A')
+    assert 1 not in seq_to_struct
+    for seq_resnum, struct_resnum in seq_to_struct.items():
+        chain_ix = int(seqprop.letter_annotations['P0ABP8_1ecp-A_chain_index'][seq_resnum - 1]) - 1
+        assert chain_record.letter_annotations['structure_resnums'][chain_ix] == struct_resnum
+
+    struct_to_seq = prot.map_structprop_resnums_to_seqprop_resnums(list(seq_to_struct.values()) + [10000],
+                                                                   structprop=structprop, chain_id='A',
+                                                                   seqprop=seqprop)
+    assert struct_to_seq == {v: k for k, v in seq_to_struct.items()}
+
+
+def test_get_mutation_matrix():
+    from Bio.Align import MultipleSeqAlignment
+    from Bio.Seq import Seq
+    from Bio.SeqRecord import SeqRecord
+
+    prot = Protein(ident='b4384')
+    for strain, mutations in [('s1', [('A', 24, 'V')]), ('s2', [('A', 24, 'V'), ('R', 33, 'T')]), ('s3', [])]:
+        aln = MultipleSeqAlignment([SeqRecord(Seq('MKT'), id='ref'), SeqRecord(Seq('MKT'), id=strain)])
+        aln.id = 'ref_{}'.format(strain)
+        aln.annotations['b_seq'] = strain
+        aln.annotations['mutations'] = mutations
+        aln.annotations['ssbio_type'] = 'seqalign'
+        prot.sequence_alignments.append(aln)
+
+    matrix = prot.get_mutation_matrix()
+    assert prot.get_mutation_matrix() is matrix
+    assert prot.get_mutation_matrix(alignment_ids='ref_s1') is not matrix
+
+    single, fingerprint = prot.sequence_mutation_summary()
+    assert single == {('A', 24, 'V'): ['s1', 's2'], ('R', 33, 'T'): ['s2']}
+    assert fingerprint == {(('A', 24, 'V'),): ['s1'], (('A', 24, 'V'), ('R', 33, 'T')): ['s2']}
+
+    # Parsing an alignment again replaces its mutations, which invalidates the cached matrix
+    prot.sequence_alignments.get_by_id('ref_s3').annotations['mutations'] = [('R', 33, 'T')]
+    assert prot.get_mutation_matrix() is not matrix
+    assert prot.sequence_mutation_summary()[0][('R', 33, 'T')] == ['s2', 's3']
+
+
+def test_pairwise_align_reuse_identical(tmpdir):
+    prot = Protein(ident='b4384')
+    prot.load_manual_sequence(seq='MKTAYIAKQRQISFVKSHFSRQ', ident='ref', set_as_representative=True)
+    prot.load_manual_sequence(seq='MKTAYIAKQRQISFVKSHFSRQ', ident='b4384_s1')
+    prot.load_manual_sequence(seq='MKTVYIAKQRQISFVKSHF', ident='b4384_s2')
+    prot.pairwise_align_sequences_to_representative(outdir=str(tmpdir), engine='biopython', parse=False,
+                                                    reuse_identical=True)
+    assert [x.id for x in prot.sequence_alignments] == ['b4384_b4384_s1', 'b4384_b4384_s2']
+
+    # New strains with an allele which was already aligned copy its alignment
+    prot.load_manual_sequence(seq='MKTVYIAKQRQISFVKSHF', ident='b4384_s3')
+    prot.load_manual_sequence(seq='MKTAYIAKQRQISFVKSHFSRQ', ident='b4384_s4')
+    prot.pairwise_align_sequences_to_representative(outdir=str(tmpdir), engine='biopython', parse=False,
+                                                    reuse_identical=True)
+    for copied, original in [('b4384_s3', 'b4384_s2'), ('b4384_s4', 'b4384_s1')]:
+        aln = prot.sequence_alignments.get_by_id('b4384_{}'.format(copied))
+        aligned = prot.sequence_alignments.get_by_id('b4384_{}'.format(original))
+        assert aln.annotations['b_seq'] == copied
+        assert list(aln)[1].id == copied
+        assert str(list(aln)[1].seq) == str(list(aligned)[1].seq)
+        assert aln.annotations['percent_identity'] == aligned.annotations['percent_identity']
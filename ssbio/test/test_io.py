@@ -0,0 +1,44 @@
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ssbio.io
+
+py38 = pytest.mark.skipif(sys.version_info < (3, 8), reason='pickle protocol 5 needs Python 3.8')
+
+
+def _obj():
+    return {'coords': np.arange(3000, dtype=float).reshape(1000, 3),
+            'df': pd.DataFrame({'rsa': np.linspace(0, 1, 50), 'ss': ['H'] * 50}),
+            'ss': list('HHHEEE---')}
+
+
+def _check(loaded):
+    expected = _obj()
+    assert np.array_equal(loaded['coords'], expected['coords'])
+    loaded['coords'][0, 0] = 1  # Arrays loaded from out-of-band buffers are writable
+    pd.testing.assert_frame_equal(loaded['df'], expected['df'])
+    assert loaded['ss'] == expected['ss']
+
+
+def test_pickle_protocol_2(tmpdir):
+    outfile = ssbio.io.save_pickle(_obj(), str(tmpdir.join('obj.pckl')))
+    with open(outfile, 'rb') as f:
+        _check(pickle.load(f))
+    _check(ssbio.io.load_pickle(outfile))
+
+    with pytest.raises(ValueError):
+        ssbio.io.save_pickle(_obj(), outfile, compression='gzip')
+
+
+@py38
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_pickle_protocol_5(tmpdir, compression):
+    outfile = ssbio.io.save_pickle(_obj(), str(tmpdir.join('obj.pckl')), protocol=5, compression=compression)
+    _check(ssbio.io.load_pickle(outfile))
+
+    with pytest.raises(ValueError):
+        ssbio.io.save_pickle(_obj(), outfile, protocol=5, compression='bz2')
@@ -0,0 +1,75 @@
+import os.path as op
+import sys
+import time
+
+import pytest
+
+from ssbio.io.jobs import JobError, JobPool, run_job
+
+posix = pytest.mark.skipif(sys.platform.startswith('win'), reason='needs POSIX process groups and limits')
+linux = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='needs prlimit for memory limits')
+
+
+def _python(code):
+    return [sys.executable, '-c', code]
+
+
+def test_run_job():
+    result = run_job(_python('import sys; print(sys.stdin.read().upper()); sys.stderr.write("warning")'), stdin='mkv')
+    assert result.ok
+    assert result.stdout.strip() == 'MKV'
+    assert result.stderr == 'warning'
+    assert result.wall_time > 0
+
+    result = run_job(_python('import sys; sys.exit(3)'))
+    assert not result.ok
+    assert result.returncode == 3
+    with pytest.raises(JobError):
+        result.check()
+
+    result = run_job(['ssbio_program_that_does_not_exist'])
+    assert not result.ok
+    assert result.returncode is None
+    assert result.error
+
+
+@posix
+def test_run_job_limits():
+    # Children of the program are stopped with it
+    start = time.time()
+    result = run_job(['sh', '-c', 'sleep 30 & sleep 30'], timeout=0.5)
+    assert time.time() - start < 10
+    assert result.timed_out
+    assert not result.ok
+
+    result = run_job(_python('import time; [sum(range(10000)) for _ in range(2000)]'))
+    assert result.cpu_time > 0
+    assert result.max_memory > 0
+
+
+@linux
+def test_run_job_memory_limit():
+    code = 'import time; time.sleep(0.2); x = bytearray(1024 ** 3)'
+    result = run_job(_python(code), memory_limit=256 * 1024 ** 2)
+    assert not result.ok
+    assert 'MemoryError' in result.stderr
+
+    # Limits are also set for jobs started from the threads of a pool
+    with JobPool(max_workers=2, memory_limit=256 * 1024 ** 2) as pool:
+        results = [f.result() for f in [pool.submit(_python(code)) for _ in range(4)]]
+    assert all('MemoryError' in r.stderr for r in results)
+
+
+def test_job_pool(tmpdir):
+    log_dir = str(tmpdir.join('logs'))
+    with JobPool(max_workers=2, log_dir=log_dir) as pool:
+        futures = [pool.submit(_python('print({})'.format(i)), name='job{}'.format(i)) for i in range(4)]
+        results = [f.result() for f in futures]
+        assert [r.stdout.strip() for r in results] == ['0', '1', '2', '3']
+        assert [r.ok for r in pool.map([_python('pass'), _python('import sys; sys.exit(1)')])] == [True, False]
+
+        stats = pool.stats()
+        assert (stats['submitted'], stats['succeeded'], stats['failed'], stats['running']) == (6, 5, 1, 0)
+
+    with open(op.join(log_dir, 'job2.out')) as f:
+        assert f.read().strip() == '2'
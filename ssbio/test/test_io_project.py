@@ -0,0 +1,57 @@
+import os
+import os.path as op
+
+import pytest
+
+from ssbio.io.project import load_project, read_manifest
+from ssbio.pipeline.gempro import GEMPRO
+
+
+@pytest.fixture()
+def gempro(tmpdir):
+    gp = GEMPRO(gem_name='sharded', root_dir=str(tmpdir), genes_list=['b0001', 'b0002', 'b0003'])
+    for g in gp.genes:
+        g.protein.description = 'protein of {}'.format(g.id)
+    return gp
+
+
+@pytest.mark.parametrize('serializer', ['pickle', 'json'])
+def test_save_load_project(gempro, tmpdir, serializer):
+    project_dir = str(tmpdir.join('project'))
+    gempro.save_project(project_dir, serializer=serializer)
+    manifest = read_manifest(project_dir)
+    assert sorted(manifest['proteins']) == ['b0001', 'b0002', 'b0003']
+
+    loaded = load_project(project_dir)
+    assert [g.id for g in loaded.genes] == [g.id for g in gempro.genes]
+    # Proteins are loaded when they are first used
+    assert not any(g.protein_loaded for g in loaded.genes)
+    gene = loaded.genes.get_by_id('b0002')
+    assert gene.protein.description == 'protein of b0002'
+    assert gene.protein_loaded
+    assert not loaded.genes.get_by_id('b0001').protein_loaded
+
+    loaded = load_project(project_dir, lazy=False)
+    assert all(g.protein_loaded for g in loaded.genes)
+
+
+def test_incremental_save(gempro, tmpdir):
+    project_dir = str(tmpdir.join('project'))
+    gempro.save_project(project_dir)
+    manifest = read_manifest(project_dir)
+    paths = {k: op.join(project_dir, v['file']) for k, v in manifest['proteins'].items()}
+    for path in paths.values():
+        os.utime(path, (0, 0))
+
+    loaded = load_project(project_dir)
+    loaded.genes.get_by_id('b0001').protein.description = 'changed'
+    loaded.genes.get_by_id('b0002').protein
+    loaded.genes.remove(loaded.genes.get_by_id('b0003'))
+    loaded.save_project(project_dir)
+
+    # Only the changed protein is written, the one that was not used is not serialized again
+    assert op.getmtime(paths['b0001']) > 0
+    assert op.getmtime(paths['b0002']) == 0
+    assert not op.exists(paths['b0003'])
+    assert sorted(read_manifest(project_dir)['proteins']) == ['b0001', 'b0002']
+    assert load_project(project_dir).genes.get_by_id('b0001').protein.description == 'changed'
@@ -0,0 +1,103 @@
+import os
+import os.path as op
+import time
+
+import pytest
+
+from ssbio.io.resultcache import CachedRun, ResultCache
+
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture()
+def cache(tmpdir):
+    return ResultCache(str(tmpdir.join('cache')))
+
+
+def test_make_key(cache, tmpdir):
+    a = _write(str(tmpdir.join('a.faa')), '>a\nMKV')
+    moved = _write(str(tmpdir.join('moved.faa')), '>a\nMKV')
+    b = _write(str(tmpdir.join('b.faa')), '>a\nMKL')
+
+    key = cache.make_key('needle', input_files=[a], args={'gapopen': 10}, version='6.6')
+    # Keys depend on file contents, not paths
+    assert cache.make_key('needle', input_files=[moved], args={'gapopen': 10}, version='6.6') == key
+    assert cache.make_key('needle', input_files=[b], args={'gapopen': 10}, version='6.6') != key
+    assert cache.make_key('needle', input_files=[a], args={'gapopen': 11}, version='6.6') != key
+    assert cache.make_key('needle', input_files=[a], args={'gapopen': 10}, version='6.7') != key
+    assert cache.make_key('water', input_files=[a], args={'gapopen': 10}, version='6.6') != key
+
+
+def test_fetch_store(cache, tmpdir):
+    out = _write(str(tmpdir.join('1abc.rsa')), 'RES ALA')
+    key = cache.make_key('freesasa', input_data=['structure'])
+    assert not cache.fetch(key, [out])
+
+    cache.store(key, [out])
+    assert key in cache
+    assert len(cache) == 1
+
+    # Outputs are restored by their order, under any name
+    other = str(tmpdir.join('project2', '1abc_copy.rsa'))
+    assert cache.fetch(key, [other])
+    assert _read(other) == 'RES ALA'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (1, 1, 1, 1)
+    assert stats['size'] == len('RES ALA')
+
+    cache.clear()
+    assert key not in cache
+    assert cache.size == 0
+
+
+def test_lru_eviction(tmpdir):
+    cache = ResultCache(str(tmpdir.join('cache')), max_size=25)
+    keys = []
+    for i in range(3):
+        out = _write(str(tmpdir.join('out{}'.format(i))), '0123456789')
+        keys.append(cache.make_key('prog', input_data=[str(i)]))
+        cache.store(keys[-1], [out])
+        # Make sure entries have distinct access times
+        entry_dir = op.join(cache.cache_dir, keys[-1][:2], keys[-1])
+        os.utime(entry_dir, (time.time() - 100 + i, time.time() - 100 + i))
+        if i == 1:
+            # Using the first entry makes the second one the least recently used
+            assert cache.fetch(keys[0], [str(tmpdir.join('fetched'))])
+
+    assert keys[0] in cache
+    assert keys[1] not in cache
+    assert keys[2] in cache
+    assert cache.stats()['evictions'] == 1
+    assert cache.size <= 25
+
+
+def test_cached_run(cache, tmpdir):
+    infile = _write(str(tmpdir.join('seq.faa')), '>a\nMKV')
+    outfile = str(tmpdir.join('seq.out'))
+
+    run = CachedRun('prog', outfiles=outfile, input_files=infile, version='1', cache=cache)
+    assert run.needs_run()
+    _write(outfile, 'result')
+    run.finish()
+
+    # A new run with the same inputs copies the results instead of running
+    os.remove(outfile)
+    run = CachedRun('prog', outfiles=outfile, input_files=infile, version='1', cache=cache)
+    assert not run.needs_run()
+    assert _read(outfile) == 'result'
+    assert run.needs_run(force_rerun=True)
+
+    # An existing output file is not trusted if the inputs changed
+    _write(infile, '>a\nMKVL')
+    run = CachedRun('prog', outfiles=outfile, input_files=infile, version='1', cache=cache)
+    assert run.needs_run()
@@ -0,0 +1,123 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from ssbio.core.protein import Protein
+from ssbio.io import jobs, tracing
+from ssbio.io.tracing import Tracer, traced
+
+
+class Thing(object):
+
+    def __init__(self, ident):
+        self.id = ident
+
+    @traced('protein')
+    def work(self, fail=False):
+        tracing.count('cache_hits')
+        if fail:
+            raise RuntimeError('failed')
+        return self.id
+
+
+@traced('gempro')
+def step(things):
+    with tracing.span('block', 'other', size=len(things)):
+        tracing.count('cache_misses', 2)
+    return [t.work() for t in things]
+
+
+def test_disabled():
+    assert tracing.get_tracer() is None
+    with tracing.span('block') as span:
+        assert span is None
+    tracing.count('cache_hits')
+    assert step([Thing('a')]) == ['a']
+
+
+def test_spans(tmpdir):
+    with Tracer() as tracer:
+        assert tracing.get_tracer() is tracer
+        assert step([Thing('a'), Thing('b')]) == ['a', 'b']
+        with pytest.raises(RuntimeError):
+            Thing('c').work(fail=True)
+    assert tracing.get_tracer() is None
+
+    spans = {(s.name, s.gene): s for s in tracer.spans}
+    assert len(spans) == 5
+    outer = spans[('step', None)]
+    assert outer.category == 'gempro' and outer.step == 'step'
+    assert outer.counters['cache_hits'] == 2 and outer.counters['cache_misses'] == 2
+    assert ('bytes_read' in outer.counters) == tracer.measure_io
+    inner = spans[('Thing.work', 'a')]
+    assert inner.step == 'step' and inner.args == {'id': 'a'} and inner.counters['cache_hits'] == 1
+    assert spans[('block', None)].args == {'size': 2}
+    assert outer.wall_time >= inner.wall_time >= 0
+    assert spans[('Thing.work', 'c')].error == 'RuntimeError: failed'
+
+    df = tracer.summary(group_by=['step', 'name'])
+    assert df.loc[('step', 'Thing.work'), 'calls'] == 2
+    assert df.loc[('step', 'Thing.work'), 'cache_hits'] == 2
+    assert tracer.summary(group_by=['gene']).loc['c', 'calls'] == 1
+
+    with open(tracer.to_json(str(tmpdir.join('trace.json')))) as f:
+        data = json.load(f)
+    assert [s['name'] for s in data['spans']][0] == 'step'
+    with open(tracer.to_chrome_trace(str(tmpdir.join('chrome.json')))) as f:
+        events = json.load(f)['traceEvents']
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in events)
+    assert events[0]['args']['cache_hits'] == 2
+
+
+def test_summary_nested_spans():
+    with Tracer(measure_io=False) as tracer:
+        with tracing.span('step', gene='b0001'):
+            with tracing.span('step'):
+                time.sleep(0.2)
+                tracing.count('cache_hits')
+            with tracing.span('other'):
+                tracing.count('cache_hits')
+
+    # The nested span of the same group is counted as a call, but its time and counters are not added again
+    df = tracer.summary(group_by=['name', 'gene'])
+    outer = df.loc[('step', 'b0001')]
+    assert outer['calls'] == 2
+    assert 0.2 <= outer['wall_time'] < 0.3
+    assert outer['cache_hits'] == 2
+    assert df.loc[('other', 'b0001'), 'cache_hits'] == 1
+
+    # Spans of other groups are not nested in the same group
+    df = tracer.summary(group_by=['name'])
+    assert df.loc['other', 'calls'] == 1 and df.loc['step', 'calls'] == 2
+    assert df.loc['step', 'wall_time'] < 0.3
+
+
+def test_threads():
+    tracer = tracing.enable_tracing(measure_io=False)
+    try:
+        threads = [threading.Thread(target=step, args=([Thing(str(i))],)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        assert tracing.disable_tracing() is tracer
+    assert len(tracer.spans) == 12
+    assert all(s.counters['cache_hits'] == 1 for s in tracer.spans if s.name == 'step')
+
+
+def test_protein_and_jobs():
+    with Tracer() as tracer:
+        protein = Protein(ident='P1')
+        protein.load_manual_sequence(seq='MKRISTTITTTITITTGNGAG', ident='P1', write_fasta_file=False,
+                                     set_as_representative=True)
+        protein.set_representative_sequence()
+        with tracing.span('jobs'):
+            jobs.JobPool(max_workers=1).run([sys.executable, '-c', 'pass'])
+    spans = {s.name: s for s in tracer.spans}
+    assert spans['Protein.set_representative_sequence'].gene == 'P1'
+    assert spans['jobs'].counters['subprocesses'] == 1
+    assert spans[sys.executable.split('/')[-1]].category == 'subprocess'
@@ -1,7 +1,162 @@
 import os.path as op
+import pandas as pd
 import pytest
+from Bio.Align import MultipleSeqAlignment
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
 from ssbio.pipeline.gempro import GEMPRO
-from ssbio.pipeline.atlas2 import ATLAS2
+from ssbio.pipeline.atlas import ATLAS
 
 
 ATLAS_NAME = 'atlas_tester'
+
+REFERENCE_SEQUENCES = {'b0001': 'MKRISTTITTTITITTGNGAG',
+                       'b0002': 'MRVLKFGGTSVANAERFLRVADILESNARQ',
+                       'b0003': 'MKVLAAGIVG'}
+
+# Parsed alignments of each strain to the reference genes, as
+# (mutations, percent identity, percent similarity, deletions, insertions)
+STRAIN_ALIGNMENTS = [('s1', {'b0001': ([], 100., 100., [], []),
+                             'b0002': ([('R', 16, 'K')], 96.7, 100., [], [])}),
+                     ('s2', {'b0001': ([('I', 4, 'V')], 95.2, 100., [], []),
+                             'b0002': ([('R', 16, 'K'), ('N', 28, 'W')], 90., 93.3, [((13, 14), 2)],
+                                       [((24, 25), 2)])}),
+                     ('s3', {'b0001': ([('I', 4, 'V'), ('T', 13, 'A')], 90.5, 95.2, [((20, 21), 1)], []),
+                             'b0002': ([('R', 16, 'K')], 96.7, 100., [], [((2, 3), 1), ((7, 8), 3)])})]
+
+# Summary of the alignments above, as calculated by get_atlas_summary_df before it summarized alignment arrays
+EXPECTED_SUMMARY = {'b0001': {'RepSeq_num_sequence_alignments': 3,
+                              'ATLAS_mean_percent_identity': 95.23333333333333,
+                              'ATLAS_mean_percent_similarity': 98.39999999999999,
+                              'ATLAS_mean_num_mutations': 1.0,
+                              'ATLAS_popular_mutations': 'I4V;T13A',
+                              'ATLAS_popular_mutation_groups': 'I4V;I4V-T13A',
+                              'ATLAS_mean_num_deletions': 1 / 3.,
+                              'ATLAS_mean_num_insertions': 0.,
+                              'ATLAS_mean_len_deletions': 1 / 3.,
+                              'ATLAS_mean_len_insertions': 0.,
+                              's1': 100., 's2': 95.2, 's3': 90.5},
+                    'b0002': {'RepSeq_num_sequence_alignments': 3,
+                              'ATLAS_mean_percent_identity': 94.46666666666665,
+                              'ATLAS_mean_percent_similarity': 97.76666666666667,
+                              'ATLAS_mean_num_mutations': 4 / 3.,
+                              'ATLAS_popular_mutations': 'R16K;N28W',
+                              'ATLAS_popular_mutation_groups': 'R16K;R16K-N28W',
+                              'ATLAS_mean_num_deletions': 1 / 3.,
+                              'ATLAS_mean_num_insertions': 1.,
+                              'ATLAS_mean_len_deletions': 2 / 3.,
+                              'ATLAS_mean_len_insertions': 2.,
+                              's1': 96.7, 's2': 90., 's3': 96.7},
+                    'b0003': {'RepSeq_num_sequence_alignments': 0,
+                              'ATLAS_popular_mutations': '',
+                              'ATLAS_popular_mutation_groups': ''}}
+
+
+def _make_atlas(root_dir):
+    reference = GEMPRO(gem_name='reference', root_dir=root_dir, genes_and_sequences=REFERENCE_SEQUENCES)
+    return ATLAS(atlas_name=ATLAS_NAME, root_dir=root_dir, reference_gempro=reference)
+
+
+def _add_strain_alignments(atlas, strain_id, alignments):
+    """Add a strain and alignments of its genes to the reference genes, as parsed by
+    pairwise_align_sequences_to_representative"""
+    atlas.strains.append(GEMPRO(gem_name=strain_id, genes_list=list(REFERENCE_SEQUENCES)))
+    for gene_id, (mutations, pid, psim, deletions, insertions) in alignments.items():
+        protein = atlas.reference_gempro.genes.get_by_id(gene_id).protein
+        a_seq = protein.representative_sequence.id
+        b_seq = '{}_{}'.format(gene_id, strain_id)
+        aln = MultipleSeqAlignment([SeqRecord(Seq(protein.representative_sequence.seq_str), id=a_seq),
+                                    SeqRecord(Seq(protein.representative_sequence.seq_str), id=b_seq)])
+        aln.id = '{}_{}'.format(protein.id, b_seq)
+        aln.annotations.update({'a_seq': a_seq, 'b_seq': b_seq, 'ssbio_type': 'seqalign', 'mutations': mutations,
+                                'percent_identity': pid, 'percent_similarity': psim,
+                                'deletions': deletions, 'insertions': insertions})
+        protein.sequence_alignments.append(aln)
+
+
+@pytest.fixture(scope='function')
+def atlas_with_alignments(tmpdir):
+    """ATLAS with alignments of three strains to the reference genes"""
+    atlas = _make_atlas(str(tmpdir))
+    for strain_id, alignments in STRAIN_ALIGNMENTS:
+        _add_strain_alignments(atlas, strain_id, alignments)
+    return atlas
+
+
+@pytest.mark.parametrize('processes', [None, 2])
+def test_get_atlas_summary_df(atlas_with_alignments, processes):
+    df = atlas_with_alignments.get_atlas_summary_df(processes=processes).set_index('Gene_ID')
+    assert sorted(df.index) == sorted(EXPECTED_SUMMARY)
+    for gene_id, expected in EXPECTED_SUMMARY.items():
+        for column, value in expected.items():
+            assert df.loc[gene_id, column] == pytest.approx(value), (gene_id, column)
+    assert df.loc['b0003', ['ATLAS_mean_percent_identity', 's1', 's2', 's3']].isnull().all()
+
+
+def test_get_atlas_summary_df_incremental(tmpdir):
+    atlas = _make_atlas(str(tmpdir))
+    for strain_id, alignments in STRAIN_ALIGNMENTS[:2]:
+        _add_strain_alignments(atlas, strain_id, alignments)
+    atlas.get_atlas_summary_df(incremental=True)
+
+    # Alignments of a new strain are folded into the kept statistics
+    _add_strain_alignments(atlas, *STRAIN_ALIGNMENTS[2])
+    incremental = atlas.get_atlas_summary_df(incremental=True)
+    pd.testing.assert_frame_equal(incremental, atlas.get_atlas_summary_df())
+
+    # Alignments whose annotations were changed are summarized again
+    aln = atlas.reference_gempro.genes.get_by_id('b0001').protein.sequence_alignments.get_by_id('b0001_b0001_s1')
+    aln.annotations['percent_identity'] = 50.
+    aln.annotations['mutations'] = [('G', 19, 'A')]
+    incremental = atlas.get_atlas_summary_df(incremental=True)
+    full = atlas.get_atlas_summary_df()
+    pd.testing.assert_frame_equal(incremental, full)
+    b0001 = full.set_index('Gene_ID').loc['b0001']
+    assert b0001['s1'] == 50.
+    assert b0001['ATLAS_popular_mutations'] == 'G19A;I4V;T13A'
+
+
+def _write_strain_blast_results(atlas, strain_id):
+    """Write a strain genome and the BLAST results of it against the reference genome, so the orthology matrix can be
+    made without running BLAST"""
+    genome_path = op.join(atlas.sequences_by_organism_dir, '{}.faa'.format(strain_id))
+    with open(genome_path, 'w') as f:
+        for gene_id, seq in sorted(REFERENCE_SEQUENCES.items()):
+            f.write('>{}_{}\n{}\n'.format(strain_id, gene_id, seq))
+
+    r_name = op.splitext(op.basename(atlas.reference_gempro.genome_path))[0]
+    for outname in ['{}_vs_{}_blast.out'.format(r_name, strain_id), '{}_vs_{}_blast.out'.format(strain_id, r_name)]:
+        with open(op.join(atlas.sequences_by_organism_dir, outname), 'w') as f:
+            f.write('# BLAST results\n')
+
+    # Strains only have orthologs of the first genes, s1 of one, s2 of two, ...
+    num_orthologs = int(strain_id[1:])
+    bbh = pd.DataFrame([{'gene': gene_id, 'subject': '{}_{}'.format(strain_id, gene_id), 'PID': 100.,
+                         'eVal': 1e-50, 'bitScore': 200., 'BBH': '<=>'}
+                        for gene_id in sorted(REFERENCE_SEQUENCES)[:num_orthologs]])
+    bbh.to_csv(op.join(atlas.sequences_by_organism_dir, '{}_vs_{}_bbh.csv'.format(r_name, strain_id)))
+    atlas.strains.append(GEMPRO(gem_name=strain_id, genome_path=genome_path, write_protein_fasta_files=False))
+
+
+def test_get_orthology_matrix_incremental(tmpdir):
+    incremental = _make_atlas(str(tmpdir.mkdir('incremental')))
+    for strain_id in ['s1', 's2']:
+        _write_strain_blast_results(incremental, strain_id)
+    incremental.get_orthology_matrix(pid_cutoff=90)
+    assert list(incremental.df_orthology_matrix.columns) == ['s1', 's2']
+
+    _write_strain_blast_results(incremental, 's3')
+    with pytest.raises(ValueError):
+        incremental.get_orthology_matrix(pid_cutoff=80, incremental=True)
+    incremental.get_orthology_matrix(pid_cutoff=90, incremental=True)
+
+    full = _make_atlas(str(tmpdir.mkdir('full')))
+    for strain_id in ['s1', 's2', 's3']:
+        _write_strain_blast_results(full, strain_id)
+    full.get_orthology_matrix(pid_cutoff=90)
+
+    pd.testing.assert_frame_equal(incremental.df_orthology_matrix.sort_index(),
+                                  full.df_orthology_matrix.sort_index())
+    assert [x.id for x in incremental.strains] == [x.id for x in full.strains] == ['s1', 's2', 's3']
+    assert incremental.df_orthology_matrix.loc['b0003', 's3'] == 's3_b0003'
+    assert pd.isnull(incremental.df_orthology_matrix.loc['b0003', 's1'])
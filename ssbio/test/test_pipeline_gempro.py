@@ -5,6 +5,7 @@ from ssbio.core.genepro import GenePro
 from ssbio.databases.kegg import KEGGProp
 from ssbio.databases.uniprot import UniProtProp
 from ssbio.databases.pdb import PDBProp
+from ssbio.protein.sequence.seqprop import SeqProp
 from cobra.core import Model, DictList
 import cobra.manipulation
 
@@ -52,6 +53,74 @@ def test_directory_creation(gempro_with_dir, test_files_outputs):
     assert op.exists(check_dir)
 
 
+def test_cached_dataframes(tmpdir):
+    gempro = GEMPRO(gem_name='test_cached_df', root_dir=str(tmpdir),
+                    genes_and_sequences={'b0001': 'MKRISTTITTTITITTGNGAG', 'b0002': 'MRVLKFGGTSVANAERFLRVADILESNARQ'})
+
+    # DataFrames are rebuilt on each access unless caching is turned on
+    b0002 = gempro.genes.get_by_id('b0002').protein
+    b0002_seq = b0002.representative_sequence
+    assert len(gempro.df_representative_sequences) == 2
+    b0002.representative_sequence = None
+    assert sorted(gempro.df_representative_sequences.index) == ['b0001']
+    b0002.representative_sequence = b0002_seq
+
+    gempro.cache_dataframes()
+    df = gempro.df_representative_sequences
+    assert sorted(df.index) == ['b0001', 'b0002']
+
+    # DataFrames are cached, and a copy is returned each time
+    df.drop('b0001', inplace=True)
+    assert len(gempro.df_representative_sequences) == 2
+
+    # Adding genes or running a method which changes them rebuilds it
+    gempro.add_gene_ids(['b0003'])
+    gempro.manual_seq_mapping({'b0003': 'MKVLAAGIVG'})
+    assert len(gempro.df_representative_sequences) == 3
+
+    # Changing proteins directly rebuilds it
+    gempro.genes.get_by_id('b0003').protein.representative_sequence = None
+    assert len(gempro.df_representative_sequences) == 2
+
+    # Replacing a gene with another, keeping the number of genes, rebuilds it
+    gempro.genes.remove(gempro.genes.get_by_id('b0002'))
+    gempro.genes.append(GenePro('b0009'))
+    gempro.genes.get_by_id('b0009').protein = b0002
+    assert sorted(gempro.df_representative_sequences.index) == ['b0001', 'b0009']
+    gempro.genes.remove(gempro.genes.get_by_id('b0009'))
+    gempro.genes.append(GenePro('b0002'))
+    gempro.genes.get_by_id('b0002').protein = b0002
+    assert sorted(gempro.df_representative_sequences.index) == ['b0001', 'b0002']
+
+    # Changes inside the attributes of proteins need the cache to be cleared
+    b0002.representative_sequence.uniprot = 'P0AD86'
+    assert 'uniprot' not in gempro.df_representative_sequences
+    gempro.clear_cache()
+    assert gempro.df_representative_sequences.loc['b0002', 'uniprot'] == 'P0AD86'
+
+    gempro.cache_dataframes(enabled=False)
+    b0002.representative_sequence = None
+    assert len(gempro.df_representative_sequences) == 1
+
+
+def test_get_sequence_properties_batch(tmpdir, monkeypatch):
+    gempro = GEMPRO(gem_name='test_seq_props', root_dir=str(tmpdir),
+                    genes_and_sequences={'b0001': 'MKRISTTITTTITITTGNGAG', 'b0002': 'MRVLKFGGTSVANAERFLRVXDILESNARQ'})
+    pepstats_run = []
+    monkeypatch.setattr(SeqProp, 'get_emboss_pepstats', lambda self: pepstats_run.append(self.id))
+
+    # Sequences are analysed individually unless batch is set
+    gempro.get_sequence_properties()
+    assert sorted(pepstats_run) == ['b0001', 'b0002']
+
+    # Sequences which can't be analysed at once fall back to running EMBOSS pepstats individually
+    del pepstats_run[:]
+    gempro.get_sequence_properties(batch=True)
+    assert pepstats_run == ['b0002']
+    annotations = gempro.genes.get_by_id('b0001').protein.representative_sequence.annotations
+    assert 'molecular_weight-biop' in annotations and 'percent_acidic-pepstats' in annotations
+
+
 class TestGemproWithDirMiniJson():
     """Tests for the gempro_with_dir_mini_json fixture"""
 
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from ssbio.pipeline.gempro import GEMPRO
+from ssbio.pipeline.runner import PipelineRunner, Step, gempro_steps, sequence_fingerprint
+
+
+SEQUENCES = {'b0001': 'MKRISTTITTTITITTGNGAG', 'b0002': 'MRVLKFGGTSVANAERFLRVADILESNARQ',
+             'b0003': 'MVKVYAPASSANMSVGFDVLGAAVTPVDG'}
+
+
+@pytest.fixture()
+def pipeline(tmpdir):
+    sequences = dict(SEQUENCES)
+    calls = {'load': [], 'lengths': []}
+
+    def load(gempro, genes):
+        calls['load'].extend(genes)
+        for g in genes:
+            protein = gempro.genes.get_by_id(g).protein
+            if protein.sequences.has_id(g):
+                protein.sequences.remove(g)
+            protein.load_manual_sequence(ident=g, seq=sequences[g], write_fasta_file=False,
+                                         set_as_representative=True)
+
+    def lengths(gempro, genes):
+        calls['lengths'].extend(genes)
+        if 'b0002' in sequences['b0001']:
+            raise RuntimeError('bad sequence')
+        for g in genes:
+            gempro.genes.get_by_id(g).annotation['length'] = len(sequences[g])
+
+    steps = [Step('lengths', lengths, depends_on='load',
+                  outputs=lambda gempro, gene: gene.annotation.get('length')),
+             Step('properties', 'get_sequence_properties', params={'batch': True}, depends_on='load',
+                  outputs=lambda gempro, gene: sorted(gene.protein.representative_sequence.annotations)),
+             Step('load', load, inputs=lambda gempro, gene: sequences.get(gene.id),
+                  outputs=lambda gempro, gene: sequence_fingerprint(gene.protein.representative_sequence))]
+    gempro = GEMPRO(gem_name='test_runner', root_dir=str(tmpdir), genes_list=['b0001', 'b0002'])
+    return gempro, steps, sequences, calls
+
+
+def test_run_incremental(pipeline):
+    gempro, steps, sequences, calls = pipeline
+    runner = PipelineRunner(gempro, steps, threads=2, chunk_size=1)
+    assert list(runner.steps) == ['load', 'lengths', 'properties']
+
+    summary = runner.run()
+    assert summary['load'] == {'run': 2, 'skipped': 0, 'failed': 0}
+    assert sorted(calls['lengths']) == ['b0001', 'b0002']
+    assert 'molecular_weight-biop' in gempro.genes.get_by_id('b0002').protein.representative_sequence.annotations
+
+    # Nothing changed, nothing runs, also when resuming from the saved manifest
+    assert runner.run()['properties'] == {'run': 0, 'skipped': 2, 'failed': 0}
+    runner = PipelineRunner(gempro, steps)
+    assert all(not x for x in runner.plan().values())
+    assert runner.run()['load']['run'] == 0
+    assert len(calls['load']) == 2
+
+    # Only new genes, and genes whose inputs changed, run
+    gempro.add_gene_ids(['b0003'])
+    sequences['b0001'] = 'MKRISTTITTTITITTGNGAGA'
+    assert runner.plan()['lengths'] == ['b0001', 'b0003']
+    summary = runner.run()
+    assert summary['lengths'] == {'run': 2, 'skipped': 1, 'failed': 0}
+    assert sorted(calls['load'][2:]) == ['b0001', 'b0003']
+
+    # Outputs which are not the ones recorded (ie. an older save of the project) are produced again
+    del gempro.genes.get_by_id('b0002').annotation['length']
+    assert runner.run()['lengths']['run'] == 1
+    assert calls['lengths'][-1] == 'b0002'
+
+    assert runner.run(steps='load', force=True)['load']['run'] == 3
+
+
+def test_run_failures(pipeline):
+    gempro, steps, sequences, calls = pipeline
+    sequences['b0001'] = 'b0002'
+    runner = PipelineRunner(gempro, steps)
+    summary = runner.run()
+    assert summary['lengths'] == {'run': 0, 'skipped': 0, 'failed': 2}
+    assert summary['properties']['run'] == 2
+    with open(runner.manifest_path) as f:
+        manifest = json.load(f)
+    assert sorted(manifest['failures']['lengths']) == ['b0001', 'b0002']
+
+    # Failed genes are run again
+    sequences['b0001'] = SEQUENCES['b0001']
+    assert runner.run()['lengths'] == {'run': 2, 'skipped': 0, 'failed': 0}
+    assert not runner.manifest['failures']['lengths']
+
+
+def test_steps():
+    with pytest.raises(ValueError):
+        PipelineRunner(GEMPRO(gem_name='test'), [Step('a', 'annotate')])
+
+    steps = gempro_steps(model_gene_source='ENSEMBLGENOME_ID', annotate_params={})
+    assert [x.name for x in PipelineRunner._sort_steps(steps)] == ['uniprot_mapping', 'representative_sequence',
+                                                                  'sequence_properties', 'pdb_mapping',
+                                                                  'representative_structure', 'annotate']
+    with pytest.raises(ValueError):
+        PipelineRunner._sort_steps([Step('a', 'annotate', depends_on='b'), Step('b', 'annotate', depends_on='a')])
+    with pytest.raises(ValueError):
+        PipelineRunner._sort_steps([Step('a', 'annotate', depends_on='c')])
@@ -0,0 +1,47 @@
+import unittest
+
+import numpy as np
+
+import ssbio.protein.sequence.properties.composition as composition
+from ssbio.protein.sequence.properties.residues import biopython_protein_analysis
+
+
+class TestComposition(unittest.TestCase):
+    """Unit tests for batch composition based sequence properties."""
+
+    seqs = ['ASQAGIPSGVYNVIPCSRKNAKEVGEAICTDPLVSKISF',
+            'MKVLAAGIVGLLLAGCSSHKEEVPAETPVTVAETAT',
+            'MSTNPKPQRKTKRNTNRRPQDVKFPGG',
+            'W',
+            'DEEDDE']
+
+    def test_composition_matrix(self):
+        counts, lengths, num_unknown = composition.composition_matrix(['AACW', 'MXZ', ''])
+        self.assertEqual(counts.shape, (3, 20))
+        self.assertEqual(counts[0, composition.AA_ORDER.index('A')], 2)
+        self.assertEqual(counts[1].sum(), 1)
+        np.testing.assert_array_equal(lengths, [4, 3, 0])
+        np.testing.assert_array_equal(num_unknown, [0, 2, 0])
+
+    def test_batch_protein_analysis(self):
+        results = composition.batch_protein_analysis(self.seqs, pepstats=False)
+        for seq, batch_info in zip(self.seqs, results):
+            self.assertEqual(batch_info, biopython_protein_analysis(seq))
+
+    def test_batch_protein_analysis_pepstats(self):
+        results = composition.batch_protein_analysis(['DEEDDE', 'ACGSTW'])
+        self.assertEqual(results[0]['percent_acidic-pepstats'], 1.0)
+        self.assertEqual(results[0]['percent_charged-pepstats'], 1.0)
+        self.assertAlmostEqual(results[1]['percent_tiny-pepstats'], 5 / 6.)
+        self.assertAlmostEqual(results[1]['percent_aromatic-pepstats'], 1 / 6.)
+
+    def test_batch_protein_analysis_invalid(self):
+        results = composition.batch_protein_analysis(['MKXL', '', 'MKL'])
+        self.assertIsNone(results[0])
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]['molecular_weight-biop'], biopython_protein_analysis('MKL')['molecular_weight-biop'])
+        self.assertEqual(composition.batch_protein_analysis([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import itertools
+import unittest
+
+import numpy as np
+
+import ssbio.protein.sequence.properties.residues as residues
+
+
+class TestResidues(unittest.TestCase):
+    """Unit tests for residue properties and substitution tables."""
+
+    def test_substitution_tables(self):
+        for table in [residues.grantham_table, residues.blosum62_table, residues.hydrophobicity_delta_table,
+                      residues.property_class_change_table]:
+            self.assertEqual(table.shape, (21, 21))
+        i, j = residues.encode_residues('CW')
+        self.assertEqual(residues.grantham_table[i, j], 215)
+        self.assertEqual(residues.blosum62_table[i, j], -2)
+        self.assertTrue(np.isnan(residues.grantham_table[i, residues.encode_residues('X')[0]]))
+
+    def test_encode_residues(self):
+        np.testing.assert_array_equal(residues.encode_residues('ACx*'), residues.encode_residues(['A', 'C', 'X', '*']))
+        self.assertEqual(residues.encode_residues('x')[0], 20)
+        self.assertEqual(len(residues.encode_residues([])), 0)
+        self.assertRaises(ValueError, residues.encode_residues, ['A', 'CW'])
+
+    def test_annotate_mutations(self):
+        aas = 'ACDEFGHIKLMNPQRSTVWYX*'
+        refs, muts = zip(*itertools.product(aas, aas))
+        df = residues.annotate_mutations(refs, muts)
+        self.assertEqual(len(df), len(aas) ** 2)
+        for ref, mut, row in zip(refs, muts, df.itertuples()):
+            self.assertEqual((row.grantham_score, row.grantham_annotation), residues.grantham_score(ref, mut))
+            self.assertEqual(row.ref_residue_prop, residues.residue_biochemical_definition(ref))
+            self.assertEqual(row.mut_residue_prop, residues.residue_biochemical_definition(mut))
+
+        self.assertEqual(len(residues.annotate_mutations('', '')), 0)
+        self.assertRaises(ValueError, residues.annotate_mutations, 'AC', 'A')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import ssbio.protein.sequence.properties.thermostability
 
 
@@ -15,4 +17,25 @@ class TestThermostability(unittest.TestCase):
         expected_1 = {'1': 'P24666-1', '2': 'P24666-2', '3': 'P24666-3'}
         self.assertEqual(
             ssbio.databases.isoform.gene_isos_to_uniprot(gene_1, isos_1, uniprot_isos_1, unrev_uniprot_isos_1),
-            expected_1)
\ No newline at end of file
+            expected_1)
+
+    def test_get_dG_at_temps(self):
+        seqs = ['ASQAGIPSGVYNVIPCSRKNAKEVGEAICTDPLVSKISF',
+                'MKVLAAGIVGLLLAGCSSHKEEVPAETPVTVAETATWFWYFLIVMCCFWY']
+        temps = [20, 37, 50]
+        dG, keq, methods = ssbio.protein.sequence.properties.thermostability.get_dG_at_temps(seqs, temps)
+        self.assertEqual(dG.shape, (2, 3))
+        for i, seq in enumerate(seqs):
+            for j, t in enumerate(temps):
+                single_dG, single_keq, single_method = ssbio.protein.sequence.properties.thermostability.get_dG_at_T(seq, t)
+                self.assertAlmostEqual(dG[i, j], single_dG, places=6)
+                self.assertAlmostEqual(keq[i, j], single_keq)
+                self.assertEqual(methods[i], single_method)
+
+    def test_get_oobatake_Tm(self):
+        seqs = ['MKVLAAGIVGLLLAGCSSHKEEVPAETPVTVAETATWFWYFLIVMCCFWY', 'DEKRDEKR', 'MKXL']
+        tm = ssbio.protein.sequence.properties.thermostability.get_oobatake_Tm(seqs)
+        self.assertAlmostEqual(ssbio.protein.sequence.properties.thermostability.calculate_oobatake_dG(seqs[0], tm[0]),
+                               0, places=4)
+        self.assertTrue(np.isnan(tm[1]))
+        self.assertTrue(np.isnan(tm[2]))
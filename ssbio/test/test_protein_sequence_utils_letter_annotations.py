@@ -0,0 +1,120 @@
+import os.path as op
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+import ssbio.protein.sequence.utils.letter_annotations as la
+from ssbio.protein.sequence.seqprop import SeqProp
+
+
+class TestLetterAnnotations(unittest.TestCase):
+    """Unit tests for columnar letter annotations"""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_to_column(self):
+        self.assertEqual(la.to_column([1.0, float('Inf'), np.nan]).dtype, np.float64)
+        self.assertEqual(la.to_column([1, 2, 3]).dtype.kind, 'i')
+        self.assertEqual(la.to_column(['H', 'E', '-']).dtype, np.dtype('U1'))
+        self.assertEqual(la.to_column('HHE'), 'HHE')
+        self.assertEqual(la.to_column(['H', 1.0, 'E']), ['H', 1.0, 'E'])
+        self.assertEqual(la.to_column([1, None, 2]), [1, None, 2])
+
+    def test_residue_annotations(self):
+        annotations = la.ResidueAnnotations(length=3, annotations={'RSA-test': [0.1, 0.2, 0.3]})
+        self.assertIsInstance(annotations.column('RSA-test'), np.ndarray)
+        self.assertIs(annotations.column('RSA-test'), annotations.column('RSA-test'))
+        self.assertEqual(annotations['RSA-test'], [0.1, 0.2, 0.3])
+        self.assertEqual(annotations.get('RSA-test'), [0.1, 0.2, 0.3])
+        self.assertEqual(annotations, {'RSA-test': [0.1, 0.2, 0.3]})
+        self.assertNotEqual(annotations, {'RSA-test': [0.1, 0.2, 0.4]})
+        with self.assertRaises(TypeError):
+            annotations['SS-test'] = 'HH'
+
+        unpickled = pickle.loads(pickle.dumps(annotations, protocol=2))
+        self.assertEqual(unpickled._length, 3)
+        self.assertIsInstance(unpickled.column('RSA-test'), np.ndarray)
+        self.assertEqual(unpickled, annotations)
+
+    def test_seqprop_letter_annotations(self):
+        sp = SeqProp(id='test', seq='MKVL')
+        sp.letter_annotations['SS-test'] = ['H', 'H', 'E', 'E']
+        self.assertIsInstance(sp.letter_annotations, la.ResidueAnnotations)
+        self.assertEqual(sp.letter_annotations.column('SS-test').dtype, np.dtype('U1'))
+        self.assertEqual(sp.letter_annotations['SS-test'], ['H', 'H', 'E', 'E'])
+        self.assertEqual(sp[1:3].letter_annotations['SS-test'], ['H', 'E'])
+
+        sp.letter_annotations = {'num-test': [1, 2, 3, 4]}
+        self.assertEqual(list(sp.letter_annotations.keys()), ['num-test'])
+
+    def test_edit_in_place(self):
+        sp = SeqProp(id='test', seq='MKVL')
+        sp.letter_annotations['SS-test'] = ['H', 'H', 'E', 'E']
+        sp.letter_annotations['num-test'] = [1, 2, 3, 4]
+        stored = sp.letter_annotations.column('num-test')
+
+        # Values which fit the stored array are written to it
+        sp.letter_annotations['SS-test'][0] = 'C'
+        sp.letter_annotations['num-test'][1] = 20
+        self.assertEqual(sp.letter_annotations['SS-test'], ['C', 'H', 'E', 'E'])
+        self.assertEqual(sp.letter_annotations['num-test'], [1, 20, 3, 4])
+        self.assertIs(sp.letter_annotations.column('num-test'), stored)
+
+        # Other values store the annotation again with a type which fits them
+        sp.letter_annotations['num-test'][2] = 3.5
+        self.assertEqual(sp.letter_annotations.column('num-test').dtype, np.float64)
+        sp.letter_annotations['SS-test'][1:3] = ['G', 'G']
+        sp.letter_annotations['SS-test'][3] = None
+        self.assertEqual(sp.letter_annotations['SS-test'], ['C', 'G', 'G', None])
+        self.assertEqual(sp.letter_annotations['num-test'], [1, 20, 3.5, 4])
+        with self.assertRaises(TypeError):
+            sp.letter_annotations['num-test'][1:3] = [1]
+
+        # Slices and copies are plain lists
+        view = sp.letter_annotations['num-test']
+        self.assertEqual(view[1:], [20, 3.5, 4])
+        self.assertIsInstance(view[0], float)
+        self.assertIsInstance(pickle.loads(pickle.dumps(view)), list)
+        self.assertEqual(view + [5], [1, 20, 3.5, 4, 5])
+
+    def test_seqprop_add(self):
+        sp = SeqProp(id='test', seq='MKVL')
+        sp.letter_annotations['SS-test'] = ['H', 'H', 'E', 'E']
+        sp.letter_annotations['RSA-test'] = [0.1, 0.2, 0.3, 0.4]
+
+        joined = sp[:2] + sp[2:]
+        self.assertEqual(str(joined.seq), 'MKVL')
+        self.assertEqual(joined.letter_annotations['SS-test'], ['H', 'H', 'E', 'E'])
+        self.assertEqual(joined.letter_annotations['RSA-test'], [0.1, 0.2, 0.3, 0.4])
+        self.assertTrue(sp.letter_annotations == dict(joined.letter_annotations))
+        self.assertTrue(sp.letter_annotations['SS-test'] == ['H', 'H', 'E', 'E'])
+
+    def test_dataset_export(self):
+        sr1 = SeqRecord(Seq('MKV'), id='seq1', letter_annotations={'RSA-test': [0.1, 0.2, 0.3], 'SS-test': 'HHE'})
+        sr2 = SeqRecord(Seq('AC'), id='seq2', letter_annotations={'RSA-test': [1, 2]})
+        dataset = la.residue_annotations_dataset([sr1, ('renamed', sr2)])
+        self.assertEqual(dataset['record_id'].tolist(), ['seq1'] * 3 + ['renamed'] * 2)
+        self.assertEqual(dataset['resnum'].tolist(), [1, 2, 3, 1, 2])
+        self.assertEqual(''.join(dataset['residue']), 'MKVAC')
+        np.testing.assert_array_equal(dataset['RSA-test'], [0.1, 0.2, 0.3, 1, 2])
+        self.assertEqual(dataset['SS-test'].tolist(), ['H', 'H', 'E', '', ''])
+
+        npz = la.save_residue_annotations(dataset, op.join(self.tempdir, 'test.npz'))
+        npy = la.save_residue_annotations(dataset, op.join(self.tempdir, 'test_npy'), file_format='npy')
+        for loaded in [la.load_residue_annotations(npz), la.load_residue_annotations(npy, mmap_mode='r')]:
+            self.assertEqual(list(loaded.keys()), list(dataset.keys()))
+            for k in dataset:
+                np.testing.assert_array_equal(loaded[k], dataset[k])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import numpy as np
+
+from ssbio.protein.sequence.utils.mapping import ResidueMapping
+
+
+class TestResidueMapping(unittest.TestCase):
+    """Unit tests for ResidueMapping"""
+
+    def setUp(self):
+        # Sequence MKTAYW aligned to chain sequence KTXYW, numbered from 10 in the structure with no coordinates for X
+        self.mapping = ResidueMapping(chain_index=[np.nan, 1, 2, 3, 4, 5],
+                                      structure_resnums=[10, 11, float('Inf'), 13, 14],
+                                      seq_str='MKTAYW',
+                                      chain_seq_str='KTXYW',
+                                      id='test')
+
+    def test_seq_to_structure(self):
+        struct_resnums, found = self.mapping.seq_to_structure([1, 2, 3, 4, 5, 6, 7])
+        np.testing.assert_array_equal(found, [False, True, True, False, True, True, False])
+        np.testing.assert_array_equal(struct_resnums[found], [10, 11, 13, 14])
+        self.assertEqual(self.mapping.num_mapped, 4)
+
+    def test_seq_to_chain(self):
+        chain_indices, found = self.mapping.seq_to_chain([1, 4])
+        np.testing.assert_array_equal(found, [False, True])
+        self.assertEqual(chain_indices[1], 2)
+
+    def test_structure_to_seq(self):
+        seq_resnums, found = self.mapping.structure_to_seq([14, 10, 12, 9, 100])
+        np.testing.assert_array_equal(found, [True, True, False, False, False])
+        np.testing.assert_array_equal(seq_resnums[found], [6, 2])
+
+    def test_residues_match(self):
+        np.testing.assert_array_equal(self.mapping.residues_match, [False, True, True, False, True, True])
+
+    def test_empty(self):
+        mapping = ResidueMapping(chain_index=[np.nan, np.nan], structure_resnums=[1])
+        self.assertIsNone(mapping.residues_match)
+        self.assertFalse(mapping.structure_to_seq([1])[1].any())
+        self.assertFalse(mapping.seq_to_structure([1, 2])[1].any())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+from Bio.Align import MultipleSeqAlignment
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from ssbio.protein.sequence.utils.mutation_matrix import MutationMatrix
+
+
+def make_alignment(aln_id, b_seq, mutations, ssbio_type='seqalign'):
+    aln = MultipleSeqAlignment([SeqRecord(Seq('MKT'), id='ref'), SeqRecord(Seq('MKT'), id=b_seq)])
+    aln.id = aln_id
+    aln.annotations['b_seq'] = b_seq
+    aln.annotations['mutations'] = mutations
+    aln.annotations['ssbio_type'] = ssbio_type
+    return aln
+
+
+class TestMutationMatrix(unittest.TestCase):
+    """Unit tests for MutationMatrix"""
+
+    def setUp(self):
+        self.alignments = [make_alignment('ref_s1', 's1', [('A', 24, 'V')]),
+                           make_alignment('ref_s2', 's2', [('A', 24, 'V'), ('R', 33, 'T')]),
+                           make_alignment('ref_s3', 's3', []),
+                           make_alignment('ref_s4', 's4', [('G', 5, 'D'), ('A', 24, 'V')]),
+                           make_alignment('ref_s5', 's5', [('A', 24, 'V')]),
+                           make_alignment('ref_1abc-A', '1abc-A', [('A', 24, 'L')], ssbio_type='structalign')]
+        self.matrix = MutationMatrix.from_alignments(self.alignments)
+
+    def test_from_alignments(self):
+        self.assertEqual(self.matrix.matrix.shape, (6, 4))
+        self.assertEqual(self.matrix.sequence_ids, ['s1', 's2', 's3', 's4', 's5', '1abc-A'])
+        self.assertEqual(self.matrix.mutations, [('A', 24, 'V'), ('R', 33, 'T'), ('G', 5, 'D'), ('A', 24, 'L')])
+
+        seqalign = MutationMatrix.from_alignments(self.alignments, alignment_type='seqalign')
+        self.assertEqual(seqalign.num_sequences, 5)
+        self.assertEqual(seqalign.num_mutations, 3)
+
+        subset = MutationMatrix.from_alignments(self.alignments, alignment_ids='ref_s2')
+        self.assertEqual(subset.sequence_ids, ['s2'])
+
+    def test_counts(self):
+        np.testing.assert_array_equal(self.matrix.mutation_counts(), [4, 1, 1, 1])
+        np.testing.assert_array_almost_equal(self.matrix.mutation_frequencies(num_total=8), [.5, .125, .125, .125])
+        np.testing.assert_array_equal(self.matrix.sequence_mutation_counts(), [1, 2, 0, 2, 1, 1])
+
+        matrix = MutationMatrix.from_alignments([make_alignment('ref_s1', 's1', [('A', 24, 'V')]),
+                                                 make_alignment('ref_s2', 's2', [('A', 24, 'L'), ('K', 30, 'R')])])
+        np.testing.assert_array_equal(matrix.sequence_mutation_counts(unique_positions=True), [1, 2])
+
+    def test_summaries(self):
+        self.assertEqual(self.matrix.sequences_with_mutation(('A', 24, 'V')), ['s1', 's2', 's4', 's5'])
+        self.assertEqual(self.matrix.sequences_with_mutation(('W', 1, 'A')), [])
+        self.assertEqual(self.matrix.single_mutations()[('R', 33, 'T')], ['s2'])
+
+        groups = self.matrix.mutation_groups()
+        self.assertEqual(groups[(('A', 24, 'V'),)], ['s1', 's5'])
+        # Groups list mutations in the order of the alignment
+        self.assertEqual(groups[(('G', 5, 'D'), ('A', 24, 'V'))], ['s4'])
+        self.assertEqual(len(groups), 4)
+
+    def test_popular(self):
+        self.assertEqual(self.matrix.popular_mutations(min_frequency=0.5), [('A', 24, 'V')])
+        self.assertEqual(self.matrix.popular_mutation_groups(min_frequency=0.3), [(('A', 24, 'V'),)])
+        self.assertEqual(len(self.matrix.popular_mutations(min_frequency=0.01)), 4)
+
+    def test_empty(self):
+        matrix = MutationMatrix.from_alignments([])
+        self.assertEqual(matrix.matrix.shape, (0, 0))
+        self.assertEqual(matrix.single_mutations(), {})
+        self.assertEqual(matrix.popular_mutations(min_frequency=0.01), [])
+        self.assertEqual(len(matrix.sequence_mutation_counts(unique_positions=True)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import os.path as op
+import shutil
+import tempfile
+import unittest
+
+from Bio import SeqIO
+
+import ssbio.protein.sequence.utils.fasta as fasta
+import ssbio.protein.sequence.utils.seqstore as seqstore
+from ssbio.protein.sequence.seqprop import SeqProp
+
+
+class TestSequenceStore(unittest.TestCase):
+    """Unit tests for the indexed sequence store."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.store_path = op.join(self.tempdir, 'store.faa')
+        self.seqs = {'TEST1': 'ASQAGIPSGVYNVIPCSRKNAKEVGEAICTDPLVSKISF',
+                     'TEST2': 'MKVLAAGIVGLLLAGCSSHKEEVPAETPVTVAETAT',
+                     'TEST3': 'MSTNPKPQRKTKRNTNRRPQDVKFPGG'}
+
+    def tearDown(self):
+        seqstore._open_stores.clear()
+        shutil.rmtree(self.tempdir)
+
+    def test_add_and_get(self):
+        store = seqstore.SequenceStore(self.store_path)
+        self.assertEqual(len(store), 0)
+
+        keys = store.add_many(self.seqs)
+        self.assertEqual(keys, list(self.seqs.keys()))
+        self.assertEqual(store.get('TEST2'), self.seqs['TEST2'])
+        self.assertEqual(store.length('TEST3'), len(self.seqs['TEST3']))
+        self.assertEqual(store.get_many(['TEST3', 'TEST1']), {'TEST3': self.seqs['TEST3'],
+                                                              'TEST1': self.seqs['TEST1']})
+        self.assertRaises(KeyError, store.get, 'NOTAKEY')
+        self.assertRaises(ValueError, store.add, 'MKV', key='has space')
+
+        # Stored file is a normal FASTA file
+        self.assertEqual(fasta.load_fasta_file_as_dict_of_seqs(self.store_path), self.seqs)
+
+    def test_overwrite_and_compact(self):
+        store = seqstore.SequenceStore(self.store_path)
+        store.add_many(self.seqs)
+        store.add('MKKKKK', key='TEST1')
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.get('TEST1'), 'MKKKKK')
+
+        # Index persists and later entries take precedence
+        reloaded = seqstore.SequenceStore(self.store_path)
+        self.assertEqual(reloaded.get('TEST1'), 'MKKKKK')
+
+        reloaded.compact()
+        self.assertEqual(len(list(SeqIO.parse(self.store_path, 'fasta'))), 3)
+        self.assertEqual(reloaded.get('TEST1'), 'MKKKKK')
+        self.assertEqual(reloaded.get('TEST2'), self.seqs['TEST2'])
+
+    def test_reindex(self):
+        fasta.write_fasta_file_from_dict(self.seqs, outname='store', outdir=self.tempdir, force_rerun=True)
+        store = seqstore.SequenceStore(self.store_path)
+        self.assertTrue(op.exists(store.index_path))
+        self.assertEqual(store.get_many(), self.seqs)
+
+    def test_export(self):
+        store = seqstore.SequenceStore(self.store_path)
+        store.add_many(self.seqs)
+        outfile = op.join(self.tempdir, 'export.faa')
+        store.export(outfile, keys=['TEST3', 'TEST1'], titles={'TEST1': 'renamed'}, force_rerun=True)
+        records = list(SeqIO.parse(outfile, 'fasta'))
+        self.assertEqual([r.id for r in records], ['TEST3', 'renamed'])
+        self.assertEqual(str(records[1].seq), self.seqs['TEST1'])
+
+    def test_seqprop_in_store(self):
+        sp = SeqProp(id='TEST1', seq=self.seqs['TEST1'])
+        sp.write_to_sequence_store(self.store_path)
+        self.assertEqual(sp.sequence_key, 'TEST1')
+        self.assertIsNone(sp._seq)
+        self.assertEqual(sp.seq_str, self.seqs['TEST1'])
+        self.assertEqual(sp.seq_len, len(self.seqs['TEST1']))
+        with self.assertRaises(ValueError):
+            sp.seq = 'MKV'
+
+        # Exported title matches what SeqIO.write would give
+        outfile = op.join(self.tempdir, 'export.faa')
+        seqstore.shared_sequence_store([sp]).export(outfile, force_rerun=True)
+        written = op.join(self.tempdir, 'written.faa')
+        SeqIO.write(SeqProp(id='TEST1', seq=self.seqs['TEST1']), written, 'fasta')
+        with open(outfile) as f1, open(written) as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+        sp.sequence_store_unset()
+        self.assertIsNone(sp.sequence_store_file)
+        self.assertEqual(sp.seq_str, self.seqs['TEST1'])
+
+    def test_export_titles_after_reopen(self):
+        store = seqstore.SequenceStore(self.store_path)
+        store.add('MKVL', key='TEST1', description='first description')
+        store.add_many(self.seqs)
+        store.add('MKKKKK', key='TEST2', description='x' * 3000)
+        index_mtime = os.stat(store.index_path).st_mtime_ns
+
+        # Titles are not read when the store is opened, and the index is not rebuilt to read them
+        reloaded = seqstore.SequenceStore(self.store_path)
+        self.assertEqual(reloaded._titles, {})
+        self.assertEqual(reloaded.title('TEST2'), 'TEST2 ' + 'x' * 3000)
+        self.assertEqual(list(reloaded._titles), ['TEST2'])
+        self.assertRaises(KeyError, reloaded.title, 'NOTAKEY')
+
+        outfile = op.join(self.tempdir, 'export.faa')
+        reloaded.export(outfile, force_rerun=True)
+        self.assertEqual(os.stat(store.index_path).st_mtime_ns, index_mtime)
+        records = {r.id: r for r in SeqIO.parse(outfile, 'fasta')}
+        self.assertEqual(records['TEST1'].description, 'TEST1')
+        self.assertEqual(records['TEST2'].description, 'TEST2 ' + 'x' * 3000)
+        self.assertEqual(records['TEST3'].description, 'TEST3')
+
+        store.add('MKVL', key='TEST4', description='first description')
+        self.assertEqual(seqstore.SequenceStore(self.store_path).title('TEST4'), 'TEST4 first description')
+
+    def test_seqprop_store_moved(self):
+        project = op.join(self.tempdir, 'project')
+        os.makedirs(op.join(project, 'sequences'))
+        sp = SeqProp(id='TEST1', seq=self.seqs['TEST1'])
+        sp.sequence_dir = op.join(project, 'sequences')
+        sp.write_to_sequence_store(op.join(project, 'store.faa'))
+        self.assertEqual(sp.sequence_store_file, op.join('..', 'store.faa'))
+
+        # The store is found again after the project folder is moved and the sequence folder updated
+        moved = op.join(self.tempdir, 'moved')
+        shutil.move(project, moved)
+        seqstore._open_stores.clear()
+        sp.sequence_dir = op.join(moved, 'sequences')
+        self.assertEqual(sp.sequence_store_path, op.join(moved, 'store.faa'))
+        self.assertEqual(sp.seq_str, self.seqs['TEST1'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os.path as op
+
+import numpy as np
+import pytest
+
+import ssbio.protein.structure.properties.depth as depth
+from ssbio.protein.structure.structprop import StructProp
+
+
+def test_surface_points():
+    # Two touching spheres enclosing nothing have one surface, on their van der Waals spheres
+    coords = np.array([[0., 0., 0.], [3., 0., 0.]])
+    points = depth.surface_points(coords, np.array([1.6, 1.6]))
+    distances = np.linalg.norm(points[:, None, :] - coords[None, :, :], axis=2).min(axis=1)
+    assert distances == pytest.approx(1.6)
+    assert len(points) == len(depth.surface_points(coords, np.array([1.6, 1.6]), exclude_cavities=False))
+
+    # An atom at the center of a closed shell has no exposed surface, and the shell loses its inner surface
+    shell = 8 * depth.sasa.sphere_points(200)
+    coords = np.vstack([[[0., 0., 0.]], shell])
+    radii = np.full(len(coords), 1.8)
+    with_cavity = depth.surface_points(coords, radii, exclude_cavities=False)
+    without_cavity = depth.surface_points(coords, radii)
+    assert np.linalg.norm(with_cavity, axis=1).min() < 8
+    assert np.linalg.norm(without_cavity, axis=1).min() > 8
+
+
+def test_get_residue_depth_df(structure_1ecp):
+    df = depth.get_residue_depth_df(structure_1ecp[0])
+    assert list(df.columns) == ['chain', 'resnum', 'icode', 'res_depth', 'ca_depth']
+    assert len(df) == 1422
+    assert (df.res_depth > 0).all()
+    assert df.ca_depth.notnull().all()
+
+    # Buried residues are deeper than exposed ones
+    results = depth.sasa.residue_sasa(structure_1ecp[0])
+    rsa = np.array([v['all_atoms_rel'] for v in results.values()])
+    assert df.res_depth[rsa < 5].mean() > 2 * df.res_depth[rsa > 50].mean()
+
+
+def test_structprop_builtin_msms(test_files_structures):
+    structprop = StructProp(ident='1u8f', structure_path=op.join(test_files_structures, '1u8f.cif'), file_type='cif')
+    structprop.get_msms_annotations(engine='builtin')
+    chain_record = structprop.chains.get_by_id('O').seq_record
+    res_depths = chain_record.letter_annotations['RES_DEPTH-msms']
+    assert len(res_depths) == len(chain_record)
+    assert np.isfinite(res_depths).sum() > 0.9 * len(res_depths)
+
+    with pytest.raises(ValueError):
+        structprop.get_msms_annotations(engine='naccess')
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+from ssbio.protein.structure.properties.dssp import dssp_command
+
+
+def _fake_dssp(tmpdir, name, version_line):
+    program = tmpdir.join(name)
+    program.write('#!/bin/sh\necho "{}"\n'.format(version_line))
+    os.chmod(str(program), 0o755)
+    return str(program)
+
+
+@pytest.mark.skipif(sys.platform.startswith('win'), reason='needs shell scripts')
+def test_dssp_command(tmpdir):
+    dssp_2 = _fake_dssp(tmpdir, 'dssp_2', 'mkdssp version 2.2.1')
+    assert dssp_command(dssp_2, '1abc.pdb') == [dssp_2, '1abc.pdb']
+
+    dssp_4 = _fake_dssp(tmpdir, 'dssp_4', 'mkdssp version 4.0.4')
+    assert dssp_command(dssp_4, '1abc.pdb') == [dssp_4, '--output-format=dssp', '1abc.pdb']
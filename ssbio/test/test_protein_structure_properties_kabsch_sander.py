@@ -0,0 +1,56 @@
+import os.path as op
+
+import numpy as np
+import pytest
+
+import ssbio.protein.structure.properties.kabsch_sander as ks
+from ssbio.protein.structure.structprop import StructProp
+
+
+@pytest.fixture(scope='module')
+def dssp_1cbn(structure_1cbn):
+    return ks.get_secondary_structure_df(structure_1cbn[0])
+
+
+def test_hbond_energies():
+    n = np.array([[0., 0., 0.], [0., 0., 0.]])
+    h = np.array([[1., 0., 0.], [1., 0., 0.]])
+    # Linear N-H...O=C bond at 2.9 Angstroms, and the same acceptor placed on top of the donor
+    c = np.array([[4.1, 0., 0.], [0.2, 0., 0.]])
+    o = np.array([[2.9, 0., 0.], [0.1, 0., 0.]])
+    energies = ks.hbond_energies(n, h, c, o)
+    expected = 0.084 * 332 * (1 / 2.9 + 1 / 3.1 - 1 / 1.9 - 1 / 4.1)
+    assert energies[0] == pytest.approx(expected, abs=0.001)
+    assert energies[1] == ks.MIN_HBOND_ENERGY
+
+
+def test_get_secondary_structure_df(dssp_1cbn):
+    assert list(dssp_1cbn.columns) == ['chain', 'resnum', 'icode', 'dssp_index', 'aa', 'ss', 'exposure_rsa', 'phi',
+                                       'psi', 'NH_O_1_relidx', 'NH_O_1_energy', 'O_NH_1_relidx', 'O_NH_1_energy',
+                                       'NH_O_2_relidx', 'NH_O_2_energy', 'O_NH_2_relidx', 'O_NH_2_energy',
+                                       'aa_three', 'max_acc', 'exposure_asa']
+    assert ''.join(dssp_1cbn.ss) == '-EE-SSHHHHHHHHHHHTTT--HHHHHHHHS-EE-SSS---TTS--'
+
+    # Angles at the chain ends are undefined
+    assert dssp_1cbn.phi.iloc[0] == 360
+    assert dssp_1cbn.psi.iloc[-1] == 360
+    assert (dssp_1cbn.phi.iloc[1:].abs() <= 180).all()
+
+    # Residues in the first helix accept a bond from 4 residues ahead
+    helix = dssp_1cbn[(dssp_1cbn.resnum >= 7) & (dssp_1cbn.resnum <= 13)]
+    assert (helix.O_NH_1_relidx == 4).all()
+    assert (helix.O_NH_1_energy < -0.5).all()
+    assert np.allclose(dssp_1cbn.exposure_asa, dssp_1cbn.exposure_rsa * dssp_1cbn.max_acc)
+
+
+def test_structprop_builtin_dssp(test_files_structures):
+    structprop = StructProp(ident='1u8f', structure_path=op.join(test_files_structures, '1u8f.cif'), file_type='cif')
+    structprop.get_dssp_annotations(engine='builtin')
+    chain_record = structprop.chains.get_by_id('O').seq_record
+    ss = chain_record.letter_annotations['SS-dssp']
+    assert len(ss) == len(chain_record)
+    assert chain_record.annotations['percent_H-dssp'] > 0.2
+    assert chain_record.annotations['percent_E-dssp'] > 0.2
+
+    with pytest.raises(ValueError):
+        structprop.get_dssp_annotations(engine='stride')
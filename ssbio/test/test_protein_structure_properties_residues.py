@@ -0,0 +1,66 @@
+import os.path as op
+import unittest
+
+import numpy as np
+from Bio.PDB import PDBParser
+from Bio.PDB.HSExposure import ExposureCN, HSExposureCA, HSExposureCB
+
+import ssbio.protein.structure.properties.residues as residues
+from ssbio.protein.structure.structprop import StructProp
+
+
+class TestStructureResidues(unittest.TestCase):
+    """Unit tests for structure residue utilities"""
+
+    def test_match_structure_sequence(self):
+        structure_seq = 'AXBXXCDX'
+        self.assertEqual(residues.match_structure_sequence(structure_seq, [1, 2, 3, 4], fill_with=None),
+                         [1, None, 2, None, None, 3, 4, None])
+        self.assertEqual(residues.match_structure_sequence(structure_seq, 'HHCC', fill_with='-'), 'H-H--CC-')
+        self.assertEqual(residues.match_structure_sequence(structure_seq, (1, 2, 3, 4, 5, 6), fill_with=0,
+                                                           ignore_excess=True), (1, 0, 2, 0, 0, 3, 4, 0))
+        self.assertRaises(ValueError, residues.match_structure_sequence, 'AXB', [1, 2, 3, 4])
+
+    def test_match_structure_sequence_short(self):
+        # Positions without values are left out, as when the fill values were inserted one at a time
+        self.assertEqual(residues.match_structure_sequence('ABXC', [1], fill_with='-'), [1, '-'])
+
+    def test_match_structure_sequence_positions(self):
+        structure_seq = 'XAAXA'
+        positions = residues.structure_sequence_positions(structure_seq)
+        self.assertEqual(positions, [1, 2, 4])
+        for values in [[1, 2, 3], ['a', 'b', 'c']]:
+            self.assertEqual(residues.match_structure_sequence(structure_seq, values, positions=positions),
+                             residues.match_structure_sequence(structure_seq, values))
+
+    def test_get_hse_df(self):
+        model = PDBParser(QUIET=True).get_structure('1cbn', op.join('test_files', 'structures', '1cbn.pdb'))[0]
+
+        # Counts are the same as Biopython's
+        for method, biopython_hse in [('cb', HSExposureCB(model)), ('ca', HSExposureCA(model))]:
+            hse = residues.get_hse_df(model, method=method).set_index(['chain', 'resnum', 'icode'])
+            for (chain, res_id), values in biopython_hse.property_dict.items():
+                row = hse.loc[(chain, res_id[1], res_id[2])]
+                self.assertEqual((row.hse_up, row.hse_down), (values[0], values[1]))
+            self.assertEqual(hse.hse_up.notnull().sum(), len(biopython_hse))
+
+        cn = ExposureCN(model)
+        hse = residues.get_hse_df(model).set_index(['chain', 'resnum', 'icode'])
+        for (chain, res_id), value in cn.property_dict.items():
+            self.assertEqual(hse.loc[(chain, res_id[1], res_id[2])].cn, value)
+        np.testing.assert_array_equal(hse.cn, hse.hse_up + hse.hse_down)
+
+        self.assertRaises(ValueError, residues.get_hse_df, model, method='cn')
+
+    def test_structprop_get_hse_annotations(self):
+        structprop = StructProp(ident='1u8f', structure_path=op.join('test_files', 'structures', '1u8f.cif'),
+                                file_type='cif')
+        structprop.get_hse_annotations()
+        chain_record = structprop.chains.get_by_id('O').seq_record
+        for key in ['HSE_UP-biopython', 'HSE_DOWN-biopython', 'CN-biopython']:
+            self.assertEqual(len(chain_record.letter_annotations[key]), len(chain_record))
+        self.assertGreater(np.isfinite(chain_record.letter_annotations['CN-biopython']).sum(), 0.9 * len(chain_record))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os.path as op
+import shutil
+
+import numpy as np
+import pytest
+from Bio.PDB import PDBParser
+
+import ssbio.protein.structure.properties.freesasa as fs
+import ssbio.protein.structure.properties.sasa as sasa
+from ssbio.protein.structure.structprop import StructProp
+
+
+@pytest.mark.parametrize('algorithm', ['shrake-rupley', 'lee-richards'])
+def test_atom_sasa(algorithm):
+    # Single sphere of radius 1.6 + 1.4
+    area = sasa.atom_sasa(np.array([[0., 0., 0.]]), np.array([1.6]), algorithm=algorithm)
+    assert area[0] == pytest.approx(4 * np.pi * 3.0 ** 2)
+
+    # Two spheres with centers 3 apart each lose a spherical cap of height 1.5
+    area = sasa.atom_sasa(np.array([[0., 0., 0.], [1., 2., 2.]]), np.array([1.6, 1.6]), algorithm=algorithm,
+                          n_points=2000, n_slices=200)
+    assert area == pytest.approx([4 * np.pi * 9 - 2 * np.pi * 3 * 1.5] * 2, rel=0.01)
+
+    with pytest.raises(ValueError):
+        sasa.atom_sasa(np.array([[0., 0., 0.]]), np.array([1.6]), algorithm='naccess')
+
+
+def test_residue_sasa(structure_1ecp):
+    results = sasa.residue_sasa(structure_1ecp, algorithm='lee-richards')
+    assert len(results) == 1422
+
+    info = [v for v in results.values() if v['res_name'] == 'ALA'][0]
+    assert info['all_atoms_abs'] == pytest.approx(info['side_chain_abs'] + info['main_chain_abs'])
+    assert info['all_atoms_abs'] == pytest.approx(info['non_polar_abs'] + info['all_polar_abs'])
+    assert info['all_atoms_rel'] == pytest.approx(100 * info['all_atoms_abs'] / 108.76)
+
+    # Glycines have no side chain reference area
+    gly = [v for v in results.values() if v['res_name'] == 'GLY'][0]
+    assert gly['side_chain_rel'] == float('Inf')
+
+
+@pytest.fixture(scope='module')
+def freesasa_1kf6(test_files_structures, tmpdir_factory):
+    """Parsed freesasa results of 1kf6, from the bundled RSA file or by running freesasa"""
+    rsa_file = op.join(test_files_structures, '1kf6.freesasa_nohet.rsa')
+    if not op.exists(rsa_file):
+        if not shutil.which('freesasa'):
+            pytest.skip('freesasa is not installed and no freesasa results of 1kf6 are bundled')
+        rsa_file = fs.run_freesasa(op.join(test_files_structures, '1kf6.pdb'), outfile='1kf6.freesasa_nohet.rsa',
+                                   include_hetatms=False, outdir=str(tmpdir_factory.mktemp('freesasa')))
+    return fs.parse_rsa_data(rsa_file)
+
+
+@pytest.mark.parametrize('algorithm, total_tolerance', [('shrake-rupley', 0.02), ('lee-richards', 0.01)])
+def test_residue_sasa_freesasa_parity(test_files_structures, freesasa_1kf6, algorithm, total_tolerance):
+    structure = PDBParser(QUIET=True).get_structure('1kf6', op.join(test_files_structures, '1kf6.pdb'))
+    results = sasa.residue_sasa(structure, algorithm=algorithm)
+    shared = [k for k in freesasa_1kf6 if k in results]
+    assert len(shared) >= 0.99 * len(freesasa_1kf6)
+
+    # The total area is within 1% (Lee-Richards, as run by freesasa) or 2% (Shrake-Rupley) of freesasa's, and the area
+    # of 95% of residues is within 5 square Angstroms or 5%
+    expected = np.array([freesasa_1kf6[k]['all_atoms_abs'] for k in shared])
+    calculated = np.array([results[k]['all_atoms_abs'] for k in shared])
+    assert calculated.sum() == pytest.approx(expected.sum(), rel=total_tolerance)
+    close = np.abs(calculated - expected) <= np.maximum(5., 0.05 * expected)
+    assert close.mean() >= 0.95
+
+
+def test_batch_residue_sasa(structure_1ecp):
+    single = sasa.residue_sasa(structure_1ecp[0])
+    batch = sasa.batch_residue_sasa([structure_1ecp, structure_1ecp], threads=2)
+    assert len(batch) == 2
+    assert batch[1] == single
+
+
+def test_structprop_builtin_freesasa(test_files_structures):
+    structprop = StructProp(ident='1u8f', structure_path=op.join(test_files_structures, '1u8f.cif'), file_type='cif')
+    structprop.get_freesasa_annotations(engine='builtin')
+    chain_record = structprop.chains.get_by_id('O').seq_record
+    rsa = chain_record.letter_annotations['RSA_ALL-freesasa_nohet']
+    assert len(rsa) == len(chain_record)
+    assert np.isfinite(rsa).sum() > 0.9 * len(rsa)
@@ -0,0 +1,71 @@
+import os.path as op
+
+import numpy as np
+import pytest
+from scipy.spatial import cKDTree
+
+from ssbio.protein.structure.properties.structure_arrays import StructureArrays
+from ssbio.protein.structure.structprop import StructProp
+
+
+def _pair_set(pairs):
+    return set(map(tuple, np.sort(pairs, axis=1)))
+
+
+def test_structure_arrays(structure_1cbn):
+    arrays = StructureArrays(structure_1cbn)
+    # 46 amino acids and one ethanol
+    assert arrays.num_residues == 47
+    assert arrays.is_standard_aa.sum() == 46
+    assert list(arrays.res_names[~arrays.is_aa]) == ['EOH']
+    assert not (arrays.elements == 'H').any()
+
+    ca = arrays.residue_atoms('CA')
+    assert (arrays.atom_names[ca[arrays.is_aa]] == 'CA').all()
+    assert ca[~arrays.is_aa] == -1
+    assert np.allclose(arrays.residue_coords('CA')[0], arrays.residues[0][1]['CA'].get_coord())
+    # Glycines have no CB
+    gly = arrays.res_names == 'GLY'
+    assert (arrays.residue_atoms('CB')[gly] == -1).all()
+    assert np.isnan(arrays.residue_coords('CB')[gly]).all()
+
+
+def test_atom_pairs(structure_1cbn):
+    arrays = StructureArrays(structure_1cbn)
+
+    # Pairs are found at the largest distance and filtered for smaller ones
+    for cutoff in [6.0, 3.0, 8.0]:
+        expected = cKDTree(arrays.coords).query_pairs(r=cutoff, output_type='ndarray')
+        assert _pair_set(arrays.atom_pairs(cutoff)) == _pair_set(expected)
+
+    # Subsets of atoms are numbered by their position in the subset
+    ca = arrays.residue_atoms('CA')[arrays.is_aa][::2]
+    expected = cKDTree(arrays.coords[ca]).query_pairs(r=9.0, output_type='ndarray')
+    for atom_name in [None, 'CA']:
+        pairs = arrays.atom_pairs(9.0, atoms=ca, atom_name=atom_name)
+        assert (pairs[:, 0] < pairs[:, 1]).all()
+        assert _pair_set(pairs) == _pair_set(expected)
+
+
+def test_structprop_annotate(test_files_structures):
+    structure_path = op.join(test_files_structures, '1u8f.cif')
+    single = StructProp(ident='1u8f', structure_path=structure_path, file_type='cif')
+    single.get_dssp_annotations(engine='builtin')
+    single.get_msms_annotations(engine='builtin')
+    single.get_freesasa_annotations(engine='builtin')
+    single.get_hse_annotations()
+    single.find_disulfide_bridges()
+
+    combined = StructProp(ident='1u8f', structure_path=structure_path, file_type='cif')
+    combined.annotate()
+
+    for chain in single.chains:
+        expected = chain.seq_record
+        calculated = combined.chains.get_by_id(chain.id).seq_record
+        assert sorted(calculated.letter_annotations) == sorted(expected.letter_annotations)
+        for key, values in expected.letter_annotations.items():
+            assert list(calculated.letter_annotations[key]) == list(values)
+        assert calculated.annotations == expected.annotations
+
+    with pytest.raises(ValueError):
+        combined.annotate(which=['dssp', 'stride'])
@@ -17,6 +17,8 @@ import warnings
 import gzip
 from collections import OrderedDict
 from collections import Callable
+import ssbio.io.jobs
+import ssbio.io.tracing
 
 log = logging.getLogger(__name__)
 
@@ -404,7 +406,9 @@ def request_file(link, outfile, force_rerun_flag=False):
 
     """
     if force_rerun(flag=force_rerun_flag, outfile=outfile):
-        req = requests.get(link)
+        with ssbio.io.tracing.span('request_file', 'network', url=link):
+            ssbio.io.tracing.count('network_requests')
+            req = requests.get(link)
         if req.status_code == 200:
             with open(outfile, 'w') as f:
                 f.write(req.text)
@@ -432,7 +436,9 @@ def request_json(link, outfile, force_rerun_flag, outdir=None):
     outfile = op.join(outdir, outfile)
 
     if force_rerun(flag=force_rerun_flag, outfile=outfile):
-        text_raw = requests.get(link)
+        with ssbio.io.tracing.span('request_json', 'network', url=link):
+            ssbio.io.tracing.count('network_requests')
+            text_raw = requests.get(link)
         my_dict = text_raw.json()
         with open(outfile, 'w') as f:
             json.dump(my_dict, f)
@@ -462,19 +468,25 @@ def program_exists(prog_name):
         return False
 
 
-def command_runner(shell_command, force_rerun_flag, outfile_checker, cwd=None, silent=False):
+def command_runner(shell_command, force_rerun_flag, outfile_checker, cwd=None, silent=False, timeout=None,
+                   memory_limit=None):
     """Run a shell command with subprocess, with additional options to check if output file exists and printing stdout.
 
+    The command is run in the shared job pool of :mod:`ssbio.io.jobs`, which limits how many programs run at the same
+    time and applies its default time and memory limits unless they are given here.
+
     Args:
         shell_command (str): Command as it would be formatted in the command-line (ie. "program -i test.in -o test.out").
         force_rerun_flag: If the program should be rerun even if the output file exists.
         outfile_checker (str): Name out the output file which may have been generated. This does not specify what the outfile
             will be, that should be done in the program's args or predetermined.
         cwd (str): Path to working directory where command will be executed.
-        silent (bool): If program STDOUT should be printed to the current shell.
+        silent (bool): If program STDOUT should be printed to the current shell once it finishes.
+        timeout (float): Time limit in seconds after which the program is stopped, the job pool's default if None.
+        memory_limit (int): Memory limit of the program in bytes, the job pool's default if None.
 
     Returns:
-        bool: If the program ran successfully.
+        bool: If the program ran successfully, or True if the output file already exists.
 
     """
     program_and_args = shlex.split(shell_command)
@@ -490,20 +502,20 @@ def command_runner(shell_command, force_rerun_flag, outfile_checker, cwd=None, s
 
     # Check for force rerunning
     if force_rerun(flag=force_rerun_flag, outfile=outfile_checker):
-        if silent:
-            command = subprocess.Popen(program_and_args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
-            out, err = command.communicate()
-            ret = command.returncode
-        else:
-            # Prints output
-            for path in execute(cmd=program_and_args, cwd=cwd):
-                print(path, end="")
+        result = ssbio.io.jobs.run(program_and_args, cwd=cwd, timeout=timeout, memory_limit=memory_limit)
+        if not silent:
+            print(result.stdout, end="")
 
-        # TODO: check return code and log properly
-        log.debug('{}: Ran program, output to {}'.format(program_and_args[0], outfile_checker))
+        if not result.ok:
+            log.error('{}. Last lines of STDERR:\n{}'.format(result.describe(),
+                                                             '\n'.join(result.stderr.splitlines()[-10:])))
+            return False
+        log.debug('{}: Ran program, output to {}'.format(result.describe(), outfile_checker))
     else:
         log.debug('{}: Output already exists'.format(outfile_checker))
 
+    return True
+
 
 def execute(cmd, cwd=None):
     popen = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, universal_newlines=True)